@@ -0,0 +1,110 @@
+"""
+Benchmark for FluidX3D host-side code - .stl loading, PNG/QOI/BMP encoding, .vtk packing, mesh bounds and parallel_for
+Runs bin/benchmark_host (built with "make benchmark-host" if it is missing), which needs no GPU or OpenCL runtime, on
+synthetic meshes, images and fields, prints throughput per case and writes the results to JSON. With --baseline,
+compares against an earlier JSON file and exits with code 1 if a case got slower by more than --tolerance, for
+CPU-only CI runners
+Usage: python benchmark_host.py [--triangles 1000000] [--ascii-triangles 100000] [--width 1920] [--height 1080]
+                                [--cells 128] [--elements 16777216] [--repeats 5] [--threads 0] [--only write_png write_qoi]
+                                [--output host.json] [--baseline baseline.json] [--tolerance 0.10] [--binary bin/benchmark_host]
+"""
+import sys
+import io
+import os
+import json
+import argparse
+import subprocess
+import tempfile
+
+# Fix console encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+root = os.path.dirname(os.path.abspath(__file__))
+parser = argparse.ArgumentParser(description="FluidX3D host-side I/O and utility benchmark")
+parser.add_argument('--triangles', type=int, default=1000000, help="triangles of the synthetic binary .stl mesh")
+parser.add_argument('--ascii-triangles', type=int, default=100000, help="triangles of the synthetic ASCII .stl mesh")
+parser.add_argument('--width', type=int, default=1920, help="width of the synthetic image")
+parser.add_argument('--height', type=int, default=1080, help="height of the synthetic image")
+parser.add_argument('--cells', type=int, default=128, help="edge length of the synthetic velocity field for .vtk")
+parser.add_argument('--elements', type=int, default=16777216, help="elements for the parallel_for cases")
+parser.add_argument('--repeats', type=int, default=5, help="timed runs per case after one warmup run, the median is reported")
+parser.add_argument('--threads', type=int, default=0, help="host threads (0: all CPU cores)")
+parser.add_argument('--only', nargs='+', default=[], help="case names to run (default: all)")
+parser.add_argument('--output', default='host.json', help="JSON file for the results (empty: don't write)")
+parser.add_argument('--baseline', default='', help="earlier output to compare against")
+parser.add_argument('--tolerance', type=float, default=0.10, help="allowed slowdown against the baseline, 0.10 = 10%%")
+parser.add_argument('--binary', default=os.path.join(root, 'bin', 'benchmark_host'), help="benchmark executable")
+options = parser.parse_args()
+
+print("=" * 70)
+print("FluidX3D - Host-side I/O and Utility Benchmark")
+print("=" * 70)
+
+if not os.path.isfile(options.binary):
+    print(f"{options.binary} not found, building it with make benchmark-host...")
+    subprocess.run(['make', '-C', root, 'benchmark-host'], check=True)
+
+with tempfile.TemporaryDirectory() as folder:
+    results_file = os.path.join(folder, 'results.json')
+    command = [options.binary, '--triangles', str(options.triangles), '--asciitriangles', str(options.ascii_triangles),
+               '--width', str(options.width), '--height', str(options.height), '--cells', str(options.cells),
+               '--elements', str(options.elements), '--repeats', str(options.repeats), '--threads', str(options.threads),
+               '--only', ','.join(options.only), '--dir', os.path.join(folder, 'files'), '--output', results_file]
+    run = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    if not os.path.isfile(results_file):
+        print(run.stdout)
+        print(f"❌ {options.binary} exited with code {run.returncode} without writing results")
+        sys.exit(1)
+    with open(results_file) as f:
+        result = json.load(f)
+
+regressions = 0
+if options.baseline:
+    with open(options.baseline) as f:
+        baseline = json.load(f)
+    reference = {(row['name'], row['size']): row for row in baseline['results']}
+    for row in result['results']:
+        previous = reference.get((row['name'], row['size']))
+        row['baseline_items_per_s'] = previous['items_per_s'] if previous else None
+        if previous:
+            row['change'] = row['items_per_s']/previous['items_per_s'] - 1.0
+            row['regression'] = row['change'] < -options.tolerance
+            regressions += row['regression']
+    result['baseline'] = {'file': options.baseline, 'date': baseline.get('date'), 'tolerance': options.tolerance,
+                          'same_threads': baseline.get('host', {}).get('threads') == result['host']['threads']}
+    result['regressions'] = regressions
+
+print(f"{result['host']['threads']} host threads, {result['settings']['repeats']} repeats after 1 warmup run, median")
+compare = 'baseline' in result
+header = f"{'case':>20} | {'size':>26} | {'time':>10} | {'throughput':>18} | {'MB/s':>9}"
+print(header + (f" | {'change':>7}" if compare else ""))
+for row in result['results']:
+    throughput = f"{row['items_per_s']/1e6:.2f} M{row['unit']}/s"
+    line = f"{row['name']:>20} | {row['size']:>26} | {1e3*row['seconds']:>7.2f} ms | {throughput:>18} | {row['mb_per_s']:>9.1f}"
+    if compare:
+        if row['baseline_items_per_s'] is None:
+            line += f" | {'-':>7}"
+        else:
+            line += f" | {100*row['change']:>+6.1f}%" + ("  ❌ slower" if row['regression'] else "")
+    if not row['ok']:
+        line += "  ❌ wrong output"
+    print(line)
+
+print()
+if options.output:
+    with open(options.output, 'w') as f:
+        json.dump(result, f, indent=1)
+    print(f"Results written to {options.output}")
+failed = [row['name'] for row in result['results'] if not row['ok']]
+if failed:
+    print(f"❌ wrong output from {', '.join(failed)}")
+if compare:
+    if not result['baseline']['same_threads']:
+        print("Note: the baseline was measured with a different number of host threads")
+    if regressions > 0:
+        print(f"❌ {regressions} case(s) more than {100*options.tolerance:.0f}% slower than {options.baseline}")
+    else:
+        print(f"✅ no case more than {100*options.tolerance:.0f}% slower than {options.baseline}")
+print("=" * 70)
+sys.exit(1 if failed or regressions > 0 else 0)
@@ -0,0 +1,42 @@
+"""
+Benchmark for FluidX3D Python Module - host field access in setups
+Times a setup-style initialization loop, a fill and a gather of the host fields, per element through the global index
+n (Memory_Container decomposes it into domain and halo offsets on every access) vs LBM::parallel_for_cells() and the
+row-wise fill()/gather() helpers
+Usage: python benchmark_host_access.py [N]
+"""
+import sys
+import io
+import fluidx3d
+
+# Fix console encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 192
+
+print("=" * 70)
+print("FluidX3D Python Module - Host Access Benchmark")
+print("=" * 70)
+print(f"Version: {fluidx3d.__version__}")
+print()
+
+config = fluidx3d.Config()
+config.parse_args(['--D3Q19', '--SRT'])
+
+results = []
+for domains in [(1, 1, 1), (2, 1, 1), (2, 2, 1), (2, 2, 2)]:
+    sim = fluidx3d.Simulation(config, N, N, N, 0.1, *domains)
+    result = sim.benchmark_host_access()
+    results.append(('x'.join(str(d) for d in domains), result))
+    del sim
+
+print()
+print(f"grid {N}^3, ns per cell (per element through n / bulk)")
+print(f"{'domains':>7} | {'setup loop':>17} | {'fill u.x':>15} | {'gather u':>15} | {'identical':>9}")
+for split, r in results:
+    print(f"{split:>7} | {r['setup_element_ns']:>6.2f} / {r['setup_cells_ns']:>6.2f} | {r['fill_element_ns']:>6.2f} / {r['fill_ns']:>6.2f} | "
+          f"{r['gather_element_ns']:>6.2f} / {r['gather_ns']:>6.2f} | {str(r['identical']):>9}")
+
+print()
+print("=" * 70)
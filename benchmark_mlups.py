@@ -0,0 +1,80 @@
+"""
+Benchmark for FluidX3D Python Module - MLUPs across velocity sets, precisions and collision operators
+Runs fluidx3d.benchmark() (empty box, like the BENCHMARK setup) for every combination on one device, prints MLUPs and
+effective GB/s, and writes the results with device metadata to JSON. With --baseline, compares against an earlier
+JSON file and exits with code 1 if a case got slower by more than --tolerance, to qualify new drivers or hardware
+Usage: python benchmark_mlups.py [--sizes 64 128] [--velocity-sets D3Q19 D3Q27] [--precisions FP32 FP16S]
+                                 [--collisions SRT] [--device 0] [--steps 200] [--warmup 50] [--repeats 5]
+                                 [--output mlups.json] [--baseline baseline.json] [--tolerance 0.05]
+"""
+import sys
+import io
+import argparse
+import fluidx3d
+
+# Fix console encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+parser = argparse.ArgumentParser(description="FluidX3D MLUPs benchmark")
+parser.add_argument('--sizes', type=int, nargs='+', default=[128], help="cube edge lengths, D2Q9 runs the square with as many cells")
+parser.add_argument('--velocity-sets', nargs='+', default=['D2Q9', 'D3Q15', 'D3Q19', 'D3Q27'])
+parser.add_argument('--precisions', nargs='+', default=['FP32', 'FP16S', 'FP16C'])
+parser.add_argument('--collisions', nargs='+', default=['SRT', 'TRT'])
+parser.add_argument('--device', type=int, default=-1, help="OpenCL device ID (-1: same choice as a simulation without -d)")
+parser.add_argument('--steps', type=int, default=200, help="time steps per timed repeat")
+parser.add_argument('--warmup', type=int, default=50, help="untimed time steps before the first repeat")
+parser.add_argument('--repeats', type=int, default=5, help="timed repeats, the median is reported")
+parser.add_argument('--output', default='mlups.json', help="JSON file for the results (empty: don't write)")
+parser.add_argument('--baseline', default='', help="earlier output to compare against")
+parser.add_argument('--tolerance', type=float, default=0.05, help="allowed slowdown against the baseline, 0.05 = 5%%")
+options = parser.parse_args()
+
+print("=" * 70)
+print("FluidX3D Python Module - MLUPs Benchmark")
+print("=" * 70)
+print(f"Version: {fluidx3d.__version__}")
+print()
+
+try:
+    result = fluidx3d.benchmark(sizes=options.sizes, velocity_sets=options.velocity_sets, precisions=options.precisions,
+                                collisions=options.collisions, device=options.device, steps=options.steps, warmup=options.warmup,
+                                repeats=options.repeats, output=options.output, baseline=options.baseline, tolerance=options.tolerance)
+except RuntimeError as e:  # no OpenCL runtime, a device ID that does not exist or invalid arguments
+    print(f"❌ {e}")
+    sys.exit(1)
+
+device = result['device']
+print()
+print(f"device {device['id']}: {device['name']} ({device['vendor']}, driver {device['driver_version']})")
+print(f"{options.steps} steps x {options.repeats} repeats after {options.warmup} warmup steps, median MLUPs")
+compare = 'baseline' in result
+header = f"{'set':>5} | {'precision':>9} | {'coll.':>5} | {'grid':>15} | {'MLUPs':>9} | {'min..max':>19} | {'GB/s':>7}"
+print(header + (f" | {'baseline':>9} | {'change':>7}" if compare else ""))
+for row in result['results']:
+    grid = 'x'.join(str(n) for n in row['N'])
+    line = f"{row['velocity_set']:>5} | {row['precision']:>9} | {row['collision']:>5} | {grid:>15} | "
+    if row['status'] != 'ok':
+        print(line + f"skipped: {row['reason']}")
+        continue
+    line += f"{row['mlups']:>9.1f} | {row['mlups_min']:>8.1f}..{row['mlups_max']:<9.1f} | {row['bandwidth_gbs']:>7.1f}"
+    if compare:
+        if row['baseline_mlups'] is None:
+            line += f" | {'-':>9} | {'-':>7}"
+        else:
+            line += f" | {row['baseline_mlups']:>9.1f} | {100*row['change']:>+6.1f}%" + ("  ❌ slower" if row['regression'] else "")
+    print(line)
+
+print()
+if options.output:
+    print(f"Results written to {options.output}")
+if compare:
+    baseline = result['baseline']
+    if not baseline['same_device']:
+        print(f"Note: the baseline was measured on {baseline['device']}")
+    if result['regressions'] > 0:
+        print(f"❌ {result['regressions']} case(s) more than {100*options.tolerance:.0f}% slower than {options.baseline}")
+    else:
+        print(f"✅ no case more than {100*options.tolerance:.0f}% slower than {options.baseline}")
+print("=" * 70)
+sys.exit(1 if compare and result['regressions'] > 0 else 0)
@@ -0,0 +1,63 @@
+"""
+Benchmark for FluidX3D Python Module - multi-device scaling
+Runs the same grid on 1, 2, 4 and 8 domains and reports MLUPs per domain count, with the halo exchange overlapped
+with stream_collide on the interior cells (default) and after stream_collide on the whole domain (--synchalo)
+Domains are placed on the devices like -d / --devicepolicy would; on a single device all domains share it,
+so there the numbers show the exchange overhead rather than a speedup
+Usage: python benchmark_scaling.py [N] [steps] [max_domains]
+"""
+import sys
+import io
+import time
+import fluidx3d
+
+# Fix console encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 128
+steps = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+max_domains = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+print("=" * 70)
+print("FluidX3D Python Module - Scaling Benchmark")
+print("=" * 70)
+print(f"Version: {fluidx3d.__version__}")
+print()
+
+def mlups(args, domains):
+    config = fluidx3d.Config()
+    config.parse_args(['--D3Q19', '--SRT'] + args)
+    sim = fluidx3d.Simulation(config, N, N, N, 0.1, *domains)
+    sim.initialize()
+    sim.run(10)  # warm up
+    sim.finish_queue()
+    start = time.perf_counter()
+    sim.run(steps)
+    sim.finish_queue()
+    seconds = time.perf_counter() - start
+    del sim
+    return N**3*steps/seconds/1e6
+
+config = fluidx3d.Config()
+config.parse_args(['--D3Q19', '--SRT'])
+results = []
+D = 1
+while D <= max_domains:
+    plan = fluidx3d.plan_domains(config, D, grid=(N, N, N))  # split with the least halo traffic
+    domains = tuple(plan['domains'])
+    devices = len({device['id'] for device in plan['devices']})
+    overlapped = mlups([], domains)
+    synchronous = mlups(['--synchalo'], domains) if D > 1 else overlapped
+    results.append((D, domains, devices, plan['halo_bytes_per_step']/1048576, overlapped, synchronous))
+    D *= 2
+
+print()
+print(f"grid {N}^3, {steps} steps, D3Q19 FP32")
+print(f"{'domains':>7} | {'split':>9} | {'devices':>7} | {'halo MB/step':>12} | {'overlapped MLUPs':>16} | {'--synchalo MLUPs':>16} | {'speedup vs 1':>12}")
+for D, domains, devices, halo, overlapped, synchronous in results:
+    split = 'x'.join(str(d) for d in domains)
+    print(f"{D:>7} | {split:>9} | {devices:>7} | {halo:>12.2f} | {overlapped:>16.1f} | {synchronous:>16.1f} | {overlapped/results[0][4]:>11.2f}x")
+
+print()
+print("=" * 70)
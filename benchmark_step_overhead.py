@@ -0,0 +1,62 @@
+"""
+Benchmark for FluidX3D Python Module - host overhead per time step
+On small grids the GPU finishes a step in microseconds, so the time per step is mostly host work
+(kernel enqueueing, extension checks, Python call overhead)
+Also times the per-step extension checks as cxxopts lookups vs the cached RuntimeFeatures
+Usage: python benchmark_step_overhead.py [steps]
+"""
+import sys
+import io
+import time
+import fluidx3d
+
+# Fix console encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+steps = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+print("=" * 70)
+print("FluidX3D Python Module - Step Overhead Benchmark")
+print("=" * 70)
+print(f"Version: {fluidx3d.__version__}")
+print()
+
+config = fluidx3d.Config()
+config.parse_args(['--D3Q19', '--SRT'])
+
+lookup = fluidx3d.benchmark_feature_lookup(config)
+print(f"Extension checks per time step: {lookup['g_args_ns_per_step']:.1f} ns as g_args lookups, {lookup['g_features_ns_per_step']:.1f} ns from RuntimeFeatures")
+print()
+
+results = []
+for N in (8, 16, 32):
+    sim = fluidx3d.Simulation(config, N, N, N, 0.1)
+    sim.initialize()
+    sim.run(100)  # warm up
+    sim.finish_queue()
+
+    start = time.perf_counter()
+    sim.run(steps)  # one call, steps enqueued back to back
+    enqueued = (time.perf_counter() - start) / steps * 1e6  # host side only, the device may still be busy
+    sim.finish_queue()
+    batched = (time.perf_counter() - start) / steps * 1e6
+
+    start = time.perf_counter()
+    for i in range(steps):
+        sim.run(1)  # one Python call per step
+    sim.finish_queue()
+    single = (time.perf_counter() - start) / steps * 1e6
+
+    results.append((N, enqueued, batched, single))
+    del sim
+
+print()
+print(f"{'grid':>8} | {'host enqueue us/step':>20} | {'run(steps) us/step':>18} | {'run(1) us/step':>14}")
+for N, enqueued, batched, single in results:
+    print(f"{N:>5}^3 | {enqueued:>20.2f} | {batched:>18.1f} | {single:>14.1f}")
+
+print()
+print("=" * 70)
+print("Step Overhead Benchmark Complete!")
+print("=" * 70)
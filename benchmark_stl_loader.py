@@ -0,0 +1,77 @@
+"""
+Benchmark for FluidX3D Python Module - .stl loader
+Writes a random binary and ASCII .stl file and times fluidx3d.read_stl() on both, side by side with
+fluidx3d.read_stl_legacy(), the std::ifstream loader it replaced (binary files only)
+Usage: python benchmark_stl_loader.py [triangles]
+"""
+import sys
+import io
+import os
+import time
+import numpy as np
+import fluidx3d
+
+# Fix console encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+binary_file = os.path.join(os.getcwd(), 'benchmark_binary.stl')
+ascii_file = os.path.join(os.getcwd(), 'benchmark_ascii.stl')
+
+print("=" * 70)
+print("FluidX3D Python Module - STL Loader Benchmark")
+print("=" * 70)
+print(f"Version: {fluidx3d.__version__}")
+print()
+
+rng = np.random.default_rng(42)
+triangles = rng.uniform(-1.0, 1.0, size=(n, 3, 3)).astype(np.float32)
+
+# binary: 80 byte header, uint32 count, then normal + 3 vertices + uint16 attribute per triangle
+records = np.zeros(n, dtype=[('normal', '<f4', 3), ('vertices', '<f4', (3, 3)), ('attribute', '<u2')])
+records['vertices'] = triangles
+with open(binary_file, 'wb') as f:
+    f.write(b'\0' * 80)
+    f.write(np.uint32(n).tobytes())
+    records.tofile(f)
+
+ascii_n = min(n, 200000)
+with open(ascii_file, 'w') as f:
+    f.write("solid benchmark\n")
+    for t in triangles[:ascii_n]:
+        f.write("  facet normal 0 0 0\n    outer loop\n")
+        for v in t:
+            f.write(f"      vertex {v[0]:.7e} {v[1]:.7e} {v[2]:.7e}\n")
+        f.write("    endloop\n  endfacet\n")
+    f.write("endsolid benchmark\n")
+
+def best_of(read, path, repeats=3):
+    times = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        result = read(path)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+print(f"{'file':>6} | {'triangles':>9} | {'MB':>6} | {'legacy':>10} | {'read_stl':>10} | {'speedup':>7} | {'M triangles/s':>13} | max error")
+for name, path, count in (("binary", binary_file, n), ("ASCII", ascii_file, ascii_n)):
+    try:
+        legacy, legacy_result = best_of(fluidx3d.read_stl_legacy, path)
+        legacy_text = f"{legacy*1E3:7.1f} ms"
+    except RuntimeError:
+        legacy, legacy_result, legacy_text = None, None, "unsupported"
+    elapsed, result = best_of(fluidx3d.read_stl, path)
+    error = float(np.abs(result - triangles[:count]).max())
+    speedup = f"{legacy/elapsed:6.2f}x" if legacy else "-"
+    print(f"{name:>6} | {count:>9} | {os.path.getsize(path)/1E6:>6.1f} | {legacy_text:>10} | {elapsed*1E3:7.1f} ms | {speedup:>7} | {count/elapsed/1E6:>13.2f} | {error:.2e}")
+    if legacy_result is not None and not np.array_equal(legacy_result, result):
+        print(f"  ❌ {name}: read_stl() and read_stl_legacy() return different triangles")
+
+os.remove(binary_file)
+os.remove(ascii_file)
+
+print()
+print("=" * 70)
+print("STL Loader Benchmark Complete!")
+print("=" * 70)
@@ -12,9 +12,16 @@ Copyright: © 2025 Christopher Nathan Drake. All rights reserved.
 SPDX-License-Identifier: Proprietary
 """
 
+import atexit
+import heapq
+import itertools
 import json
 import os
+import subprocess
 import sys
+import tempfile
+import uuid
+from collections import deque
 from easy_mcp.server import MCPLogger, get_tool_token
 from typing import Dict, List, Optional, Union, Tuple
 import threading
@@ -22,6 +29,9 @@ import time
 
 # Constants
 TOOL_LOG_NAME = "FLUIDX3D"
+JOB_FOLDER = os.path.join(tempfile.gettempdir(), "fluidx3d_jobs")  # one log file per submitted job
+DEFAULT_MAX_JOBS_PER_DEVICE = int(os.environ.get("FLUIDX3D_MAX_JOBS_PER_DEVICE", "1"))
+NO_DEVICES_MESSAGE = "No OpenCL devices available. Install the OpenCL runtime of your GPU driver, or a CPU runtime such as PoCL or Intel's"
 
 # Module-level token generated once at import time
 TOOL_UNLOCK_TOKEN = get_tool_token(__file__)
@@ -56,17 +66,17 @@ TOOLS = [
             "properties": {
                 "operation": {
                     "type": "string",
-                    "enum": ["readme", "run_simulation", "get_version", "validate_config", "list_devices"],
+                    "enum": ["readme", "run_simulation", "run_sweep", "run_batch", "submit_simulation", "job_status", "job_result", "cancel_job", "get_version", "validate_config", "list_devices"],
                     "description": "Operation to perform"
                 },
                 "config": {
                     "type": "object",
-                    "description": "Simulation configuration parameters (required for run_simulation and validate_config operations)",
+                    "description": "Simulation configuration parameters (required for run_simulation, run_sweep, submit_simulation and validate_config operations)",
                     "properties": {
                         "stl_file": {"type": "string", "description": "Path to .stl mesh file"},
                         "velocity_set": {"type": "string", "enum": ["D2Q9", "D3Q15", "D3Q19", "D3Q27"], "description": "Lattice Boltzmann velocity set"},
                         "collision_operator": {"type": "string", "enum": ["SRT", "TRT"], "description": "LBM collision operator"},
-                        "resolution": {"type": "integer", "description": "Grid resolution"},
+                        "resolution": {"type": "integer", "description": "Grid resolution, as the device memory in MB the grid may fill (per device with domains)"},
                         "reynolds": {"type": "number", "description": "Reynolds number"},
                         "velocity": {"type": "number", "description": "Flow velocity in m/s"},
                         "density": {"type": "number", "description": "Fluid density (rho) in kg/m³"},
@@ -96,15 +106,29 @@ TOOLS = [
                         "pause_on_start": {"type": "boolean", "description": "Do not auto-start the simulation"},
                         "fps": {"type": "number", "description": "Frames per second for video output"},
                         "realtime_export": {"type": "boolean", "description": "Save every frame to video output"},
+                        "record_frames": {"type": "boolean", "description": "Start with frame export turned on (writes frames to export_path)"},
                         "slomo": {"type": "number", "description": "Slow motion factor (1=realtime, 10=10x slower)"},
                         "export_path": {"type": "string", "description": "Folder name to save images and data"},
+                        "kernel_cache": {"type": "string", "description": "Folder to cache compiled OpenCL programs in, so repeated runs skip the kernel compile"},
+                        "mesh_cache": {"type": "string", "description": "Folder to cache transformed meshes and voxelized flags in, so repeated runs of the same geometry skip STL loading and voxelization"},
+                        "monitor_interval": {"type": "integer", "description": "Sample drag and lift coefficients every N time steps into a CSV log (turns on FORCE_FIELD)"},
+                        "monitor_log": {"type": "string", "description": "CSV file for the drag/lift samples (default: forces.csv in export_path)"},
+                        "converge_tolerance": {"type": "number", "description": "Stop early once the mean coefficients of the last converge_window samples change by less than this fraction"},
+                        "converge_window": {"type": "integer", "description": "Number of samples averaged per convergence check (default: 10)"},
+                        "reference_area": {"type": "number", "description": "Reference area in m^2 for the coefficients (default: chord_length^2)"},
+                        "checkpoint_every": {"type": "integer", "description": "Write a checkpoint of the full simulation state every N time steps, in the background"},
+                        "checkpoint_file": {"type": "string", "description": "Checkpoint file (default: checkpoint.fxc in export_path)"},
+                        "resume": {"type": "string", "description": "Checkpoint file to continue from instead of initializing; grid, domains, velocity set and extensions must match"},
                         "frame_width": {"type": "integer", "description": "Screen or window resolution width"},
                         "frame_height": {"type": "integer", "description": "Screen or window resolution height"},
                         "background_color": {"type": "integer", "description": "Screen background color (hex)"},
                         "streamline_sparse": {"type": "integer", "description": "Streamlines spacing"},
                         "streamline_length": {"type": "integer", "description": "Streamline length"},
                         "transparency": {"type": "boolean", "description": "Enable transparency"},
-                        "display": {"type": "string", "description": "Display device selection"},
+                        "display": {"type": "string", "description": "OpenCL device ID(s) to run on, comma separated, one per domain (same as -d, see list_devices)"},
+                        "device_policy": {"type": "string", "enum": ["auto", "flops", "memory"], "description": "How to pick the device when display is not given: auto (fastest group of identical devices), flops or memory"},
+                        "domains": {"type": "integer", "description": "Split the grid across this many devices; the domain split with the least halo traffic is picked automatically"},
+                        "headless": {"type": "boolean", "description": "Run without a window (always the case on Linux/macOS); frames are still written when record_frames is set"},
                         "enable_graphics": {"type": "boolean", "description": "Enable interactive 3D graphics"},
                         "enable_graphics_ascii": {"type": "boolean", "description": "Enable console ASCII graphics"},
                         "enable_subgrid": {"type": "boolean", "description": "Enable SUBGRID model"},
@@ -123,6 +147,43 @@ TOOLS = [
                         "allow_sleep": {"type": "boolean", "description": "Do not prevent PC from sleeping"}
                     }
                 },
+                "points": {
+                    "type": "array",
+                    "description": "Operating points for run_sweep; each may set reynolds, velocity and angle_of_attack, missing values come from config",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "reynolds": {"type": "number", "description": "Reynolds number"},
+                            "velocity": {"type": "number", "description": "Free stream velocity in m/s"},
+                            "angle_of_attack": {"type": "number", "description": "Rotation angle in degrees"}
+                        }
+                    }
+                },
+                "configs": {
+                    "type": "array",
+                    "description": "Simulation configurations for run_batch, each with the same parameters as config; run in parallel, one worker process per OpenCL device",
+                    "items": {"type": "object"}
+                },
+                "timeout": {
+                    "type": "number",
+                    "description": "Wall time limit in seconds for each run_batch job, a job that takes longer is stopped and reported as timeout (default: no limit)"
+                },
+                "cores_per_worker": {
+                    "type": "integer",
+                    "description": "CPU cores per run_batch worker on a CPU OpenCL device, which gets one worker per this many cores; each worker is pinned to its own cores (Linux) and its OpenCL runtime and host loops use that many threads (default: all cores, one worker)"
+                },
+                "job_id": {
+                    "type": "string",
+                    "description": "Job returned by submit_simulation (required for job_result and cancel_job, optional for job_status)"
+                },
+                "priority": {
+                    "type": "integer",
+                    "description": "Queue priority for submit_simulation, higher runs first, equal priorities run in submission order (default: 0)"
+                },
+                "max_jobs_per_device": {
+                    "type": "integer",
+                    "description": "Number of jobs allowed to run at the same time on one OpenCL device (default: 1)"
+                },
                 "tool_unlock_token": {
                     "type": "string",
                     "description": "Security token obtained from readme operation: " + TOOL_UNLOCK_TOKEN
@@ -211,12 +272,98 @@ You MUST include tool_unlock_token in the input dict for all operations.
   }}
 }}
 
+### 6. Submit a Simulation Job (returns immediately)
+{{
+  "input": {{
+    "operation": "submit_simulation",
+    "config": {{
+      "stl_file": "wing.stl",
+      "velocity_set": "D3Q19",
+      "resolution": 4096,
+      "velocity": 25.0,
+      "reynolds": 1000000,
+      "simulation_time": 5.0,
+      "collision_operator": "SRT",
+      "record_frames": true,
+      "export_path": "output/wing/"
+    }},
+    "priority": 0,
+    "tool_unlock_token": "{TOOL_UNLOCK_TOKEN}"
+  }}
+}}
+
+### 7. Job Status, Result and Cancel
+{{
+  "input": {{
+    "operation": "job_status",
+    "job_id": "<id from submit_simulation, omit to list all jobs>",
+    "tool_unlock_token": "{TOOL_UNLOCK_TOKEN}"
+  }}
+}}
+Use "operation": "job_result" for the exit status, log tail, exported files and drag/lift monitor result of a finished job,
+and "operation": "cancel_job" to remove a queued job or stop a running one.
+
+### 8. Run a Sweep (Reynolds number, velocity and angle of attack on one grid)
+{{
+  "input": {{
+    "operation": "run_sweep",
+    "config": {{
+      "stl_file": "wing.stl",
+      "velocity_set": "D3Q19",
+      "resolution": 4096,
+      "velocity": 25.0,
+      "reynolds": 1000000,
+      "simulation_time": 2.0,
+      "collision_operator": "SRT",
+      "monitor_interval": 100,
+      "converge_tolerance": 0.001
+    }},
+    "points": [
+      {{"angle_of_attack": 0.0}},
+      {{"angle_of_attack": 4.0}},
+      {{"angle_of_attack": 4.0, "reynolds": 2000000}}
+    ],
+    "tool_unlock_token": "{TOOL_UNLOCK_TOKEN}"
+  }}
+}}
+The grid is allocated and the kernels are compiled once; per point only the viscosity and the units change, and the
+mesh is voxelized again when the angle of attack changes. Blocks until every point is done and returns one result per
+point (Cd, Cl, Cs, force_N, time steps t, converged, setup_s and run_s wall times). FORCE_FIELD is always on and the
+sweep runs headless. Points run in order, so grouping equal angles of attack saves voxelizations.
+
+### 9. Run a Batch (different configs in parallel, one worker per device)
+{{
+  "input": {{
+    "operation": "run_batch",
+    "configs": [
+      {{"stl_file": "wing.stl", "velocity_set": "D3Q19", "resolution": 2048, "velocity": 25.0, "reynolds": 1000000, "simulation_time": 1.0, "collision_operator": "SRT", "monitor_interval": 100}},
+      {{"stl_file": "wing.stl", "velocity_set": "D3Q19", "resolution": 2048, "velocity": 25.0, "reynolds": 1000000, "simulation_time": 1.0, "collision_operator": "SRT", "monitor_interval": 100, "angle_of_attack": 4.0}},
+      {{"stl_file": "fuselage.stl", "velocity_set": "D3Q27", "resolution": 4096, "velocity": 40.0, "reynolds": 5000000, "simulation_time": 1.0, "collision_operator": "TRT", "monitor_interval": 100}}
+    ],
+    "timeout": 3600,
+    "tool_unlock_token": "{TOOL_UNLOCK_TOKEN}"
+  }}
+}}
+Unlike run_sweep, every config may use its own STL, grid and extensions. Each device gets one worker (a CPU OpenCL device
+gets one per cores_per_worker cores, pinned to its own cores with as many threads) that runs jobs one at a time in worker processes; a worker that runs out of jobs
+takes queued ones from the busiest other worker. Blocks until every job is done and returns one result per config (status
+completed/failed/timeout, device, elapsed_time, monitor result, log file) plus throughput stats (jobs per hour, time steps
+per second, per-worker utilization). Configs with "display" only run on that device. Every job runs on a single device,
+configs with several display IDs or domains > 1 are rejected; run those with run_simulation or submit_simulation.
+
+## Jobs
+- Every submitted job runs headless in its own worker process, so a crash or exit() in a job never takes down the server
+- Jobs wait in a priority queue (higher priority first, FIFO within a priority) until their OpenCL device is free
+- The device of a job is its "display" config value (OpenCL device ID list, same as -d); jobs without one go to the first free device that device_policy allows (auto: all devices identical to the fastest one, flops/memory: every device, best first)
+- max_jobs_per_device sets how many jobs run at once per device (default 1, or the FLUIDX3D_MAX_JOBS_PER_DEVICE environment variable)
+- Job logs are written to {JOB_FOLDER}, run_batch logs to a batch_<id> folder inside it (batch jobs are not listed by job_status)
+
 ## Configuration Parameters
 
 ### Required Parameters
 - **stl_file**: Path to 3D mesh file (must exist)
 - **velocity_set**: D2Q9, D3Q15, D3Q19, or D3Q27 (D3Q27 recommended)
-- **resolution**: Grid resolution (higher = more detail, more GPU memory)
+- **resolution**: Grid resolution as the device memory in MB the grid fills (higher = more detail); validate_config reports the exact memory and whether it fits
 - **velocity**: Flow velocity in m/s
 - **reynolds**: Reynolds number (Re = velocity × length / kinematic_viscosity)
 - **simulation_time**: How long to run simulation in seconds
@@ -228,6 +375,18 @@ You MUST include tool_unlock_token in the input dict for all operations.
 - **enable_subgrid**: Better turbulence modeling (default: false)
 - **enable_fp16s**: Use half-precision for memory efficiency (default: false)
 - **export_path**: Directory to save results (default: "export/")
+- **headless**: No window, message pump or render loop - for servers and batch jobs (default: false, always true on Linux/macOS)
+- **record_frames**: Write rendered frames to export_path from the start (default: false)
+- **kernel_cache**: Folder for compiled OpenCL programs; repeated runs with the same settings skip the compile (default: off)
+- **display**: OpenCL device ID(s) from list_devices, comma separated (default: picked by device_policy)
+- **device_policy**: auto, flops or memory - how to pick the device when display is not given (default: auto)
+- **domains**: Number of devices to split the grid across, resolution is then the memory per device in MB; pass one display ID per domain (default: 1)
+- **mesh_cache**: Folder for transformed meshes and voxelized flags; repeated runs with the same STL, transform and resolution skip voxelization (default: off)
+- **monitor_interval**: Sample drag (Cd) and lift (Cl) every N time steps into monitor_log; the response gets a "monitor" entry with the last sample (default: off)
+- **converge_tolerance**: With monitor_interval, stop as soon as the coefficients settle to this relative change between two windows of converge_window samples (default: run to the end)
+- **reference_area**: Area in m^2 the coefficients refer to (default: chord_length squared)
+- **checkpoint_every**: Save the full simulation state every N time steps to checkpoint_file, so a crashed or pre-empted run can continue (default: off)
+- **resume**: Checkpoint file to continue from; the run keeps simulation_time as its end, so it only does the remaining steps (default: off)
 - **camera_x/y/z**: Camera position (defaults: 19.0, 19.1, 19.2)
 - **angle_of_attack**: Rotation angle in degrees (default: 0.0)
 
@@ -303,11 +462,11 @@ You MUST include tool_unlock_token in the input dict for all operations.
 ## Notes
 1. STL files must exist in the current directory or provide full path
 2. Higher resolution requires more GPU memory (D3Q27 @ 15400³ needs ~16GB VRAM)
-3. Simulation runs in real-time and blocks until completed
+3. run_simulation runs in real-time and blocks until completed, use submit_simulation for long runs
 4. Results are automatically exported to export_path if specified
 5. FluidX3D module must be installed: `pip install fluidx3d`
 6. Requires OpenCL runtime (GPU drivers or Intel CPU Runtime)
-7. **Known limitation**: Closing the graphics window calls exit() in C++, which may terminate the server process. This is a limitation of the current C++ implementation.
+7. **Known limitation**: Closing the graphics window calls exit() in C++, which may terminate the server process when using run_simulation. Jobs from submit_simulation run in their own process and are not affected.
 
 ## Velocity Set Comparison
 - **D2Q9**: 2D simulations only
@@ -359,6 +518,8 @@ def validate_parameters(input_param: Dict) -> Tuple[Optional[str], Dict]:
                 return f"Parameter '{param_name}' must be a string, got {type(value).__name__}", {}
             elif expected_type == "object" and not isinstance(value, dict):
                 return f"Parameter '{param_name}' must be an object/dictionary, got {type(value).__name__}", {}
+            elif expected_type == "array" and not isinstance(value, list):
+                return f"Parameter '{param_name}' must be an array/list, got {type(value).__name__}", {}
             elif expected_type == "integer" and not isinstance(value, int):
                 return f"Parameter '{param_name}' must be an integer, got {type(value).__name__}", {}
             elif expected_type == "boolean" and not isinstance(value, bool):
@@ -436,11 +597,14 @@ def handle_list_devices(params: Dict) -> Dict:
         
         MCPLogger.log(TOOL_LOG_NAME, "Listing OpenCL devices")
         
-        # This would require additional OpenCL introspection
-        # For now, return a placeholder
+        # Enumerated once per server process by the module, so repeated calls are cheap
+        devices = fx3d.get_devices()
+        if not devices:
+            return create_error_response(NO_DEVICES_MESSAGE, with_readme=False)
         result = {
-            "message": "Device detection not yet implemented. Run a simulation to see detected devices in output.",
-            "note": "FluidX3D will automatically detect and use the best available OpenCL device"
+            "devices": devices,
+            "selected": {policy: fx3d.select_devices(1, policy)[0] for policy in ("auto", "flops", "memory")},
+            "note": "Pass a device id as config.display to run on that device, or config.device_policy to pick one"
         }
         
         return {
@@ -490,12 +654,19 @@ def handle_validate_config(params: Dict) -> Dict:
             "warnings": []
         }
         
-        # Add warnings for high memory usage
-        if config_params["resolution"] > 10000:
-            result["warnings"].append("High resolution may require significant GPU memory (>8GB)")
-        
-        if config_params["velocity_set"] == "D3Q27" and config_params["resolution"] > 10000:
-            result["warnings"].append("D3Q27 with high resolution may require >16GB GPU memory")
+        # Exact memory of the grid this configuration sets up, on the devices it would run on
+        config = fx3d.Config()
+        config.parse_args(build_simulation_args(config_params))
+        plan = fx3d.plan_domains(config, int(config_params.get("domains", 1)))
+        result["memory"] = plan
+        if not plan["devices"]:
+            result["warnings"].append(f"{NO_DEVICES_MESSAGE}. The memory plan is not checked against a device")
+        for device in plan["devices"]:
+            if not device["fits"]:
+                result["valid"] = False
+                result["warnings"].append(f"Needs {device['required_mb']} MB on device {device['id']} ({device['name']}), which has {device['memory_mb']} MB; lower resolution, enable_fp16s or use more domains")
+            elif not device["buffer_fits"]:
+                result["warnings"].append(f"The DDF buffer is larger than the {device['max_buffer_mb']} MB maximum buffer size of device {device['id']}; enable_fp16s or more domains avoid it")
         
         return {
             "content": [{"type": "text", "text": json.dumps(result, indent=2)}],
@@ -505,6 +676,569 @@ def handle_validate_config(params: Dict) -> Dict:
     except Exception as e:
         return create_error_response(f"Error validating configuration: {str(e)}", with_readme=False)
 
+def build_simulation_args(config_params: Dict) -> List[str]:
+    """Translate a config dict into FluidX3D command line arguments."""
+    args = [
+        f'--{config_params["velocity_set"]}',
+        f'--{config_params["collision_operator"]}',
+        '-f', config_params["stl_file"],
+        '-r', str(config_params["resolution"]),
+        '-u', str(config_params["velocity"]),
+        '--re', str(config_params["reynolds"]),
+    ]
+    
+    # Add simulation time (either secs or time steps)
+    if "simulation_time" in config_params:
+        args.extend(['--secs', str(config_params["simulation_time"])])
+    elif "time_steps" in config_params:
+        args.extend(['-t', str(config_params["time_steps"])])
+    
+    # Mesh transformations
+    if "rotation_x" in config_params:
+        args.extend(['--rotx', str(config_params["rotation_x"])])
+    if "rotation_y" in config_params:
+        args.extend(['--roty', str(config_params["rotation_y"])])
+    if "rotation_z" in config_params:
+        args.extend(['--rotz', str(config_params["rotation_z"])])
+    if "translate_x" in config_params:
+        args.extend(['--trx', str(config_params["translate_x"])])
+    if "translate_y" in config_params:
+        args.extend(['--try', str(config_params["translate_y"])])
+    if "translate_z" in config_params:
+        args.extend(['--trz', str(config_params["translate_z"])])
+    if "scale" in config_params:
+        args.extend(['--scale', str(config_params["scale"])])
+    if "angle_of_attack" in config_params:
+        args.extend(['--aoa', str(config_params["angle_of_attack"])])
+    
+    # Simulation box
+    if "box_width" in config_params:
+        args.extend(['-x', str(config_params["box_width"])])
+    if "box_length" in config_params:
+        args.extend(['-y', str(config_params["box_length"])])
+    if "box_height" in config_params:
+        args.extend(['-z', str(config_params["box_height"])])
+    
+    # Physical parameters
+    if "density" in config_params:
+        args.extend(['--rho', str(config_params["density"])])
+    if "chord_length" in config_params:
+        args.extend(['-c', str(config_params["chord_length"])])
+    
+    # Camera settings
+    if "camera_x" in config_params:
+        args.extend(['--camx', str(config_params["camera_x"])])
+    if "camera_y" in config_params:
+        args.extend(['--camy', str(config_params["camera_y"])])
+    if "camera_z" in config_params:
+        args.extend(['--camz', str(config_params["camera_z"])])
+    if "camera_zoom" in config_params:
+        args.extend(['--camzoom', str(config_params["camera_zoom"])])
+    if "camera_rotation_x" in config_params:
+        args.extend(['--camrx', str(config_params["camera_rotation_x"])])
+    if "camera_rotation_y" in config_params:
+        args.extend(['--camry', str(config_params["camera_rotation_y"])])
+    if "camera_fov" in config_params:
+        args.extend(['--camfov', str(config_params["camera_fov"])])
+    
+    # Graphics settings
+    if "export_path" in config_params:
+        args.extend(['--export', config_params["export_path"]])
+    if "kernel_cache" in config_params:
+        args.extend(['--kernelcache', config_params["kernel_cache"]])
+    if "mesh_cache" in config_params:
+        args.extend(['--meshcache', config_params["mesh_cache"]])
+    if "fps" in config_params:
+        args.extend(['--fps', str(config_params["fps"])])
+    if "slomo" in config_params:
+        args.extend(['--slomo', str(config_params["slomo"])])
+    if "frame_width" in config_params:
+        args.extend(['--FRAME_WIDTH', str(config_params["frame_width"])])
+    if "frame_height" in config_params:
+        args.extend(['--FRAME_HEIGHT', str(config_params["frame_height"])])
+    if "background_color" in config_params:
+        args.extend(['--BACKGROUND_COLOR', str(config_params["background_color"])])
+    if "streamline_sparse" in config_params:
+        args.extend(['--STREAMLINE_SPARSE', str(config_params["streamline_sparse"])])
+    if "streamline_length" in config_params:
+        args.extend(['--STREAMLINE_LENGTH', str(config_params["streamline_length"])])
+    if "display" in config_params:
+        args.extend(['-d', config_params["display"]])
+    if "device_policy" in config_params:
+        args.extend(['--devicepolicy', config_params["device_policy"]])
+    if "domains" in config_params:
+        args.extend(['--domains', str(config_params["domains"])])
+    
+    # Drag/lift monitor, needs the force field
+    if "monitor_interval" in config_params:
+        args.extend(['--monitor', str(config_params["monitor_interval"])])
+        if not config_params.get("enable_force_field"):
+            args.append('--FORCE_FIELD')
+    if "monitor_log" in config_params:
+        args.extend(['--monitorlog', config_params["monitor_log"]])
+    if "converge_tolerance" in config_params:
+        args.extend(['--converge', str(config_params["converge_tolerance"])])
+    if "converge_window" in config_params:
+        args.extend(['--convergewindow', str(config_params["converge_window"])])
+    if "reference_area" in config_params:
+        args.extend(['--area', str(config_params["reference_area"])])
+    
+    # Checkpoint and restart
+    if "checkpoint_every" in config_params:
+        args.extend(['--checkpoint-every', str(config_params["checkpoint_every"])])
+    if "checkpoint_file" in config_params:
+        args.extend(['--checkpoint', config_params["checkpoint_file"]])
+    if "resume" in config_params:
+        args.extend(['--resume', config_params["resume"]])
+    
+    # Boolean flags
+    if config_params.get("window_mode"):
+        args.append('--window')
+    if config_params.get("wait_on_exit"):
+        args.append('--wait')
+    if config_params.get("pause_on_start"):
+        args.append('--pause')
+    if config_params.get("realtime_export"):
+        args.append('--realtime')
+    if config_params.get("record_frames"):
+        args.append('--record')
+    if config_params.get("transparency"):
+        args.append('--TRANSPARENCY')
+    if config_params.get("enable_graphics"):
+        args.append('--GRAPHICS')
+    if config_params.get("enable_graphics_ascii"):
+        args.append('--GRAPHICS_ASCII')
+    if config_params.get("enable_subgrid"):
+        args.append('--SUBGRID')
+    if config_params.get("enable_volume_force"):
+        args.append('--VOLUME_FORCE')
+    if config_params.get("enable_force_field"):
+        args.append('--FORCE_FIELD')
+    if config_params.get("enable_particles"):
+        args.append('--PARTICLES')
+    if config_params.get("enable_temperature"):
+        args.append('--TEMPERATURE')
+    if config_params.get("enable_update_fields"):
+        args.append('--UPDATE_FIELDS')
+    if config_params.get("enable_moving_boundaries"):
+        args.append('--MOVING_BOUNDARIES')
+    if config_params.get("enable_equilibrium_boundaries"):
+        args.append('--EQUILIBRIUM_BOUNDARIES')
+    if config_params.get("enable_surface"):
+        args.append('--SURFACE')
+    if config_params.get("enable_fp16s"):
+        args.append('--FP16S')
+    if config_params.get("enable_fp16c"):
+        args.append('--FP16C')
+    if config_params.get("enable_benchmark"):
+        args.append('--BENCHMARK')
+    if config_params.get("enable_floor"):
+        args.append('--floor')
+    if config_params.get("allow_sleep"):
+        args.append('--allowsleep')
+    
+    return args
+
+# Runs in the worker process: argv[1] is the folder of the fluidx3d extension module, argv[2] the JSON argument list, argv[3] "1" for headless
+# The drag/lift monitor result is printed as the last log line after WORKER_RESULT_PREFIX
+WORKER_RESULT_PREFIX = "FLUIDX3D_RESULT "
+WORKER_SCRIPT = """
+import json, os, sys
+cores = [int(c) for c in os.environ.get("FLUIDX3D_WORKER_CORES", "").split(",") if c]
+if cores and hasattr(os, "sched_setaffinity"):
+    os.sched_setaffinity(0, cores)  # before the OpenCL runtime starts its threads, they inherit the affinity
+sys.path.insert(0, sys.argv[1])
+import fluidx3d
+if cores:
+    fluidx3d.set_threads(len(cores))  # host loops, hardware_concurrency() ignores the affinity
+    print("Worker pinned to cores %%s" %% ",".join(str(c) for c in sorted(os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else cores)), flush=True)
+config = fluidx3d.Config()
+config.parse_args(json.loads(sys.argv[2]))
+monitor = config.run_simulation(headless=sys.argv[3] == "1")
+print("%s" + json.dumps(monitor), flush=True)
+""" % WORKER_RESULT_PREFIX
+
+def start_worker(args: List[str], headless: bool, log_file: str, cores: Optional[List[int]] = None) -> subprocess.Popen:
+    """Launch a worker process that runs one simulation with the given arguments and logs to log_file.
+    
+    With cores, the worker is pinned to these CPU cores (Linux) and the CPU OpenCL runtime (PoCL) and the host loops are
+    limited to as many threads, so several workers on one CPU device don't oversubscribe it.
+    """
+    module_folder = os.path.dirname(os.path.abspath(fx3d.__file__))
+    env = None
+    if cores:
+        env = dict(os.environ)
+        env["FLUIDX3D_WORKER_CORES"] = ",".join(str(c) for c in cores)
+        env["POCL_CPU_MAX_CU_COUNT"] = env["POCL_MAX_PTHREAD_COUNT"] = str(len(cores))
+    with open(log_file, "w") as log:
+        return subprocess.Popen(
+            [sys.executable, "-c", WORKER_SCRIPT, module_folder, json.dumps(args), "1" if headless else "0"],
+            stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, env=env)
+
+def read_worker_log(log_file: str) -> Tuple[List[str], Optional[Dict]]:
+    """Lines of a worker log and the drag/lift monitor result it printed last, None if there is none."""
+    if not os.path.exists(log_file):
+        return [], None
+    with open(log_file, "r", errors="replace") as log:
+        lines = log.read().splitlines()
+    results = [line for line in lines if line.startswith(WORKER_RESULT_PREFIX)]
+    return lines, json.loads(results[-1][len(WORKER_RESULT_PREFIX):]) if results else None
+
+class JobManager:
+    """Queue of simulation jobs, each run in its own worker process, limited per OpenCL device."""
+    
+    def __init__(self, max_jobs_per_device: int = DEFAULT_MAX_JOBS_PER_DEVICE):
+        self.max_jobs_per_device = max(1, max_jobs_per_device)
+        self.jobs = {}  # job_id -> job dict, kept after the job finishes
+        self.queue = []  # heap of (-priority, sequence, job_id)
+        self.running = {}  # device -> number of running jobs
+        self.sequence = itertools.count()
+        self.lock = threading.Lock()
+    
+    def submit(self, config_params: Dict, args: List[str], devices: List[str], priority: int = 0) -> str:
+        """Queue a job and start it right away if one of its devices has a free slot."""
+        job_id = uuid.uuid4().hex[:12]
+        os.makedirs(JOB_FOLDER, exist_ok=True)
+        with self.lock:
+            self.jobs[job_id] = {
+                "job_id": job_id,
+                "status": "queued",
+                "priority": priority,
+                "device": None,  # set when the job starts
+                "devices": devices,  # candidates in order of preference
+                "headless": bool(config_params.get("headless", True)),
+                "config": config_params,
+                "args": args,
+                "log_file": os.path.join(JOB_FOLDER, f"{job_id}.log"),
+                "submitted": time.time(),
+                "started": None,
+                "finished": None,
+                "returncode": None,
+                "process": None,
+            }
+            heapq.heappush(self.queue, (-priority, next(self.sequence), job_id))
+            self._schedule()
+        MCPLogger.log(TOOL_LOG_NAME, f"Job {job_id} submitted with priority {priority}")
+        return job_id
+    
+    def _schedule(self):
+        """Start queued jobs whose device has a free slot, in priority order. Call with the lock held."""
+        waiting = []
+        while self.queue:
+            entry = heapq.heappop(self.queue)
+            job = self.jobs[entry[2]]
+            if job["status"] != "queued":
+                continue  # cancelled while waiting
+            free = [device for device in job["devices"] if self.running.get(device, 0) < self.max_jobs_per_device]
+            if not free:
+                waiting.append(entry)
+                continue
+            self._start(job, free[0])
+        for entry in waiting:
+            heapq.heappush(self.queue, entry)
+    
+    def _start(self, job: Dict, device: str):
+        """Launch the worker process of a job on a device and a thread that waits for it. Call with the lock held."""
+        args = job["args"] if "display" in job["config"] else job["args"] + ['-d', device]
+        try:
+            job["process"] = start_worker(args, job["headless"], job["log_file"])
+        except OSError as e:
+            job["status"] = "failed"
+            job["finished"] = time.time()
+            job["error"] = str(e)
+            MCPLogger.log(TOOL_LOG_NAME, f"Job {job['job_id']} failed to start: {e}")
+            return
+        job["status"] = "running"
+        job["started"] = time.time()
+        job["device"] = device
+        self.running[job["device"]] = self.running.get(job["device"], 0) + 1
+        threading.Thread(target=self._wait, args=(job,), daemon=True).start()
+        MCPLogger.log(TOOL_LOG_NAME, f"Job {job['job_id']} started on device {job['device']}")
+    
+    def _wait(self, job: Dict):
+        """Record the outcome of a finished worker and hand its device slot to the next job."""
+        returncode = job["process"].wait()
+        with self.lock:
+            job["returncode"] = returncode
+            job["finished"] = time.time()
+            if job["status"] == "cancelling":
+                job["status"] = "cancelled"
+            else:
+                job["status"] = "completed" if returncode == 0 else "failed"
+            self.running[job["device"]] -= 1
+            self._schedule()
+        MCPLogger.log(TOOL_LOG_NAME, f"Job {job['job_id']} {job['status']} (exit code {returncode})")
+    
+    def cancel(self, job_id: str) -> Optional[str]:
+        """Drop a queued job or terminate a running one, returns the new status or None for an unknown job."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            if job["status"] == "queued":
+                job["status"] = "cancelled"  # stays in the heap, _schedule() skips it
+                job["finished"] = time.time()
+            elif job["status"] == "running":
+                job["status"] = "cancelling"
+                job["process"].terminate()
+            return job["status"]
+    
+    def set_max_jobs_per_device(self, max_jobs_per_device: int):
+        with self.lock:
+            self.max_jobs_per_device = max(1, max_jobs_per_device)
+            self._schedule()
+    
+    def status(self, job_id: str) -> Optional[Dict]:
+        """Summary of one job, or None for an unknown job."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            summary = {key: job[key] for key in ("job_id", "status", "priority", "device", "devices", "returncode")}
+            end = job["finished"] or time.time()
+            summary["elapsed_time"] = round(end - job["started"], 2) if job["started"] else 0.0
+            if job["status"] == "queued":
+                entry = next(e for e in self.queue if e[2] == job_id)
+                summary["queue_position"] = sum(1 for e in self.queue if e < entry and self.jobs[e[2]]["status"] == "queued")
+            if "error" in job:
+                summary["error"] = job["error"]
+            return summary
+    
+    def list(self) -> List[Dict]:
+        with self.lock:
+            job_ids = sorted(self.jobs, key=lambda j: self.jobs[j]["submitted"])
+        return [self.status(job_id) for job_id in job_ids]
+    
+    def result(self, job_id: str, log_lines: int = 40) -> Optional[Dict]:
+        """Status plus log tail and exported files of a job."""
+        summary = self.status(job_id)
+        if summary is None:
+            return None
+        job = self.jobs[job_id]
+        summary["log_file"] = job["log_file"]
+        if os.path.exists(job["log_file"]):
+            lines, monitor = read_worker_log(job["log_file"])
+            summary["log_tail"] = lines[-log_lines:]
+            if monitor is not None:
+                summary["monitor"] = monitor
+        export_path = job["config"].get("export_path")
+        if export_path and os.path.isdir(export_path):
+            summary["export_path"] = export_path
+            summary["exported_files"] = len(os.listdir(export_path))
+        return summary
+    
+    def shutdown(self):
+        """Terminate all running workers, called when the server exits."""
+        with self.lock:
+            for job in self.jobs.values():
+                if job["status"] in ("running", "cancelling"):
+                    job["process"].terminate()
+
+def candidate_devices(config_params: Dict) -> List[str]:
+    """Devices a job may run on, best first: the given display value, or every device the device_policy allows."""
+    if "display" in config_params:
+        return [str(config_params["display"])]
+    policy = config_params.get("device_policy", "auto")
+    devices = fx3d.get_devices()
+    if not devices:
+        raise RuntimeError(NO_DEVICES_MESSAGE)
+    if policy == "auto":
+        best = devices[fx3d.select_devices(1, "auto")[0]]
+        devices = [d for d in devices if d["name"] == best["name"]]  # same group the simulation itself would pick from
+    else:
+        devices = sorted(devices, key=lambda d: d["tflops"] if policy == "flops" else d["memory_mb"], reverse=True)
+    return [str(d["id"]) for d in devices]
+
+def multi_device_reason(config_params: Dict) -> Optional[str]:
+    """Why a config needs more than one device, None if it runs on one. A run_batch worker only holds one device."""
+    display = [d for d in str(config_params.get("display", "")).replace(" ", ",").split(",") if d]
+    if len(display) > 1:
+        return f"runs on devices {', '.join(display)}"
+    if int(config_params.get("domains", 1)) > 1:
+        return f"splits the grid into {config_params['domains']} domains"
+    return None
+
+def prepare_worker_config(config_params: Dict) -> Tuple[Dict, List[str]]:
+    """Config with absolute paths and its checked arguments, for a job that runs in a worker process."""
+    # Workers do not share the server's working directory assumptions, so pass absolute paths
+    config_params = dict(config_params)
+    for key in ("stl_file", "export_path", "kernel_cache", "mesh_cache", "monitor_log", "checkpoint_file", "resume"):
+        if key in config_params:
+            config_params[key] = os.path.abspath(config_params[key]) + (os.sep if key == "export_path" else "")
+    
+    # Check the arguments here, a parse error in the worker would only show up in its log
+    args = build_simulation_args(config_params)
+    fx3d.Config().parse_args(args)
+    return config_params, args
+
+JOB_MANAGER = JobManager()
+atexit.register(JOB_MANAGER.shutdown)
+
+class BatchScheduler:
+    """Runs a list of configs to completion over a pool of worker slots, one per OpenCL device or per cores_per_worker cores of a CPU device.
+    
+    Every slot has its own deque of jobs and runs them one at a time, each in its own worker process. A slot whose deque
+    is empty steals the last queued job of the slot with the most jobs left, so slow devices never hold up the batch.
+    The workers of a CPU device slot are pinned to their own cores_per_worker cores, see start_worker().
+    """
+    
+    def __init__(self, devices: List[str], cores_per_worker: int = 0):
+        info = {str(d["id"]): d for d in fx3d.get_devices()}
+        available = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+        self.slots = []  # one dict per worker thread
+        for device in devices:
+            d = info.get(device)
+            if d is not None and d["type"] == "cpu" and cores_per_worker > 0:
+                workers = max(1, min(d["cores"], len(available)) // cores_per_worker)
+                cores = [available[i*cores_per_worker:(i + 1)*cores_per_worker] for i in range(workers)]
+            else:
+                cores = [None]  # GPUs, or one CPU worker that uses every core
+            for worker_cores in cores:
+                self.slots.append({"worker": len(self.slots), "device": device, "cores": worker_cores, "queue": deque(), "jobs": 0, "stolen": 0, "busy": 0.0})
+        self.batch_id = uuid.uuid4().hex[:12]
+        self.folder = os.path.join(JOB_FOLDER, f"batch_{self.batch_id}")
+        self.lock = threading.Lock()
+        self.processes = {}  # job index -> running worker process
+        self.stopped = False
+    
+    def _assign(self, jobs: List[Dict]):
+        """Deal the jobs round-robin over the slots that may run them."""
+        turn = itertools.count()
+        for job in jobs:
+            slots = [slot for slot in self.slots if job["device"] is None or slot["device"] == job["device"]]
+            if not slots:  # pinned to a device outside the pool, give it a slot of its own
+                slots = [{"worker": len(self.slots), "device": job["device"], "cores": None, "queue": deque(), "jobs": 0, "stolen": 0, "busy": 0.0}]
+                self.slots.append(slots[0])
+            slots[next(turn) % len(slots)]["queue"].append(job)
+    
+    def _next(self, slot: Dict) -> Optional[Dict]:
+        """Next job of a slot: the front of its own deque, else the back of the fullest deque it may steal from."""
+        with self.lock:
+            if self.stopped:
+                return None
+            if slot["queue"]:
+                return slot["queue"].popleft()
+            victims = sorted(self.slots, key=lambda other: len(other["queue"]), reverse=True)
+            for other in victims:
+                for job in reversed(other["queue"]):
+                    if job["device"] is None or job["device"] == slot["device"]:
+                        other["queue"].remove(job)
+                        slot["stolen"] += 1
+                        return job
+            return None
+    
+    def _run(self, slot: Dict, timeout: Optional[float]):
+        """Worker thread of one slot."""
+        while True:
+            job = self._next(slot)
+            if job is None:
+                return
+            args = job["args"] if job["device"] is not None else job["args"] + ['-d', slot["device"]]
+            job["device"] = slot["device"]
+            job["worker"] = slot["worker"]
+            job["started"] = time.time()
+            try:
+                with self.lock:
+                    process = self.processes[job["index"]] = start_worker(args, True, job["log_file"], slot["cores"])
+                try:
+                    job["returncode"] = process.wait(timeout=timeout)
+                    job["status"] = "cancelled" if self.stopped else "completed" if job["returncode"] == 0 else "failed"
+                except subprocess.TimeoutExpired:
+                    process.terminate()
+                    try:
+                        job["returncode"] = process.wait(timeout=10)
+                    except subprocess.TimeoutExpired:
+                        process.kill()
+                        job["returncode"] = process.wait()
+                    job["status"] = "timeout"
+            except OSError as e:
+                job["status"] = "failed"
+                job["error"] = str(e)
+            job["finished"] = time.time()
+            with self.lock:
+                self.processes.pop(job["index"], None)
+                slot["jobs"] += 1
+                slot["busy"] += job["finished"] - job["started"]
+            MCPLogger.log(TOOL_LOG_NAME, f"Batch {self.batch_id} job {job['index']} {job['status']} on device {slot['device']} in {job['finished'] - job['started']:.1f}s")
+    
+    def run(self, configs: List[Dict], timeout: Optional[float] = None) -> Dict:
+        """Run every config headless and return one result per config, in the given order, plus throughput stats."""
+        for index, config_params in enumerate(configs):
+            reason = multi_device_reason(config_params)
+            if reason:  # its other devices would be oversubscribed by the workers that own them
+                raise ValueError(f"Config {index} {reason}, but every batch job runs on a single device")
+        os.makedirs(self.folder, exist_ok=True)
+        jobs = []
+        for index, config_params in enumerate(configs):
+            config_params, args = prepare_worker_config(config_params)
+            jobs.append({
+                "index": index,
+                "status": "queued",
+                "device": str(config_params["display"]) if "display" in config_params else None,
+                "worker": None,
+                "args": args,
+                "log_file": os.path.join(self.folder, f"{index}.log"),
+                "started": None,
+                "finished": None,
+                "returncode": None,
+            })
+        self._assign(jobs)
+        MCPLogger.log(TOOL_LOG_NAME, f"Batch {self.batch_id}: {len(jobs)} jobs on {len(self.slots)} workers, logs in {self.folder}")
+        
+        start_time = time.time()
+        threads = [threading.Thread(target=self._run, args=(slot, timeout), daemon=True) for slot in self.slots]
+        atexit.register(self.stop)  # worker processes would outlive the server otherwise
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        atexit.unregister(self.stop)
+        wall_time = time.time() - start_time
+        
+        results = []
+        for job in jobs:
+            lines, monitor = read_worker_log(job["log_file"])
+            result = {key: job[key] for key in ("index", "status", "device", "worker", "returncode", "log_file")}
+            result["elapsed_time"] = round(job["finished"] - job["started"], 2) if job["started"] else 0.0
+            result["monitor"] = monitor
+            if "error" in job:
+                result["error"] = job["error"]
+            elif job["status"] != "completed":
+                result["log_tail"] = lines[-20:]
+            results.append(result)
+        
+        completed = [r for r in results if r["status"] == "completed"]
+        time_steps = sum(r["monitor"]["t"] for r in completed if r["monitor"])
+        stats = {
+            "jobs": len(results),
+            "completed": len(completed),
+            "failed": sum(1 for r in results if r["status"] == "failed"),
+            "timeout": sum(1 for r in results if r["status"] == "timeout"),
+            "cancelled": sum(1 for r in results if r["status"] == "cancelled"),
+            "not_run": sum(1 for r in results if r["status"] == "queued"),
+            "wall_time": round(wall_time, 2),
+            "job_time": round(sum(r["elapsed_time"] for r in results), 2),  # sum over jobs, job_time/wall_time is the speedup over running them one after another
+            "jobs_per_hour": round(3600.0 * len(completed) / wall_time, 2) if wall_time > 0.0 else 0.0,
+            "time_steps_per_second": round(time_steps / wall_time, 1) if wall_time > 0.0 else 0.0,  # monitored jobs only
+            "workers": [{
+                "worker": slot["worker"],
+                "device": slot["device"],
+                "cores": slot["cores"],
+                "jobs": slot["jobs"],
+                "stolen": slot["stolen"],
+                "busy_time": round(slot["busy"], 2),
+                "utilization": round(slot["busy"] / wall_time, 3) if wall_time > 0.0 else 0.0,
+            } for slot in self.slots],
+        }
+        return {"batch_id": self.batch_id, "results": results, "stats": stats}
+    
+    def stop(self):
+        """Drop the queued jobs and terminate the running ones."""
+        with self.lock:
+            self.stopped = True
+            for process in self.processes.values():
+                process.terminate()
+
 def handle_run_simulation(params: Dict) -> Dict:
     """Run a CFD simulation."""
     try:
@@ -526,135 +1260,12 @@ def handle_run_simulation(params: Dict) -> Dict:
         if not os.path.exists(stl_file):
             return create_error_response(f"STL file not found: {stl_file}. Please provide full path or ensure file is in current directory.", with_readme=False)
         
+        if not fx3d.get_devices():  # the simulation would exit the server process without one
+            return create_error_response(NO_DEVICES_MESSAGE, with_readme=False)
+        
         MCPLogger.log(TOOL_LOG_NAME, f"Starting simulation: {stl_file}")
         
-        # Build argument list for FluidX3D
-        args = [
-            f'--{config_params["velocity_set"]}',
-            f'--{config_params["collision_operator"]}',
-            '-f', stl_file,
-            '-r', str(config_params["resolution"]),
-            '-u', str(config_params["velocity"]),
-            '--re', str(config_params["reynolds"]),
-        ]
-        
-        # Add simulation time (either secs or time steps)
-        if "simulation_time" in config_params:
-            args.extend(['--secs', str(config_params["simulation_time"])])
-        elif "time_steps" in config_params:
-            args.extend(['-t', str(config_params["time_steps"])])
-        
-        # Mesh transformations
-        if "rotation_x" in config_params:
-            args.extend(['--rotx', str(config_params["rotation_x"])])
-        if "rotation_y" in config_params:
-            args.extend(['--roty', str(config_params["rotation_y"])])
-        if "rotation_z" in config_params:
-            args.extend(['--rotz', str(config_params["rotation_z"])])
-        if "translate_x" in config_params:
-            args.extend(['--trx', str(config_params["translate_x"])])
-        if "translate_y" in config_params:
-            args.extend(['--try', str(config_params["translate_y"])])
-        if "translate_z" in config_params:
-            args.extend(['--trz', str(config_params["translate_z"])])
-        if "scale" in config_params:
-            args.extend(['--scale', str(config_params["scale"])])
-        if "angle_of_attack" in config_params:
-            args.extend(['--aoa', str(config_params["angle_of_attack"])])
-        
-        # Simulation box
-        if "box_width" in config_params:
-            args.extend(['-x', str(config_params["box_width"])])
-        if "box_length" in config_params:
-            args.extend(['-y', str(config_params["box_length"])])
-        if "box_height" in config_params:
-            args.extend(['-z', str(config_params["box_height"])])
-        
-        # Physical parameters
-        if "density" in config_params:
-            args.extend(['--rho', str(config_params["density"])])
-        if "chord_length" in config_params:
-            args.extend(['-c', str(config_params["chord_length"])])
-        
-        # Camera settings
-        if "camera_x" in config_params:
-            args.extend(['--camx', str(config_params["camera_x"])])
-        if "camera_y" in config_params:
-            args.extend(['--camy', str(config_params["camera_y"])])
-        if "camera_z" in config_params:
-            args.extend(['--camz', str(config_params["camera_z"])])
-        if "camera_zoom" in config_params:
-            args.extend(['--camzoom', str(config_params["camera_zoom"])])
-        if "camera_rotation_x" in config_params:
-            args.extend(['--camrx', str(config_params["camera_rotation_x"])])
-        if "camera_rotation_y" in config_params:
-            args.extend(['--camry', str(config_params["camera_rotation_y"])])
-        if "camera_fov" in config_params:
-            args.extend(['--camfov', str(config_params["camera_fov"])])
-        
-        # Graphics settings
-        if "export_path" in config_params:
-            args.extend(['--export', config_params["export_path"]])
-        if "fps" in config_params:
-            args.extend(['--fps', str(config_params["fps"])])
-        if "slomo" in config_params:
-            args.extend(['--slomo', str(config_params["slomo"])])
-        if "frame_width" in config_params:
-            args.extend(['--FRAME_WIDTH', str(config_params["frame_width"])])
-        if "frame_height" in config_params:
-            args.extend(['--FRAME_HEIGHT', str(config_params["frame_height"])])
-        if "background_color" in config_params:
-            args.extend(['--BACKGROUND_COLOR', str(config_params["background_color"])])
-        if "streamline_sparse" in config_params:
-            args.extend(['--STREAMLINE_SPARSE', str(config_params["streamline_sparse"])])
-        if "streamline_length" in config_params:
-            args.extend(['--STREAMLINE_LENGTH', str(config_params["streamline_length"])])
-        if "display" in config_params:
-            args.extend(['-d', config_params["display"]])
-        
-        # Boolean flags
-        if config_params.get("window_mode"):
-            args.append('--window')
-        if config_params.get("wait_on_exit"):
-            args.append('--wait')
-        if config_params.get("pause_on_start"):
-            args.append('--pause')
-        if config_params.get("realtime_export"):
-            args.append('--realtime')
-        if config_params.get("transparency"):
-            args.append('--TRANSPARENCY')
-        if config_params.get("enable_graphics"):
-            args.append('--GRAPHICS')
-        if config_params.get("enable_graphics_ascii"):
-            args.append('--GRAPHICS_ASCII')
-        if config_params.get("enable_subgrid"):
-            args.append('--SUBGRID')
-        if config_params.get("enable_volume_force"):
-            args.append('--VOLUME_FORCE')
-        if config_params.get("enable_force_field"):
-            args.append('--FORCE_FIELD')
-        if config_params.get("enable_particles"):
-            args.append('--PARTICLES')
-        if config_params.get("enable_temperature"):
-            args.append('--TEMPERATURE')
-        if config_params.get("enable_update_fields"):
-            args.append('--UPDATE_FIELDS')
-        if config_params.get("enable_moving_boundaries"):
-            args.append('--MOVING_BOUNDARIES')
-        if config_params.get("enable_equilibrium_boundaries"):
-            args.append('--EQUILIBRIUM_BOUNDARIES')
-        if config_params.get("enable_surface"):
-            args.append('--SURFACE')
-        if config_params.get("enable_fp16s"):
-            args.append('--FP16S')
-        if config_params.get("enable_fp16c"):
-            args.append('--FP16C')
-        if config_params.get("enable_benchmark"):
-            args.append('--BENCHMARK')
-        if config_params.get("enable_floor"):
-            args.append('--floor')
-        if config_params.get("allow_sleep"):
-            args.append('--allowsleep')
+        args = build_simulation_args(config_params)
         
         # Create config and parse arguments
         config = fx3d.Config()
@@ -668,7 +1279,7 @@ def handle_run_simulation(params: Dict) -> Dict:
         start_time = time.time()
         
         try:
-            config.run_simulation()
+            monitor = config.run_simulation(headless=bool(config_params.get("headless", False)))
         except SystemExit as se:
             # Catch exit() calls from C++ code
             elapsed = time.time() - start_time
@@ -694,6 +1305,10 @@ def handle_run_simulation(params: Dict) -> Dict:
             "config": config_params,
             "message": f"Simulation completed successfully in {elapsed:.1f} seconds"
         }
+        if monitor is not None:
+            result["monitor"] = monitor
+            if monitor["converged"]:
+                result["message"] += f" (force coefficients converged at t = {monitor['t']})"
         
         return {
             "content": [{"type": "text", "text": json.dumps(result, indent=2)}],
@@ -715,6 +1330,204 @@ def handle_run_simulation(params: Dict) -> Dict:
     except Exception as e:
         return create_error_response(f"Error running simulation: {str(e)}", with_readme=False)
 
+SWEEP_KEYS = {"reynolds": "re", "velocity": "u", "angle_of_attack": "aoa"}
+
+def handle_run_sweep(params: Dict) -> Dict:
+    """Run the same STL and grid for several Reynolds numbers, velocities and angles of attack on one LBM allocation."""
+    try:
+        if not FLUIDX3D_AVAILABLE:
+            return create_error_response("FluidX3D module not available. Install with: pip install fluidx3d", with_readme=False)
+        
+        config_params = params.get("config")
+        if not config_params:
+            return create_error_response("Missing 'config' parameter", with_readme=True)
+        points = params.get("points")
+        if not points:
+            return create_error_response("Missing 'points' parameter, run_sweep needs at least one operating point", with_readme=True)
+        
+        required_config = ["stl_file", "velocity_set", "resolution", "velocity", "reynolds", "simulation_time", "collision_operator"]
+        missing = [p for p in required_config if p not in config_params]
+        if missing:
+            return create_error_response(f"Missing required config parameters: {', '.join(missing)}", with_readme=True)
+        
+        stl_file = config_params["stl_file"]
+        if not os.path.exists(stl_file):
+            return create_error_response(f"STL file not found: {stl_file}. Please provide full path or ensure file is in current directory.", with_readme=False)
+        
+        if not fx3d.get_devices():  # the simulation would exit the server process without one
+            return create_error_response(NO_DEVICES_MESSAGE, with_readme=False)
+        
+        sweep = []
+        for i, point in enumerate(points):
+            if not isinstance(point, dict):
+                return create_error_response(f"Point {i} must be an object, got {type(point).__name__}", with_readme=True)
+            unknown = set(point) - set(SWEEP_KEYS)
+            if unknown:
+                return create_error_response(f"Point {i} has unknown keys: {', '.join(sorted(unknown))}. Allowed: {', '.join(SWEEP_KEYS)}", with_readme=True)
+            sweep.append({SWEEP_KEYS[key]: float(value) for key, value in point.items()})
+        
+        # The coefficients need FORCE_FIELD; the sweep always runs headless
+        args = build_simulation_args(dict(config_params, enable_force_field=True, enable_graphics=False, enable_graphics_ascii=False))
+        config = fx3d.Config()
+        config.parse_args(args)
+        
+        MCPLogger.log(TOOL_LOG_NAME, f"Running sweep of {len(sweep)} points with args: {' '.join(args)}")
+        start_time = time.time()
+        table = config.run_sweep(sweep)
+        elapsed = time.time() - start_time
+        MCPLogger.log(TOOL_LOG_NAME, f"Sweep completed in {elapsed:.1f}s")
+        
+        result = {
+            "status": "completed",
+            "elapsed_time": round(elapsed, 2),
+            "config": config_params,
+            "points": len(table),
+            "results": [{"reynolds": row["re"], "velocity": row["u"], "angle_of_attack": row["aoa"], **{k: v for k, v in row.items() if k not in ("re", "u", "aoa")}} for row in table],
+            "message": f"Sweep of {len(table)} points completed in {elapsed:.1f} seconds"
+        }
+        return {
+            "content": [{"type": "text", "text": json.dumps(result, indent=2)}],
+            "isError": False
+        }
+        
+    except Exception as e:
+        return create_error_response(f"Error running sweep: {str(e)}", with_readme=False)
+
+def handle_run_batch(params: Dict) -> Dict:
+    """Run several configs in parallel worker processes, one worker per OpenCL device, and wait for all of them."""
+    try:
+        if not FLUIDX3D_AVAILABLE:
+            return create_error_response("FluidX3D module not available. Install with: pip install fluidx3d", with_readme=False)
+        
+        configs = params.get("configs")
+        if not configs:
+            return create_error_response("Missing 'configs' parameter, run_batch needs at least one config", with_readme=True)
+        timeout = params.get("timeout")
+        if timeout is not None and timeout <= 0:
+            return create_error_response("Parameter 'timeout' must be > 0 seconds", with_readme=False)
+        
+        required_config = ["stl_file", "velocity_set", "resolution", "velocity", "reynolds", "simulation_time", "collision_operator"]
+        for i, config_params in enumerate(configs):
+            if not isinstance(config_params, dict):
+                return create_error_response(f"Config {i} must be an object, got {type(config_params).__name__}", with_readme=True)
+            missing = [p for p in required_config if p not in config_params]
+            if missing:
+                return create_error_response(f"Config {i} is missing required parameters: {', '.join(missing)}", with_readme=True)
+            if not os.path.exists(config_params["stl_file"]):
+                return create_error_response(f"Config {i}: STL file not found: {config_params['stl_file']}. Please provide full path or ensure file is in current directory.", with_readme=False)
+            reason = multi_device_reason(config_params)
+            if reason:
+                return create_error_response(f"Config {i} {reason}, but every run_batch job runs on a single device. Run multi-device configs with run_simulation or submit_simulation", with_readme=False)
+        
+        # Every device the policy of the first config allows, plus the devices pinned with display
+        devices = candidate_devices({k: v for k, v in configs[0].items() if k != "display"})
+        scheduler = BatchScheduler(devices, params.get("cores_per_worker", 0))
+        
+        MCPLogger.log(TOOL_LOG_NAME, f"Running batch of {len(configs)} jobs on devices {', '.join(devices)}")
+        result = scheduler.run(configs, timeout)
+        MCPLogger.log(TOOL_LOG_NAME, f"Batch {result['batch_id']} completed in {result['stats']['wall_time']:.1f}s")
+        
+        result["status"] = "completed"
+        result["message"] = f"{result['stats']['completed']} of {len(configs)} jobs completed in {result['stats']['wall_time']:.1f} seconds"
+        return {
+            "content": [{"type": "text", "text": json.dumps(result, indent=2)}],
+            "isError": False
+        }
+        
+    except Exception as e:
+        return create_error_response(f"Error running batch: {str(e)}", with_readme=False)
+
+def handle_submit_simulation(params: Dict) -> Dict:
+    """Queue a CFD simulation as a background job and return its id."""
+    try:
+        if not FLUIDX3D_AVAILABLE:
+            return create_error_response("FluidX3D module not available. Install with: pip install fluidx3d", with_readme=False)
+        
+        config_params = params.get("config")
+        if not config_params:
+            return create_error_response("Missing 'config' parameter", with_readme=True)
+        
+        # Validate required config parameters
+        required_config = ["stl_file", "velocity_set", "resolution", "velocity", "reynolds", "simulation_time", "collision_operator"]
+        missing = [p for p in required_config if p not in config_params]
+        if missing:
+            return create_error_response(f"Missing required config parameters: {', '.join(missing)}", with_readme=True)
+        
+        # Check if STL file exists
+        stl_file = config_params["stl_file"]
+        if not os.path.exists(stl_file):
+            return create_error_response(f"STL file not found: {stl_file}. Please provide full path or ensure file is in current directory.", with_readme=False)
+        
+        config_params, args = prepare_worker_config(config_params)
+        
+        if "max_jobs_per_device" in params:
+            JOB_MANAGER.set_max_jobs_per_device(params["max_jobs_per_device"])
+        job_id = JOB_MANAGER.submit(config_params, args, candidate_devices(config_params), params.get("priority", 0))
+        
+        return {
+            "content": [{"type": "text", "text": json.dumps(JOB_MANAGER.status(job_id), indent=2)}],
+            "isError": False
+        }
+        
+    except Exception as e:
+        return create_error_response(f"Error submitting simulation: {str(e)}", with_readme=False)
+
+def handle_job_status(params: Dict) -> Dict:
+    """Report one job, or all jobs when no job_id is given."""
+    try:
+        if "job_id" not in params:
+            result = {"jobs": JOB_MANAGER.list(), "max_jobs_per_device": JOB_MANAGER.max_jobs_per_device}
+        else:
+            result = JOB_MANAGER.status(params["job_id"])
+            if result is None:
+                return create_error_response(f"Unknown job_id: {params['job_id']}", with_readme=False)
+        
+        return {
+            "content": [{"type": "text", "text": json.dumps(result, indent=2)}],
+            "isError": False
+        }
+        
+    except Exception as e:
+        return create_error_response(f"Error getting job status: {str(e)}", with_readme=False)
+
+def handle_job_result(params: Dict) -> Dict:
+    """Report the outcome, log tail and exported files of a job."""
+    try:
+        if "job_id" not in params:
+            return create_error_response("Missing 'job_id' parameter", with_readme=True)
+        
+        result = JOB_MANAGER.result(params["job_id"])
+        if result is None:
+            return create_error_response(f"Unknown job_id: {params['job_id']}", with_readme=False)
+        
+        return {
+            "content": [{"type": "text", "text": json.dumps(result, indent=2)}],
+            "isError": False
+        }
+        
+    except Exception as e:
+        return create_error_response(f"Error getting job result: {str(e)}", with_readme=False)
+
+def handle_cancel_job(params: Dict) -> Dict:
+    """Cancel a queued or running job."""
+    try:
+        if "job_id" not in params:
+            return create_error_response("Missing 'job_id' parameter", with_readme=True)
+        
+        status = JOB_MANAGER.cancel(params["job_id"])
+        if status is None:
+            return create_error_response(f"Unknown job_id: {params['job_id']}", with_readme=False)
+        
+        MCPLogger.log(TOOL_LOG_NAME, f"Job {params['job_id']} cancel requested, status: {status}")
+        
+        return {
+            "content": [{"type": "text", "text": json.dumps({"job_id": params["job_id"], "status": status}, indent=2)}],
+            "isError": False
+        }
+        
+    except Exception as e:
+        return create_error_response(f"Error cancelling job: {str(e)}", with_readme=False)
+
 def handle_fluidx3d(input_param: Dict) -> Dict:
     """Handle FluidX3D tool operations via MCP interface."""
     try:
@@ -757,6 +1570,18 @@ def handle_fluidx3d(input_param: Dict) -> Dict:
             return handle_validate_config(validated_params)
         elif operation == "run_simulation":
             return handle_run_simulation(validated_params)
+        elif operation == "run_sweep":
+            return handle_run_sweep(validated_params)
+        elif operation == "run_batch":
+            return handle_run_batch(validated_params)
+        elif operation == "submit_simulation":
+            return handle_submit_simulation(validated_params)
+        elif operation == "job_status":
+            return handle_job_status(validated_params)
+        elif operation == "job_result":
+            return handle_job_result(validated_params)
+        elif operation == "cancel_job":
+            return handle_cancel_job(validated_params)
         elif operation == "readme":
             return {
                 "content": [{"type": "text", "text": readme(True)}],
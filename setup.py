@@ -28,6 +28,29 @@ fluidx3d_sources = [
     'src/python_bindings_full.cpp',  # Our Python wrapper
 ]
 
+if sys.platform == 'win32':
+    libraries = ['OpenCL', 'user32', 'gdi32', 'kernel32']  # OpenCL + Windows GUI libs
+    library_dirs = ['src/OpenCL/lib']
+    define_macros = []
+    extra_compile_args = [
+        '/std:c++17',
+        '/EHsc',
+        '/MD',
+        '/O2',
+        '/fp:fast'
+    ]
+else:
+    # Linux: g++ flags as in the makefile (but -O3); no X11 window code, the module runs headless (compute nodes have no display)
+    libraries = ['OpenCL']
+    library_dirs = ['src/OpenCL/lib']
+    define_macros = [('NO_X11', None)]
+    extra_compile_args = [
+        '-std=c++17',
+        '-pthread',
+        '-O3',
+        '-Wno-comment'
+    ]
+
 ext_modules = [
     Extension(
         'fluidx3d',
@@ -36,16 +59,11 @@ ext_modules = [
             get_pybind_include(),
             'src/OpenCL/include',
         ],
-        library_dirs=['src/OpenCL/lib'],
-        libraries=['OpenCL', 'user32', 'gdi32', 'kernel32'],  # OpenCL + Windows GUI libs
+        library_dirs=library_dirs,
+        libraries=libraries,
+        define_macros=define_macros,
         language='c++',
-        extra_compile_args=[
-            '/std:c++17',
-            '/EHsc',
-            '/MD',
-            '/O2',
-            '/fp:fast'
-        ],
+        extra_compile_args=extra_compile_args,
     ),
 ]
 
@@ -80,6 +98,7 @@ setup(
         'Programming Language :: Python :: 3.14',
         'Programming Language :: C++',
         'Operating System :: Microsoft :: Windows',
+        'Operating System :: POSIX :: Linux',
         'Environment :: GPU :: NVIDIA CUDA',
     ],
     keywords='cfd, lattice-boltzmann, fluid-dynamics, gpu, opencl, computational-physics, simulation, interactive',
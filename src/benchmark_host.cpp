@@ -0,0 +1,257 @@
+// Host-side I/O and utility microbenchmarks: .stl loading, image encoders, .vtk packing, mesh bounds and parallel_for.
+// Needs no OpenCL device and does not link OpenCL, so it runs on plain CPU machines. Build with "make benchmark-host",
+// run bin/benchmark_host --help for the options, or use benchmark_host.py, which builds, runs and compares against a baseline.
+#include "utilities.hpp"
+#include <ctime>
+
+struct Host_Result { // one benchmark case, times in s
+	string name, size; // what was measured and on what input, for example "64x64x64x3 float"
+	ulong items = 0ull, bytes = 0ull; // work per run: triangles, pixels or elements, and bytes read/written/encoded
+	string unit = "items"; // what items counts
+	vector<double> times;
+	bool ok = true; // the output was checked against the input
+	inline double median() const {
+		vector<double> t = times;
+		std::sort(t.begin(), t.end());
+		return t.size()%2u ? t[t.size()/2u] : 0.5*(t[t.size()/2u-1u]+t[t.size()/2u]);
+	}
+	inline string json() const {
+		const double s = median(), s_min = *std::min_element(times.begin(), times.end());
+		return "{\"name\":\""+name+"\",\"size\":\""+size+"\",\"unit\":\""+unit+"\",\"items\":"+to_string(items)+",\"bytes\":"+to_string(bytes)+
+			",\"repeats\":"+to_string((uint)times.size())+",\"seconds\":"+to_string(s, 9u)+",\"seconds_min\":"+to_string(s_min, 9u)+
+			",\"items_per_s\":"+to_string((double)items/s, 1u)+",\"mb_per_s\":"+to_string(1E-6*(double)bytes/s, 3u)+",\"ok\":"+string(ok ? "true" : "false")+"}";
+	}
+};
+
+class Null_Buffer : public std::streambuf { // discards everything written to it
+protected:
+	inline int overflow(const int c) override { return c; }
+	inline std::streamsize xsputn(const char*, const std::streamsize n) override { return n; }
+};
+
+template<typename F> inline void time_runs(Host_Result& result, const uint repeats, const F& run) { // one untimed warmup run, then repeats timed runs
+	run(); // console output, including errors, goes to stderr, see main()
+	static Null_Buffer null_buffer;
+	std::streambuf* console = std::cout.rdbuf(&null_buffer); // the timed runs don't print, so console I/O is not measured
+	for(uint r=0u; r<repeats; r++) {
+		Clock clock;
+		run();
+		result.times.push_back(clock.stop());
+	}
+	std::cout.rdbuf(console);
+}
+
+inline float random_float(ulong& state) { // fixed sequence, so every run works on the same input
+	state = state*6364136223846793005ull+1442695040888963407ull;
+	return (float)(state>>40)/(float)(1ull<<24);
+}
+
+inline void write_synthetic_stl(const string& filename, const uint triangles, const bool binary) { // random triangles in the unit cube
+	ulong state = 42ull;
+	string data;
+	if(binary) {
+		data.assign(84ull+50ull*(ulong)triangles, '\0');
+		memcpy(&data[80], &triangles, 4u);
+		for(uint i=0u; i<triangles; i++) {
+			float triangle[9];
+			for(uint j=0u; j<9u; j++) triangle[j] = random_float(state);
+			memcpy(&data[96ull+50ull*(ulong)i], triangle, 36u);
+		}
+	} else {
+		data = "solid benchmark\n";
+		for(uint i=0u; i<triangles; i++) {
+			data += "  facet normal 0 0 0\n    outer loop\n";
+			for(uint j=0u; j<3u; j++) data += "      vertex "+to_string(random_float(state), 7u)+" "+to_string(random_float(state), 7u)+" "+to_string(random_float(state), 7u)+"\n";
+			data += "    endloop\n  endfacet\n";
+		}
+		data += "endsolid benchmark\n";
+	}
+	create_folder(filename);
+	std::ofstream file(filename, std::ios::out|std::ios::binary);
+	file.write(data.c_str(), data.length());
+	file.close();
+}
+
+inline ulong file_size(const string& filename) {
+	std::ifstream file(filename, std::ios::in|std::ios::binary|std::ios::ate);
+	return file.fail() ? 0ull : (ulong)file.tellg();
+}
+
+int main(int argc, char* argv[]) {
+	cxxopts::Options options("benchmark_host", "FluidX3D host-side I/O and utility microbenchmarks, results as JSON");
+	options.add_options()
+		("triangles", "Triangles of the synthetic mesh for .stl loading and mesh bounds", cxxopts::value<uint>()->default_value("1000000"))
+		("asciitriangles", "Triangles of the synthetic ASCII .stl file", cxxopts::value<uint>()->default_value("100000"))
+		("width", "Width of the synthetic image for the PNG/QOI/BMP encoders", cxxopts::value<uint>()->default_value("1920"))
+		("height", "Height of the synthetic image", cxxopts::value<uint>()->default_value("1080"))
+		("cells", "Edge length of the synthetic velocity field for .vtk packing and writing", cxxopts::value<uint>()->default_value("128"))
+		("elements", "Elements for the parallel_for benchmarks", cxxopts::value<ulong>()->default_value("16777216"))
+		("repeats", "Timed runs per benchmark after one warmup run, the median is reported", cxxopts::value<uint>()->default_value("5"))
+		("threads", "Host threads for parallel_for (0: all CPU cores)", cxxopts::value<uint>()->default_value("0"))
+		("only", "Comma separated benchmark names to run (empty: all)", cxxopts::value<string>()->default_value(""))
+		("dir", "Folder for the temporary input and output files", cxxopts::value<string>()->default_value("benchmark_host_files/"))
+		("output", "JSON file for the results (empty: print to stdout, other output goes to stderr)", cxxopts::value<string>()->default_value(""))
+		("h,help", "Print the options");
+	const cxxopts::ParseResult args = options.parse(argc, argv);
+	if(args.count("help")) {
+		println(options.help());
+		return 0;
+	}
+	std::streambuf* console = std::cout.rdbuf(std::cerr.rdbuf()); // info output of read_stl() and others goes to stderr, stdout only gets the JSON
+	const uint triangles=max(args["triangles"].as<uint>(), 1u), ascii_triangles=max(args["asciitriangles"].as<uint>(), 1u);
+	const uint width=max(args["width"].as<uint>(), 1u), height=max(args["height"].as<uint>(), 1u), cells=max(args["cells"].as<uint>(), 1u);
+	const ulong elements = max(args["elements"].as<ulong>(), 1ull);
+	const uint repeats = max(args["repeats"].as<uint>(), 1u);
+	set_parallel_threads(args["threads"].as<uint>());
+	string dir = args["dir"].as<string>();
+	if(!ends_with(dir, "/")) dir += "/";
+	const string only = ","+args["only"].as<string>()+",";
+	const auto selected = [&](const string& name) { return only==",," || contains(only, ","+name+","); };
+	vector<Host_Result> results;
+
+	if(selected("read_stl_binary")||selected("read_stl_ascii")||selected("find_bounds")) {
+		const string binary_file=dir+"mesh_binary.stl", ascii_file=dir+"mesh_ascii.stl";
+		write_synthetic_stl(binary_file, triangles, true);
+		if(selected("read_stl_binary")) {
+			Host_Result r;
+			r.name = "read_stl_binary"; r.size = to_string(triangles)+" triangles"; r.unit = "triangles"; r.items = triangles; r.bytes = file_size(binary_file);
+			time_runs(r, repeats, [&]() {
+				Mesh* mesh = read_stl(binary_file);
+				r.ok = r.ok&&mesh->triangle_number==triangles;
+				delete mesh;
+			});
+			results.push_back(r);
+		}
+		if(selected("read_stl_ascii")) {
+			write_synthetic_stl(ascii_file, ascii_triangles, false);
+			Host_Result r;
+			r.name = "read_stl_ascii"; r.size = to_string(ascii_triangles)+" triangles"; r.unit = "triangles"; r.items = ascii_triangles; r.bytes = file_size(ascii_file);
+			time_runs(r, repeats, [&]() {
+				Mesh* mesh = read_stl(ascii_file);
+				r.ok = r.ok&&mesh->triangle_number==ascii_triangles;
+				delete mesh;
+			});
+			results.push_back(r);
+			std::remove(ascii_file.c_str());
+		}
+		if(selected("find_bounds")) {
+			Mesh* mesh = read_stl(binary_file);
+			float3 pmin, pmax;
+			mesh->find_bounds(0u, mesh->triangle_number, pmin, pmax); // single-threaded reference
+			Host_Result r;
+			r.name = "find_bounds"; r.size = to_string(triangles)+" triangles"; r.unit = "triangles"; r.items = triangles; r.bytes = 3ull*(ulong)triangles*sizeof(float3);
+			time_runs(r, repeats, [&]() {
+				mesh->find_bounds();
+				r.ok = r.ok&&mesh->pmin.x==pmin.x&&mesh->pmin.y==pmin.y&&mesh->pmin.z==pmin.z&&mesh->pmax.x==pmax.x&&mesh->pmax.y==pmax.y&&mesh->pmax.z==pmax.z;
+			});
+			results.push_back(r);
+			delete mesh;
+		}
+		std::remove(binary_file.c_str());
+	}
+
+	if(selected("write_png")||selected("write_qoi")||selected("write_bmp")) {
+		Image image(width, height); // smooth gradients with some noise, compresses like a rendered frame rather than like random data
+		ulong state = 7ull;
+		for(uint y=0u; y<height; y++) {
+			for(uint x=0u; x<width; x++) {
+				const int noise = (int)(16.0f*random_float(state));
+				const int r=(int)(255u*x/width), g=(int)(255u*y/height), b=clamp(128+(int)(64.0f*sinf(0.02f*(float)(x+y)))+noise, 0, 255);
+				image.set_color(x, y, r<<16|g<<8|b);
+			}
+		}
+		const string formats[3] = { "png", "qoi", "bmp" };
+		for(const string& format : formats) {
+			if(!selected("write_"+format)) continue;
+			const string filename = dir+"image."+format;
+			Host_Result r;
+			r.name = "write_"+format; r.size = to_string(width)+"x"+to_string(height); r.unit = "pixels"; r.items = (ulong)width*(ulong)height; r.bytes = 3ull*r.items; // raw RGB pixels encoded
+			time_runs(r, repeats, [&]() {
+				if(format=="png") write_png(filename, &image);
+				else if(format=="qoi") write_qoi(filename, &image);
+				else write_bmp(filename, &image);
+			});
+			Image* written = format=="png" ? read_png(filename) : format=="qoi" ? read_qoi(filename) : read_bmp(filename);
+			for(uint i=0u; i<width*height&&r.ok; i++) r.ok = (written->data()[i]&0xFFFFFF)==(image.data()[i]&0xFFFFFF);
+			delete written;
+			std::remove(filename.c_str());
+			results.push_back(r);
+		}
+	}
+
+	if(selected("vtk_pack")||selected("write_vtk")) {
+		const ulong N = (ulong)cells*(ulong)cells*(ulong)cells;
+		float* u = new float[3ull*N]; // SoA like the host buffers of LBM::u
+		parallel_for(N, [&](ulong n) {
+			u[n] = 0.01f*(float)(n%97ull); u[N+n] = -0.02f*(float)(n%89ull); u[2ull*N+n] = 0.03f*(float)(n%83ull);
+		});
+		const string size = to_string(cells)+"x"+to_string(cells)+"x"+to_string(cells)+"x3 float";
+		if(selected("vtk_pack")) { // SoA to AoS with byte reversal, the CPU part of write_vtk() without the disk
+			float* data = new float[3ull*N];
+			Host_Result r;
+			r.name = "vtk_pack"; r.size = size; r.unit = "elements"; r.items = 3ull*N; r.bytes = 3ull*N*sizeof(float);
+			time_runs(r, repeats, [&]() {
+				parallel_for(N, [&](ulong n) {
+					for(uint d=0u; d<3u; d++) data[3ull*n+(ulong)d] = reverse_bytes(u[(ulong)d*N+n]);
+				});
+			});
+			r.ok = reverse_bytes(data[3ull*(N-1ull)+2ull])==u[3ull*N-1ull];
+			delete[] data;
+			results.push_back(r);
+		}
+		if(selected("write_vtk")) {
+			const string filename = dir+"field.vtk";
+			Host_Result r;
+			r.name = "write_vtk"; r.size = size; r.unit = "elements"; r.items = 3ull*N; r.bytes = 3ull*N*sizeof(float);
+			time_runs(r, repeats, [&]() {
+				write_vtk<float>(filename, cells, cells, cells, 3u, 1.0f, [&](const ulong n, const uint d) { return u[(ulong)d*N+n]; });
+			});
+			r.ok = file_size(filename)>r.bytes&&file_size(filename)<r.bytes+1024ull;
+			std::remove(filename.c_str());
+			results.push_back(r);
+		}
+		delete[] u;
+	}
+
+	if(selected("parallel_for_static")||selected("parallel_for_dynamic")) {
+		vector<float> data((size_t)elements);
+		const uint threads = get_parallel_threads();
+		if(selected("parallel_for_static")) {
+			Host_Result r;
+			r.name = "parallel_for_static"; r.size = to_string(elements)+" floats, "+to_string(threads)+" threads"; r.unit = "elements"; r.items = elements; r.bytes = elements*sizeof(float);
+			time_runs(r, repeats, [&]() {
+				parallel_for(elements, threads, [&](ulong n, uint t) { data[n] = 0.5f*(float)n+1.0f; });
+			});
+			r.ok = data[elements-1ull]==0.5f*(float)(elements-1ull)+1.0f;
+			results.push_back(r);
+		}
+		if(selected("parallel_for_dynamic")) {
+			Host_Result r;
+			r.name = "parallel_for_dynamic"; r.size = to_string(elements)+" floats, "+to_string(threads)+" threads"; r.unit = "elements"; r.items = elements; r.bytes = elements*sizeof(float);
+			time_runs(r, repeats, [&]() {
+				parallel_for(elements, [&](ulong n) { data[n] = 0.25f*(float)n; });
+			});
+			r.ok = data[elements-1ull]==0.25f*(float)(elements-1ull);
+			results.push_back(r);
+		}
+	}
+
+	char date[32];
+	const std::time_t now = std::time(nullptr);
+	std::strftime(date, sizeof(date), "%Y-%m-%dT%H:%M:%S", std::localtime(&now));
+	string json = "{\n\"date\":\""+string(date)+"\",\n\"host\":{\"threads\":"+to_string(get_parallel_threads())+",\"hardware_concurrency\":"+to_string((uint)thread::hardware_concurrency())+"},\n"
+		"\"settings\":{\"triangles\":"+to_string(triangles)+",\"asciitriangles\":"+to_string(ascii_triangles)+",\"width\":"+to_string(width)+",\"height\":"+to_string(height)+
+		",\"cells\":"+to_string(cells)+",\"elements\":"+to_string(elements)+",\"repeats\":"+to_string(repeats)+"},\n\"results\":[";
+	for(uint i=0u; i<(uint)results.size(); i++) json += string(i ? ",\n" : "\n")+results[i].json();
+	json += "\n]}\n";
+	const string output = args["output"].as<string>();
+	std::cout.rdbuf(console);
+	if(output!="") {
+		write_file(output, json);
+		print_info("Wrote "+to_string((uint)results.size())+" results to \""+output+"\".");
+	} else {
+		print(json);
+	}
+	for(const Host_Result& r : results) if(!r.ok) return 1;
+	return 0;
+}
@@ -603,7 +603,7 @@ INT WINAPI WinMain(_In_ HINSTANCE hInstance, _In_opt_ HINSTANCE, _In_ PSTR, _In_
 	return 0;
 }
 
-#elif defined(__linux__)||defined(__APPLE__)
+#elif (defined(__linux__)||defined(__APPLE__))&&!defined(NO_X11) // NO_X11: Python module for headless servers, only Config.run_simulation(headless=True) is available
 
 #include "X11/include/X11/Xlib.h" // sources: libx11-dev, x11proto-dev, libxrandr-dev, libxrender-dev
 #define register // to avoid compiler warning in XKBlib.h
@@ -6,8 +6,8 @@ Info info;
 void Info::initialize(LBM* lbm) {
 	this->lbm = lbm;
 
-	if(g_args["SRT"].as<bool>()) collision = "SRT"; // cnd
-	else if(g_args["TRT"].as<bool>())collision = "TRT";
+	if(g_features.srt) collision = "SRT"; // cnd
+	else if(g_features.trt)collision = "TRT";
 /*
 #if defined(SRT)
 	collision = "SRT";
@@ -17,9 +17,9 @@ void Info::initialize(LBM* lbm) {
 */
 
 //cnd #if defined(FP16S)
-	if(g_args["FP16S"].as<bool>()) collision += " (FP32/FP16S)";
+	if(g_features.fp16s) collision += " (FP32/FP16S)";
 //cnd #elif defined(FP16C)
-	else if(g_args["FP16C"].as<bool>()) collision += " (FP32/FP16C)";
+	else if(g_features.fp16c) collision += " (FP32/FP16C)";
 //cnd #else // FP32
 	else collision += " (FP32/FP32)";
 //cnd #endif // FP32
@@ -33,9 +33,10 @@ void Info::append(const ulong steps, const ulong t) {
 	this->runtime_lbm_last = runtime_lbm; // reset last runtime if multiple run() commands are executed consecutively
 	this->runtime_total = clock.stop();
 }
-void Info::update(const double dt) {
-	this->runtime_lbm_timestep_last = dt; // exact dt
-	this->runtime_lbm_timestep_smooth = (dt+0.3)/(0.3/runtime_lbm_timestep_smooth+1.0); // smoothed dt
+void Info::update(const double dt, const ulong steps) { // dt is the runtime of a batch of steps time steps
+	const double dt_step = dt/(double)max(steps, 1ull);
+	this->runtime_lbm_timestep_last = dt_step; // exact dt, averaged over the batch
+	this->runtime_lbm_timestep_smooth = (dt_step+0.3)/(0.3/runtime_lbm_timestep_smooth+1.0); // smoothed dt
 	this->runtime_lbm += dt; // skip first step since it is likely slower than average
 	this->runtime_total = clock.stop();
 }
@@ -80,13 +81,13 @@ void Info::print_initialize() {
 	println("| Reynolds Number | "+alignr(57u, /******************************************/ "Re < "+string(Re>=100.0f ? to_string(to_uint(Re)) : to_string(Re, 6u)))+" |");
 
 //cnd #ifdef VOLUME_FORCE
-       if(g_args["VOLUME_FORCE"].as<bool>()) println("| Volume Force    | "+alignr(57u, alignr(15u, to_string(lbm->get_fx(), 8u))+","+alignr(15u, to_string(lbm->get_fy(), 8u))+","+alignr(15u, to_string(lbm->get_fz(), 8u)))+" |");
+       if(g_features.volume_force) println("| Volume Force    | "+alignr(57u, alignr(15u, to_string(lbm->get_fx(), 8u))+","+alignr(15u, to_string(lbm->get_fy(), 8u))+","+alignr(15u, to_string(lbm->get_fz(), 8u)))+" |");
 //#endif // VOLUME_FORCE
 //cnd #ifdef SURFACE
-	if(g_args["SURFACE"].as<bool>()) println("| Surface Tension | "+alignr(57u, /**********************************************************************************/ to_string(lbm->get_sigma(), 8u))+" |");
+	if(g_features.surface) println("| Surface Tension | "+alignr(57u, /**********************************************************************************/ to_string(lbm->get_sigma(), 8u))+" |");
 //cnd #endif // SURFACE
 //cnd #ifdef TEMPERATURE
-	if(g_args["TEMPERATURE"].as<bool>()) {
+	if(g_features.temperature) {
 	println("| Thermal Diff.   | "+alignr(57u, /**********************************************************************************/ to_string(lbm->get_alpha(), 8u))+" |");
 	println("| Thermal Exp.    | "+alignr(57u, /***********************************************************************************/ to_string(lbm->get_beta(), 8u))+" |");
 	}
@@ -122,4 +123,5 @@ void Info::print_update() const {
 void Info::print_finalize() {
 	allow_rendering = false;
 	println("\n|---------'-------------'-----------'-------------------'---------------------|");
+	if(kernel_profiler().is_enabled()) kernel_profiler().print();
 }
@@ -15,7 +15,7 @@ struct Info { // contains redundant information for console printing
 	string collision = "";
 	void initialize(LBM* lbm);
 	void append(const ulong steps, const ulong t);
-	void update(const double dt);
+	void update(const double dt, const ulong steps=1ull); // runtime dt of steps time steps
 	double time() const; // returns either elapsed time or remaining time
 	void print_logo() const;
 	void print_initialize(); // enables interactive rendering
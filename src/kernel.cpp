@@ -893,6 +893,26 @@ string opencl_c_container() { return R( // ########################## begin of O
 )+R(bool is_halo_q(const uint3 xyz) {
 	return ((def_Dx>1u)&(xyz.x==0u||xyz.x>=def_Nx-2u))||((def_Dy>1u)&(xyz.y==0u||xyz.y>=def_Ny-2u))||((def_Dz>1u)&(xyz.z==0u||xyz.z>=def_Nz-2u)); // halo data is kept up-to-date, so allow using halo data for rendering
 }
+)+R(bool is_transfer_layer(const uint x, const uint N) { // layers 1, 2, N-3, N-2 next to the halo, stream_collide() on them writes all DDFs that the transfer_extract kernels read
+	return x==1u||x==2u||x==N-3u||x==N-2u;
+}
+)+R(bool is_transfer_cell(const uxx n) { // cell in the transfer layers of any split direction
+	const uint3 xyz = coordinates(n);
+	return ((def_Dx>1u)&is_transfer_layer(xyz.x, def_Nx))||((def_Dy>1u)&is_transfer_layer(xyz.y, def_Ny))||((def_Dz>1u)&is_transfer_layer(xyz.z, def_Nz));
+}
+)+R(uxx transfer_cell(const uint a) { // a-th cell in the transfer layers, 4 layers per split direction in x, y, z order; returns def_N for cells that were already covered by a previous direction
+	const uint A[3] = { (def_Dx>1u)*4u*def_Ax, (def_Dy>1u)*4u*def_Ay, (def_Dz>1u)*4u*def_Az };
+	const uint direction = a<A[0] ? 0u : a<A[0]+A[1] ? 1u : 2u;
+	const uint b = a-(direction>0u ? A[0] : 0u)-(direction>1u ? A[1] : 0u);
+	if(b>=A[direction]) return (uxx)def_N; // global range is padded to a multiple of the workgroup size
+	const uint N[3] = { def_Nx, def_Ny, def_Nz };
+	const uint area=A[direction]/4u, l=b/area, c=b%area, x=l<2u ? 1u+l : N[direction]-5u+l; // layer 1, 2, N-3, N-2 and index within the layer
+	const uint3 coordinates[3] = { (uint3)(x, c%def_Ny, c/def_Ny), (uint3)(c/def_Nz, x, c%def_Nz), (uint3)(c%def_Nx, c/def_Nx, x) };
+	const uint3 xyz = coordinates[direction];
+	if(direction>0u&&(def_Dx>1u)&is_transfer_layer(xyz.x, def_Nx)) return (uxx)def_N; // edge cells belong to the first direction they are in
+	if(direction>1u&&(def_Dy>1u)&is_transfer_layer(xyz.y, def_Ny)) return (uxx)def_N;
+	return index(xyz);
+}
 
 )+R(float half_to_float_custom(const ushort x) { // custom 16-bit floating-point format, 1-4-11, exp-15, +-1.99951168, +-6.10351562E-5, +-2.98023224E-8, 3.612 digits
 	const uint e = (x&0x7800)>>11; // exponent
@@ -1501,7 +1521,7 @@ string opencl_c_container() { return R( // ########################## begin of O
 
 
 
-)+R(kernel void stream_collide)+"("+R(global fpxx* fi, global float* rho, global float* u, global uchar* flags, const ulong t, const float fx, const float fy, const float fz // () { // main LBM kernel//cnd}
+)+R(kernel void stream_collide)+"("+R(global fpxx* fi, global float* rho, global float* u, global uchar* flags, const ulong t, const float fx, const float fy, const float fz, const float nu // () { // main LBM kernel//cnd}
 )+"#ifdef FORCE_FIELD"+R(
 	, const global float* F // argument order is important
 )+"#endif"+R( // FORCE_FIELD
@@ -1511,9 +1531,11 @@ string opencl_c_container() { return R( // ########################## begin of O
 )+"#ifdef TEMPERATURE"+R(
 	, global fpxx* gi, global float* T // argument order is important
 )+"#endif"+R( // TEMPERATURE
+	, const uint part // 0 = all cells, 1 = only cells in the transfer layers (global range is their number), 2 = only the remaining interior cells
 )+") {"+R( // stream_collide()
-	const uxx n = get_global_id(0); // n = x+(y+z*Ny)*Nx
+	const uxx n = part==1u ? transfer_cell(get_global_id(0)) : get_global_id(0); // n = x+(y+z*Ny)*Nx
 	if(n>=(uxx)def_N||is_halo(n)) return; // don't execute stream_collide() on halo
+	if(part==2u&&is_transfer_cell(n)) return; // transfer layers are done already, the halo exchange runs in parallel
 	const uchar flagsn = flags[n]; // cache flags[n] for multiple readings
 	const uchar flagsn_bo=flagsn&TYPE_BO, flagsn_su=flagsn&TYPE_SU; // extract boundary and surface flags
 	if(flagsn_bo==TYPE_S||flagsn_su==TYPE_G) return; // if cell is solid boundary or gas, just return
@@ -1632,7 +1654,7 @@ string opencl_c_container() { return R( // ########################## begin of O
 
 	float feq[def_velocity_set]; // equilibrium DDFs
 	calculate_f_eq(rhon, uxn, uyn, uzn, feq); // calculate equilibrium DDFs
-	float w = def_w; // LBM relaxation rate w = dt/tau = dt/(nu/c^2+dt/2) = 1/(3*nu+1/2)
+	float w = 1.0f/(3.0f*nu+0.5f); // LBM relaxation rate w = dt/tau = dt/(nu/c^2+dt/2) = 1/(3*nu+1/2), nu is a kernel argument so it can change without recompiling
 
 )+"#ifdef SUBGRID"+R(
 	{ // Smagorinsky-Lilly subgrid turbulence model, source: https://arxiv.org/pdf/comp-gas/9401004.pdf, in the eq. below (26), it is "tau_0" not "nu_0", and "sqrt(2)/rho" (they call "rho" "n") is missing
@@ -1955,6 +1977,28 @@ string opencl_c_container() { return R( // ########################## begin of O
 	F[    def_N+(ulong)n] = 0.0f;
 	F[2ul*def_N+(ulong)n] = 0.0f;
 } // reset_force_field()
+)+R(kernel void object_sums(const global uchar* flags, const global float* F, const uchar flag_marker, const float rx, const float ry, const float rz, global float* sums) { // per-workgroup sums over cells flagged with flag_marker: count, position, force, torque; positions relative to (rx, ry, rz) in global lattice coordinates
+	local float cache[10u*def_workgroup_size];
+	const uint lid = get_local_id(0);
+	float s[10] = { 0.0f, 0.0f, 0.0f, 0.0f, 0.0f, 0.0f, 0.0f, 0.0f, 0.0f, 0.0f };
+	for(uxx n=get_global_id(0); n<(uxx)def_N; n+=(uxx)get_global_size(0)) { // grid-stride loop, kernel is launched with a fixed number of workgroups
+		if(flags[n]!=flag_marker||is_halo(n)) continue; // halo cells are counted by the neighboring domain
+		const uint3 xyz = coordinates(n);
+		const float3 p = (float3)((float)((int)xyz.x+def_Ox)-rx, (float)((int)xyz.y+def_Oy)-ry, (float)((int)xyz.z+def_Oz)-rz);
+		const float3 Fn = (float3)(F[n], F[def_N+(ulong)n], F[2ul*def_N+(ulong)n]);
+		const float3 Tn = cross(p, Fn);
+		s[0] += 1.0f;
+		s[1] += p.x; s[2] += p.y; s[3] += p.z;
+		s[4] += Fn.x; s[5] += Fn.y; s[6] += Fn.z;
+		s[7] += Tn.x; s[8] += Tn.y; s[9] += Tn.z;
+	}
+	for(uint i=0u; i<10u; i++) cache[i*def_workgroup_size+lid] = s[i];
+	for(uint stride=def_workgroup_size/2u; stride>0u; stride/=2u) { // tree reduction in local memory
+		barrier(CLK_LOCAL_MEM_FENCE);
+		if(lid<stride) for(uint i=0u; i<10u; i++) cache[i*def_workgroup_size+lid] += cache[i*def_workgroup_size+lid+stride];
+	}
+	if(lid==0u) for(uint i=0u; i<10u; i++) sums[10u*get_group_id(0)+i] = cache[i*def_workgroup_size];
+} // object_sums()
 )+R(void spread_force(volatile global float* F, const float3 p, const float3 Fn) {
 	const float xa=p.x-0.5f+1.5f*(float)def_Nx, ya=p.y-0.5f+1.5f*(float)def_Ny, za=p.z-0.5f+1.5f*(float)def_Nz; // subtract lattice offsets
 	const uint xb=(uint)xa, yb=(uint)ya, zb=(uint)za; // integer casting to find bottom left corner
@@ -2310,6 +2354,54 @@ string opencl_c_container() { return R( // ########################## begin of O
 	if(p.x>=x0-1.0f&&p.y>=y0-1.0f&&p.z>=z0-1.0f&&p.x<=x1+1.0f&&p.y<=y1+1.0f&&p.z<=z1+1.0f) flags[n] &= ~flag;
 } // unvoxelize_mesh()
 
+)+R(kernel void apply_region(global float* rho, global float* u, global uchar* flags, const uint shape, const float px, const float py, const float pz, const float lx, const float ly, const float lz, const float r, const uint faces, const uint set, const uchar flag, const uchar keep, const float rhon, const float uxn, const float uyn, const float uzn) { // write initial/boundary conditions of a region directly in device memory, see struct Region
+	const uxx n = get_global_id(0);
+	if(n>=(uxx)def_N||(flags[n]&keep)) return;
+	const uint3 xyz = coordinates(n);
+	const int Nx=(int)def_Dx*((int)def_Nx-2*(int)(def_Dx>1u)), Ny=(int)def_Dy*((int)def_Ny-2*(int)(def_Dy>1u)), Nz=(int)def_Dz*((int)def_Nz-2*(int)(def_Dz>1u)); // global lattice dimensions
+	const int x=((int)xyz.x+def_Ox+Nx)%Nx, y=((int)xyz.y+def_Oy+Ny)%Ny, z=((int)xyz.z+def_Oz+Nz)%Nz; // global coordinates, halo cells get the values of the cells they mirror
+	const float3 t = (float3)((float)x-px, (float)y-py, (float)z-pz);
+	bool inside = true; // box
+	if(shape==1u) { // faces
+		inside = ((faces&0x01u)&&x==0)||((faces&0x02u)&&x==Nx-1)||((faces&0x04u)&&y==0)||((faces&0x08u)&&y==Ny-1)||((faces&0x10u)&&z==0)||((faces&0x20u)&&z==Nz-1);
+	} else if(shape==2u) { // sphere
+		inside = sq(t.x)+sq(t.y)+sq(t.z)<=sq(r);
+	} else if(shape==3u) { // cuboid
+		inside = t.x>=-0.5f*lx&&t.x<=0.5f*lx && t.y>=-0.5f*ly&&t.y<=0.5f*ly && t.z>=-0.5f*lz&&t.z<=0.5f*lz;
+	} else if(shape==4u) { // cylinder with axis (lx, ly, lz)
+		const float3 a = (float3)(lx, ly, lz);
+		const float sqnt = sq(dot(normalize(a), t));
+		inside = sq(t.x)+sq(t.y)+sq(t.z)-sqnt<=sq(r) && sqnt<=sq(0.5f*length(a));
+	}
+	if(!inside) return;
+	if(set&0x1u) flags[n] = flag;
+	if(set&0x2u) rho[n] = rhon;
+	if(set&0x4u) {
+		u[                 n] = uxn;
+		u[    def_N+(ulong)n] = uyn;
+		u[2ul*def_N+(ulong)n] = uzn;
+	}
+} // apply_region()
+)+R(kernel void used_flags(const global uchar* flags, const global float* u, global uint* used) { // per-workgroup OR of the flags of all cells, bit 8: moving boundaries (TYPE_S with velocity or TYPE_S|TYPE_E), bit 9: equilibrium boundaries (TYPE_E without TYPE_S), see LBM::sanity_checks_initialization()
+	local uint cache[def_workgroup_size];
+	const uint lid = get_local_id(0);
+	uint s = 0u;
+	for(uxx n=get_global_id(0); n<(uxx)def_N; n+=(uxx)get_global_size(0)) { // grid-stride loop, kernel is launched with a fixed number of workgroups
+		if(is_halo(n)) continue; // halo cells are copies of cells of the neighboring domain
+		const uchar flagsn = flags[n];
+		const uchar flagsn_bo = flagsn&(TYPE_S|TYPE_E);
+		s |= (uint)flagsn;
+		if(flagsn_bo==(TYPE_S|TYPE_E)||(flagsn_bo==TYPE_S&&(u[n]!=0.0f||u[def_N+(ulong)n]!=0.0f||u[2ul*def_N+(ulong)n]!=0.0f))) s |= 0x100u;
+		if(flagsn_bo==TYPE_E) s |= 0x200u;
+	}
+	cache[lid] = s;
+	for(uint stride=def_workgroup_size/2u; stride>0u; stride/=2u) { // tree reduction in local memory
+		barrier(CLK_LOCAL_MEM_FENCE);
+		if(lid<stride) cache[lid] |= cache[lid+stride];
+	}
+	if(lid==0u) used[get_group_id(0)] = cache[0];
+} // used_flags()
+
 
 
 // ################################################## graphics code ##################################################
@@ -3,6 +3,7 @@
 
 
 Units units; // for unit conversion
+Force_Monitor force_monitor; // force monitor of the last main_setup() run
 
 uint velocity_set;
 uint dimensions;
@@ -31,45 +32,61 @@ const uint transfers = 9u;
 uint bytes_per_cell_host() { // returns the number of Bytes per cell allocated in host memory
 	uint bytes_per_cell = 17u; // rho, u, flags
 //cnd #ifdef FORCE_FIELD
-	if(g_args["FORCE_FIELD"].as<bool>()) bytes_per_cell += 12u; // F
+	if(g_features.force_field) bytes_per_cell += 12u; // F
 //cnd #endif // FORCE_FIELD
 //cnd #ifdef SURFACE
-	if(g_args["SURFACE"].as<bool>()) bytes_per_cell += 4u; // phi
+	if(g_features.surface) bytes_per_cell += 4u; // phi
 //cnd #endif // SURFACE
 //cnd #ifdef TEMPERATURE
-	if(g_args["TEMPERATURE"].as<bool>()) bytes_per_cell += 4u; // T
+	if(g_features.temperature) bytes_per_cell += 4u; // T
 //cnd #endif // TEMPERATURE
 	return bytes_per_cell;
 }
 uint bytes_per_cell_device() { // returns the number of Bytes per cell allocated in device memory
 	uint bytes_per_cell = velocity_set*fpxxsize+17u; // fi, rho, u, flags
 //cnd #ifdef FORCE_FIELD
-	if(g_args["FORCE_FIELD"].as<bool>()) bytes_per_cell += 12u; // F
+	if(g_features.force_field) bytes_per_cell += 12u; // F
 //cnd #endif // FORCE_FIELD
 //cnd #ifdef SURFACE
-	if(g_args["SURFACE"].as<bool>()) bytes_per_cell += 12u; // phi, mass, flags
+	if(g_features.surface) bytes_per_cell += 12u; // phi, mass, flags
 //cnd #endif // SURFACE
 //cnd #ifdef TEMPERATURE
-	if(g_args["TEMPERATURE"].as<bool>()) bytes_per_cell += 7u*fpxxsize+4u; // gi, T
+	if(g_features.temperature) bytes_per_cell += 7u*fpxxsize+4u; // gi, T
 //cnd #endif // TEMPERATURE
 	return bytes_per_cell;
 }
 uint bandwidth_bytes_per_cell_device() { // returns the bandwidth in Bytes per cell per time step from/to device memory
 	uint bandwidth_bytes_per_cell = velocity_set*2u*fpxxsize+1u; // lattice.set()*2*fi, flags
 //cnd #ifdef UPDATE_FIELDS
-	if(g_args["UPDATE_FIELDS"].as<bool>()) bandwidth_bytes_per_cell += 16u; // rho, u
+	if(g_features.update_fields) bandwidth_bytes_per_cell += 16u; // rho, u
 //cnd #endif // UPDATE_FIELDS
 //cnd #ifdef FORCE_FIELD
-	if(g_args["FORCE_FIELD"].as<bool>()) bandwidth_bytes_per_cell += 12u; // F
+	if(g_features.force_field) bandwidth_bytes_per_cell += 12u; // F
 //cnd #endif // FORCE_FIELD
 //cnd #if defined(MOVING_BOUNDARIES)||defined(SURFACE)||defined(TEMPERATURE)
-	if( g_args["MOVING_BOUNDARIES"].as<bool>() || g_args["SURFACE"].as<bool>() || g_args["TEMPERATURE"].as<bool>() ) bandwidth_bytes_per_cell += (velocity_set-1u)*1u; // neighbor flags have to be loaded
+	if( g_features.moving_boundaries || g_features.surface || g_features.temperature ) bandwidth_bytes_per_cell += (velocity_set-1u)*1u; // neighbor flags have to be loaded
 //cnd #endif // MOVING_BOUNDARIES, SURFACE or TEMPERATURE
 //cnd #ifdef SURFACE
-	if(g_args["SURFACE"].as<bool>()) bandwidth_bytes_per_cell += (1u+(2u*velocity_set-1u)*fpxxsize+8u+(velocity_set-1u)*4u) + 1u + 1u + (4u+velocity_set+4u+4u+4u); // surface_0 (flags, fi, mass, massex), surface_1 (flags), surface_2 (flags), surface_3 (rho, flags, mass, massex, phi)
+	if(g_features.surface) bandwidth_bytes_per_cell += (1u+(2u*velocity_set-1u)*fpxxsize+8u+(velocity_set-1u)*4u) + 1u + 1u + (4u+velocity_set+4u+4u+4u); // surface_0 (flags, fi, mass, massex), surface_1 (flags), surface_2 (flags), surface_3 (rho, flags, mass, massex, phi)
 //cnd #endif // SURFACE
 //cnd #ifdef TEMPERATURE
-	if(g_args["TEMPERATURE"].as<bool>()) bandwidth_bytes_per_cell += 7u*2u*fpxxsize+4u; // 2*gi, T
+	if(g_features.temperature) bandwidth_bytes_per_cell += 7u*2u*fpxxsize+4u; // 2*gi, T
+//cnd #endif // TEMPERATURE
+	return bandwidth_bytes_per_cell;
+}
+uint bandwidth_bytes_per_halo_cell() { // returns the number of Bytes per domain boundary cell copied from/to device memory in every time step
+	uint bandwidth_bytes_per_cell = transfers*(uint)fpxxsize; // fi
+//cnd #if defined(SURFACE) || defined(GRAPHICS)
+	if(g_features.surface || g_features.graphics) bandwidth_bytes_per_cell += 17u; // rho, u, flags
+//cnd #endif // SURFACE || GRAPHICS
+//cnd #ifdef SURFACE
+	if(g_features.surface) bandwidth_bytes_per_cell += 1u+1u+9u; // flags, flags, phi/massex/flags
+//cnd #endif // SURFACE
+//cnd #ifdef TEMPERATURE
+	if(g_features.temperature) bandwidth_bytes_per_cell += (uint)fpxxsize; // gi
+#ifdef GRAPHICS
+	if(g_features.temperature) bandwidth_bytes_per_cell += 4u; // T
+#endif // GRAPHICS
 //cnd #endif // TEMPERATURE
 	return bandwidth_bytes_per_cell;
 }
@@ -79,6 +96,79 @@ uint3 resolution(const float3 box_aspect_ratio, const uint memory) { // input: s
 	return uint3(to_uint(scaling*box_aspect_ratio.x), to_uint(scaling*box_aspect_ratio.y), to_uint(scaling*box_aspect_ratio.z));
 }
 
+Memory_Plan plan_memory(const uint Nx, const uint Ny, const uint Nz, const uint Dx, const uint Dy, const uint Dz, const uint particles_N) { // same allocations as LBM_Domain::allocate() and LBM_Domain::allocate_transfer()
+	Memory_Plan plan;
+	plan.Dx = max(Dx, 1u); plan.Dy = max(Dy, 1u); plan.Dz = max(Dz, 1u);
+	plan.Nx = (Nx/plan.Dx)*plan.Dx; plan.Ny = (Ny/plan.Dy)*plan.Dy; plan.Nz = (Nz/plan.Dz)*plan.Dz; // make resolution equally divisible by domains
+	const uint Hx=plan.Dx>1u, Hy=plan.Dy>1u, Hz=plan.Dz>1u; // halo offsets
+	plan.domain_Nx = plan.Nx/plan.Dx+2u*Hx; plan.domain_Ny = plan.Ny/plan.Dy+2u*Hy; plan.domain_Nz = plan.Nz/plan.Dz+2u*Hz;
+	const ulong N = (ulong)plan.domain_Nx*(ulong)plan.domain_Ny*(ulong)plan.domain_Nz; // cells per domain
+	const ulong A[3] = { (ulong)plan.domain_Ny*(ulong)plan.domain_Nz, (ulong)plan.domain_Nz*(ulong)plan.domain_Nx, (ulong)plan.domain_Nx*(ulong)plan.domain_Ny }; // domain side areas
+	ulong Amax = 0ull, halo_cells = 0ull; // maximum domain side area of communicated directions, communicated cells per domain
+	if(Hx) { Amax = max(Amax, A[0]); halo_cells += 2ull*A[0]; }
+	if(Hy) { Amax = max(Amax, A[1]); halo_cells += 2ull*A[1]; }
+	if(Hz) { Amax = max(Amax, A[2]); halo_cells += 2ull*A[2]; }
+	const ulong transfer_bytes = 2ull*Amax*(ulong)max(transfers*(uint)fpxxsize, 17u); // transfer_buffer_p and transfer_buffer_m, on device and host
+	ulong extra_bytes = transfer_bytes; // allocated on device and host
+//cnd #ifdef FORCE_FIELD
+	if(g_features.force_field) extra_bytes += 40ull*min((N+(ulong)WORKGROUP_SIZE-1ull)/(ulong)WORKGROUP_SIZE, (ulong)1024u); // object_sums
+//cnd #endif // FORCE_FIELD
+//cnd #ifdef PARTICLES
+	if(g_features.particles) extra_bytes += 12ull*(ulong)particles_N; // particles
+//cnd #endif // PARTICLES
+	plan.device_bytes = N*(ulong)bytes_per_cell_device()+extra_bytes;
+	plan.host_bytes = (ulong)plan.get_D()*(N*(ulong)bytes_per_cell_host()+extra_bytes);
+#ifdef GRAPHICS
+	const ulong pixels = (ulong)camera.width*(ulong)camera.height;
+	plan.device_bytes += 8ull*pixels; // bitmap, zbuffer
+	plan.host_bytes += (ulong)plan.get_D()*(plan.get_D()>1u ? 8ull : 4ull)*pixels; // bitmap, zbuffer with multiple domains
+#endif // GRAPHICS
+	plan.max_buffer_bytes = N*(ulong)(velocity_set*(uint)fpxxsize); // fi
+	plan.halo_bytes = 2ull*(ulong)plan.get_D()*halo_cells*(ulong)bandwidth_bytes_per_halo_cell(); // device to host and back
+	return plan;
+}
+Memory_Plan plan_domains(const uint Nx, const uint Ny, const uint Nz, const uint D, const uint particles_N) {
+	Memory_Plan best = plan_memory(Nx, Ny, Nz, max(D, 1u), 1u, 1u, particles_N);
+	for(uint Dx=1u; Dx<=D; Dx++) {
+		if(D%Dx!=0u) continue;
+		for(uint Dy=1u; Dy<=D/Dx; Dy++) {
+			if((D/Dx)%Dy!=0u) continue;
+			const uint Dz = D/(Dx*Dy);
+			if(dimensions==2u&&Dz>1u) continue; // 2D grids have Nz=1
+			const Memory_Plan plan = plan_memory(Nx, Ny, Nz, Dx, Dy, Dz, particles_N);
+			if(plan.get_N()==0ull) continue; // more domains than cells in one direction
+			if(best.get_N()==0ull||plan.halo_bytes<best.halo_bytes||(plan.halo_bytes==best.halo_bytes&&plan.get_N()>best.get_N())) best = plan; // least halo traffic, then least cells lost to rounding
+		}
+	}
+	return best;
+}
+Memory_Plan plan_resolution(const float3 box_aspect_ratio, const uint memory, const uint D, const uint particles_N) {
+	const double budget = (double)memory*1048576.0; // in Bytes per device
+	const double volume = (double)box_aspect_ratio.x*(double)box_aspect_ratio.y*(double)box_aspect_ratio.z;
+	const double upper = cbrt((double)max(D, 1u)*budget/(fmax(volume, 1E-9)*(double)bytes_per_cell_device())); // halo layers and buffers only add memory, so this scaling is never too small
+	Memory_Plan best;
+	double best_cost = 0.0; // halo Bytes per cell and time step
+	for(uint Dx=1u; Dx<=max(D, 1u); Dx++) {
+		if(max(D, 1u)%Dx!=0u) continue;
+		for(uint Dy=1u; Dy<=max(D, 1u)/Dx; Dy++) {
+			if((max(D, 1u)/Dx)%Dy!=0u) continue;
+			const uint Dz = max(D, 1u)/(Dx*Dy);
+			if(dimensions==2u&&Dz>1u) continue; // 2D grids have Nz=1
+			Memory_Plan plan; // bisection for the largest scaling that fits, the rounding to whole cells makes the memory a step function of it
+			double low=0.0, high=upper;
+			for(uint i=0u; i<48u; i++) {
+				const double scaling = 0.5*(low+high);
+				const Memory_Plan test = plan_memory(max((uint)(scaling*(double)box_aspect_ratio.x+0.5), 1u), max((uint)(scaling*(double)box_aspect_ratio.y+0.5), 1u), max((uint)(scaling*(double)box_aspect_ratio.z+0.5), 1u), Dx, Dy, Dz, particles_N);
+				if(test.get_N()>0ull&&(double)test.device_bytes<=budget) { low = scaling; plan = test; } else high = scaling;
+			}
+			if(plan.get_N()==0ull) continue; // memory too small for this split
+			const double cost = (double)plan.halo_bytes/(double)plan.get_N();
+			if(best.get_N()==0ull||cost<best_cost||(cost==best_cost&&plan.get_N()>best.get_N())) { best = plan; best_cost = cost; } // least halo traffic relative to the grid, then largest grid
+		}
+	}
+	return best; // get_N()==0 if nothing fits
+}
+
 string default_filename(const string& path, const string& name, const string& extension, const ulong t) { // generate a default filename with timestamp
 	string time = "00000000"+to_string(t);
 	time = substring(time, length(time)-9u, 9u);
@@ -116,31 +206,34 @@ LBM_Domain::LBM_Domain(const Device_Info& device_info, const uint Nx, const uint
 
 void LBM_Domain::allocate(Device& device) {
 	const ulong N = get_N();
-	if(g_args["FP16S"].as<bool>() || g_args["FP16C"].as<bool>()) fi = Memory<fpxx>(device, N/2, velocity_set, false); // ushort (fpxx16) is half the size of float (fpxx)
+	if(g_features.fp16s || g_features.fp16c) fi = Memory<fpxx>(device, N/2, velocity_set, false); // ushort (fpxx16) is half the size of float (fpxx)
 	else fi = Memory<fpxx>(device, N, velocity_set, false);
 	rho = Memory<float>(device, N, 1u, true, true, 1.0f);
 	u = Memory<float>(device, N, 3u);
 	flags = Memory<uchar>(device, N);
 	kernel_initialize = Kernel(device, N, "initialize", fi, rho, u, flags);
-	kernel_stream_collide = Kernel(device, N, "stream_collide", fi, rho, u, flags, t, fx, fy, fz);
+	kernel_stream_collide = Kernel(device, N, "stream_collide", fi, rho, u, flags, t, fx, fy, fz, nu);
 	kernel_update_fields = Kernel(device, N, "update_fields", fi, rho, u, flags, t, fx, fy, fz);
 
 //#ifdef FORCE_FIELD
-	if(g_args["FORCE_FIELD"].as<bool>()) {
+	if(g_features.force_field) {
 	F = Memory<float>(device, N, 3u);
 	kernel_stream_collide.add_parameters(F);
 	kernel_update_fields.add_parameters(F);
 	kernel_calculate_force_on_boundaries = Kernel(device, N, "calculate_force_on_boundaries", fi, flags, t, F);
 	kernel_reset_force_field = Kernel(device, N, "reset_force_field", F);
+	const ulong groups = min((N+(ulong)WORKGROUP_SIZE-1ull)/(ulong)WORKGROUP_SIZE, (ulong)1024u); // enough workgroups to fill the device, few enough to read back cheaply
+	object_sums = Memory<float>(device, 10ull*groups);
+	kernel_object_sums = Kernel(device, groups*(ulong)WORKGROUP_SIZE, "object_sums", flags, F, (uchar)TYPE_S, 0.0f, 0.0f, 0.0f, object_sums);
 	}
 //cnd #endif // FORCE_FIELD
 
 //cnd #ifdef MOVING_BOUNDARIES
-	if(g_args["MOVING_BOUNDARIES"].as<bool>()) kernel_update_moving_boundaries = Kernel(device, N, "update_moving_boundaries", u, flags);
+	if(g_features.moving_boundaries) kernel_update_moving_boundaries = Kernel(device, N, "update_moving_boundaries", u, flags);
 //cnd #endif // MOVING_BOUNDARIES
 
 //cnd #ifdef SURFACE
-	if(g_args["SURFACE"].as<bool>()) {
+	if(g_features.surface) {
 	phi = Memory<float>(device, N);
 	mass = Memory<float>(device, N, 1u, false);
 	massex = Memory<float>(device, N, 1u, false);
@@ -154,8 +247,8 @@ void LBM_Domain::allocate(Device& device) {
 //cnd #endif // SURFACE
 
 //cnd #ifdef TEMPERATURE
-	if(g_args["TEMPERATURE"].as<bool>()) {
-	if(g_args["FP16S"].as<bool>() || g_args["FP16C"].as<bool>()) gi = Memory<fpxx>(device, N/2, 7u, false); // reinterpret_cast<fpxx*>(Memory<fpxx16>(device, N, 7u, false));
+	if(g_features.temperature) {
+	if(g_features.fp16s || g_features.fp16c) gi = Memory<fpxx>(device, N/2, 7u, false); // reinterpret_cast<fpxx*>(Memory<fpxx16>(device, N, 7u, false));
 	else							     gi = Memory<fpxx>(device, N, 7u, false);
 	T = Memory<float>(device, N, 1u, true, true, 1.0f);
 	kernel_initialize.add_parameters(gi, T);
@@ -165,27 +258,31 @@ void LBM_Domain::allocate(Device& device) {
 //cnd #endif // TEMPERATURE
 
 //cnd #ifdef PARTICLES
-	if(g_args["PARTICLES"].as<bool>()) {
+	if(g_features.particles) {
 	particles = Memory<float>(device, (ulong)particles_N, 3u);
 	kernel_integrate_particles = Kernel(device, (ulong)particles_N, "integrate_particles", particles, u, flags, 1.0f);
 //cnd #ifdef FORCE_FIELD
-	if(g_args["FORCE_FIELD"].as<bool>()) kernel_integrate_particles.add_parameters(F, fx, fy, fz);
+	if(g_features.force_field) kernel_integrate_particles.add_parameters(F, fx, fy, fz);
 //cnd #endif // FORCE_FIELD
 	}
 //cnd #endif // PARTICLES
 
+	kernel_stream_collide.add_parameters(0u); // part, always the last parameter, see enqueue_stream_collide()
 	if(get_D()>1u) allocate_transfer(device);
 }
 
 void LBM_Domain::enqueue_initialize() { // call kernel_initialize
 	kernel_initialize.enqueue_run();
 }
-void LBM_Domain::enqueue_stream_collide() { // call kernel_stream_collide to perform one LBM time step
-	kernel_stream_collide.set_parameters(4u, t, fx, fy, fz).enqueue_run();
+void LBM_Domain::enqueue_stream_collide(const uint part) { // call kernel_stream_collide to perform one LBM time step
+	const ulong transfer_cells = 4ull*((Dx>1u)*get_area(0u)+(Dy>1u)*get_area(1u)+(Dz>1u)*get_area(2u)); // 4 transfer layers per split direction, edges are counted more than once and skipped in the kernel
+	const ulong cells = part==1u ? transfer_cells : part==2u ? get_N()-min(transfer_cells, get_N()) : get_N(); // cells that actually stream and collide in this part
+	kernel_stream_collide.set_ranges(part==1u ? transfer_cells : get_N()).set_bytes(cells*(ulong)bandwidth_bytes_per_cell_device());
+	kernel_stream_collide.set_parameters(4u, t, fx, fy, fz, nu).set_parameters(kernel_stream_collide.get_number_of_parameters()-1u, part).enqueue_run();
 }
 void LBM_Domain::enqueue_update_fields() { // update fields (rho, u, T) manually
 //cnd #ifndef UPDATE_FIELDS
-	if(g_args["UPDATE_FIELDS"].as<bool>() && (t!=t_last_update_fields)) { // only run kernel_update_fields if the time step has changed since last update
+	if(g_features.update_fields && (t!=t_last_update_fields)) { // only run kernel_update_fields if the time step has changed since last update
 		kernel_update_fields.set_parameters(4u, t, fx, fy, fz).enqueue_run();
 		t_last_update_fields = t;
 	}
@@ -209,6 +306,10 @@ void LBM_Domain::enqueue_surface_3() {
 void LBM_Domain::enqueue_calculate_force_on_boundaries() { // calculate forces from fluid on TYPE_S cells
 	kernel_calculate_force_on_boundaries.set_parameters(2u, t).enqueue_run();
 }
+void LBM_Domain::enqueue_object_sums(const uchar flag_marker, const float3& reference) { // reduce force, torque around reference and positions of cells flagged with flag_marker into object_sums, then read them to the host
+	kernel_object_sums.set_parameters(2u, flag_marker, reference.x, reference.y, reference.z).enqueue_run();
+	object_sums.enqueue_read_from_device();
+}
 //cnd #endif // FORCE_FIELD
 //cnd #ifdef MOVING_BOUNDARIES
 void LBM_Domain::enqueue_update_moving_boundaries() { // mark/unmark cells next to TYPE_S cells with velocity!=0 with TYPE_MS
@@ -218,7 +319,7 @@ void LBM_Domain::enqueue_update_moving_boundaries() { // mark/unmark cells next
 //cnd #ifdef PARTICLES
 void LBM_Domain::enqueue_integrate_particles(const uint time_step_multiplicator) { // intgegrate particles forward in time and couple particles to fluid
 //cnd #ifdef FORCE_FIELD
-	if(g_args["FORCE_FIELD"].as<bool>()) {
+	if(g_features.force_field) {
 	if(particles_rho!=1.0f) kernel_reset_force_field.enqueue_run(); // only reset force field if particles have buoyancy and apply forces on fluid
 	kernel_integrate_particles.set_parameters(5u, fx, fy, fz);
 	}
@@ -230,18 +331,61 @@ void LBM_Domain::enqueue_integrate_particles(const uint time_step_multiplicator)
 void LBM_Domain::increment_time_step(const uint steps) {
 	t += (ulong)steps; // increment time step
 //cnd #ifdef UPDATE_FIELDS
-	if(g_args["UPDATE_FIELDS"].as<bool>()) t_last_update_fields = t;
+	if(g_features.update_fields) t_last_update_fields = t;
 //cnd #endif // UPDATE_FIELDS
 }
 void LBM_Domain::reset_time_step() {
 	t = 0ull; // increment time step
 //cnd #ifdef UPDATE_FIELDS
-	if(g_args["UPDATE_FIELDS"].as<bool>()) t_last_update_fields = t;
+	if(g_features.update_fields) t_last_update_fields = t;
 //cnd #endif // UPDATE_FIELDS
 }
+void LBM_Domain::set_time_step(const ulong t) { // continue from time step t, for restoring a checkpoint
+	this->t = t;
+	t_last_update_fields = t; // rho, u and T are restored together with the DDFs
+}
+ulong LBM_Domain::get_state_bytes() { // size of the checkpoint state of this domain in bytes, halos included
+	ulong bytes = 0ull;
+	for_each_state_buffer([&](auto& buffer) { bytes += buffer.capacity(); });
+	return bytes;
+}
+void LBM_Domain::enqueue_read_state(uchar* destination) { // copy the checkpoint state from the device into destination
+	for_each_state_buffer([&](auto& buffer) {
+		using T = typename std::remove_reference<decltype(buffer[0])>::type;
+		buffer.enqueue_read_from_device_to((T*)destination);
+		destination += buffer.capacity();
+	});
+}
+void LBM_Domain::write_state(const uchar* source) { // copy the checkpoint state to the device, and to the host buffers where they exist
+	for_each_state_buffer([&](auto& buffer) {
+		using T = typename std::remove_reference<decltype(buffer[0])>::type;
+		if(buffer.data()!=nullptr) { // keep host buffers in sync, so reading rho/u/flags on the host works without read_from_device()
+			std::memcpy((void*)buffer.data(), (const void*)source, buffer.capacity());
+			buffer.write_to_device();
+		} else {
+			buffer.write_to_device_from((const T*)source);
+		}
+		source += buffer.capacity();
+	});
+}
 void LBM_Domain::finish_queue() {
 	device.finish_queue();
 }
+void LBM_Domain::enqueue_transfer_begin() { // transfer queue waits for all work enqueued in the compute queue so far, later compute work is not held up
+	Event event;
+	device.barrier(nullptr, &event); // marker in the in-order compute queue
+	const vector<Event> waitlist = { event };
+	device.barrier_transfer(&waitlist);
+}
+void LBM_Domain::enqueue_transfer_end() { // compute queue waits for all work enqueued in the transfer queue so far
+	Event event;
+	device.barrier_transfer(nullptr, &event);
+	const vector<Event> waitlist = { event };
+	device.barrier(&waitlist);
+}
+void LBM_Domain::finish_transfer_queue() {
+	device.finish_transfer_queue();
+}
 
 uint LBM_Domain::get_velocity_set() const {
 	return velocity_set;
@@ -292,7 +436,7 @@ void LBM_Domain::voxelize_mesh_on_device(const Mesh* mesh, const uchar flag, con
 	const ulong A[3] = { (ulong)Ny*(ulong)Nz, (ulong)Nz*(ulong)Nx, (ulong)Nx*(ulong)Ny };
 	Kernel kernel_voxelize_mesh(device, A[direction], "voxelize_mesh", direction, fi, rho, u, flags, t+1ull, flag, p0, p1, p2, bounding_box_and_velocity);
 //cnd #ifdef SURFACE
-	if(g_args["SURFACE"].as<bool>()) kernel_voxelize_mesh.add_parameters(mass, massex);
+	if(g_features.surface) kernel_voxelize_mesh.add_parameters(mass, massex);
 //cnd #endif // SURFACE
 	p0.write_to_device();
 	p1.write_to_device();
@@ -305,6 +449,21 @@ void LBM_Domain::enqueue_unvoxelize_mesh_on_device(const Mesh* mesh, const uchar
 	Kernel kernel_unvoxelize_mesh(device, get_N(), "unvoxelize_mesh", flags, flag, x0, y0, z0, x1, y1, z1);
 	kernel_unvoxelize_mesh.run();
 }
+void LBM_Domain::enqueue_apply_region(const Region& region) { // write flags/rho/u of the cells in region directly in device memory
+	const uint set = (uint)region.set_flags|(uint)region.set_rho<<1|(uint)region.set_u<<2;
+	Kernel kernel_apply_region(device, get_N(), "apply_region", rho, u, flags, region.shape, region.p.x, region.p.y, region.p.z, region.l.x, region.l.y, region.l.z, region.r, region.faces, set, region.flags, region.keep, region.rho, region.u.x, region.u.y, region.u.z);
+	kernel_apply_region.enqueue_run();
+}
+uint LBM_Domain::used_flags() { // OR of the flags of all cells, bit 8: moving boundaries, bit 9: equilibrium boundaries; reduced on the device, only one value per workgroup is copied back
+	const ulong groups = min((get_N()+(ulong)WORKGROUP_SIZE-1ull)/(ulong)WORKGROUP_SIZE, (ulong)1024u);
+	Memory<uint> used(device, groups);
+	Kernel kernel_used_flags(device, groups*(ulong)WORKGROUP_SIZE, "used_flags", flags, u, used);
+	kernel_used_flags.run();
+	used.read_from_device();
+	uint result = 0u;
+	for(ulong i=0ull; i<groups; i++) result |= used[i];
+	return result;
+}
 
 string LBM_Domain::device_defines() const { return
 	"\n	#define def_Nx "+to_string(Nx)+"u"
@@ -335,21 +494,20 @@ string LBM_Domain::device_defines() const { return
 	"\n	#define def_transfers "+to_string(transfers)+"u" // number of DDFs that are transferred between multiple domains
 
 	"\n	#define def_c 0.57735027f" // lattice speed of sound c = 1/sqrt(3)*dt
-	"\n	#define def_w " +to_string(1.0f/get_tau())+"f" // relaxation rate w = dt/tau = dt/(nu/c^2+dt/2) = 1/(3*nu+1/2)
 
-	+ (g_args["D2Q9"].as<bool>() ? 
+	+ (g_features.d2q9 ? 
 	"\n	#define def_w0 (1.0f/2.25f)" // center (0)
 	"\n	#define def_ws (1.0f/9.0f)" // straight (1-4)
 	"\n	#define def_we (1.0f/36.0f)" // edge (5-8)
-	: g_args["D3Q15"].as<bool>() ? 
+	: g_features.d3q15 ? 
 	"\n	#define def_w0 (1.0f/4.5f)" // center (0)
 	"\n	#define def_ws (1.0f/9.0f)" // straight (1-6)
 	"\n	#define def_wc (1.0f/72.0f)" // corner (7-14)
-	: g_args["D3Q19"].as<bool>() ? 
+	: g_features.d3q19 ? 
 	"\n	#define def_w0 (1.0f/3.0f)" // center (0)
 	"\n	#define def_ws (1.0f/18.0f)" // straight (1-6)
 	"\n	#define def_we (1.0f/36.0f)" // edge (7-18)
-	: g_args["D3Q27"].as<bool>() ? 
+	: g_features.d3q27 ? 
 	"\n	#define def_w0 (1.0f/3.375f)" // center (0)
 	"\n	#define def_ws (1.0f/13.5f)" // straight (1-6)
 	"\n	#define def_we (1.0f/54.0f)" // edge (7-18)
@@ -377,8 +535,8 @@ string LBM_Domain::device_defines() const { return
 #endif // D3Q27
 */
 
-        + (g_args["SRT"].as<bool>() ? "\n     #define SRT" :    // cnd - was #if defined(SRT)
-           g_args["TRT"].as<bool>() ? "\n     #define TRT" : "") + // cnd - was #if defined(SRT)
+        + (g_features.srt ? "\n     #define SRT" :    // cnd - was #if defined(SRT)
+           g_features.trt ? "\n     #define TRT" : "") + // cnd - was #if defined(SRT)
 
 /*
 #if defined(SRT)
@@ -405,12 +563,12 @@ string LBM_Domain::device_defines() const { return
 	"\n	#define TYPE_SU 0x38" // 0b00111000 // any flag bit used for SURFACE
 
 	
-        + (g_args["FP16S"].as<bool>() ?    // cnd - was #if defined(FP16S)
+        + (g_features.fp16s ?    // cnd - was #if defined(FP16S)
 	"\n	#define fpxx half" // switchable data type (scaled IEEE-754 16-bit floating-point format: 1-5-10, exp-30, +-1.99902344, +-1.86446416E-9, +-1.81898936E-12, 3.311 digits)
 	"\n	#define fpxx_copy ushort" // switchable data type for direct copying (scaled IEEE-754 16-bit floating-point format: 1-5-10, exp-30, +-1.99902344, +-1.86446416E-9, +-1.81898936E-12, 3.311 digits)
 	"\n	#define load(p,o) vload_half(o,p)*3.0517578E-5f" // special function for loading half
 	"\n	#define store(p,o,x) vstore_half_rte((x)*32768.0f,o,p)" // special function for storing half
-         : g_args["FP16C"].as<bool>() ?  // cnd - was #elif defined(FP16C)
+         : g_features.fp16c ?  // cnd - was #elif defined(FP16C)
 	"\n	#define fpxx ushort" // switchable data type (custom 16-bit floating-point format: 1-4-11, exp-15, +-1.99951168, +-6.10351562E-5, +-2.98023224E-8, 3.612 digits), 12.5% slower than IEEE-754 16-bit
 	"\n	#define fpxx_copy ushort" // switchable data type for direct copying (custom 16-bit floating-point format: 1-4-11, exp-15, +-1.99951168, +-6.10351562E-5, +-2.98023224E-8, 3.612 digits), 12.5% slower than IEEE-754 16-bit
 	"\n	#define load(p,o) half_to_float_custom(p[o])" // special function for loading half
@@ -441,37 +599,37 @@ string LBM_Domain::device_defines() const { return
 #endif // FP32
 */
 
-	  (g_args["UPDATE_FIELDS"].as<bool>() ? "\n     #define UPDATE_FIELDS" : "") + // cnd - was #ifdef UPDATE_FIELDS
+	  (g_features.update_fields ? "\n     #define UPDATE_FIELDS" : "") + // cnd - was #ifdef UPDATE_FIELDS
 /*
 #ifdef UPDATE_FIELDS
 	"\n	#define UPDATE_FIELDS"
 #endif // UPDATE_FIELDS
 */
 
-	  (g_args["VOLUME_FORCE"].as<bool>() ? "\n     #define VOLUME_FORCE" : "") + // cnd - was #ifdef VOLUME_FORCE
-	  (g_args["MOVING_BOUNDARIES"].as<bool>() ? "\n     #define MOVING_BOUNDARIES" : "") + // cnd - was #ifdef MOVING_BOUNDARIES
+	  (g_features.volume_force ? "\n     #define VOLUME_FORCE" : "") + // cnd - was #ifdef VOLUME_FORCE
+	  (g_features.moving_boundaries ? "\n     #define MOVING_BOUNDARIES" : "") + // cnd - was #ifdef MOVING_BOUNDARIES
 /*
 #ifdef MOVING_BOUNDARIES
 	"\n	#define MOVING_BOUNDARIES"
 #endif // MOVING_BOUNDARIES
 */
 
-	  (g_args["EQUILIBRIUM_BOUNDARIES"].as<bool>() ? "\n     #define EQUILIBRIUM_BOUNDARIES" : "") + // cnd - was #ifdef EQUILIBRIUM_BOUNDARIES
+	  (g_features.equilibrium_boundaries ? "\n     #define EQUILIBRIUM_BOUNDARIES" : "") + // cnd - was #ifdef EQUILIBRIUM_BOUNDARIES
 /*
 #ifdef EQUILIBRIUM_BOUNDARIES
 	"\n	#define EQUILIBRIUM_BOUNDARIES"
 #endif // EQUILIBRIUM_BOUNDARIES
 */
 
-	+ (g_args["FORCE_FIELD"].as<bool>() ? "\n     #define FORCE_FIELD" : "") + // cnd - was #ifdef FORCE_FIELD
+	+ (g_features.force_field ? "\n     #define FORCE_FIELD" : "") + // cnd - was #ifdef FORCE_FIELD
 /*
 #ifdef FORCE_FIELD
 	"\n	#define FORCE_FIELD"
 #endif // FORCE_FIELD
 */
 
-	  (g_args["SURFACE"].as<bool>() ? "\n     #define SURFACE" : "") + // cnd - was #ifdef SURFACE
-	  (g_args["SURFACE"].as<bool>() ? "\n     #define def_6_sigma "+to_string(6.0f*sigma)+"f" : "") + // rho_laplace = 2*o*K, rho = 1-rho_laplace/c^2 = 1-(6*o)*K
+	  (g_features.surface ? "\n     #define SURFACE" : "") + // cnd - was #ifdef SURFACE
+	  (g_features.surface ? "\n     #define def_6_sigma "+to_string(6.0f*sigma)+"f" : "") + // rho_laplace = 2*o*K, rho = 1-rho_laplace/c^2 = 1-(6*o)*K
 /*
 #ifdef SURFACE
 	"\n	#define SURFACE"
@@ -479,10 +637,10 @@ string LBM_Domain::device_defines() const { return
 #endif // SURFACE
 */
 
-          (g_args["TEMPERATURE"].as<bool>() ? "\n     #define TEMPERATURE" : "") + // cnd - was #ifdef TEMPERATURE
-          (g_args["TEMPERATURE"].as<bool>() ? "\n     #define def_w_T "+to_string(1.0f/(2.0f*alpha+0.5f))+"f" : "") +// wT = dt/tauT = 1/(2*alpha+1/2), alpha = thermal diffusion coefficient
-          (g_args["TEMPERATURE"].as<bool>() ? "\n     #define def_beta "+to_string(beta)+"f" : "") + // thermal expansion coefficient
-          (g_args["TEMPERATURE"].as<bool>() ? "\n     #define def_T_avg "+to_string(T_avg)+"f" : "") + // average temperature
+          (g_features.temperature ? "\n     #define TEMPERATURE" : "") + // cnd - was #ifdef TEMPERATURE
+          (g_features.temperature ? "\n     #define def_w_T "+to_string(1.0f/(2.0f*alpha+0.5f))+"f" : "") +// wT = dt/tauT = 1/(2*alpha+1/2), alpha = thermal diffusion coefficient
+          (g_features.temperature ? "\n     #define def_beta "+to_string(beta)+"f" : "") + // thermal expansion coefficient
+          (g_features.temperature ? "\n     #define def_T_avg "+to_string(T_avg)+"f" : "") + // average temperature
 
 /*
 #ifdef TEMPERATURE
@@ -493,11 +651,11 @@ string LBM_Domain::device_defines() const { return
 #endif // TEMPERATURE
 */
 
-      (g_args["SUBGRID"].as<bool>() ? "\n     #define SUBGRID" : "") + // cnd - was #ifdef SUBGRID
+      (g_features.subgrid ? "\n     #define SUBGRID" : "") + // cnd - was #ifdef SUBGRID
 
-      (g_args["PARTICLES"].as<bool>() ? "\n     #define PARTICLES" : "") + // cnd - was #ifdef PARTICLES
-      (g_args["PARTICLES"].as<bool>() ? "\n	#define def_particles_N "+to_string(particles_N)+"ul" : "") + // cnd - was #ifdef PARTICLES
-      (g_args["PARTICLES"].as<bool>() ? "\n	#define def_particles_rho "+to_string(particles_rho)+"f" : "") + // cnd - was #ifdef PARTICLES
+      (g_features.particles ? "\n     #define PARTICLES" : "") + // cnd - was #ifdef PARTICLES
+      (g_features.particles ? "\n	#define def_particles_N "+to_string(particles_N)+"ul" : "") + // cnd - was #ifdef PARTICLES
+      (g_features.particles ? "\n	#define def_particles_rho "+to_string(particles_rho)+"f" : "") + // cnd - was #ifdef PARTICLES
 /*
 #ifdef PARTICLES
 	"\n	#define PARTICLES"
@@ -519,8 +677,8 @@ void LBM_Domain::Graphics::allocate(Device& device) {
 	kernel_graphics_flags_mc = Kernel(device, lbm->get_N(), "graphics_flags_mc", camera_parameters, bitmap, zbuffer, lbm->flags);
 	kernel_graphics_field = Kernel(device, lbm->get_D()==1u ? camera.width*camera.height : lbm->get_N(), lbm->get_D()==1u ? "graphics_field_rt" : "graphics_field", camera_parameters, bitmap, zbuffer, 0, lbm->rho, lbm->u, lbm->flags); // raytraced field visualization only works for single-GPU
 	kernel_graphics_field_slice = Kernel(device, lbm->get_N(), "graphics_field_slice", camera_parameters, bitmap, zbuffer, 0, 0, 0, 0, 0, lbm->rho, lbm->u, lbm->flags);
-	if(!g_args["D2Q9"].as<bool>()) kernel_graphics_streamline = Kernel(device, (lbm->get_Nx()/g_args["STREAMLINE_SPARSE"].as<int>())*(lbm->get_Ny()/g_args["STREAMLINE_SPARSE"].as<int>())*(lbm->get_Nz()/g_args["STREAMLINE_SPARSE"].as<int>()), "graphics_streamline", camera_parameters, bitmap, zbuffer, 0, 0, 0, 0, 0, lbm->rho, lbm->u, lbm->flags); // 3D
-	else kernel_graphics_streamline = Kernel(device, (lbm->get_Nx()/g_args["STREAMLINE_SPARSE"].as<int>())*(lbm->get_Ny()/g_args["STREAMLINE_SPARSE"].as<int>()), "graphics_streamline", camera_parameters, bitmap, zbuffer, 0, 0, 0, 0, 0, lbm->rho, lbm->u, lbm->flags); // 2D
+	if(!g_features.d2q9) kernel_graphics_streamline = Kernel(device, (lbm->get_Nx()/g_features.streamline_sparse)*(lbm->get_Ny()/g_features.streamline_sparse)*(lbm->get_Nz()/g_features.streamline_sparse), "graphics_streamline", camera_parameters, bitmap, zbuffer, 0, 0, 0, 0, 0, lbm->rho, lbm->u, lbm->flags); // 3D
+	else kernel_graphics_streamline = Kernel(device, (lbm->get_Nx()/g_features.streamline_sparse)*(lbm->get_Ny()/g_features.streamline_sparse), "graphics_streamline", camera_parameters, bitmap, zbuffer, 0, 0, 0, 0, 0, lbm->rho, lbm->u, lbm->flags); // 2D
 /*
 #ifndef D2Q9
 	kernel_graphics_streamline = Kernel(device, (lbm->get_Nx()/GRAPHICS_STREAMLINE_SPARSE)*(lbm->get_Ny()/GRAPHICS_STREAMLINE_SPARSE)*(lbm->get_Nz()/GRAPHICS_STREAMLINE_SPARSE), "graphics_streamline", camera_parameters, bitmap, zbuffer, 0, 0, 0, 0, 0, lbm->rho, lbm->u, lbm->flags); // 3D
@@ -531,14 +689,14 @@ void LBM_Domain::Graphics::allocate(Device& device) {
 	kernel_graphics_q = Kernel(device, lbm->get_N(), "graphics_q", camera_parameters, bitmap, zbuffer, 0, lbm->rho, lbm->u);
 
 //cnd #ifdef FORCE_FIELD
-	if(g_args["FORCE_FIELD"].as<bool>())  {
+	if(g_features.force_field)  {
 	kernel_graphics_flags.add_parameters(lbm->F);
 	kernel_graphics_flags_mc.add_parameters(lbm->F);
 	}
 //cnd #endif // FORCE_FIELD
 
 //cnd #ifdef SURFACE
-	if(g_args["SURFACE"].as<bool>()) {
+	if(g_features.surface) {
 	skybox = Memory<int>(device, skybox_image->width()*skybox_image->height(), 1u, skybox_image->data());
 	kernel_graphics_rasterize_phi = Kernel(device, lbm->get_N(), "graphics_rasterize_phi", camera_parameters, bitmap, zbuffer, lbm->phi);
 	kernel_graphics_raytrace_phi = Kernel(device, bitmap.length(), "graphics_raytrace_phi", camera_parameters, bitmap, skybox, lbm->phi, lbm->flags);
@@ -547,7 +705,7 @@ void LBM_Domain::Graphics::allocate(Device& device) {
 //cnd #endif // SURFACE
 
 //cnd #ifdef TEMPERATURE
-	if(g_args["TEMPERATURE"].as<bool>()) {
+	if(g_features.temperature) {
 	kernel_graphics_field.add_parameters(lbm->T);
 	kernel_graphics_field_slice.add_parameters(lbm->T);
 	kernel_graphics_streamline.add_parameters(lbm->T);
@@ -556,7 +714,7 @@ void LBM_Domain::Graphics::allocate(Device& device) {
 //cnd #endif // TEMPERATURE
 
 //cnd #ifdef PARTICLES
-	if(g_args["PARTICLES"].as<bool>()) kernel_graphics_particles = Kernel(device, lbm->particles.length(), "graphics_particles", camera_parameters, bitmap, zbuffer, lbm->particles);
+	if(g_features.particles) kernel_graphics_particles = Kernel(device, lbm->particles.length(), "graphics_particles", camera_parameters, bitmap, zbuffer, lbm->particles);
 //cnd #endif // PARTICLES
 }
 
@@ -580,7 +738,7 @@ bool LBM_Domain::Graphics::enqueue_draw_frame(const int visualization_modes, con
 	kernel_clear.enqueue_run();
 	const int sx=slice_x-lbm->Ox, sy=slice_y-lbm->Oy, sz=slice_z-lbm->Oz; // subtract domain offsets
 //cnd #ifdef SURFACE
-	if(g_args["SURFACE"].as<bool>()) {
+	if(g_features.surface) {
 	if((visualization_modes&VIS_PHI_RAYTRACE)&&lbm->get_D()==1u) kernel_graphics_raytrace_phi.enqueue_run(); // disable raytracing for multi-GPU (domain decomposition rendering doesn't work for raytracing)
 	if(visualization_modes&VIS_PHI_RASTERIZE) kernel_graphics_rasterize_phi.enqueue_run();
 	}
@@ -622,7 +780,7 @@ bool LBM_Domain::Graphics::enqueue_draw_frame(const int visualization_modes, con
 	if(visualization_modes&VIS_STREAMLINES) kernel_graphics_streamline.set_parameters(3u, field_mode, slice_mode, sx, sy, sz).enqueue_run();
 	if(visualization_modes&VIS_Q_CRITERION) kernel_graphics_q.set_parameters(3u, field_mode).enqueue_run();
 //cnd #ifdef PARTICLES
-	if(g_args["PARTICLES"].as<bool>() && (visualization_modes&VIS_PARTICLES)) kernel_graphics_particles.enqueue_run();
+	if(g_features.particles && (visualization_modes&VIS_PARTICLES)) kernel_graphics_particles.enqueue_run();
 //cnd #endif // PARTICLES
 	bitmap.enqueue_read_from_device();
 	if(lbm->get_D()>1u) zbuffer.enqueue_read_from_device();
@@ -645,8 +803,8 @@ string LBM_Domain::Graphics::device_defines() const { return
 	"\n	#define def_scale_T "          +to_string(0.5f/(GRAPHICS_T_DELTA))+"f"
 	"\n	#define def_scale_F "          +to_string(0.5f/(GRAPHICS_F_MAX))+"f"
 	"\n	#define def_scale_Q_min "      +to_string(GRAPHICS_Q_CRITERION)+"f"
-	"\n	#define def_streamline_sparse "+to_string(g_args["STREAMLINE_SPARSE"].as<int>())+"u"
-	"\n	#define def_streamline_length "+to_string(g_args["STREAMLINE_LENGTH"].as<int>())+"u"
+	"\n	#define def_streamline_sparse "+to_string(g_features.streamline_sparse)+"u"
+	"\n	#define def_streamline_length "+to_string(g_features.streamline_length)+"u"
 	"\n	#define def_n "                +to_string(1.333f)+"f" // refractive index of water for raytracing graphics
 	"\n	#define def_attenuation "      +to_string(ln(GRAPHICS_RAYTRACING_TRANSMITTANCE)/(float)max(max(lbm->get_Nx(), lbm->get_Ny()), lbm->get_Nz()))+"f" // (negative) attenuation parameter for raytracing graphics
 	"\n	#define def_absorption_color " +to_string(GRAPHICS_RAYTRACING_COLOR)+"" // absorption color of fluid for raytracing graphics
@@ -666,8 +824,8 @@ string LBM_Domain::Graphics::device_defines() const { return
 	"\n	#define GRAPHICS_TRANSPARENCY "+to_string(GRAPHICS_TRANSPARENCY)+"f"
 #endif // GRAPHICS_TRANSPARENCY
 
-	+ (g_args["SURFACE"].as<bool>() ? "\n     #define def_skybox_width " +to_string(skybox_image->width() )+"u" : "\n     #define def_skybox_width 1u" ) + // cnd - was #ifdef SURFACE
-	  (g_args["SURFACE"].as<bool>() ? "\n     #define def_skybox_height "+to_string(skybox_image->height())+"u" : "\n     #define def_skybox_height 1u" ) + 
+	+ (g_features.surface ? "\n     #define def_skybox_width " +to_string(skybox_image->width() )+"u" : "\n     #define def_skybox_width 1u" ) + // cnd - was #ifdef SURFACE
+	  (g_features.surface ? "\n     #define def_skybox_height "+to_string(skybox_image->height())+"u" : "\n     #define def_skybox_height 1u" ) + 
 /*
 #ifndef SURFACE
 	"\n	#define def_skybox_width 1u"
@@ -684,48 +842,7 @@ string LBM_Domain::Graphics::device_defines() const { return
 
 
 vector<Device_Info> smart_device_selection(const uint D) {
-	const vector<Device_Info>& devices = get_devices(); // a vector of all available OpenCL devices
-	vector<Device_Info> device_infos(D);
-	const int user_specified_devices = (int)main_arguments.size();
-	if(user_specified_devices>0) { // user has selevted specific devices as command line arguments
-		if(user_specified_devices==D) { // as much specified devices as domains
-			for(uint d=0; d<D; d++) device_infos[d] = select_device_with_id(to_uint(main_arguments[d]), devices); // use list of devices IDs specified by user
-		} else {
-			print_warning("Incorrect number of devices specified. Using single fastest device for all domains.");
-			for(uint d=0; d<D; d++) device_infos[d] = select_device_with_most_flops(devices);
-		}
-	} else { // device auto-selection
-		vector<vector<Device_Info>> device_type_ids; // a vector of all different devices, containing vectors of their device IDs
-		for(uint i=0u; i<(uint)devices.size(); i++) {
-			const string name_i = devices[i].name;
-			bool already_exists = false;
-			for(uint j=0u; j<(uint)device_type_ids.size(); j++) {
-				const string name_j = device_type_ids[j][0].name;
-				if(name_i==name_j) {
-					device_type_ids[j].push_back(devices[i]);
-					already_exists = true;
-				}
-			}
-			if(!already_exists) device_type_ids.push_back(vector<Device_Info>(1, devices[i]));
-		}
-		float best_value = -1.0f;
-		int best_j = -1;
-		for(uint j=0u; j<(uint)device_type_ids.size(); j++) {
-			const float value = device_type_ids[j][0].tflops;
-			if((uint)device_type_ids[j].size()>=D && value>best_value) {
-				best_value = value;
-				best_j = j;
-			}
-		}
-		if(best_j>=0) { // select all devices of fastest device type with at least D devices of the same type
-			for(uint d=0; d<D; d++) device_infos[d] = device_type_ids[best_j][d];
-		} else {
-			print_warning("Not enough devices of the same type available. Using single fastest device for all domains.");
-			for(uint d=0; d<D; d++) device_infos[d] = select_device_with_most_flops(devices);
-		}
-		//for(uint j=0u; j<(uint)device_type_ids.size(); j++) print_info("Device Type "+to_string(j)+" ("+device_type_ids[j][0].name+"): "+to_string((uint)device_type_ids[j].size())+"x");
-	}
-	return device_infos;
+	return select_devices(D, g_args["devicepolicy"].as<string>(), main_arguments); // device IDs from -d, otherwise --devicepolicy
 }
 
 LBM::LBM(const uint Nx, const uint Ny, const uint Nz, const float nu, const float fx, const float fy, const float fz, const float sigma, const float alpha, const float beta, const uint particles_N, const float particles_rho) // single device
@@ -756,6 +873,7 @@ LBM::LBM(const uint Nx, const uint Ny, const uint Nz, const uint Dx, const uint
 	this->Dx = Dx; this->Dy = Dy; this->Dz = Dz;
 	const uint D = Dx*Dy*Dz;
 	const uint Hx=Dx>1u, Hy=Dy>1u, Hz=Dz>1u; // halo offsets
+	if(g_features.profile||PROFILE_TRACE_PATH!="") kernel_profiler().enable(true); // before the domains create their command queues
 	const vector<Device_Info>& device_infos = smart_device_selection(D);
 	sanity_checks_constructor(device_infos, this->Nx, this->Ny, this->Nz, Dx, Dy, Dz, nu, fx, fy, fz, sigma, alpha, beta, particles_N, particles_rho);
 	lbm_domain = new LBM_Domain*[D];
@@ -763,6 +881,7 @@ LBM::LBM(const uint Nx, const uint Ny, const uint Nz, const uint Dx, const uint
 		const uint x=((uint)d%(Dx*Dy))%Dx, y=((uint)d%(Dx*Dy))/Dx, z=(uint)d/(Dx*Dy); // d = x+(y+z*Dy)*Dx
 		lbm_domain[d] = new LBM_Domain(device_infos[d], this->Nx/Dx+2u*Hx, this->Ny/Dy+2u*Hy, this->Nz/Dz+2u*Hz, Dx, Dy, Dz, (int)(x*this->Nx/Dx)-(int)Hx, (int)(y*this->Ny/Dy)-(int)Hy, (int)(z*this->Nz/Dz)-(int)Hz, nu, fx, fy, fz, sigma, alpha, beta, particles_N, particles_rho);
 	} // });
+	overlap_transfers = D>1u&&!g_features.surface&&!g_features.sync_halo&&(Dx==1u||this->Nx/Dx>=4u)&&(Dy==1u||this->Ny/Dy>=4u)&&(Dz==1u||this->Nz/Dz>=4u); // SURFACE needs several exchanges between its kernels; transfer layers on both sides must not overlap
 	{
 		Memory<float>** buffers_rho = new Memory<float>*[D];
 		for(uint d=0u; d<D; d++) buffers_rho[d] = &(lbm_domain[d]->rho);
@@ -777,7 +896,7 @@ LBM::LBM(const uint Nx, const uint Ny, const uint Nz, const uint Dx, const uint
 		flags = Memory_Container(this, buffers_flags, "flags");
 	} {
 //cnd #ifdef FORCE_FIELD
-		if(g_args["FORCE_FIELD"].as<bool>())  {
+		if(g_features.force_field)  {
 		Memory<float>** buffers_F = new Memory<float>*[D];
 		for(uint d=0u; d<D; d++) buffers_F[d] = &(lbm_domain[d]->F);
 		F = Memory_Container(this, buffers_F, "F");
@@ -785,7 +904,7 @@ LBM::LBM(const uint Nx, const uint Ny, const uint Nz, const uint Dx, const uint
 //cnd #endif // FORCE_FIELD
 	} {
 //cnd #ifdef SURFACE
-		if(g_args["SURFACE"].as<bool>()) {
+		if(g_features.surface) {
 		Memory<float>** buffers_phi = new Memory<float>*[D];
 		for(uint d=0u; d<D; d++) buffers_phi[d] = &(lbm_domain[d]->phi);
 		phi = Memory_Container(this, buffers_phi, "phi");
@@ -793,7 +912,7 @@ LBM::LBM(const uint Nx, const uint Ny, const uint Nz, const uint Dx, const uint
 //cnd #endif // SURFACE
 	} {
 //cnd #ifdef TEMPERATURE
-		if(g_args["TEMPERATURE"].as<bool>())  {
+		if(g_features.temperature)  {
 		Memory<float>** buffers_T = new Memory<float>*[D];
 		for(uint d=0u; d<D; d++) buffers_T[d] = &(lbm_domain[d]->T);
 		T = Memory_Container(this, buffers_T, "T");
@@ -801,7 +920,7 @@ LBM::LBM(const uint Nx, const uint Ny, const uint Nz, const uint Dx, const uint
 //cnd #endif // TEMPERATURE
 	} {
 //cnd #ifdef PARTICLES
-		if(g_args["PARTICLES"].as<bool>()) particles = &(lbm_domain[0]->particles);
+		if(g_features.particles) particles = &(lbm_domain[0]->particles);
 //cnd #endif // PARTICLES
 	}
 #ifdef GRAPHICS
@@ -810,7 +929,9 @@ LBM::LBM(const uint Nx, const uint Ny, const uint Nz, const uint Dx, const uint
 	info.initialize(this);
 }
 LBM::~LBM() {
+	delete snapshot_writer; // waits for queued snapshots, they read from the host buffers
 	info.print_finalize();
+	if(PROFILE_TRACE_PATH!=""&&kernel_profiler().is_enabled()) print_info("Wrote "+to_string(kernel_profiler().export_trace(PROFILE_TRACE_PATH))+" profiler events to \""+PROFILE_TRACE_PATH+"\".");
 	for(uint d=0u; d<get_D(); d++) delete lbm_domain[d];
 	delete[] lbm_domain;
 }
@@ -819,16 +940,21 @@ void LBM::sanity_checks_constructor(const vector<Device_Info>& device_infos, con
 	if((ulong)Nx*(ulong)Ny*(ulong)Nz==0ull) print_error("Grid point number is 0: "+to_string(Nx)+"x"+to_string(Ny)+"x"+to_string(Nz)+" = 0.");
 	if(Dx*Dy*Dz==0u) print_error("You specified 0 LBM grid domains ("+to_string(Dx)+"x"+to_string(Dy)+"x"+to_string(Dz)+"). There has to be at least 1 domain in every direction. Check your input in LBM constructor.");
 	const uint local_Nx=Nx/Dx+2u*(Dx>1u), local_Ny=Ny/Dy+2u*(Dy>1u), local_Nz=Nz/Dz+2u*(Dz>1u);
-	uint memory_available = max_uint; // in MB
-	for(Device_Info device_info : device_infos) memory_available = min(memory_available, device_info.memory);
-	uint memory_required = (uint)((ulong)Nx*(ulong)Ny*(ulong)Nz/((ulong)(Dx*Dy*Dz))*(ulong)bytes_per_cell_device()/1048576ull); // in MB
+	const Memory_Plan plan = plan_memory(Nx, Ny, Nz, Dx, Dy, Dz, particles_N);
+	uint memory_available = max_uint; // in MB per domain
+	for(Device_Info device_info : device_infos) {
+		uint domains = 0u; // domains sharing this device
+		for(Device_Info other : device_infos) domains += other.id==device_info.id;
+		memory_available = min(memory_available, device_info.memory/domains);
+	}
+	uint memory_required = plan.device_memory(); // in MB, including halo layers and transfer buffers
 	if(memory_required>memory_available) {
 		float factor = cbrt((float)memory_available/(float)memory_required);
 		const uint maxNx=(uint)(factor*(float)Nx), maxNy=(uint)(factor*(float)Ny), maxNz=(uint)(factor*(float)Nz);
 		string message = "Grid resolution ("+to_string(Nx)+", "+to_string(Ny)+", "+to_string(Nz)+") is too large: "+to_string(Dx*Dy*Dz)+"x "+to_string(memory_required)+" MB required, "+to_string(Dx*Dy*Dz)+"x "+to_string(memory_available)+" MB available. Largest possible resolution is ("+to_string(maxNx)+", "+to_string(maxNy)+", "+to_string(maxNz)+"). Restart the simulation with lower resolution or on different device(s) with more memory.";
 //cnd #if !defined(FP16S)&&!defined(FP16C)
-		if(!g_args["FP16S"].as<bool>() && !g_args["FP16C"].as<bool>()) {
-		uint memory_required_fp16 = (uint)((ulong)Nx*(ulong)Ny*(ulong)Nz/((ulong)(Dx*Dy*Dz))*(ulong)(bytes_per_cell_device()-velocity_set*2u)/1048576ull); // in MB
+		if(!g_features.fp16s && !g_features.fp16c) {
+		uint memory_required_fp16 = (uint)((plan.device_bytes-(ulong)local_Nx*(ulong)local_Ny*(ulong)local_Nz*(ulong)(velocity_set*2u))/1048576ull); // in MB
 		float factor_fp16 = cbrt((float)memory_available/(float)memory_required_fp16);
 		const uint maxNx_fp16=(uint)(factor_fp16*(float)Nx), maxNy_fp16=(uint)(factor_fp16*(float)Ny), maxNz_fp16=(uint)(factor_fp16*(float)Nz);
 		message += " Consider using FP16S/FP16C memory compression to double maximum grid resolution to a maximum of ("+to_string(maxNx_fp16)+", "+to_string(maxNy_fp16)+", "+to_string(maxNz_fp16)+"); for this, uncomment \"#define FP16S\" or \"#define FP16C\" in defines.hpp.";
@@ -836,14 +962,17 @@ void LBM::sanity_checks_constructor(const vector<Device_Info>& device_infos, con
 //cnd #endif // !FP16S&&!FP16C
 		print_error(message);
 	}
+	for(Device_Info device_info : device_infos) {
+		if(plan.max_buffer_bytes/1048576ull>(ulong)device_info.max_global_buffer&&!device_info.intel_gpu_above_4gb_patch) print_warning("The DDF buffer of "+to_string((uint)(plan.max_buffer_bytes/1048576ull))+" MB per domain is larger than the maximum buffer size of "+to_string(device_info.max_global_buffer)+" MB device \""+device_info.name+"\" reports. If allocation fails, use more domains or FP16S/FP16C memory compression.");
+	}
 	if(nu==0.0f) print_error("Viscosity cannot be 0. Change it in setup.cpp."); // sanity checks for viscosity
 	else if(nu<0.0f) print_error("Viscosity cannot be negative. Remove the \"-\" in setup.cpp.");
 //cnd #ifdef D2Q9
-	if(g_args["D2Q9"].as<bool>() && Nz!=1u) print_error("D2Q9 is the 2D velocity set. You have to set Nz=1u in the LBM constructor! Currently you have set Nz="+to_string(Nz)+"u.");
+	if(g_features.d2q9 && Nz!=1u) print_error("D2Q9 is the 2D velocity set. You have to set Nz=1u in the LBM constructor! Currently you have set Nz="+to_string(Nz)+"u.");
 //cnd #endif // D2Q9
 
-	if(!g_args["SRT"].as<bool>() && !g_args["TRT"].as<bool>()) print_error("No LBM collision operator selected. Uncomment either \"#define SRT\" or \"#define TRT\" in defines.hpp");
-	else if(g_args["SRT"].as<bool>() && g_args["TRT"].as<bool>()) print_error("Too many LBM collision operators selected. Comment out either \"#define SRT\" or \"#define TRT\" in defines.hpp");
+	if(!g_features.srt && !g_features.trt) print_error("No LBM collision operator selected. Uncomment either \"#define SRT\" or \"#define TRT\" in defines.hpp");
+	else if(g_features.srt && g_features.trt) print_error("Too many LBM collision operators selected. Comment out either \"#define SRT\" or \"#define TRT\" in defines.hpp");
 
 /*
 #if !defined(SRT)&&!defined(TRT)
@@ -854,43 +983,43 @@ void LBM::sanity_checks_constructor(const vector<Device_Info>& device_infos, con
 */
 
 //cnd #ifndef VOLUME_FORCE
-	if(!g_args["VOLUME_FORCE"].as<bool>()) {
+	if(!g_features.volume_force) {
 	  if(fx!=0.0f||fy!=0.0f||fz!=0.0f) print_error("Volume force is set in LBM constructor in main_setup(), but VOLUME_FORCE is not enabled. Uncomment \"#define VOLUME_FORCE\" in defines.hpp.");
 	} else {
 //cnd #else // VOLUME_FORCE
 //cnd #ifndef FORCE_FIELD
-	if(g_args["FORCE_FIELD"].as<bool>() && (fx==0.0f&&fy==0.0f&&fz==0.0f)) print_warning("The VOLUME_FORCE extension is enabled but the volume force in LBM constructor is set to zero. You may disable the extension by commenting out \"#define VOLUME_FORCE\" in defines.hpp.");
+	if(g_features.force_field && (fx==0.0f&&fy==0.0f&&fz==0.0f)) print_warning("The VOLUME_FORCE extension is enabled but the volume force in LBM constructor is set to zero. You may disable the extension by commenting out \"#define VOLUME_FORCE\" in defines.hpp.");
 //cnd #endif // FORCE_FIELD
 	}
 //cnd #endif // VOLUME_FORCE
 
 //cnd #ifndef SURFACE
-	if(!g_args["SURFACE"].as<bool>() && (sigma!=0.0f)) print_error("Surface tension is set in LBM constructor in main_setup(), but SURFACE is not enabled. Uncomment \"#define SURFACE\" in defines.hpp.");
+	if(!g_features.surface && (sigma!=0.0f)) print_error("Surface tension is set in LBM constructor in main_setup(), but SURFACE is not enabled. Uncomment \"#define SURFACE\" in defines.hpp.");
 //cnd #endif // SURFACE
 //cnd #ifndef TEMPERATURE
-	if(!g_args["TEMPERATURE"].as<bool>() && (alpha!=0.0f||beta!=0.0f)) print_error("Thermal diffusion/expansion coefficients are set in LBM constructor in main_setup(), but TEMPERATURE is not enabled. Uncomment \"#define TEMPERATURE\" in defines.hpp.");
+	if(!g_features.temperature && (alpha!=0.0f||beta!=0.0f)) print_error("Thermal diffusion/expansion coefficients are set in LBM constructor in main_setup(), but TEMPERATURE is not enabled. Uncomment \"#define TEMPERATURE\" in defines.hpp.");
 //cnd #else // TEMPERATURE
-	else if(g_args["TEMPERATURE"].as<bool>() && alpha==0.0f&&beta==0.0f) print_warning("The TEMPERATURE extension is enabled but the thermal diffusion/expansion coefficients alpha/beta in the LBM constructor are both set to zero. You may disable the extension by commenting out \"#define TEMPERATURE\" in defines.hpp.");
+	else if(g_features.temperature && alpha==0.0f&&beta==0.0f) print_warning("The TEMPERATURE extension is enabled but the thermal diffusion/expansion coefficients alpha/beta in the LBM constructor are both set to zero. You may disable the extension by commenting out \"#define TEMPERATURE\" in defines.hpp.");
 //cnd #endif // TEMPERATURE
 //cnd #ifdef PARTICLES
-	if(g_args["PARTICLES"].as<bool>()) {
+	if(g_features.particles) {
 	if(particles_N==0u) print_error("The PARTICLES extension is enabled but the number of particles is set to 0. Comment out \"#define PARTICLES\" in defines.hpp.");
 	if(get_D()>1u) print_error("The PARTICLES extension is not supported in multi-GPU mode.");
 
 	// cnd - logic from end of src/defines.hpp
-	if(g_args["SURFACE"].as<bool>() && !g_args["UPDATE_FIELDS"].as<bool>()) print_error("The SURFACE extension is enabled but the required UPDATE_FIELDS is not.");
-	if(g_args["PARTICLES"].as<bool>() && !g_args["UPDATE_FIELDS"].as<bool>()) print_error("The PARTICLES extension is enabled but the required UPDATE_FIELDS is not.");
-	if(g_args["GRAPHICS"].as<bool>() && !g_args["UPDATE_FIELDS"].as<bool>()) print_error("The GRAPHICS extension is enabled but the required UPDATE_FIELDS is not.");
-	if(g_args["TEMPERATURE"].as<bool>() && !g_args["VOLUME_FORCE"].as<bool>()) print_error("The TEMPERATURE extension is enabled but the required VOLUME_FORCE is not.");
+	if(g_features.surface && !g_features.update_fields) print_error("The SURFACE extension is enabled but the required UPDATE_FIELDS is not.");
+	if(g_features.particles && !g_features.update_fields) print_error("The PARTICLES extension is enabled but the required UPDATE_FIELDS is not.");
+	if(g_features.graphics && !g_features.update_fields) print_error("The GRAPHICS extension is enabled but the required UPDATE_FIELDS is not.");
+	if(g_features.temperature && !g_features.volume_force) print_error("The TEMPERATURE extension is enabled but the required VOLUME_FORCE is not.");
 
 //cnd #if !defined(VOLUME_FORCE)||!defined(FORCE_FIELD)
-	if((!g_args["VOLUME_FORCE"].as<bool>()) && (particles_rho!=1.0f)) print_error("Particle density is set unequal to 1, but particle-fluid 2-way-coupling is not enabled. Uncomment both \"#define VOLUME_FORCE\" and \"#define FORCE_FIELD\" in defines.hpp.");
+	if((!g_features.volume_force) && (particles_rho!=1.0f)) print_error("Particle density is set unequal to 1, but particle-fluid 2-way-coupling is not enabled. Uncomment both \"#define VOLUME_FORCE\" and \"#define FORCE_FIELD\" in defines.hpp.");
 //cnd #if !defined(FORCE_FIELD)
-	if(!g_args["FORCE_FIELD"].as<bool>() && (particles_rho!=1.0f)) print_error("Particle density is set unequal to 1, but particle-fluid 2-way-coupling is not enabled. Uncomment both \"#define VOLUME_FORCE\" and \"#define FORCE_FIELD\" in defines.hpp.");
+	if(!g_features.force_field && (particles_rho!=1.0f)) print_error("Particle density is set unequal to 1, but particle-fluid 2-way-coupling is not enabled. Uncomment both \"#define VOLUME_FORCE\" and \"#define FORCE_FIELD\" in defines.hpp.");
 //cnd #endif // !VOLUME_FORCE||!FORCE_FIELD
 
 //cnd #ifdef FORCE_FIELD
-	if(g_args["FORCE_FIELD"].as<bool>() && (particles_rho==1.0f)) print_warning("Particle density is set to 1, so particles behave as passive tracers without acting a force on the fluid, but particle-fluid 2-way-coupling is enabled. You may comment out \"#define FORCE_FIELD\" in defines.hpp.");
+	if(g_features.force_field && (particles_rho==1.0f)) print_warning("Particle density is set to 1, so particles behave as passive tracers without acting a force on the fluid, but particle-fluid 2-way-coupling is enabled. You may comment out \"#define FORCE_FIELD\" in defines.hpp.");
 //cnd #endif // FORCE_FIELD
 //cnd #else // PARTICLES
 	} else {
@@ -899,81 +1028,69 @@ void LBM::sanity_checks_constructor(const vector<Device_Info>& device_infos, con
 //cnd #endif // PARTICLES
 }
 
-void LBM::sanity_checks_initialization() { // sanity checks during initialization on used extensions based on used flags
-	uchar flags_used = 0u;
-	bool moving_boundaries_used=false, equilibrium_boundaries_used=false, surface_used=false, temperature_used=false; // identify used extensions based used flags
-	const uint threads = thread::hardware_concurrency();
-	vector<uchar> t_flags_used(threads, 0u);
-	vector<char> t_moving_boundaries_used(threads, false); // don't use vector<bool> as it uses bit-packing which is broken for multithreading
-	vector<char> t_equilibrium_boundaries_used(threads, false); // don't use vector<bool> as it uses bit-packing which is broken for multithreading
-	parallel_for(get_N(), threads, [&](ulong n, uint t) {
-		const uchar flagsn = flags[n];
-		const uchar flagsn_bo = flagsn&(TYPE_S|TYPE_E);
-		t_flags_used[t] = t_flags_used[t]|flagsn;
-		if(flagsn_bo&TYPE_S) t_moving_boundaries_used[t] = t_moving_boundaries_used[t] || (((flagsn_bo==TYPE_S)&&(u.x[n]!=0.0f||u.y[n]!=0.0f||u.z[n]!=0.0f))||(flagsn_bo==(TYPE_S|TYPE_E)));
-		t_equilibrium_boundaries_used[t] = t_equilibrium_boundaries_used[t] || flagsn_bo==TYPE_E;
-	});
-	for(uint t=0u; t<threads; t++) {
-		flags_used = flags_used|t_flags_used[t];
-		moving_boundaries_used = moving_boundaries_used || t_moving_boundaries_used[t];
-		equilibrium_boundaries_used = equilibrium_boundaries_used || t_equilibrium_boundaries_used[t];
-	}
-	surface_used = (bool)(flags_used&(TYPE_F|TYPE_I|TYPE_G));
-	temperature_used = (bool)(flags_used&TYPE_T);
+void LBM::sanity_checks_initialization() { // sanity checks during initialization on used extensions based on used flags, call after rho, u and flags are in device memory
+	uint used = 0u; // reduced on the device, with apply_region() the host buffers don't hold the flags
+	for(uint d=0u; d<get_D(); d++) used |= lbm_domain[d]->used_flags();
+	const uchar flags_used = (uchar)used;
+	const bool moving_boundaries_used=(bool)(used&0x100u), equilibrium_boundaries_used=(bool)(used&0x200u); // identify used extensions based used flags
+	const bool surface_used=(bool)(flags_used&(TYPE_F|TYPE_I|TYPE_G)), temperature_used=(bool)(flags_used&TYPE_T);
 //cnd #ifndef MOVING_BOUNDARIES
-	if(!g_args["MOVING_BOUNDARIES"].as<bool>() && moving_boundaries_used) print_warning("Some boundary cells have non-zero velocity, but MOVING_BOUNDARIES is not enabled. If you intend to use moving boundaries, uncomment \"#define MOVING_BOUNDARIES\" in defines.hpp.");
+	if(!g_features.moving_boundaries && moving_boundaries_used) print_warning("Some boundary cells have non-zero velocity, but MOVING_BOUNDARIES is not enabled. If you intend to use moving boundaries, uncomment \"#define MOVING_BOUNDARIES\" in defines.hpp.");
 //cnd #else // MOVING_BOUNDARIES
-	if(g_args["MOVING_BOUNDARIES"].as<bool>() && !moving_boundaries_used) print_warning("The MOVING_BOUNDARIES extension is enabled but no moving boundary cells (TYPE_S flag and velocity unequal to zero) are placed in the simulation box. You may disable the extension by commenting out \"#define MOVING_BOUNDARIES\" in defines.hpp.");
+	if(g_features.moving_boundaries && !moving_boundaries_used) print_warning("The MOVING_BOUNDARIES extension is enabled but no moving boundary cells (TYPE_S flag and velocity unequal to zero) are placed in the simulation box. You may disable the extension by commenting out \"#define MOVING_BOUNDARIES\" in defines.hpp.");
 //cnd #endif // MOVING_BOUNDARIES
 //cnd #ifndef EQUILIBRIUM_BOUNDARIES
-	if(!g_args["EQUILIBRIUM_BOUNDARIES"].as<bool>() && equilibrium_boundaries_used) print_error("Some cells are set as equilibrium boundaries with the TYPE_E flag, but EQUILIBRIUM_BOUNDARIES is not enabled. Uncomment \"#define EQUILIBRIUM_BOUNDARIES\" in defines.hpp.");
+	if(!g_features.equilibrium_boundaries && equilibrium_boundaries_used) print_error("Some cells are set as equilibrium boundaries with the TYPE_E flag, but EQUILIBRIUM_BOUNDARIES is not enabled. Uncomment \"#define EQUILIBRIUM_BOUNDARIES\" in defines.hpp.");
 //cnd #else // EQUILIBRIUM_BOUNDARIES
-	if(g_args["EQUILIBRIUM_BOUNDARIES"].as<bool>() && !equilibrium_boundaries_used) print_warning("The EQUILIBRIUM_BOUNDARIES extension is enabled but no equilibrium boundary cells (TYPE_E flag) are placed in the simulation box. You may disable the extension by commenting out \"#define EQUILIBRIUM_BOUNDARIES\" in defines.hpp.");
+	if(g_features.equilibrium_boundaries && !equilibrium_boundaries_used) print_warning("The EQUILIBRIUM_BOUNDARIES extension is enabled but no equilibrium boundary cells (TYPE_E flag) are placed in the simulation box. You may disable the extension by commenting out \"#define EQUILIBRIUM_BOUNDARIES\" in defines.hpp.");
 //cnd #endif // EQUILIBRIUM_BOUNDARIES
 //cnd #ifndef SURFACE
-	if(!g_args["SURFACE"].as<bool>() && surface_used) print_error("Some cells are set as fluid/interface/gas with the TYPE_F/TYPE_I/TYPE_G flags, but SURFACE is not enabled. Uncomment \"#define SURFACE\" in defines.hpp.");
+	if(!g_features.surface && surface_used) print_error("Some cells are set as fluid/interface/gas with the TYPE_F/TYPE_I/TYPE_G flags, but SURFACE is not enabled. Uncomment \"#define SURFACE\" in defines.hpp.");
 //cnd #else // SURFACE
-	if(g_args["SURFACE"].as<bool>() && !surface_used) print_error("The SURFACE extension is enabled but no fluid/interface/gas cells (TYPE_F/TYPE_I/TYPE_G flags) are placed in the simulation box. Disable the extension by commenting out \"#define SURFACE\" in defines.hpp.");
+	if(g_features.surface && !surface_used) print_error("The SURFACE extension is enabled but no fluid/interface/gas cells (TYPE_F/TYPE_I/TYPE_G flags) are placed in the simulation box. Disable the extension by commenting out \"#define SURFACE\" in defines.hpp.");
 //cnd #endif // SURFACE
 //cnd #ifndef TEMPERATURE
-	if(!g_args["TEMPERATURE"].as<bool>() && temperature_used) print_error("Some cells are set as temperature boundary with the TYPE_T flag, but TEMPERATURE is not enabled. Uncomment \"#define TEMPERATURE\" in defines.hpp.");
+	if(!g_features.temperature && temperature_used) print_error("Some cells are set as temperature boundary with the TYPE_T flag, but TEMPERATURE is not enabled. Uncomment \"#define TEMPERATURE\" in defines.hpp.");
 //cnd #endif // TEMPERATURE
 }
 
 void LBM::initialize() { // write all data fields to device and call kernel_initialize
+	if(setup_on_device()) { // with apply_region(), rho, u and flags are already in device memory, the host buffers only see them after read_from_device()
+		if(host_fields_changed()) print_error("rho, u or flags were changed on the host after apply_region() but not uploaded. Set host fields before the first apply_region(), or call write_to_device() on them.");
+	} else {
+		for(uint d=0u; d<get_D(); d++) lbm_domain[d]->rho.enqueue_write_to_device();
+		for(uint d=0u; d<get_D(); d++) lbm_domain[d]->u.enqueue_write_to_device();
+		for(uint d=0u; d<get_D(); d++) lbm_domain[d]->flags.enqueue_write_to_device();
+	}
 //cnd #ifndef BENCHMARK
-	if(!g_args["BENCHMARK"].as<bool>()) sanity_checks_initialization();
+	if(!g_features.benchmark) sanity_checks_initialization();
 //cnd #endif // BENCHMARK
-
-	for(uint d=0u; d<get_D(); d++) lbm_domain[d]->rho.enqueue_write_to_device();
-	for(uint d=0u; d<get_D(); d++) lbm_domain[d]->u.enqueue_write_to_device();
-	for(uint d=0u; d<get_D(); d++) lbm_domain[d]->flags.enqueue_write_to_device();
 //cnd #ifdef FORCE_FIELD
-	if(g_args["FORCE_FIELD"].as<bool>()) for(uint d=0u; d<get_D(); d++) lbm_domain[d]->F.enqueue_write_to_device();
+	if(g_features.force_field) for(uint d=0u; d<get_D(); d++) lbm_domain[d]->F.enqueue_write_to_device();
 //cnd #endif // FORCE_FIELD
 //cnd #ifdef SURFACE
-	if(g_args["SURFACE"].as<bool>()) for(uint d=0u; d<get_D(); d++) lbm_domain[d]->phi.enqueue_write_to_device();
+	if(g_features.surface) for(uint d=0u; d<get_D(); d++) lbm_domain[d]->phi.enqueue_write_to_device();
 //cnd #endif // SURFACE
 //cnd #ifdef TEMPERATURE
-	if(g_args["TEMPERATURE"].as<bool>()) for(uint d=0u; d<get_D(); d++) lbm_domain[d]->T.enqueue_write_to_device();
+	if(g_features.temperature) for(uint d=0u; d<get_D(); d++) lbm_domain[d]->T.enqueue_write_to_device();
 //cnd #endif // TEMPERATURE
 //cnd #ifdef PARTICLES
-	if(g_args["PARTICLES"].as<bool>()) for(uint d=0u; d<get_D(); d++) lbm_domain[d]->particles.enqueue_write_to_device();
+	if(g_features.particles) for(uint d=0u; d<get_D(); d++) lbm_domain[d]->particles.enqueue_write_to_device();
 //cnd #endif // PARTICLES
 
 	for(uint d=0u; d<get_D(); d++) lbm_domain[d]->increment_time_step(); // the communicate calls at initialization need an odd time step
 	communicate_rho_u_flags();
 //cnd #ifdef SURFACE
-	if(g_args["SURFACE"].as<bool>()) communicate_phi_massex_flags();
+	if(g_features.surface) communicate_phi_massex_flags();
 //cnd #endif // SURFACE
 	for(uint d=0u; d<get_D(); d++) lbm_domain[d]->enqueue_initialize(); // odd time step is baked-in the kernel
 	communicate_rho_u_flags();
 //cnd #ifdef SURFACE
-	if(g_args["SURFACE"].as<bool>()) communicate_phi_massex_flags();
+	if(g_features.surface) communicate_phi_massex_flags();
 //cnd #endif // SURFACE
 	communicate_fi(); // time step must be odd here
 //cnd #ifdef TEMPERATURE
-	if(g_args["TEMPERATURE"].as<bool>()) {
+	if(g_features.temperature) {
 	communicate_T(); // T halo data is required for field_slice rendering
 	communicate_gi(); // time step must be odd here
 	}
@@ -984,15 +1101,33 @@ void LBM::initialize() { // write all data fields to device and call kernel_init
 }
 
 void LBM::do_time_step() { // call kernel_stream_collide to perform one LBM time step
+	if(overlap_transfers) { // multi-device without SURFACE: stream_collide on the interior cells runs while the halos are exchanged in the transfer queues
+		for(uint d=0u; d<get_D(); d++) lbm_domain[d]->enqueue_stream_collide(1u); // transfer layers first, they hold all data the extract kernels read
+		for(uint d=0u; d<get_D(); d++) lbm_domain[d]->enqueue_transfer_begin(); // event after the transfer layers, not after the interior
+		for(uint d=0u; d<get_D(); d++) lbm_domain[d]->enqueue_stream_collide(2u); // interior cells don't touch the DDFs that are extracted or inserted
+//cnd #ifdef GRAPHICS
+		if(g_features.graphics) communicate_rho_u_flags(false); // u halo data is required for Q-criterion rendering
+//cnd #endif // GRAPHICS
+		communicate_fi(false);
+//cnd #ifdef TEMPERATURE
+		if(g_features.temperature) {
+#ifdef GRAPHICS
+		communicate_T(false); // T halo data is required for field_slice rendering
+#endif // GRAPHICS
+		communicate_gi(false);
+		}
+//cnd #endif // TEMPERATURE
+		for(uint d=0u; d<get_D(); d++) lbm_domain[d]->enqueue_transfer_end(); // next kernels wait for the new halo data
+	} else {
 //cnd #ifdef SURFACE
-	if(g_args["SURFACE"].as<bool>()) for(uint d=0u; d<get_D(); d++) lbm_domain[d]->enqueue_surface_0();
+	if(g_features.surface) for(uint d=0u; d<get_D(); d++) lbm_domain[d]->enqueue_surface_0();
 //cnd #endif // SURFACE
 	for(uint d=0u; d<get_D(); d++) lbm_domain[d]->enqueue_stream_collide(); // run LBM stream_collide kernel after domain communication
 //cnd #if defined(SURFACE) || defined(GRAPHICS)
-	if(g_args["SURFACE"].as<bool>() || g_args["GRAPHICS"].as<bool>()) communicate_rho_u_flags(); // rho/u/flags halo data is required for SURFACE extension, and u halo data is required for Q-criterion rendering
+	if(g_features.surface || g_features.graphics) communicate_rho_u_flags(); // rho/u/flags halo data is required for SURFACE extension, and u halo data is required for Q-criterion rendering
 //cnd #endif // SURFACE || GRAPHICS
 //cnd #ifdef SURFACE
-	if(g_args["SURFACE"].as<bool>()) {
+	if(g_features.surface) {
 	for(uint d=0u; d<get_D(); d++) lbm_domain[d]->enqueue_surface_1();
 	communicate_flags();
 	for(uint d=0u; d<get_D(); d++) lbm_domain[d]->enqueue_surface_2();
@@ -1003,18 +1138,18 @@ void LBM::do_time_step() { // call kernel_stream_collide to perform one LBM time
 //cnd #endif // SURFACE
 	communicate_fi();
 //cnd #ifdef TEMPERATURE
-	if(g_args["TEMPERATURE"].as<bool>()) {
+	if(g_features.temperature) {
 #ifdef GRAPHICS
 	communicate_T(); // T halo data is required for field_slice rendering
 #endif // GRAPHICS
 	communicate_gi();
 	}
 //cnd #endif // TEMPERATURE
+	}
 //cnd #ifdef PARTICLES
-	if(g_args["PARTICLES"].as<bool>()) for(uint d=0u; d<get_D(); d++) lbm_domain[d]->enqueue_integrate_particles(); // intgegrate particles forward in time and couple particles to fluid
+	if(g_features.particles) for(uint d=0u; d<get_D(); d++) lbm_domain[d]->enqueue_integrate_particles(); // intgegrate particles forward in time and couple particles to fluid
 //cnd #endif // PARTICLES
-	if(get_D()==1u) for(uint d=0u; d<get_D(); d++) lbm_domain[d]->finish_queue(); // this additional domain synchronization barrier is only required in single-GPU, as communication calls already provide all necessary synchronization barriers in multi-GPU
-	for(uint d=0u; d<get_D(); d++) lbm_domain[d]->increment_time_step();
+	for(uint d=0u; d<get_D(); d++) lbm_domain[d]->increment_time_step(); // single-GPU steps are not synchronized here, run() waits once per batch; communication calls already provide all necessary synchronization barriers in multi-GPU
 }
 
 void LBM::run(const ulong steps) { // initializes the LBM simulation (copies data to device and runs initialize kernel), then runs LBM
@@ -1024,16 +1159,22 @@ void LBM::run(const ulong steps) { // initializes the LBM simulation (copies dat
 		info.print_initialize(); // only print setup info if the setup is new (run() was not called before)
 	}
 	Clock clock;
-	for(ulong i=1ull; i<=steps; i++) {
+	for(ulong i=0ull; i<steps; ) {
 #if defined(INTERACTIVE_GRAPHICS)||defined(INTERACTIVE_GRAPHICS_ASCII)
 		while(!key_P&&running) sleep(0.016);
 		if(!running) break;
 #endif // INTERACTIVE_GRAPHICS_ASCII || INTERACTIVE_GRAPHICS
+		const ulong batch = min(steps-i, max((ulong)(0.01/info.runtime_lbm_timestep_smooth), 1ull)); // time steps are enqueued back to back and waited for once per batch of about 10 ms, which also keeps pausing and progress updates responsive
 		clock.start();
-		do_time_step();
-		info.update(clock.stop());
+		for(ulong j=0ull; j<batch; j++) do_time_step();
+		for(uint d=0u; d<get_D(); d++) lbm_domain[d]->finish_queue();
+		info.update(clock.stop(), batch);
+		i += batch;
 	}
-	if(get_D()>1u) for(uint d=0u; d<get_D(); d++) lbm_domain[d]->finish_queue(); // wait for everything to finish (multi-GPU only)
+}
+
+void LBM::finish_queue() { // wait until all queued work on all domains has finished
+	for(uint d=0u; d<get_D(); d++) lbm_domain[d]->finish_queue();
 }
 
 void LBM::update_fields() { // update fields (rho, u, T) manually
@@ -1043,6 +1184,37 @@ void LBM::update_fields() { // update fields (rho, u, T) manually
 
 void LBM::reset() { // reset simulation (takes effect in following run() call)
 	initialized = false;
+	if(setup_on_device()) { // there is no host copy to start from again, so set rho=1 and u=0 outside of solids and write the regions once more; other flags stay as they are on the device
+		const Region defaults = Region::box().set_density(1.0f).set_velocity(float3(0.0f)).except(TYPE_S);
+		for(uint d=0u; d<get_D(); d++) lbm_domain[d]->enqueue_apply_region(defaults);
+		for(const Region& region : regions) for(uint d=0u; d<get_D(); d++) lbm_domain[d]->enqueue_apply_region(region);
+		for(uint d=0u; d<get_D(); d++) lbm_domain[d]->finish_queue();
+		rho.mark_clean(); u.mark_clean(); flags.mark_clean(); // host edits from here on need write_to_device()
+	} else { // the device fields have moved on since initialize(), a following first apply_region() has to upload the host initial conditions again
+		rho.mark_dirty(); u.mark_dirty(); flags.mark_dirty();
+	}
+}
+void LBM::apply_region(const Region& region) { // set flags/rho/u in a region directly in device memory, without a host loop and without the host->device copy in initialize()
+	if(initialized) print_error("apply_region() sets initial and boundary conditions, call it before run() or after reset().");
+	if(!setup_on_device()) { // the first region: upload what was written on the host so far, initialize() won't upload it anymore; fields that weren't written still match device memory
+		if(rho.is_dirty()) for(uint d=0u; d<get_D(); d++) lbm_domain[d]->rho.enqueue_write_to_device();
+		if(u.is_dirty()) for(uint d=0u; d<get_D(); d++) lbm_domain[d]->u.enqueue_write_to_device();
+		if(flags.is_dirty()) for(uint d=0u; d<get_D(); d++) lbm_domain[d]->flags.enqueue_write_to_device();
+		rho.mark_clean(); u.mark_clean(); flags.mark_clean();
+	}
+	for(uint d=0u; d<get_D(); d++) lbm_domain[d]->enqueue_apply_region(region);
+	for(uint d=0u; d<get_D(); d++) lbm_domain[d]->finish_queue();
+	regions.push_back(region);
+}
+bool LBM::host_fields_changed() const {
+	return setup_on_device()&&!initialized&&(rho.is_dirty()||u.is_dirty()||flags.is_dirty());
+}
+void LBM::clear_geometry() { // remove all voxelized meshes and flags on the device, unlike unvoxelize_mesh_on_device() this also gives cells that turn solid later the initial rho/u again
+	if(!setup_on_device()) print_error("clear_geometry() needs a setup with apply_region(), set the host fields instead.");
+	initialized = false;
+	const Region cleared = Region::box().set(0u).set_density(1.0f).set_velocity(float3(0.0f));
+	for(uint d=0u; d<get_D(); d++) lbm_domain[d]->enqueue_apply_region(cleared);
+	for(uint d=0u; d<get_D(); d++) lbm_domain[d]->finish_queue();
 }
 
 //cnd #ifdef FORCE_FIELD
@@ -1101,8 +1273,81 @@ float3 LBM::calculate_torque_on_object(const float3& rotation_center, const ucha
 	for(uint t=0u; t<threads; t++) torque += torques[t];
 	return float3((float)torque.x, (float)torque.y, (float)torque.z);
 }
+Object_Forces LBM::calculate_object_forces(const float3& rotation_center, const uchar flag_marker) { // force, torque around rotation_center and center of mass of all cells flagged with flag_marker, reduced on the device
+	for(uint d=0u; d<get_D(); d++) lbm_domain[d]->enqueue_object_sums(flag_marker, rotation_center); // only the per-workgroup sums are copied, not F and flags
+	for(uint d=0u; d<get_D(); d++) lbm_domain[d]->finish_queue();
+	double sums[10] = { 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0 };
+	for(uint d=0u; d<get_D(); d++) {
+		const Memory<float>& partial = lbm_domain[d]->object_sums;
+		for(ulong i=0ull; i<partial.length(); i++) sums[i%10ull] += (double)partial[i];
+	}
+	Object_Forces result;
+	result.cells = (ulong)sums[0];
+	result.force = float3((float)sums[4], (float)sums[5], (float)sums[6]);
+	result.torque = float3((float)sums[7], (float)sums[8], (float)sums[9]);
+	result.center_of_mass = result.cells>0ull ? rotation_center+float3((float)(sums[1]/sums[0]), (float)(sums[2]/sums[0]), (float)(sums[3]/sums[0])) : rotation_center;
+	return result;
+}
+Object_Forces LBM::calculate_object_forces(const uchar flag_marker) { // force, torque around center of mass and center of mass of all cells flagged with flag_marker, reduced on the device
+	Object_Forces result = calculate_object_forces(center(), flag_marker); // single pass around the box center, then move the torque to the center of mass
+	result.torque -= cross(result.center_of_mass-center(), result.force);
+	return result;
+}
 //cnd #endif // FORCE_FIELD
 
+void Force_Monitor::start() { // open the log and clear the history
+	history.clear();
+	samples = 0ull;
+	converged = false;
+	if(log.is_open()) log.close();
+	if(log_file!="") {
+		create_folder(log_file);
+		log.open(log_file, std::ios::out);
+		if(!log.is_open()) print_warning("Can't write force monitor log \""+log_file+"\".");
+		log << "# t,time_s,Fx_N,Fy_N,Fz_N,Cs,Cd,Cl\n";
+	}
+}
+bool Force_Monitor::sample(LBM& lbm) { // compute forces on the device and log them, returns true once converged
+	lbm.calculate_force_on_boundaries();
+	const float3 force = lbm.calculate_object_forces(flag_marker).force;
+	t = lbm.get_t();
+	si_force = float3(units.si_F(force.x), units.si_F(force.y), units.si_F(force.z));
+	coefficients = si_force/(0.5f*si_rho*sq(si_u)*si_A);
+	history.push_back(coefficients);
+	samples++;
+	if(log.is_open()) {
+		log << to_string(t)+","+to_string(units.si_t(t), 6u)+","+to_string(si_force.x, 6u)+","+to_string(si_force.y, 6u)+","+to_string(si_force.z, 6u)+","+to_string(coefficients.x, 6u)+","+to_string(coefficients.y, 6u)+","+to_string(coefficients.z, 6u)+"\n";
+		log.flush(); // readable while the simulation is running
+	}
+	if(tolerance>0.0f&&(ulong)history.size()>=2ull*(ulong)window) { // compare the means of the last two windows
+		float3 previous(0.0f), current(0.0f);
+		for(ulong i=history.size()-2ull*(ulong)window; i<history.size()-(ulong)window; i++) previous += history[i];
+		for(ulong i=history.size()-(ulong)window; i<history.size(); i++) current += history[i];
+		previous /= (float)window;
+		current /= (float)window;
+		change = length(current-previous)/fmax(length(current), 1E-6f); // relative to the total coefficient, so a lift coefficient near 0 does not prevent convergence
+		converged = change<tolerance;
+	}
+	return converged;
+}
+
+Frame_Scheduler::Frame_Scheduler(const float fps, const float slomo, const bool realtime, const float si_dt) {
+	steps_per_frame = realtime||fps<=0.0f||slomo<=0.0f ? 1.0 : 1.0/((double)fps*(double)slomo*(double)si_dt); // one frame per 1/(fps*slomo) simulated seconds
+}
+ulong Frame_Scheduler::frame_step(const ulong frame) const {
+	return (ulong)ceil((double)frame*steps_per_frame-1E-9); // tolerance so a frame that falls exactly on a time step is not pushed to the next one by rounding
+}
+bool Frame_Scheduler::due(const ulong t) {
+	if(t<frame_step(frame)) return false;
+	frame = (ulong)((double)t/steps_per_frame)+1ull; // with less than one time step per frame, the frames in between can't be rendered and are skipped
+	while(frame_step(frame)<=t) frame++;
+	return true;
+}
+ulong Frame_Scheduler::steps_until_next(const ulong t) const {
+	const ulong next = frame_step(frame);
+	return next>t ? next-t : 1ull;
+}
+
 //cnd #ifdef MOVING_BOUNDARIES
 void LBM::update_moving_boundaries() { // mark/unmark cells next to TYPE_S cells with velocity!=0 with TYPE_MS
 	for(uint d=0u; d<get_D(); d++) lbm_domain[d]->enqueue_update_moving_boundaries();
@@ -1124,7 +1369,7 @@ void LBM::integrate_particles(const ulong steps, const uint time_step_multiplica
 		if(!running) break;
 #endif // INTERACTIVE_GRAPHICS_ASCII || INTERACTIVE_GRAPHICS
 		clock.start();
-		//cnd if(g_args["PARTICLES"].as<bool>() && !g_args["FORCE_FIELD"].as<bool>()) 
+		//cnd if(g_features.particles && !g_features.force_field) 
 		for(uint d=0u; d<get_D(); d++) lbm_domain[d]->enqueue_integrate_particles(time_step_multiplicator);
 		for(uint d=0u; d<get_D(); d++) lbm_domain[d]->finish_queue();
 		for(uint d=0u; d<get_D(); d++) lbm_domain[d]->increment_time_step(time_step_multiplicator);
@@ -1145,13 +1390,13 @@ void LBM::write_status(const string& path) { // write LBM status report to a .tx
 	status += "Relaxation Time = "+to_string(get_tau())+"\n";
 	status += "Maximum Reynolds Number = "+to_string(get_Re_max())+"\n";
 //cnd #ifdef VOLUME_FORCE
-	if(g_args["VOLUME_FORCE"].as<bool>()) status += "Volume Force = ("+to_string(get_fx())+", "+to_string(get_fy())+", "+to_string(get_fz())+")\n";
+	if(g_features.volume_force) status += "Volume Force = ("+to_string(get_fx())+", "+to_string(get_fy())+", "+to_string(get_fz())+")\n";
 //cnd #endif // VOLUME_FORCE
 //cnd #ifdef SURFACE
-	if(g_args["SURFACE"].as<bool>()) status += "Surface Tension Coefficient = "+to_string(get_sigma())+"\n";
+	if(g_features.surface) status += "Surface Tension Coefficient = "+to_string(get_sigma())+"\n";
 //cnd #endif // SURFACE
 //cnd #ifdef TEMPERATURE
-	if(g_args["TEMPERATURE"].as<bool>()) {
+	if(g_features.temperature) {
 	status += "Thermal Diffusion Coefficient = "+to_string(get_alpha())+"\n";
 	status += "Thermal Expansion Coefficient = "+to_string(get_beta())+"\n";
 	}
@@ -1159,6 +1404,192 @@ void LBM::write_status(const string& path) { // write LBM status report to a .tx
 	const string filename = default_filename(path, "status", ".txt", get_t());
 	write_file(filename, status);
 }
+string LBM::checkpoint_header(const ulong t) const { // grid, velocity set, DDF encoding, extensions and domain split, see write_checkpoint(...)
+	// layout (little endian): "FX3DCKPT", uint version, uint Nx, Ny, Nz, Dx, Dy, Dz, velocity set, DDF encoding (0: FP32, 1: FP16S, 2: FP16C), extensions (1: FORCE_FIELD, 2: SURFACE, 4: TEMPERATURE, 8: PARTICLES),
+	// particles, ulong t, float nu, fx, fy, fz, ulong state bytes per domain, then per domain: ulong state bytes, state (see LBM_Domain::for_each_state_buffer(...))
+	const uint version=1u, velocity_set=get_velocity_set(), encoding=g_features.fp16s ? 1u : g_features.fp16c ? 2u : 0u, particles_N=lbm_domain[0]->get_particles_N();
+	const uint extensions = (uint)g_features.force_field|(uint)g_features.surface<<1|(uint)g_features.temperature<<2|(uint)g_features.particles<<3;
+	const float nu=get_nu(), fx=get_fx(), fy=get_fy(), fz=get_fz();
+	const ulong state_bytes = lbm_domain[0]->get_state_bytes();
+	string header = "FX3DCKPT";
+	const auto append = [&](const void* value, const size_t bytes) { header.append((const char*)value, bytes); };
+	append(&version, 4u); append(&Nx, 4u); append(&Ny, 4u); append(&Nz, 4u); append(&Dx, 4u); append(&Dy, 4u); append(&Dz, 4u);
+	append(&velocity_set, 4u); append(&encoding, 4u); append(&extensions, 4u); append(&particles_N, 4u); append(&t, 8u);
+	append(&nu, 4u); append(&fx, 4u); append(&fy, 4u); append(&fz, 4u); append(&state_bytes, 8u);
+	return header;
+}
+void LBM::write_checkpoint(const string& path) { // queue a checkpoint (.fxc) of the full simulation state on the background writer, only the device->host copy blocks
+	if(!initialized) print_error("write_checkpoint() needs an initialized simulation, call run(0u) first.");
+	Snapshot_Writer* writer = get_snapshot_writer();
+	writer->wait_for(this); // at most one checkpoint in flight, so host memory use stays at one copy of the state
+	auto state = std::make_shared<vector<vector<uchar>>>(get_D()); // staging copy, the DDFs only exist in device memory
+	for(uint d=0u; d<get_D(); d++) {
+		(*state)[d].resize(lbm_domain[d]->get_state_bytes());
+		lbm_domain[d]->enqueue_read_state((*state)[d].data());
+	}
+	for(uint d=0u; d<get_D(); d++) lbm_domain[d]->finish_queue();
+	Snapshot_Writer::Job job;
+	job.filename = path!="" ? create_file_extension(path, ".fxc") : EXPORT_PATH+"checkpoint.fxc"; // no time step in the default name, so each checkpoint replaces the last one
+	job.header = checkpoint_header(get_t());
+	job.slabs = get_D(); // one record per domain
+	job.element_size = 1u;
+	job.compress = false; // DDFs hardly compress, and the writer should keep up with short checkpoint intervals
+	job.field = this;
+	job.encode = [state](const uint domain, vector<float>& parameters, vector<uchar>& data) {
+		parameters.clear();
+		data.swap((*state)[domain]); // hand over the staging buffer instead of copying it
+	};
+	writer->submit(std::move(job));
+}
+string LBM::read_checkpoint(const string& filename) { // restore the full simulation state instead of initialize(), returns an error message or "" on success
+	std::ifstream file(filename, std::ios::in|std::ios::binary);
+	if(file.fail()) return "Checkpoint \""+filename+"\" does not exist.";
+	const string expected = checkpoint_header(0ull);
+	string header(expected.length(), '\0');
+	file.read(&header[0], (std::streamsize)header.length());
+	if(file.fail()||header.substr(0u, 8u)!="FX3DCKPT") return "\""+filename+"\" is not a FluidX3D checkpoint.";
+	const auto field = [&](const uint offset) { uint value=0u; std::memcpy(&value, header.data()+offset, 4u); return value; };
+	const auto expected_field = [&](const uint offset) { uint value=0u; std::memcpy(&value, expected.data()+offset, 4u); return value; };
+	if(field(8u)!=expected_field(8u)) return "Checkpoint version "+to_string(field(8u))+" is not supported.";
+	if(header.substr(12u, 12u)!=expected.substr(12u, 12u)) return "Checkpoint grid is "+to_string(field(12u))+"x"+to_string(field(16u))+"x"+to_string(field(20u))+", simulation grid is "+to_string(Nx)+"x"+to_string(Ny)+"x"+to_string(Nz)+".";
+	if(header.substr(24u, 12u)!=expected.substr(24u, 12u)) return "Checkpoint domains are "+to_string(field(24u))+"x"+to_string(field(28u))+"x"+to_string(field(32u))+", simulation domains are "+to_string(Dx)+"x"+to_string(Dy)+"x"+to_string(Dz)+".";
+	if(field(36u)!=expected_field(36u)) return "Checkpoint velocity set is D"+to_string(field(36u)==9u?2u:3u)+"Q"+to_string(field(36u))+", simulation uses D"+to_string(get_velocity_set()==9u?2u:3u)+"Q"+to_string(get_velocity_set())+".";
+	const string encodings[3] = { "FP32", "FP16S", "FP16C" };
+	if(field(40u)!=expected_field(40u)) return "Checkpoint DDFs are stored as "+encodings[min(field(40u), 2u)]+", simulation uses "+encodings[expected_field(40u)]+".";
+	if(field(44u)!=expected_field(44u)||field(48u)!=expected_field(48u)) return "Checkpoint extensions (FORCE_FIELD, SURFACE, TEMPERATURE, PARTICLES) or particle count differ from the simulation.";
+	ulong t=0ull, state_bytes=0ull;
+	std::memcpy(&t, header.data()+52u, 8u);
+	std::memcpy(&state_bytes, header.data()+76u, 8u);
+	if(header.substr(60u, 16u)!=expected.substr(60u, 16u)) print_warning("Checkpoint viscosity or volume force differ from the simulation, continuing with the simulation values.");
+	vector<uchar> state;
+	for(uint d=0u; d<get_D(); d++) {
+		ulong bytes = 0ull;
+		file.read((char*)&bytes, 8u);
+		if(file.fail()||bytes!=state_bytes||bytes!=lbm_domain[d]->get_state_bytes()) return "Checkpoint \""+filename+"\" is truncated or corrupt.";
+		state.resize(bytes);
+		file.read((char*)state.data(), (std::streamsize)bytes);
+		if(file.fail()) return "Checkpoint \""+filename+"\" is truncated or corrupt.";
+		lbm_domain[d]->write_state(state.data());
+	}
+	for(uint d=0u; d<get_D(); d++) lbm_domain[d]->set_time_step(t);
+	initialized = true; // the DDFs are already there, so run() skips kernel_initialize
+	print_info("Resumed from checkpoint \""+filename+"\" at t = "+to_string(t)+".");
+	return "";
+}
+Snapshot_Writer* LBM::get_snapshot_writer() { // background writer of .fxs field snapshots
+	if(snapshot_writer==nullptr) snapshot_writer = new Snapshot_Writer();
+	return snapshot_writer;
+}
+void LBM::wait_for_snapshots(const void* field) { // wait until no queued snapshot reads from these host buffers anymore
+	if(snapshot_writer!=nullptr) snapshot_writer->wait_for(field);
+}
+void LBM::flush_snapshots() { // wait until all queued snapshots are written to disk
+	if(snapshot_writer!=nullptr) snapshot_writer->flush();
+}
+
+Snapshot_Writer::Snapshot_Writer() {
+	writer = thread(&Snapshot_Writer::worker, this);
+}
+Snapshot_Writer::~Snapshot_Writer() { // waits for all queued snapshots to be written
+	{
+		std::unique_lock<std::mutex> lock(mutex);
+		stop = true;
+	}
+	job_available.notify_all();
+	writer.join();
+}
+void Snapshot_Writer::worker() { // writer thread main loop
+	while(true) {
+		const Job* job = nullptr;
+		{
+			std::unique_lock<std::mutex> lock(mutex);
+			job_available.wait(lock, [&]{ return stop||!jobs.empty(); });
+			if(jobs.empty()) return; // only exit once all queued snapshots are written
+			job = &jobs.front(); // stays in the queue while it is written, so wait_for(...) sees it; deque references are stable under push_back
+		}
+		const bool written = write(*job);
+		{
+			std::unique_lock<std::mutex> lock(mutex);
+			jobs.pop_front();
+			if(written) snapshots_written++; else snapshots_failed++; // under the same lock, so the counts are final once flush() returns
+		}
+		job_done.notify_all();
+	}
+}
+bool Snapshot_Writer::write(const Job& job) { // stream one snapshot to disk, returns false if it could not be written
+	const auto t0 = std::chrono::steady_clock::now();
+	std::error_code error;
+	const std::filesystem::path folder = std::filesystem::path(job.filename).parent_path();
+	if(!folder.empty()) std::filesystem::create_directories(folder, error); // create_folder() would throw in the writer thread if a file is in the way
+	const string temporary = job.filename+".tmp"; // readers never see a half-written snapshot
+	std::ofstream file(temporary, std::ios::out|std::ios::binary);
+	if(file.fail()) {
+		print_warning("Can't write snapshot \""+job.filename+"\".");
+		return false;
+	}
+	file.write(job.header.data(), job.header.length());
+	const uint threads = min(max((uint)thread::hardware_concurrency(), 1u), max(job.slabs, 1u)); // slabs are encoded and compressed in parallel, then written in order
+	vector<vector<float>> parameters(threads);
+	vector<vector<uchar>> data(threads), shuffled(threads), compressed(threads);
+	vector<uint> compress_errors(threads, 0u); // lodepng error code per slab, 0 on success
+	for(uint first=0u; first<job.slabs; first+=threads) {
+		const uint n = min(threads, job.slabs-first);
+		parallel_for(n, n, [&](uint i) {
+			job.encode(first+i, parameters[i], data[i]);
+			if(job.compress) { // byte shuffle: deflate finds far more matches when the exponent bytes of neighboring values are next to each other
+				const ulong values = (ulong)data[i].size()/(ulong)job.element_size;
+				shuffled[i].resize(data[i].size());
+				for(ulong v=0ull; v<values; v++) for(uint b=0u; b<job.element_size; b++) shuffled[i][(ulong)b*values+v] = data[i][v*(ulong)job.element_size+(ulong)b];
+				compressed[i].clear();
+				compress_errors[i] = lodepng::compress(compressed[i], shuffled[i].data(), shuffled[i].size());
+			}
+		});
+		for(uint i=0u; i<n; i++) {
+			if(compress_errors[i]!=0u) { // a truncated payload would only show up when the snapshot is read
+				print_warning("Can't compress slab "+to_string(first+i)+" of snapshot \""+job.filename+"\": "+string(lodepng_error_text(compress_errors[i]))+".");
+				file.close();
+				std::filesystem::remove(temporary, error);
+				return false;
+			}
+			const vector<uchar>& payload = job.compress ? compressed[i] : data[i];
+			const ulong bytes = (ulong)payload.size();
+			file.write((const char*)&bytes, 8u);
+			file.write((const char*)parameters[i].data(), parameters[i].size()*sizeof(float));
+			file.write((const char*)payload.data(), bytes);
+			bytes_raw += (ulong)data[i].size();
+			bytes_written += 8ull+(ulong)(parameters[i].size()*sizeof(float))+bytes;
+		}
+	}
+	file.close();
+	if(!file.fail()) std::filesystem::rename(temporary, job.filename, error);
+	write_time_us += (ulong)std::chrono::duration_cast<std::chrono::microseconds>(std::chrono::steady_clock::now()-t0).count();
+	if(file.fail()||error) { // disk full or the target is not writable
+		print_warning("Can't write snapshot \""+job.filename+"\".");
+		std::filesystem::remove(temporary, error);
+		return false;
+	}
+	return true;
+}
+void Snapshot_Writer::submit(Job&& job) { // queue snapshot, returns right away
+	{
+		std::unique_lock<std::mutex> lock(mutex);
+		jobs.push_back(std::move(job));
+		snapshots_queued++;
+	}
+	job_available.notify_one();
+}
+void Snapshot_Writer::flush() { // wait until all queued snapshots are written
+	std::unique_lock<std::mutex> lock(mutex);
+	job_done.wait(lock, [&]{ return jobs.empty(); });
+}
+void Snapshot_Writer::wait_for(const void* field) { // wait until no queued snapshot reads from these host buffers anymore
+	std::unique_lock<std::mutex> lock(mutex);
+	job_done.wait(lock, [&]{ for(const Job& job : jobs) if(job.field==field) return false; return true; });
+}
+uint Snapshot_Writer::queued() { // number of snapshots currently waiting or being written
+	std::unique_lock<std::mutex> lock(mutex);
+	return (uint)jobs.size();
+}
 
 void LBM::voxelize_mesh_on_device(const Mesh* mesh, const uchar flag, const float3& rotation_center, const float3& linear_velocity, const float3& rotational_velocity) { // voxelize triangle mesh
 	if(get_D()==1u) {
@@ -1169,9 +1600,9 @@ void LBM::voxelize_mesh_on_device(const Mesh* mesh, const uchar flag, const floa
 		});
 	}
 //cnd #ifdef MOVING_BOUNDARIES
-	if(g_args["MOVING_BOUNDARIES"].as<bool>() && flag==TYPE_S&&(length(linear_velocity)>0.0f||length(rotational_velocity)>0.0f)) update_moving_boundaries();
+	if(g_features.moving_boundaries && flag==TYPE_S&&(length(linear_velocity)>0.0f||length(rotational_velocity)>0.0f)) update_moving_boundaries();
 //cnd #endif // MOVING_BOUNDARIES
-	if(!initialized) {
+	if(!initialized&&!setup_on_device()) {
 		flags.read_from_device();
 		u.read_from_device();
 	}
@@ -1218,10 +1649,52 @@ void LBM::write_mesh_to_vtk(const Mesh* mesh, const string& path, const bool con
 }
 void LBM::voxelize_stl(const string& path, const float3& center, const float3x3& rotation, const float size, const uchar flag) { // voxelize triangle mesh
 	const Mesh* mesh = read_stl(path, this->size(), center, rotation, size);
-	flags.write_to_device();
+	if(!setup_on_device()) flags.write_to_device();
 	voxelize_mesh_on_device(mesh, flag);
 	delete mesh;
-	flags.read_from_device();
+	if(!setup_on_device()) flags.read_from_device();
+}
+bool LBM::read_flags_cache(const string& filename) { // restore host flags from a mesh cache entry, returns false on a cache miss
+#ifndef UTILITIES_NO_CPP17
+	string data;
+	if(!read_cache_file(filename, data)||data.length()<16ull||data.compare(0, 8, "FX3DFLAG")!=0||(data.length()-16ull)%5ull!=0ull) return false;
+	ulong N = 0ull, n = 0ull;
+	memcpy(&N, data.data()+8, 8u);
+	if(N!=get_N()) return false;
+	for(ulong p=16ull; p<(ulong)data.length(); p+=5ull) { // check run lengths first, so a broken entry leaves flags untouched
+		uint run = 0u;
+		memcpy(&run, data.data()+p+1ull, 4u);
+		n += (ulong)run;
+	}
+	if(n!=N) return false;
+	n = 0ull;
+	for(ulong p=16ull; p<(ulong)data.length(); p+=5ull) { // (flag, run length) pairs
+		const uchar flag = (uchar)data[p];
+		uint run = 0u;
+		memcpy(&run, data.data()+p+1ull, 4u);
+		for(ulong i=n; i<n+(ulong)run; i++) flags[i] = flag;
+		n += (ulong)run;
+	}
+	return true;
+#else // UTILITIES_NO_CPP17
+	return false;
+#endif // UTILITIES_NO_CPP17
+}
+void LBM::write_flags_cache(const string& filename) { // store host flags run-length encoded in the mesh cache (--meshcache)
+#ifndef UTILITIES_NO_CPP17
+	const ulong N = get_N();
+	string data = "FX3DFLAG"+string((const char*)&N, 8u);
+	for(ulong n=0ull; n<N; ) {
+		const uchar flag = flags(n); // const access, reading doesn't make the host flags dirty
+		ulong end = n+1ull;
+		while(end<N&&flags(end)==flag&&end-n<(ulong)max_uint) end++;
+		const uint run = (uint)(end-n);
+		data += (char)flag;
+		data.append((const char*)&run, 4u);
+		n = end;
+	}
+	write_cache_file(filename, data, { ".mesh", ".flags" }, (ulong)MESH_CACHE_MB*1048576ull);
+#endif // UTILITIES_NO_CPP17
 }
 void LBM::voxelize_stl(const string& path, const float3x3& rotation, const float size, const uchar flag) { // read and voxelize binary .stl file (place in box center)
 	voxelize_stl(path, center(), rotation, size, flag);
@@ -1236,7 +1709,7 @@ void LBM::voxelize_stl(const string& path, const float size, const uchar flag) {
 #ifdef GRAPHICS
 int* LBM::Graphics::draw_frame() {
 //cnd #ifndef UPDATE_FIELDS
-	if(!g_args["UPDATE_FIELDS"].as<bool>() && (visualization_modes&(VIS_FIELD|VIS_STREAMLINES|VIS_Q_CRITERION))) {
+	if(!g_features.update_fields && (visualization_modes&(VIS_FIELD|VIS_STREAMLINES|VIS_Q_CRITERION))) {
 		for(uint d=0u; d<lbm->get_D(); d++) lbm->lbm_domain[d]->enqueue_update_fields(); // only call update_fields() if the time step has changed since the last rendered frame
 	}
 //cnd #endif // UPDATE_FIELDS
@@ -1252,7 +1725,7 @@ int* LBM::Graphics::draw_frame() {
 	}
 	if(key_Z) {
 //cnd #ifndef TEMPERATURE
-		if(!g_args["TEMPERATURE"].as<bool>()) {
+		if(!g_features.temperature) {
 		field_mode = (field_mode+1)%2; key_Z = false; // field_mode = { 0 (u), 1 (rho) }
 		} else {
 //cnd #else // TEMPERATURE
@@ -1319,8 +1792,12 @@ void LBM::Graphics::set_camera_free(const float3& p, const float rx, const float
 	camera.zoom = 1E16f;
 	camera.pos = p;
 }
-bool LBM::Graphics::next_frame(const ulong total_time_steps, const float video_length_seconds) { // returns true once simulation time has progressed enough to render the next video frame for a 60fps video of specified length
-	const uint new_frame = to_uint((float)lbm->get_t()/(float)total_time_steps*video_length_seconds*60.0f);
+uint LBM::Graphics::frame_at(const ulong t, const ulong total_time_steps, const float video_length_seconds) const { // video frame number of time step t
+	return to_uint((float)t/(float)total_time_steps*video_length_seconds*g_features.fps);
+}
+bool LBM::Graphics::next_frame(const ulong total_time_steps, const float video_length_seconds) { // returns true once simulation time has progressed enough to render the next video frame for a --fps video of specified length, or every time step with --realtime
+	if(g_features.realtime) return true;
+	const uint new_frame = frame_at(lbm->get_t(), total_time_steps, video_length_seconds);
 	if(new_frame!=last_exported_frame) {
 		last_exported_frame = new_frame;
 		return true;
@@ -1328,6 +1805,16 @@ bool LBM::Graphics::next_frame(const ulong total_time_steps, const float video_l
 		return false;
 	}
 }
+ulong LBM::Graphics::steps_to_next_frame(const ulong total_time_steps, const float video_length_seconds) const { // time steps until next_frame(...) returns true again, so they can run in one batch
+	const ulong t = lbm->get_t();
+	const uint frame = frame_at(t, total_time_steps, video_length_seconds);
+	const double frames_per_step = (double)video_length_seconds*(double)g_features.fps/(double)total_time_steps;
+	if(g_features.realtime||frames_per_step<=0.0) return 1ull;
+	ulong next = max((ulong)ceil((double)(frame+1u)/frames_per_step), t+1ull); // estimate, then correct it against the float math in frame_at(...)
+	while(next>t+1ull&&frame_at(next-1ull, total_time_steps, video_length_seconds)!=frame) next--;
+	while(frame_at(next, total_time_steps, video_length_seconds)==frame) next++;
+	return next-t;
+}
 void LBM::Graphics::print_frame() { // preview current frame in console
 #ifndef INTERACTIVE_GRAPHICS_ASCII
 	info.allow_rendering = false; // temporarily disable interactive rendering
@@ -1339,12 +1826,87 @@ void LBM::Graphics::print_frame() { // preview current frame in console
 	info.allow_rendering = true;
 #endif // INTERACTIVE_GRAPHICS_ASCII
 }
-void encode_image(Image* image, const string& filename, const string& extension, std::atomic_int* running_encoders) {
-	if(extension==".png") write_png(filename, image);
-	if(extension==".qoi") write_qoi(filename, image);
-	if(extension==".bmp") write_bmp(filename, image);
-	delete image; // delete image when done
-	(*running_encoders)--;
+Frame_Encoder::Frame_Encoder(const uint capacity, const uint threads, const bool drop_when_full) {
+	this->capacity = max(capacity, 1u);
+	this->drop_when_full = drop_when_full;
+	for(uint i=0u; i<clamp(threads, 1u, this->capacity); i++) workers.push_back(thread(&Frame_Encoder::worker, this));
+}
+Frame_Encoder::~Frame_Encoder() { // waits for all queued frames to be written
+	{
+		std::unique_lock<std::mutex> lock(mutex);
+		stop = true;
+	}
+	job_available.notify_all();
+	for(uint i=0u; i<(uint)workers.size(); i++) workers[i].join();
+	for(uint i=0u; i<(uint)free_images.size(); i++) delete free_images[i];
+}
+void Frame_Encoder::worker() { // encoder thread main loop
+	while(true) {
+		Job job;
+		{
+			std::unique_lock<std::mutex> lock(mutex);
+			job_available.wait(lock, [&]{ return stop||!jobs.empty(); });
+			if(jobs.empty()) return; // only exit once all queued frames are written
+			job = jobs.front();
+			jobs.pop_front();
+		}
+		if(job.extension==".png") write_png(job.filename, job.image); // the main bottleneck in rendering images to the hard disk is .png encoding, so encode images in the background
+		if(job.extension==".qoi") write_qoi(job.filename, job.image);
+		if(job.extension==".bmp") write_bmp(job.filename, job.image);
+		frames_written++;
+		release(job.image);
+	}
+}
+void Frame_Encoder::release(Image* image) { // return frame buffer to the pool
+	{
+		std::unique_lock<std::mutex> lock(mutex);
+		free_images.push_back(image);
+		in_flight--;
+	}
+	slot_available.notify_one();
+	all_done.notify_all();
+}
+Image* Frame_Encoder::acquire(const uint width, const uint height) { // get a frame buffer to fill, blocks while the queue is full, returns nullptr if the frame is dropped
+	Image* image = nullptr;
+	{
+		std::unique_lock<std::mutex> lock(mutex);
+		if(in_flight>=capacity) {
+			if(drop_when_full) {
+				frames_dropped++;
+				return nullptr;
+			}
+			const auto t0 = std::chrono::steady_clock::now();
+			slot_available.wait(lock, [&]{ return in_flight<capacity; }); // back-pressure: the simulation waits for the encoders
+			stall_time += std::chrono::duration<double>(std::chrono::steady_clock::now()-t0).count();
+		}
+		in_flight++;
+		max_in_flight = max(max_in_flight, in_flight);
+		if(!free_images.empty()) {
+			image = free_images.back();
+			free_images.pop_back();
+		}
+	}
+	if(image!=nullptr&&(image->width()!=width||image->height()!=height)) { // frame size changed, reallocate buffer
+		delete image;
+		image = nullptr;
+	}
+	return image!=nullptr ? image : new Image(width, height);
+}
+void Frame_Encoder::submit(Image* image, const string& filename, const string& extension) { // queue filled frame buffer from acquire(...) for encoding
+	{
+		std::unique_lock<std::mutex> lock(mutex);
+		jobs.push_back({ image, filename, extension });
+		frames_queued++;
+	}
+	job_available.notify_one();
+}
+void Frame_Encoder::flush() { // wait until all queued frames are written
+	std::unique_lock<std::mutex> lock(mutex);
+	all_done.wait(lock, [&]{ return in_flight==0u; });
+}
+uint Frame_Encoder::queued() { // number of frames currently waiting or being encoded
+	std::unique_lock<std::mutex> lock(mutex);
+	return in_flight;
 }
 void LBM::Graphics::write_frame(const string& path, const string& name, const string& extension, bool print_preview) { // save current frame as .png file (smallest file size, but slow)
 	write_frame(0u, 0u, camera.width, camera.height, path, name, extension, print_preview);
@@ -1355,8 +1917,13 @@ void LBM::Graphics::write_frame(const uint x1, const uint y1, const uint x2, con
 	const string filename = default_filename(path, name, extension, lbm->get_t());
 	const uint xa=max(min(x1, x2), 0u), xb=min(max(x1, x2), camera.width ); // sort coordinates if necessary
 	const uint ya=max(min(y1, y2), 0u), yb=min(max(y1, y2), camera.height);
-	Image* image = new Image(xb-xa, yb-ya); // create local copy of frame buffer
-	for(uint y=0u; y<image->height(); y++) for(uint x=0u; x<image->width(); x++) image->set_color(x, y, image_data[camera.width*(ya+y)+(xa+x)]);
+	if(encoder==nullptr) encoder = new Frame_Encoder((uint)max(g_args["framequeue"].as<int>(), 1), min(4u, max(std::thread::hardware_concurrency(), 1u)), g_args["dropframes"].as<bool>());
+	Image* image = encoder->acquire(xb-xa, yb-ya); // reuse a frame buffer, waits here if the encoders are behind
+	if(image==nullptr) { // encoder queue is full and --dropframes is set
+		info.allow_rendering = true;
+		return;
+	}
+	for(uint y=0u; y<image->height(); y++) std::copy(image_data+camera.width*(ya+y)+xa, image_data+camera.width*(ya+y)+xb, image->data()+image->width()*y); // copy frame buffer row by row
 #ifndef INTERACTIVE_GRAPHICS_ASCII
 	if(print_preview) {
 		println();
@@ -1366,11 +1933,12 @@ void LBM::Graphics::write_frame(const uint x1, const uint y1, const uint x2, con
 #else
 	print_info("Image \""+filename+"\" saved.");
 #endif // INTERACTIVE_GRAPHICS_ASCII
-	running_encoders++;
-	thread encoder(encode_image, image, filename, extension, &running_encoders); // the main bottleneck in rendering images to the hard disk is .png encoding, so encode image in new thread
-	encoder.detach(); // detatch thread so it can run concurrently
+	encoder->submit(image, filename, extension); // encoding and disk writes overlap with the next time steps
 	info.allow_rendering = true;
 }
+void LBM::Graphics::flush_frames() { // wait until all queued frames are written to disk
+	if(encoder!=nullptr) encoder->flush();
+}
 void LBM::Graphics::write_frame_png(const string& path, bool print_preview) { // save current frame as .png file (smallest file size, but slow)
 	write_frame(path, "image", ".png", print_preview);
 }
@@ -1409,19 +1977,24 @@ void LBM_Domain::allocate_transfer(Device& device) { // allocate all memory for
 	kernel_transfer[enum_transfer_field::flags           ][0] = Kernel(device, 0u, "transfer_extract_flags"           , 0u, t, transfer_buffer_p, transfer_buffer_m, flags);
 	kernel_transfer[enum_transfer_field::flags           ][1] = Kernel(device, 0u, "transfer__insert_flags"           , 0u, t, transfer_buffer_p, transfer_buffer_m, flags);
 //cnd #ifdef SURFACE
-	if(g_args["SURFACE"].as<bool>()) {
+	if(g_features.surface) {
 	kernel_transfer[enum_transfer_field::phi_massex_flags][0] = Kernel(device, 0u, "transfer_extract_phi_massex_flags", 0u, t, transfer_buffer_p, transfer_buffer_m, phi, massex, flags);
 	kernel_transfer[enum_transfer_field::phi_massex_flags][1] = Kernel(device, 0u, "transfer__insert_phi_massex_flags", 0u, t, transfer_buffer_p, transfer_buffer_m, phi, massex, flags);
 	}
 //cnd #endif // SURFACE
 //cnd #ifdef TEMPERATURE
-	if(g_args["TEMPERATURE"].as<bool>()) {
+	if(g_features.temperature) {
 	kernel_transfer[enum_transfer_field::gi              ][0] = Kernel(device, 0u, "transfer_extract_gi"              , 0u, t, transfer_buffer_p, transfer_buffer_m, gi);
 	kernel_transfer[enum_transfer_field::gi              ][1] = Kernel(device, 0u, "transfer__insert_gi"              , 0u, t, transfer_buffer_p, transfer_buffer_m, gi);
 	kernel_transfer[enum_transfer_field::T               ][0] = Kernel(device, 0u, "transfer_extract_T"               , 0u, t, transfer_buffer_p, transfer_buffer_m, T);
 	kernel_transfer[enum_transfer_field::T               ][1] = Kernel(device, 0u, "transfer__insert_T"               , 0u, t, transfer_buffer_p, transfer_buffer_m, T);
 	}
 //cnd #endif // TEMPERATURE
+	transfer_buffer_p.set_queue(device.get_cl_queue_transfer()); // halo exchange runs in its own queue, ordered against the compute queue with events, see LBM::communicate_field()
+	transfer_buffer_m.set_queue(device.get_cl_queue_transfer());
+	for(uint field=0u; field<(uint)enum_transfer_field::enum_transfer_field_length; field++) {
+		for(uint i=0u; i<2u; i++) if(kernel_transfer[field][i].get_number_of_parameters()>0u) kernel_transfer[field][i].set_queue(device.get_cl_queue_transfer());
+	}
 }
 
 ulong LBM_Domain::get_area(const uint direction) {
@@ -1440,10 +2013,11 @@ void LBM_Domain::enqueue_transfer_insert_field(Kernel& kernel_transfer_insert_fi
 	transfer_buffer_m.enqueue_write_to_device(0ull, kernel_transfer_insert_field.range()*(ulong)bytes_per_cell); // PCIe copy (-)
 	kernel_transfer_insert_field.set_parameters(0u, direction, get_t()).enqueue_run(); // selective in-VRAM copy
 }
-void LBM::communicate_field(const enum_transfer_field field, const uint bytes_per_cell) {
+void LBM::communicate_field(const enum_transfer_field field, const uint bytes_per_cell, const bool synchronize) { // synchronize=false: caller orders the exchange against the compute queue itself
+	if(synchronize) for(uint d=0u; d<get_D(); d++) lbm_domain[d]->enqueue_transfer_begin(); // extract after all kernels enqueued so far
 	if(Dx>1u) { // communicate in x-direction
 		for(uint d=0u; d<get_D(); d++) lbm_domain[d]->enqueue_transfer_extract_field(lbm_domain[d]->kernel_transfer[field][0], 0u, bytes_per_cell); // selective in-VRAM copy (x) + PCIe copy
-		for(uint d=0u; d<get_D(); d++) lbm_domain[d]->finish_queue(); // domain synchronization barrier
+		for(uint d=0u; d<get_D(); d++) lbm_domain[d]->finish_transfer_queue(); // domain synchronization barrier, compute queues keep running
 		for(uint d=0u; d<get_D(); d++) {
 			const uint x=(d%(Dx*Dy))%Dx, y=(d%(Dx*Dy))/Dx, z=d/(Dx*Dy), dxp=((x+1u)%Dx)+(y+z*Dy)*Dx; // d = x+(y+z*Dy)*Dx
 			lbm_domain[d]->transfer_buffer_p.exchange_host_buffer(lbm_domain[dxp]->transfer_buffer_m.exchange_host_buffer(lbm_domain[d]->transfer_buffer_p.data())); // CPU pointer swaps
@@ -1452,7 +2026,7 @@ void LBM::communicate_field(const enum_transfer_field field, const uint bytes_pe
 	}
 	if(Dy>1u) { // communicate in y-direction
 		for(uint d=0u; d<get_D(); d++) lbm_domain[d]->enqueue_transfer_extract_field(lbm_domain[d]->kernel_transfer[field][0], 1u, bytes_per_cell); // selective in-VRAM copy (y) + PCIe copy
-		for(uint d=0u; d<get_D(); d++) lbm_domain[d]->finish_queue(); // domain synchronization barrier
+		for(uint d=0u; d<get_D(); d++) lbm_domain[d]->finish_transfer_queue(); // domain synchronization barrier, compute queues keep running
 		for(uint d=0u; d<get_D(); d++) {
 			const uint x=(d%(Dx*Dy))%Dx, y=(d%(Dx*Dy))/Dx, z=d/(Dx*Dy), dyp=x+(((y+1u)%Dy)+z*Dy)*Dx; // d = x+(y+z*Dy)*Dx
 			lbm_domain[d]->transfer_buffer_p.exchange_host_buffer(lbm_domain[dyp]->transfer_buffer_m.exchange_host_buffer(lbm_domain[d]->transfer_buffer_p.data())); // CPU pointer swaps
@@ -1461,34 +2035,35 @@ void LBM::communicate_field(const enum_transfer_field field, const uint bytes_pe
 	}
 	if(Dz>1u) { // communicate in z-direction
 		for(uint d=0u; d<get_D(); d++) lbm_domain[d]->enqueue_transfer_extract_field(lbm_domain[d]->kernel_transfer[field][0], 2u, bytes_per_cell); // selective in-VRAM copy (z) + PCIe copy
-		for(uint d=0u; d<get_D(); d++) lbm_domain[d]->finish_queue(); // domain synchronization barrier
+		for(uint d=0u; d<get_D(); d++) lbm_domain[d]->finish_transfer_queue(); // domain synchronization barrier, compute queues keep running
 		for(uint d=0u; d<get_D(); d++) {
 			const uint x=(d%(Dx*Dy))%Dx, y=(d%(Dx*Dy))/Dx, z=d/(Dx*Dy), dzp=x+(y+((z+1u)%Dz)*Dy)*Dx; // d = x+(y+z*Dy)*Dx
 			lbm_domain[d]->transfer_buffer_p.exchange_host_buffer(lbm_domain[dzp]->transfer_buffer_m.exchange_host_buffer(lbm_domain[d]->transfer_buffer_p.data())); // CPU pointer swaps
 		}
 		for(uint d=0u; d<get_D(); d++) lbm_domain[d]-> enqueue_transfer_insert_field(lbm_domain[d]->kernel_transfer[field][1], 2u, bytes_per_cell); // PCIe copy + selective in-VRAM copy (z)
 	}
+	if(synchronize) for(uint d=0u; d<get_D(); d++) lbm_domain[d]->enqueue_transfer_end(); // kernels enqueued from now on see the new halo data
 }
 
-void LBM::communicate_fi() {
-	communicate_field(enum_transfer_field::fi, transfers*fpxxsize);
+void LBM::communicate_fi(const bool synchronize) {
+	communicate_field(enum_transfer_field::fi, transfers*fpxxsize, synchronize);
 }
-void LBM::communicate_rho_u_flags() {
-	communicate_field(enum_transfer_field::rho_u_flags, 17u);
+void LBM::communicate_rho_u_flags(const bool synchronize) {
+	communicate_field(enum_transfer_field::rho_u_flags, 17u, synchronize);
 }
-void LBM::communicate_flags() {
-	communicate_field(enum_transfer_field::flags, 1u);
+void LBM::communicate_flags(const bool synchronize) {
+	communicate_field(enum_transfer_field::flags, 1u, synchronize);
 }
 //cnd #ifdef SURFACE
-void LBM::communicate_phi_massex_flags() {
-	communicate_field(enum_transfer_field::phi_massex_flags, 9u);
+void LBM::communicate_phi_massex_flags(const bool synchronize) {
+	communicate_field(enum_transfer_field::phi_massex_flags, 9u, synchronize);
 }
 //cnd #endif // SURFACE
 //cnd #ifdef TEMPERATURE
-void LBM::communicate_gi() {
-	communicate_field(enum_transfer_field::gi, fpxxsize);
+void LBM::communicate_gi(const bool synchronize) {
+	communicate_field(enum_transfer_field::gi, fpxxsize, synchronize);
 }
-void LBM::communicate_T() {
-	communicate_field(enum_transfer_field::T, 4u);
+void LBM::communicate_T(const bool synchronize) {
+	communicate_field(enum_transfer_field::T, 4u, synchronize);
 }
 //cnd #endif // TEMPERATURE
@@ -9,8 +9,51 @@
 uint bytes_per_cell_host(); // returns the number of Bytes per cell allocated in host memory
 uint bytes_per_cell_device(); // returns the number of Bytes per cell allocated in device memory
 uint bandwidth_bytes_per_cell_device(); // returns the bandwidth in Bytes per cell per time step from/to device memory
+uint bandwidth_bytes_per_halo_cell(); // returns the number of Bytes per domain boundary cell copied from/to device memory in every time step
 uint3 resolution(const float3 box_aspect_ratio, const uint memory); // input: simulation box aspect ratio and VRAM occupation in MB, output: grid resolution
 
+struct Memory_Plan { // exact memory footprint of a grid split into Dx*Dy*Dz domains for the current extensions, known before anything is allocated
+	uint Nx=0u, Ny=0u, Nz=0u; // grid resolution, rounded down to be divisible by the domains like the LBM constructor does
+	uint Dx=1u, Dy=1u, Dz=1u; // domains in x, y and z
+	uint domain_Nx=0u, domain_Ny=0u, domain_Nz=0u; // cells per domain including halo layers
+	ulong device_bytes = 0ull; // allocated on every device: fields including halo layers, transfer buffers, particles
+	ulong host_bytes = 0ull; // allocated in host memory, all domains together
+	ulong max_buffer_bytes = 0ull; // largest single allocation, has to be within the device's maximum buffer size
+	ulong halo_bytes = 0ull; // copied between devices and host in every time step, all domains together
+	inline uint get_D() const { return Dx*Dy*Dz; }
+	inline ulong get_N() const { return (ulong)Nx*(ulong)Ny*(ulong)Nz; }
+	inline uint device_memory() const { return (uint)((device_bytes+1048575ull)/1048576ull); } // in MB, rounded up
+	inline uint host_memory() const { return (uint)((host_bytes+1048575ull)/1048576ull); } // in MB, rounded up
+	inline bool fits(const Device_Info& device_info, const uint domains=1u) const { return (ulong)domains*(ulong)device_memory()<=(ulong)device_info.memory; } // domains: how many domains share this device
+};
+Memory_Plan plan_memory(const uint Nx, const uint Ny, const uint Nz, const uint Dx, const uint Dy, const uint Dz, const uint particles_N=0u); // memory of this grid and domain split
+Memory_Plan plan_domains(const uint Nx, const uint Ny, const uint Nz, const uint D, const uint particles_N=0u); // domain split of D devices with the least halo traffic for this grid
+Memory_Plan plan_resolution(const float3 box_aspect_ratio, const uint memory, const uint D, const uint particles_N=0u); // largest grid with this aspect ratio and its domain split, such that every one of D devices uses at most memory MB
+
+struct Region { // initial/boundary condition on a part of the box, written by LBM::apply_region() directly in device memory; coordinates are lattice cells like in shapes.hpp
+	enum Shape : uint { BOX=0u, FACES=1u, SPHERE=2u, CUBOID=3u, CYLINDER=4u };
+	enum Face : uint { X0=0x01u, X1=0x02u, Y0=0x04u, Y1=0x08u, Z0=0x10u, Z1=0x20u, ALL_FACES=0x3Fu }; // outermost cell layers of the box
+	uint shape = BOX; // BOX is the whole simulation box
+	float3 p = float3(0.0f); // center (SPHERE, CUBOID, CYLINDER)
+	float3 l = float3(0.0f); // side lengths (CUBOID), axis with the length of the cylinder (CYLINDER)
+	float r = 0.0f; // radius (SPHERE, CYLINDER)
+	uint faces = 0u; // combination of Face bits (FACES)
+	bool set_flags=false, set_rho=false, set_u=false; // which fields the region writes
+	uchar flags = 0u; // TYPE_S, TYPE_E, ... replaces the flags of the cell
+	float rho = 1.0f;
+	float3 u = float3(0.0f);
+	uchar keep = 0u; // cells that have any of these flags are left untouched, for example TYPE_S to set a velocity everywhere except in solids
+	static inline Region box() { return Region(); }
+	static inline Region box_faces(const uint faces) { Region region; region.shape = FACES; region.faces = faces; return region; }
+	static inline Region sphere(const float3& p, const float r) { Region region; region.shape = SPHERE; region.p = p; region.r = r; return region; }
+	static inline Region cuboid(const float3& p, const float3& l) { Region region; region.shape = CUBOID; region.p = p; region.l = l; return region; }
+	static inline Region cylinder(const float3& p, const float3& n, const float r) { Region region; region.shape = CYLINDER; region.p = p; region.l = n; region.r = r; return region; }
+	inline Region& set(const uchar flags) { this->flags = flags; set_flags = true; return *this; }
+	inline Region& set_density(const float rho) { this->rho = rho; set_rho = true; return *this; }
+	inline Region& set_velocity(const float3& u) { this->u = u; set_u = true; return *this; }
+	inline Region& except(const uchar keep) { this->keep = keep; return *this; }
+};
+
 string default_filename(const string& path, const string& name, const string& extension, const ulong t); // generate a default filename with timestamp
 string default_filename(const string& name, const string& extension, const ulong t); // generate a default filename with timestamp at exe_path/export/
 
@@ -40,6 +83,7 @@ private:
 //cnd #ifdef FORCE_FIELD
 	Kernel kernel_calculate_force_on_boundaries; // calculate forces from fluid on TYPE_S cells
 	Kernel kernel_reset_force_field; // reset force field (also on TYPE_S cells)
+	Kernel kernel_object_sums; // per-workgroup sums of force, torque and position of flagged cells
 //cnd #endif // FORCE_FIELD
 //cnd #ifdef MOVING_BOUNDARIES
 	Kernel kernel_update_moving_boundaries; // mark/unmark cells next to TYPE_S cells with velocity!=0 with TYPE_MS
@@ -68,6 +112,7 @@ public:
 	Memory<uchar> flags; // flags of every cell
 //cnd #ifdef FORCE_FIELD
 	Memory<float> F; // individual force for every cell
+	Memory<float> object_sums; // 10 partial sums per workgroup of kernel_object_sums: count, position, force, torque
 //cnd #endif // FORCE_FIELD
 //cnd #ifdef SURFACE
 	Memory<float> phi; // fill level of every cell
@@ -89,7 +134,7 @@ public:
 	LBM_Domain(const Device_Info& device_info, const uint Nx, const uint Ny, const uint Nz, const uint Dx, const uint Dy, const uint Dz, const int Ox, const int Oy, const int Oz, const float nu, const float fx, const float fy, const float fz, const float sigma, const float alpha, const float beta, const uint particles_N, const float particles_rho); // compiles OpenCL C code and allocates memory
 
 	void enqueue_initialize(); // write all data fields to device and call kernel_initialize
-	void enqueue_stream_collide(); // call kernel_stream_collide to perform one LBM time step
+	void enqueue_stream_collide(const uint part=0u); // call kernel_stream_collide to perform one LBM time step, part: 0 = all cells, 1 = transfer layers next to the halo, 2 = remaining interior cells
 	void enqueue_update_fields(); // update fields (rho, u, T) manually
 //cnd #ifdef SURFACE
 	void enqueue_surface_0();
@@ -99,6 +144,7 @@ public:
 //cnd #endif // SURFACE
 //cnd #ifdef FORCE_FIELD
 	void enqueue_calculate_force_on_boundaries(); // calculate forces from fluid on TYPE_S cells
+	void enqueue_object_sums(const uchar flag_marker, const float3& reference); // reduce force, torque around reference and positions of cells flagged with flag_marker into object_sums, then read them to the host
 //cnd #endif // FORCE_FIELD
 //cnd #ifdef MOVING_BOUNDARIES
 	void enqueue_update_moving_boundaries(); // mark/unmark cells next to TYPE_S cells with velocity!=0 with TYPE_MS
@@ -109,7 +155,22 @@ public:
 
 	void increment_time_step(const uint steps=1u); // increment time step
 	void reset_time_step(); // reset time step
+	void set_time_step(const ulong t); // continue from time step t, for restoring a checkpoint
 	void finish_queue();
+	void enqueue_transfer_begin(); // transfer queue waits for all work enqueued in the compute queue so far
+	void enqueue_transfer_end(); // compute queue waits for all work enqueued in the transfer queue so far
+	void finish_transfer_queue();
+
+	template<typename Function> void for_each_state_buffer(Function&& function) { // DDFs and fields needed to continue the simulation, in checkpoint order
+		function(fi); function(rho); function(u); function(flags);
+		if(g_features.force_field) function(F);
+		if(g_features.surface) { function(phi); function(mass); function(massex); }
+		if(g_features.temperature) { function(gi); function(T); }
+		if(g_features.particles) function(particles);
+	}
+	ulong get_state_bytes(); // size of the checkpoint state of this domain in bytes, halos included
+	void enqueue_read_state(uchar* destination); // copy the checkpoint state from the device into destination
+	void write_state(const uchar* source); // copy the checkpoint state to the device, and to the host buffers where they exist
 
 	const Device& get_device() const { return device; }
 	uint get_Nx() const { return Nx; } // get (local) lattice dimensions in x-direction
@@ -128,8 +189,10 @@ public:
 	float get_sigma() const { return sigma; } // get surface tension coefficient
 	float get_alpha() const { return alpha; } // get thermal diffusion coefficient
 	float get_beta() const { return beta; } // get thermal expansion coefficient
+	uint get_particles_N() const { return particles_N; } // get number of particles
 	ulong get_t() const { return t; } // get discrete time step in LBM units
 	uint get_velocity_set() const; // get LBM velocity set
+	void set_nu(const float nu) { this->nu = nu; } // set kinematic shear viscosity, takes effect with the next time step
 	void set_fx(const float fx) { this->fx = fx; } // set global froce per volume
 	void set_fy(const float fy) { this->fy = fy; } // set global froce per volume
 	void set_fz(const float fz) { this->fz = fz; } // set global froce per volume
@@ -137,6 +200,8 @@ public:
 
 	void voxelize_mesh_on_device(const Mesh* mesh, const uchar flag=TYPE_S, const float3& rotation_center=float3(0.0f), const float3& linear_velocity=float3(0.0f), const float3& rotational_velocity=float3(0.0f)); // voxelize mesh
 	void enqueue_unvoxelize_mesh_on_device(const Mesh* mesh, const uchar flag=TYPE_S); // remove voxelized triangle mesh from LBM grid
+	void enqueue_apply_region(const Region& region); // write flags/rho/u of the cells in region directly in device memory
+	uint used_flags(); // OR of the flags of all cells, bit 8: moving boundaries, bit 9: equilibrium boundaries; reduced on the device
 
 #ifdef GRAPHICS
 	class Graphics {
@@ -175,13 +240,13 @@ public:
 		Graphics(LBM_Domain* lbm) {
 			this->lbm = lbm;
 //cnd #ifdef SURFACE
-			if(g_args["SURFACE"].as<bool>()) skybox_image = read_png(path_skybox);
+			if(g_features.surface) skybox_image = read_png(path_skybox);
 //cnd #endif // SURFACE
 		}
 		Graphics& operator=(const Graphics& graphics) { // copy assignment
 			lbm = graphics.lbm;
 //cnd #ifdef SURFACE
-			if(g_args["SURFACE"].as<bool>()) skybox_image = graphics.get_skybox_image();
+			if(g_features.surface) skybox_image = graphics.get_skybox_image();
 //cnd #endif // SURFACE
 			return *this;
 		}
@@ -197,31 +262,120 @@ public:
 
 
 
+#include <condition_variable>
+#include <deque>
+#include <mutex>
+#ifdef GRAPHICS
+class Frame_Encoder { // bounded background queue that encodes frames (.png/.qoi/.bmp) and writes them to disk while the simulation continues, frame buffers are reused
+private:
+	struct Job {
+		Image* image = nullptr;
+		string filename, extension;
+	};
+	std::mutex mutex;
+	std::condition_variable job_available, slot_available, all_done;
+	std::deque<Job> jobs; // frames waiting for an encoder thread
+	vector<Image*> free_images; // recycled frame buffers
+	vector<thread> workers;
+	uint capacity = 8u; // maximum number of frames waiting or being encoded
+	uint in_flight = 0u; // number of frames waiting or being encoded
+	bool drop_when_full = false; // drop frames instead of blocking the simulation when the queue is full
+	bool stop = false;
+	void worker(); // encoder thread main loop
+	void release(Image* image); // return frame buffer to the pool
+
+public:
+	ulong frames_queued=0ull, frames_dropped=0ull; // frame counters since construction, only changed by the simulation thread
+	std::atomic_ulong frames_written = 0ull; // changed by the encoder threads
+	uint max_in_flight = 0u; // highest queue occupancy seen
+	double stall_time = 0.0; // total time in seconds the simulation thread waited for a free slot (back-pressure)
+
+	Frame_Encoder(const uint capacity, const uint threads, const bool drop_when_full);
+	~Frame_Encoder(); // waits for all queued frames to be written
+	Image* acquire(const uint width, const uint height); // get a frame buffer to fill, blocks while the queue is full, returns nullptr if the frame is dropped
+	void submit(Image* image, const string& filename, const string& extension); // queue filled frame buffer from acquire(...) for encoding
+	void flush(); // wait until all queued frames are written
+	uint queued(); // number of frames currently waiting or being encoded
+};
+#endif // GRAPHICS
+
+class Snapshot_Writer { // background thread that streams field snapshots (.fxs) to disk in z-slabs, straight from the host buffers without a full-size staging copy, while the simulation continues
+public:
+	struct Job {
+		string filename; // final file name, written to filename+".tmp" first
+		string header; // file header, see Memory_Container::write_snapshot(...)
+		uint slabs = 0u; // number of z-slabs
+		uint element_size = 4u; // bytes per stored value, for byte shuffling before compression
+		bool compress = false; // deflate every slab
+		const void* field = nullptr; // host buffers the job reads from, see wait_for(...)
+		std::function<void(const uint slab, vector<float>& parameters, vector<uchar>& data)> encode; // fill quantization parameters and stored values of one slab
+	};
+
+private:
+	std::mutex mutex;
+	std::condition_variable job_available, job_done;
+	std::deque<Job> jobs; // snapshots waiting or being written, the front one is in progress
+	thread writer;
+	bool stop = false;
+	void worker(); // writer thread main loop
+	bool write(const Job& job); // stream one snapshot to disk, returns false if it could not be written
+
+public:
+	ulong snapshots_queued = 0ull; // only changed by the simulation thread
+	std::atomic_ulong snapshots_written=0ull, snapshots_failed=0ull, bytes_raw=0ull, bytes_written=0ull; // changed by the writer thread, bytes_raw counts stored values before compression
+	std::atomic_ulong write_time_us = 0ull; // total time in microseconds the writer thread spent on snapshots
+
+	Snapshot_Writer();
+	~Snapshot_Writer(); // waits for all queued snapshots to be written
+	void submit(Job&& job); // queue snapshot, returns right away
+	void flush(); // wait until all queued snapshots are written
+	void wait_for(const void* field); // wait until no queued snapshot reads from these host buffers anymore
+	uint queued(); // number of snapshots currently waiting or being written
+};
+
+struct Object_Forces { // result of LBM::calculate_object_forces()
+	float3 force; // total force on the object in LBM units
+	float3 torque; // total torque on the object in LBM units
+	float3 center_of_mass; // in lattice coordinates, same as calculate_object_center_of_mass()
+	ulong cells = 0ull; // number of cells flagged with flag_marker
+};
+
 class LBM {
 private:
 	uint Nx=1u, Ny=1u, Nz=1u; // (global) lattice dimensions
 	uint Dx=1u, Dy=1u, Dz=1u; // lattice domains
 	bool initialized = false; // becomes true after LBM::initialize() has been called
+	vector<Region> regions; // applied with apply_region(), while not empty the device holds rho, u and flags and initialize() doesn't upload them
+	Snapshot_Writer* snapshot_writer = nullptr; // created on first write_host_to_snapshot(...) or write_checkpoint(...) call
+	string checkpoint_header(const ulong t) const; // grid, velocity set, DDF encoding, extensions and domain split, see write_checkpoint(...)
 
 	void sanity_checks_constructor(const vector<Device_Info>& device_infos, const uint Nx, const uint Ny, const uint Nz, const uint Dx, const uint Dy, const uint Dz, const float nu, const float fx, const float fy, const float fz, const float sigma, const float alpha, const float beta, const uint particles_N, const float particles_rho); // sanity checks on grid resolution and extension support
 	void sanity_checks_initialization(); // sanity checks during initialization on used extensions based on used flags
 	void initialize(); // write all data fields to device and call kernel_initialize
 	void do_time_step(); // call kernel_stream_collide to perform one LBM time step
 
-	void communicate_field(const enum_transfer_field field, const uint bytes_per_cell);
+	bool overlap_transfers = false; // multi-device: exchange halos while stream_collide runs on the interior cells, see do_time_step()
+	void communicate_field(const enum_transfer_field field, const uint bytes_per_cell, const bool synchronize=true); // halo exchange in the transfer queues, synchronize=false leaves ordering against the compute queues to the caller
 
-	void communicate_fi();
-	void communicate_rho_u_flags();
-	void communicate_flags();
+	void communicate_fi(const bool synchronize=true);
+	void communicate_rho_u_flags(const bool synchronize=true);
+	void communicate_flags(const bool synchronize=true);
 //cnd #ifdef SURFACE
-	void communicate_phi_massex_flags();
+	void communicate_phi_massex_flags(const bool synchronize=true);
 //cnd #endif // SURFACE
 //cnd #ifdef TEMPERATURE
-	void communicate_gi();
-	void communicate_T();
+	void communicate_gi(const bool synchronize=true);
+	void communicate_T(const bool synchronize=true);
 //cnd #endif // TEMPERATURE
 
 public:
+	struct Cell { // cell handed out by parallel_for_cells(), converts to the global index n = x+(y+z*Ny)*Nx, and Memory_Container access with it skips the index decomposition for multiple domains
+		ulong n = 0ull; // global index
+		ulong local_n = 0ull; // index in the host buffers of its domain, halo offsets included
+		uint domain = 0u; // domain the cell is in
+		inline operator ulong() const { return n; }
+	};
+
 	template<typename T> class Memory_Container { // does not hold any data itsef, just links to LBM_Domain data
 	private:
 		ulong N = 0ull; // buffer length
@@ -229,6 +383,7 @@ public:
 		LBM* lbm = nullptr;
 		Memory<T>** buffers = nullptr; // host buffers
 		string name = "";
+		bool dirty = false; // the host buffers were written since they last matched device memory, see LBM::apply_region(); not atomic, so host loops can keep the check out of their inner loop
 
 		uint Nx=1u, Ny=1u, Nz=1u, Dx=1u, Dy=1u, Dz=1u, D=1u; // auxiliary variables: (local) lattice dimensions, lattice domains, number of domains
 		uint NxDx=1u, NyDy=1u, NzDz=1u, Hx=0u, Hy=0u, Hz=0u; // auxiliary variables: number of domains, shortcuts for N_/D_, halo offsets
@@ -248,7 +403,7 @@ public:
 			if(d>0x1u) y = Pointer(this, 0x1u);
 			if(d>0x2u) z = Pointer(this, 0x2u);
 		}
-		inline T& reference(const ulong i) { // stitch together domain buffers and make them appear as one single large buffer
+		inline T& reference(const ulong i) const { // stitch together domain buffers and make them appear as one single large buffer
 			if(D==1u) { // take shortcut for single domain
 				return buffers[0]->data()[i]; // array of structures
 			} else { // decompose index for multiple domains
@@ -260,7 +415,7 @@ public:
 				return buffers[domain]->data()[local_i+local_dimension*local_N]; // array of structures
 			}
 		}
-		inline T& reference(const ulong i, const uint dimension) { // stitch together domain buffers and make them appear as one single large buffer
+		inline T& reference(const ulong i, const uint dimension) const { // stitch together domain buffers and make them appear as one single large buffer
 			if(D==1u) { // take shortcut for single domain
 				return buffers[0]->data()[i+(ulong)dimension*N]; // array of structures
 			} else { // decompose index for multiple domains
@@ -272,13 +427,29 @@ public:
 				return buffers[domain]->data()[local_i+local_dimension*local_N]; // array of structures
 			}
 		}
-		inline string vtk_type() const {
-			/**/ if constexpr(std::is_same<T, char >::value) return "char" ; else if constexpr(std::is_same<T, uchar >::value) return "unsigned_char" ;
-			else if constexpr(std::is_same<T, short>::value) return "short"; else if constexpr(std::is_same<T, ushort>::value) return "unsigned_short";
-			else if constexpr(std::is_same<T, int  >::value) return "int"  ; else if constexpr(std::is_same<T, uint  >::value) return "unsigned_int"  ;
-			else if constexpr(std::is_same<T, slong>::value) return "long" ; else if constexpr(std::is_same<T, ulong >::value) return "unsigned_long" ;
-			else if constexpr(std::is_same<T, float>::value) return "float"; else if constexpr(std::is_same<T, double>::value) return "double"        ;
-			else print_error("Error in vtk_type(): Type not supported.");
+		inline T& reference(const Cell& cell, const uint dimension) const { // domain and local index are known already
+			return buffers[cell.domain]->data()[cell.local_n+(ulong)dimension*local_N];
+		}
+		inline void fill_box(const T value, const uint d0, const uint d1, const uint x0, const uint y0, const uint z0, const uint x1, const uint y1, const uint z1) { // set dimensions [d0, d1) in the box [x0, x1) x [y0, y1) x [z0, z1), one std::fill per row
+			lbm->wait_for_snapshots(buffers); // a queued snapshot may still be reading the host buffers
+			mark_dirty();
+			lbm->parallel_for_rows((uint)thread::hardware_concurrency(), [&](const Cell& cell, const uint cx, const uint cy, const uint cz, const uint length, const uint t) {
+				const uint a=max(cx, x0), b=min(cx+length, x1);
+				if(cy<y0||cy>=y1||cz<z0||cz>=z1||a>=b) return;
+				for(uint c=d0; c<d1; c++) {
+					T* row = buffers[cell.domain]->data()+cell.local_n+(ulong)c*local_N;
+					std::fill(row+(a-cx), row+(b-cx), value);
+				}
+			});
+		}
+		inline string vtk_type() const { return ::vtk_type<T>(); }
+		inline string snapshot_type() const { // NumPy dtype code of T
+			/**/ if constexpr(std::is_same<T, char >::value) return "i1"; else if constexpr(std::is_same<T, uchar >::value) return "u1";
+			else if constexpr(std::is_same<T, short>::value) return "i2"; else if constexpr(std::is_same<T, ushort>::value) return "u2";
+			else if constexpr(std::is_same<T, int  >::value) return "i4"; else if constexpr(std::is_same<T, uint  >::value) return "u4";
+			else if constexpr(std::is_same<T, slong>::value) return "i8"; else if constexpr(std::is_same<T, ulong >::value) return "u8";
+			else if constexpr(std::is_same<T, float>::value) return "f4"; else if constexpr(std::is_same<T, double>::value) return "f8";
+			else print_error("Error in snapshot_type(): Type not supported.");
 			return "";
 		}
 		inline void write_vtk(const string& path, const bool convert_to_si_units=true) { // write binary .vtk file
@@ -291,31 +462,72 @@ public:
 				if(name=="F"  ) unit_conversion_factor = (T)units.si_F  (1.0f);
 				if(name=="T"  ) unit_conversion_factor = (T)units.si_T  (1.0f);
 			}
-			const float3 origin = spacing*float3(0.5f-0.5f*(float)Nx, 0.5f-0.5f*(float)Ny, 0.5f-0.5f*(float)Nz);
-			const string header =
-				"# vtk DataFile Version 3.0\nData\nBINARY\nDATASET STRUCTURED_POINTS\n"
-				"DIMENSIONS "+to_string(Nx)+" "+to_string(Ny)+" "+to_string(Nz)+"\n"
-				"ORIGIN "+to_string(origin.x)+" "+to_string(origin.y)+" "+to_string(origin.z)+"\n"
-				"SPACING "+to_string(spacing)+" "+to_string(spacing)+" "+to_string(spacing)+"\n"
-				"POINT_DATA "+to_string((ulong)Nx*(ulong)Ny*(ulong)Nz)+"\nSCALARS data "+vtk_type()+" "+to_string(dimensions())+"\nLOOKUP_TABLE default\n"
-			;
-			T* data = new T[range()];
-			parallel_for(length(), [&](ulong i) {
-				for(uint d=0u; d<dimensions(); d++) {
-					data[i*(ulong)dimensions()+(ulong)d] = reverse_bytes((T)(unit_conversion_factor*reference(i, d))); // SoA <- AoS
-				}
-			});
 			const string filename = create_file_extension(path, ".vtk");
-			create_folder(filename);
-			std::ofstream file(filename, std::ios::out|std::ios::binary);
-			file.write(header.c_str(), header.length()); // write non-binary file header
-			file.write((char*)data, capacity()); // write binary data
-			file.close();
-			delete[] data;
+			::write_vtk<T>(filename, Nx, Ny, Nz, dimensions(), spacing, [&](const ulong i, const uint d) { return (T)(unit_conversion_factor*reference(i, d)); });
 			info.allow_rendering = false; // temporarily disable interactive rendering
 			print_info("File \""+filename+"\" saved.");
 			info.allow_rendering = true;
 		}
+		inline void write_snapshot(const string& path, const string& format, const bool compress, const bool convert_to_si_units) { // queue .fxs snapshot of the host buffers on the background writer
+			// file layout (little endian): "FX3DSNAP", uint version, uint Nx, Ny, Nz, dimensions, slab_z, char[4] stored type (NumPy dtype code), uint quantized, uint compressed,
+			// ulong t, float spacing, origin x, y, z, char[16] name, then per slab: ulong stored bytes, 2 floats (min, max) per dimension if quantized, stored values (dimensions, z, y, x)
+			const bool half = format=="float16", quantized = format=="uint16";
+			if(format!="raw"&&!half&&!quantized) print_error("Snapshot format \""+format+"\" is not supported, use raw, float16 or uint16.");
+			if((half||quantized)&&!std::is_same<T, float>::value) print_error("Snapshot format \""+format+"\" needs a float field, \""+name+"\" is stored raw.");
+			float spacing = 1.0f;
+			T unit_conversion_factor = (T)1;
+			if(convert_to_si_units) {
+				spacing = units.si_x(1.0f);
+				if(name=="rho") unit_conversion_factor = (T)units.si_rho(1.0f);
+				if(name=="u"  ) unit_conversion_factor = (T)units.si_u  (1.0f);
+				if(name=="F"  ) unit_conversion_factor = (T)units.si_F  (1.0f);
+				if(name=="T"  ) unit_conversion_factor = (T)units.si_T  (1.0f);
+			}
+			const float3 origin = spacing*float3(0.5f-0.5f*(float)Nx, 0.5f-0.5f*(float)Ny, 0.5f-0.5f*(float)Nz);
+			const uint element_size = half||quantized ? 2u : (uint)sizeof(T);
+			const uint slab_z = clamp((uint)(16ull*1048576ull/((ulong)NxNy*(ulong)d*(ulong)element_size)), 1u, Nz); // about 16 MB per slab
+			const string type = half ? "f2" : quantized ? "u2" : snapshot_type();
+			string header = "FX3DSNAP";
+			const auto append = [&](const void* value, const size_t bytes) { header.append((const char*)value, bytes); };
+			const uint version=1u, is_quantized=(uint)quantized, is_compressed=(uint)compress;
+			const ulong t = lbm->get_t();
+			char type_code[4] = { 0 }, name_code[16] = { 0 };
+			std::copy(type.begin(), type.end(), type_code);
+			std::copy(name.begin(), name.begin()+min(name.length(), (size_t)15u), name_code);
+			append(&version, 4u); append(&Nx, 4u); append(&Ny, 4u); append(&Nz, 4u); append(&d, 4u); append(&slab_z, 4u); append(type_code, 4u);
+			append(&is_quantized, 4u); append(&is_compressed, 4u); append(&t, 8u); append(&spacing, 4u); append(&origin.x, 4u); append(&origin.y, 4u); append(&origin.z, 4u); append(name_code, 16u);
+			Snapshot_Writer::Job job;
+			job.filename = create_file_extension(path, ".fxs");
+			job.header = header;
+			job.slabs = (Nz+slab_z-1u)/slab_z;
+			job.element_size = element_size;
+			job.compress = compress;
+			job.field = buffers;
+			job.encode = [this, slab_z, unit_conversion_factor, half, quantized](const uint slab, vector<float>& parameters, vector<uchar>& data) {
+				const uint z0 = slab*slab_z, nz = min(slab_z, Nz-z0);
+				const ulong cells = NxNy*(ulong)nz, offset = NxNy*(ulong)z0;
+				parameters.clear();
+				data.resize(cells*(ulong)d*(half||quantized ? 2ull : (ulong)sizeof(T)));
+				for(uint c=0u; c<d; c++) {
+					if(half) {
+						ushort* out = (ushort*)data.data()+(ulong)c*cells;
+						for(ulong i=0ull; i<cells; i++) out[i] = float_to_half((float)(unit_conversion_factor*reference(offset+i, c)));
+					} else if(quantized) { // 16-bit steps between the minimum and maximum of this dimension in this slab
+						float vmin=+max_float, vmax=-max_float;
+						for(ulong i=0ull; i<cells; i++) { const float v = (float)(unit_conversion_factor*reference(offset+i, c)); vmin = fmin(vmin, v); vmax = fmax(vmax, v); }
+						const float scale = vmax>vmin ? 65535.0f/(vmax-vmin) : 0.0f;
+						ushort* out = (ushort*)data.data()+(ulong)c*cells;
+						for(ulong i=0ull; i<cells; i++) out[i] = (ushort)(((float)(unit_conversion_factor*reference(offset+i, c))-vmin)*scale+0.5f);
+						parameters.push_back(vmin);
+						parameters.push_back(vmax);
+					} else {
+						T* out = (T*)data.data()+(ulong)c*cells;
+						for(ulong i=0ull; i<cells; i++) out[i] = (T)(unit_conversion_factor*reference(offset+i, c));
+					}
+				}
+			};
+			lbm->get_snapshot_writer()->submit(std::move(job));
+		}
 
 	public:
 		class Pointer {
@@ -328,8 +540,12 @@ public:
 				this->memory = memory;
 				this->dimension = dimension;
 			}
-			inline T& operator[](const ulong i) { return memory->reference(i, dimension); }
+			inline T& operator[](const ulong i) { memory->mark_dirty(); return memory->reference(i, dimension); }
 			inline const T& operator[](const ulong i) const { return memory->reference(i, dimension); }
+			inline T& operator[](const Cell& cell) { memory->mark_dirty(); return memory->reference(cell, dimension); }
+			inline const T& operator[](const Cell& cell) const { return memory->reference(cell, dimension); }
+			inline void fill(const T value) { memory->fill_box(value, dimension, dimension+1u, 0u, 0u, 0u, memory->Nx, memory->Ny, memory->Nz); } // set this dimension in every cell
+			inline void fill_box(const T value, const uint x0, const uint y0, const uint z0, const uint x1, const uint y1, const uint z1) { memory->fill_box(value, dimension, dimension+1u, x0, y0, z0, x1, y1, z1); } // set this dimension in the box [x0, x1) x [y0, y1) x [z0, z1)
 		};
 		Pointer x, y, z; // host buffer auxiliary pointers for multi-dimensional array access (array of structures)
 
@@ -350,31 +566,59 @@ public:
 			this->lbm = memory.lbm;
 			this->buffers = memory.buffers;
 			this->name = memory.name;
+			this->dirty = memory.dirty;
 			initialize_auxiliary_variables();
 			initialize_auxiliary_pointers();
 			return *this;
 		}
 		inline void reset(const T value=(T)0) {
+			lbm->wait_for_snapshots(buffers); // a queued snapshot may still be reading the host buffers
 			for(uint domain=0u; domain<D; domain++) buffers[domain]->reset(value);
+			mark_clean(); // Memory::reset() writes to the device too
 		}
 		inline const ulong length() const { return N; }
 		inline const uint dimensions() const { return d; }
 		inline const ulong range() const { return N*(ulong)d; }
 		inline const ulong capacity() const { return N*(ulong)d*sizeof(T); } // returns capacity of the buffer in Byte
-		inline T& operator[](const ulong i) { return reference(i); }
+		inline T& operator[](const ulong i) { mark_dirty(); return reference(i); }
 		inline const T& operator[](const ulong i) const { return reference(i); }
 		inline const T operator()(const ulong i) const { return reference(i); }
 		inline const T operator()(const ulong i, const uint dimension) const { return reference(i, dimension); } // array of structures
+		inline T& operator[](const Cell& cell) { mark_dirty(); return reference(cell, 0u); }
+		inline const T& operator[](const Cell& cell) const { return reference(cell, 0u); }
+		inline void fill(const T value) { fill_box(value, 0u, d, 0u, 0u, 0u, Nx, Ny, Nz); } // set all dimensions in every cell, halo layers are left as they are
+		inline void fill_box(const T value, const uint x0, const uint y0, const uint z0, const uint x1, const uint y1, const uint z1) { fill_box(value, 0u, d, x0, y0, z0, x1, y1, z1); } // set all dimensions in the box [x0, x1) x [y0, y1) x [z0, z1)
+		inline void gather(T* const destination) { // copy all domains without halo layers into one array (n = x+(y+z*Ny)*Nx, dimensions stacked), one copy per row
+			lbm->parallel_for_rows((uint)thread::hardware_concurrency(), [&](const Cell& cell, const uint cx, const uint cy, const uint cz, const uint length, const uint t) {
+				for(uint c=0u; c<d; c++) std::copy_n(buffers[cell.domain]->data()+cell.local_n+(ulong)c*local_N, length, destination+cell.n+(ulong)c*N);
+			});
+		}
+		inline void scatter(const T* const source) { // inverse of gather(), halo layers are left as they are
+			lbm->wait_for_snapshots(buffers); // a queued snapshot may still be reading the host buffers
+			mark_dirty();
+			lbm->parallel_for_rows((uint)thread::hardware_concurrency(), [&](const Cell& cell, const uint cx, const uint cy, const uint cz, const uint length, const uint t) {
+				for(uint c=0u; c<d; c++) std::copy_n(source+cell.n+(ulong)c*N, length, buffers[cell.domain]->data()+cell.local_n+(ulong)c*local_N);
+			});
+		}
+		inline T* data() { mark_dirty(); return D==1u ? buffers[0]->data() : nullptr; } // raw host buffer (n = x+(y+z*Ny)*Nx, dimensions stacked), only for a single domain as multiple domains have halos; counts as a write
+		inline const T* data() const { return D==1u ? buffers[0]->data() : nullptr; } // same buffer, for reading
+		inline bool is_dirty() const { return dirty; } // host buffers were written (non-const access, fill, scatter, data()) since they last matched device memory
+		inline void mark_dirty() { if(!dirty) dirty = true; } // check first, so parallel host loops don't keep writing the same cache line; every thread only ever writes true
+		inline void mark_clean() { dirty = false; } // host buffers match device memory again, not called during parallel host loops
 		inline void read_from_device() {
+			lbm->wait_for_snapshots(buffers); // a queued snapshot may still be reading the host buffers
 //cnd #ifndef UPDATE_FIELDS
-			if(!g_args["UPDATE_FIELDS"].as<bool>()) for(uint domain=0u; domain<D; domain++) lbm->lbm_domain[domain]->enqueue_update_fields(); // make sure data in device memory is up-to-date
+			if(!g_features.update_fields) for(uint domain=0u; domain<D; domain++) lbm->lbm_domain[domain]->enqueue_update_fields(); // make sure data in device memory is up-to-date
 //cnd #endif // UPDATE_FIELDS
 			for(uint domain=0u; domain<D; domain++) buffers[domain]->enqueue_read_from_device();
 			for(uint domain=0u; domain<D; domain++) buffers[domain]->finish_queue();
+			mark_clean();
 		}
 		inline void write_to_device() {
+			lbm->wait_for_snapshots(buffers); // keep host and device data of a queued snapshot consistent
 			for(uint domain=0u; domain<D; domain++) buffers[domain]->enqueue_write_to_device();
 			for(uint domain=0u; domain<D; domain++) buffers[domain]->finish_queue();
+			mark_clean();
 		}
 		inline void write_host_to_vtk(const string& path="", const bool convert_to_si_units=true) { // write binary .vtk file
 			write_vtk(default_filename(path, name, ".vtk", lbm->get_t()), convert_to_si_units);
@@ -383,6 +627,13 @@ public:
 			read_from_device();
 			write_host_to_vtk(path, convert_to_si_units);
 		}
+		inline void write_host_to_snapshot(const string& path="", const string& format="raw", const bool compress=true, const bool convert_to_si_units=true) { // write .fxs snapshot in the background, format: raw, float16 or uint16 (quantized per slab)
+			write_snapshot(default_filename(path, name, ".fxs", lbm->get_t()), format, compress, convert_to_si_units);
+		}
+		inline void write_device_to_snapshot(const string& path="", const string& format="raw", const bool compress=true, const bool convert_to_si_units=true) { // write .fxs snapshot in the background, only the device->host copy blocks
+			read_from_device();
+			write_host_to_snapshot(path, format, compress, convert_to_si_units);
+		}
 	};
 
 	LBM_Domain** lbm_domain; // one LBM domain per GPU
@@ -415,12 +666,20 @@ public:
 
 	void run(const ulong steps=max_ulong); // initializes the LBM simulation (copies data to device and runs initialize kernel), then runs LBM
 	void update_fields(); // update fields (rho, u, T) manually
+	void finish_queue(); // wait until all queued work on all domains has finished
 	void reset(); // reset simulation (takes effect in following run() call)
+	void apply_region(const Region& region); // set flags/rho/u in a region directly in device memory, without a host loop and without the host->device copy in initialize()
+	void clear_geometry(); // with apply_region() setups: set flags=0, rho=1 and u=0 in device memory like after allocation, so other meshes can be voxelized before reset() writes the regions again
+	bool is_initialized() const { return initialized; } // false until the first run() call and again after reset()
+	bool setup_on_device() const { return !regions.empty(); } // rho, u and flags were set on the device, the host buffers only see them after read_from_device()
+	bool host_fields_changed() const; // with apply_region() setups before run(): true if host rho, u or flags were written without write_to_device(), initialize() would not upload them
 //cnd #ifdef FORCE_FIELD
 	void calculate_force_on_boundaries(); // calculate forces from fluid on TYPE_S cells
 	float3 calculate_object_center_of_mass(const uchar flag_marker=TYPE_S); // calculate center of mass of all cells flagged with flag_marker
 	float3 calculate_force_on_object(const uchar flag_marker=TYPE_S); // add up force for all cells flagged with flag_marker
 	float3 calculate_torque_on_object(const float3& rotation_center, const uchar flag_marker=TYPE_S); // add up torque around specified rotation_center for all cells flagged with flag_marker
+	Object_Forces calculate_object_forces(const float3& rotation_center, const uchar flag_marker=TYPE_S); // force, torque around rotation_center and center of mass of all cells flagged with flag_marker, reduced on the device
+	Object_Forces calculate_object_forces(const uchar flag_marker=TYPE_S); // force, torque around center of mass and center of mass of all cells flagged with flag_marker, reduced on the device
 //cnd #endif // FORCE_FIELD
 //cnd #ifdef MOVING_BOUNDARIES
 	void update_moving_boundaries(); // mark/unmark cells next to TYPE_S cells with velocity!=0 with TYPE_MS
@@ -448,6 +707,7 @@ public:
 	float get_beta() const { return lbm_domain[0]->get_beta(); } // get thermal expansion coefficient
 	ulong get_t() const { return lbm_domain[0]->get_t(); } // get discrete time step in LBM units
 	uint get_velocity_set() const { return lbm_domain[0]->get_velocity_set(); }
+	void set_nu(const float nu) { for(uint d=0u; d<get_D(); d++) lbm_domain[d]->set_nu(nu); } // set kinematic shear viscosity, takes effect with the next time step
 	void set_fx(const float fx) { for(uint d=0u; d<get_D(); d++) lbm_domain[d]->set_fx(fx); } // set global froce per volume
 	void set_fy(const float fy) { for(uint d=0u; d<get_D(); d++) lbm_domain[d]->set_fy(fy); } // set global froce per volume
 	void set_fz(const float fz) { for(uint d=0u; d<get_D(); d++) lbm_domain[d]->set_fz(fz); } // set global froce per volume
@@ -468,6 +728,27 @@ public:
 	ulong index(const uint x, const uint y, const uint z) const { // turn 3D coordinates into 1D linear index
 		return (ulong)x+((ulong)y+(ulong)z*(ulong)Ny)*(ulong)Nx;
 	}
+	template<typename Function> void parallel_for_rows(const uint threads, Function&& function) const { // usage: lbm.parallel_for_rows(threads, [&](const LBM::Cell& n, uint x, uint y, uint z, uint length, uint t) { ... }); one call per row of length cells along x within one domain, n is its first cell
+		const uint NxDx=Nx/Dx, NyDy=Ny/Dy, NzDz=Nz/Dz, Hx=Dx>1u, Hy=Dy>1u, Hz=Dz>1u; // domain size without halo layers, halo offsets
+		const ulong local_Nx=(ulong)(NxDx+2u*Hx), local_Ny=(ulong)(NyDy+2u*Hy); // domain size with halo layers
+		parallel_for((ulong)get_D()*(ulong)NyDy*(ulong)NzDz, threads, [&](ulong row, uint t) { // rows of each domain are contiguous, so each thread mostly stays in one domain buffer
+			const uint domain=(uint)(row/((ulong)NyDy*(ulong)NzDz)), py=(uint)(row%(ulong)NyDy), pz=(uint)((row/(ulong)NyDy)%(ulong)NzDz); // domain and position within it
+			const uint x=(domain%Dx)*NxDx, y=((domain/Dx)%Dy)*NyDy+py, z=(domain/(Dx*Dy))*NzDz+pz; // domain = dx+(dy+dz*Dy)*Dx
+			Cell cell;
+			cell.n = index(x, y, z);
+			cell.local_n = (ulong)Hx+((ulong)(py+Hy)+(ulong)(pz+Hz)*local_Ny)*local_Nx; // add halo offsets
+			cell.domain = domain;
+			function((const Cell&)cell, x, y, z, NxDx, t);
+		});
+	}
+	template<typename Function> void parallel_for_cells(const uint threads, Function&& function) const { // usage: lbm.parallel_for_cells(threads, [&](const LBM::Cell& n, uint x, uint y, uint z, uint t) { lbm.flags[n] = ...; }); like parallel_for(lbm.get_N(), threads, ...), but x, y, z come for free and field access with n is a plain array access
+		parallel_for_rows(threads, [&](Cell cell, const uint x, const uint y, const uint z, const uint length, const uint t) {
+			for(uint i=0u; i<length; i++, cell.n++, cell.local_n++) function((const Cell&)cell, x+i, y, z, t);
+		});
+	}
+	template<typename Function> void parallel_for_cells(Function&& function) const { // usage: lbm.parallel_for_cells([&](const LBM::Cell& n, uint x, uint y, uint z) { ... }); on all parallel_for(...) threads
+		parallel_for_cells(get_parallel_threads(), [&](const Cell& cell, const uint x, const uint y, const uint z, const uint t) { function(cell, x, y, z); });
+	}
 	ulong index(const float3& p) const { // turn 3D position into closest 1D linear index
 		uint x=0u, y=0u, z=0u;
 		coordinates(p, x, y, z);
@@ -509,6 +790,11 @@ public:
 		return relative_position(x, y, z);
 	}
 	void write_status(const string& path=""); // write LBM status report to a .txt file
+	void write_checkpoint(const string& path=""); // queue a checkpoint (.fxc) of the full simulation state on the background writer, only the device->host copy blocks
+	string read_checkpoint(const string& filename); // restore the full simulation state instead of initialize(), returns an error message or "" on success
+	Snapshot_Writer* get_snapshot_writer(); // background writer of .fxs field snapshots
+	void wait_for_snapshots(const void* field); // wait until no queued snapshot reads from these host buffers anymore
+	void flush_snapshots(); // wait until all queued snapshots are written to disk
 
 	void voxelize_mesh_on_device(const Mesh* mesh, const uchar flag=TYPE_S, const float3& rotation_center=float3(0.0f), const float3& linear_velocity=float3(0.0f), const float3& rotational_velocity=float3(0.0f)); // voxelize mesh
 	void unvoxelize_mesh_on_device(const Mesh* mesh, const uchar flag=TYPE_S); // remove voxelized triangle mesh from LBM grid
@@ -517,18 +803,20 @@ public:
 	void voxelize_stl(const string& path, const float3x3& rotation, const float size=0.0f, const uchar flag=TYPE_S); // read and voxelize binary .stl file (place in box center)
 	void voxelize_stl(const string& path, const float3& center, const float size=0.0f, const uchar flag=TYPE_S); // read and voxelize binary .stl file (no rotation)
 	void voxelize_stl(const string& path, const float size=0.0f, const uchar flag=TYPE_S); // read and voxelize binary .stl file (place in box center, no rotation)
+	bool read_flags_cache(const string& filename); // restore host flags from a mesh cache entry, returns false on a cache miss
+	void write_flags_cache(const string& filename); // store host flags run-length encoded in the mesh cache (--meshcache)
 
 #ifdef GRAPHICS
 	class Graphics {
 	private:
 		LBM* lbm = nullptr;
-		std::atomic_int running_encoders = 0;
+		Frame_Encoder* encoder = nullptr; // created on first write_frame(...) call
 		uint last_exported_frame = 0u; // for next_frame(...) function
 		int last_visualization_modes=0, last_field_mode=0, last_slice_mode=0, last_slice_x=0, last_slice_y=0, last_slice_z=0; // don't render a new frame if the scene hasn't changed since last frame
 		void default_settings() {
 			visualization_modes |= VIS_FLAG_LATTICE;
 //cnd #ifdef PARTICLES
-			if(g_args["PARTICLES"].as<bool>()) visualization_modes |= VIS_PARTICLES;
+			if(g_features.particles) visualization_modes |= VIS_PARTICLES;
 //cnd #endif // PARTICLES
 		}
 
@@ -545,14 +833,12 @@ public:
 			default_settings();
 		}
 		~Graphics() { // destructor must wait for all encoder threads to finish
-			int last_value = running_encoders.load();
-			while(last_value>0) {
-				const int current_value = running_encoders.load();
-				if(last_value!=current_value) {
-					print_info("Finishing encoder threads: "+to_string(current_value));
-					last_value = current_value;
-				}
-				sleep(0.016);
+			if(encoder!=nullptr) {
+				const uint remaining = encoder->queued();
+				if(remaining>0u) print_info("Finishing encoder threads: "+to_string(remaining)+" frames left");
+				encoder->flush();
+				print_info("Frames written: "+to_string(encoder->frames_written.load())+", dropped: "+to_string(encoder->frames_dropped)+", max queued: "+to_string(encoder->max_in_flight)+", simulation waited "+to_string(encoder->stall_time, 3u)+"s for encoders");
+				delete encoder;
 			}
 		}
 		Graphics& operator=(const Graphics& graphics) { // copy assignment
@@ -570,7 +856,9 @@ public:
 
 		void set_camera_centered(const float rx=0.0f, const float ry=0.0f, const float fov=100.0f, const float zoom=1.0f); // set camera centered
 		void set_camera_free(const float3& p=float3(0.0f), const float rx=0.0f, const float ry=0.0f, const float fov=100.0f); // set camera free
-		bool next_frame(const ulong total_time_steps, const float video_length_seconds); // returns true once simulation time has progressed enough to render the next video frame for a 60fps video of specified length
+		uint frame_at(const ulong t, const ulong total_time_steps, const float video_length_seconds) const; // video frame number of time step t
+		bool next_frame(const ulong total_time_steps, const float video_length_seconds); // returns true once simulation time has progressed enough to render the next video frame for a --fps video of specified length
+		ulong steps_to_next_frame(const ulong total_time_steps, const float video_length_seconds) const; // time steps until next_frame(...) returns true again, for lbm.run(k) in one batch
 		void print_frame(); // preview preview of current frame in console
 		void write_frame(const string& path="", const string& name="image", const string& extension=".png", bool print_preview=false); // save current frame
 		void write_frame(const uint x1, const uint y1, const uint x2, const uint y2, const string& path="", const string& name="image", const string& extension=".png", bool print_preview=false); // save current frame cropped with two corner points (x1,y1) and (x2,y2)
@@ -580,7 +868,46 @@ public:
 		void write_frame_png(const uint x1, const uint y1, const uint x2, const uint y2, const string& path="", bool print_preview=false); // save current frame as .png file (smallest file size, but slow)
 		void write_frame_qoi(const uint x1, const uint y1, const uint x2, const uint y2, const string& path="", bool print_preview=false); // save current frame as .qoi file (small file size, fast)
 		void write_frame_bmp(const uint x1, const uint y1, const uint x2, const uint y2, const string& path="", bool print_preview=false); // save current frame as .bmp file (large file size, fast)
+		void flush_frames(); // wait until all queued frames are written to disk
+		Frame_Encoder* get_encoder() { return encoder; } // frame export queue metrics, nullptr if no frame was written yet
 	}; // Graphics
 	Graphics graphics;
 #endif // GRAPHICS
 }; // LBM
+
+class Force_Monitor { // samples the side/drag/lift force coefficients of an object every interval time steps, logs them as CSV and detects convergence; flow is in +y direction, lift in +z
+private:
+	std::ofstream log; // CSV: t, time in s, force in N, coefficients
+	vector<float3> history; // coefficients (side, drag, lift) of every sample
+
+public:
+	ulong interval = 0ull; // sample every interval time steps, 0 = off
+	uint window = 10u; // samples per averaging window of the convergence check
+	float tolerance = 0.0f; // converged once the mean coefficients of the last window differ from the window before by less than tolerance times their magnitude, 0 = never
+	uchar flag_marker = TYPE_S; // cells of the object
+	float si_rho=1.0f, si_u=1.0f, si_A=1.0f; // density in kg/m^3, free stream velocity in m/s and reference area in m^2 for the coefficients
+	string log_file = ""; // empty: no log
+
+	ulong samples = 0ull; // number of samples taken
+	ulong t = 0ull; // time step of the last sample
+	float3 si_force; // force of the last sample in N
+	float3 coefficients; // (side, drag, lift) coefficients of the last sample
+	float change = 0.0f; // relative change of the last convergence check
+	bool converged = false;
+
+	void start(); // open the log and clear the history
+	bool sample(LBM& lbm); // compute forces on the device and log them, returns true once converged
+};
+class Frame_Scheduler { // time steps of exported video frames: a --fps video that plays the simulation --slomo times slower, or every time step with --realtime
+private:
+	double steps_per_frame = 1.0; // simulated time steps between two frames, usually not a whole number
+	ulong frame = 0ull; // next frame
+
+public:
+	Frame_Scheduler() {}
+	Frame_Scheduler(const float fps, const float slomo, const bool realtime, const float si_dt); // si_dt: simulated time of one time step in s, units.si_t(1ull)
+	ulong frame_step(const ulong frame) const; // time step of a frame, the first one that reaches its simulated time
+	bool due(const ulong t); // true if a frame is due at time step t, then moves on to the first frame after t
+	ulong steps_until_next(const ulong t) const; // time steps from t to the next frame, at least 1
+};
+extern Force_Monitor force_monitor; // force monitor of the last main_setup() run, declared in lbm.cpp
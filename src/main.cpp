@@ -3,11 +3,21 @@
 #include "setup.hpp"
 #include "cxxopts.hpp"
 cxxopts::ParseResult g_args;
-int fpxxsize=32; // gets set to 16 if --FS16* switch passed
+static RuntimeFeatures runtime_features;
+const RuntimeFeatures& g_features = runtime_features;
+void set_runtime_features(const cxxopts::ParseResult& args) { // resolve typed extension switches once, everything else reads g_features
+	runtime_features = RuntimeFeatures(args);
+}
+int fpxxsize=4; // size of a stored DDF in Bytes, gets set to 2 if --FP16S or --FP16C is passed
 extern bool key_P;
 extern bool key_O;
 int GRAPHICS_BACKGROUND_COLOR; // for speed - used every frame
 std::string EXPORT_PATH;
+std::string KERNEL_CACHE_PATH; // empty disables the OpenCL program cache
+uint KERNEL_CACHE_MB=256u;
+std::string PROFILE_TRACE_PATH; // empty: --profile prints its table only
+std::string MESH_CACHE_PATH; // empty disables the mesh/flags cache
+uint MESH_CACHE_MB=1024u;
 
 #ifdef GRAPHICS
 void draw_scale(const int field_mode, const int color) {
@@ -96,7 +106,7 @@ void main_label(const double frametime) {
 			const bool surface = false;
 #endif // SURFACE
 */
-			const bool surface = g_args["SURFACE"].as<bool>();
+			const bool surface = g_features.surface;
 /*
 #ifdef PARTICLES
 			const bool particles = true;
@@ -104,7 +114,7 @@ void main_label(const double frametime) {
 			const bool particles = false;
 #endif // PARTICLES
 */
-			const bool particles = g_args["PARTICLES"].as<bool>();
+			const bool particles = g_features.particles;
 			const int ox=2, oy=2;
 			int i = 0;
 
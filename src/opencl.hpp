@@ -9,6 +9,7 @@
 #endif // _WIN32
 #include <CL/cl.hpp> // OpenCL 1.0, 1.1, 1.2
 #include "utilities.hpp"
+#include <mutex>
 using cl::Event;
 
 struct Device_Info {
@@ -105,22 +106,27 @@ inline void print_device_info(const Device_Info& d) { // print OpenCL device inf
 	println("| Buffer Limits  | "+alignl(58, to_string(d.max_global_buffer)+" MB global, "+to_string(d.max_constant_buffer)+" KB constant")+" |");
 	println("|----------------'------------------------------------------------------------|");
 }
-inline vector<Device_Info> get_devices(const bool print_info=true) { // returns a vector of all available OpenCL devices
-	vector<Device_Info> devices; // get all devices of all platforms
-	vector<cl::Platform> cl_platforms; // get all platforms (drivers)
-	cl::Platform::get(&cl_platforms);
-	uint id = 0u;
-	for(uint i=0u; i<(uint)cl_platforms.size(); i++) {
-		vector<cl::Device> cl_devices;
-		cl_platforms[i].getDevices(CL_DEVICE_TYPE_ALL, &cl_devices);
-		//cl::Context cl_context(cl_devices); // same cl::Context for all devices (allocates extra VRAM on all other unused Nvidia GPUs)
-		for(uint j=0u; j<(uint)cl_devices.size(); j++) {
-			cl::Context cl_context(cl_devices[j]); // separate cl::Context for each device
-			devices.push_back(Device_Info(cl_devices[j], cl_context, id++));
-		}
-	}
-	if((uint)cl_platforms.size()==0u||(uint)devices.size()==0u) {
-		print_error("There are no OpenCL devices available. Make sure that the OpenCL 1.2 Runtime for your device is installed. For GPUs it comes by default with the graphics driver, for CPUs it has to be installed separately.");
+inline vector<Device_Info> get_devices(const bool print_info=true, const bool refresh=false, const bool required=true) { // returns a vector of all available OpenCL devices, platforms are only queried on the first call or with refresh=true; without required, an empty vector if there are none
+	static vector<Device_Info>& devices = *new vector<Device_Info>(); // get all devices of all platforms, never destroyed so no cl::Context is released after the OpenCL runtime at exit
+	static std::mutex devices_mutex;
+	std::lock_guard<std::mutex> lock(devices_mutex);
+	if(devices.size()==0u||refresh) {
+		devices.clear();
+		vector<cl::Platform> cl_platforms; // get all platforms (drivers)
+		cl::Platform::get(&cl_platforms);
+		uint id = 0u;
+		for(uint i=0u; i<(uint)cl_platforms.size(); i++) {
+			vector<cl::Device> cl_devices;
+			cl_platforms[i].getDevices(CL_DEVICE_TYPE_ALL, &cl_devices);
+			//cl::Context cl_context(cl_devices); // same cl::Context for all devices (allocates extra VRAM on all other unused Nvidia GPUs)
+			for(uint j=0u; j<(uint)cl_devices.size(); j++) {
+				cl::Context cl_context(cl_devices[j]); // separate cl::Context for each device
+				devices.push_back(Device_Info(cl_devices[j], cl_context, id++));
+			}
+		}
+		if(((uint)cl_platforms.size()==0u||(uint)devices.size()==0u)&&required) {
+			print_error("There are no OpenCL devices available. Make sure that the OpenCL 1.2 Runtime for your device is installed. For GPUs it comes by default with the graphics driver, for CPUs it has to be installed separately.");
+		}
 	}
 	if(print_info) {
 		println("\r|----------------.------------------------------------------------------------|");
@@ -160,11 +166,219 @@ inline Device_Info select_device_with_id(const uint id, const vector<Device_Info
 	}
 }
 
+inline vector<Device_Info> select_devices(const uint D, const string& policy="auto", const vector<string>& ids=vector<string>(), const vector<Device_Info>& devices=get_devices()) { // returns D devices, by list of device IDs or by policy: auto (fastest group of D identical devices), flops or memory
+	vector<Device_Info> device_infos(D);
+	const int user_specified_devices = (int)ids.size();
+	if(user_specified_devices>0) { // user has selevted specific devices as command line arguments
+		if(user_specified_devices==D) { // as much specified devices as domains
+			for(uint d=0; d<D; d++) device_infos[d] = select_device_with_id(to_uint(ids[d]), devices); // use list of devices IDs specified by user
+		} else {
+			print_warning("Incorrect number of devices specified. Using single fastest device for all domains.");
+			for(uint d=0; d<D; d++) device_infos[d] = select_device_with_most_flops(devices);
+		}
+	} else if(policy=="flops"||policy=="memory") { // the D best devices by estimated FP32 performance or by memory capacity, regardless of device type
+		vector<Device_Info> ranked = devices;
+		std::stable_sort(ranked.begin(), ranked.end(), [&](const Device_Info& a, const Device_Info& b) { return policy=="flops" ? a.tflops>b.tflops : a.memory>b.memory; });
+		if((uint)ranked.size()>=D) {
+			for(uint d=0; d<D; d++) device_infos[d] = ranked[d];
+		} else {
+			print_warning("Not enough devices available. Using single best device for all domains.");
+			for(uint d=0; d<D; d++) device_infos[d] = ranked[0];
+		}
+	} else { // device auto-selection
+		if(policy!="auto") print_warning("Unknown device policy \""+policy+"\", using auto.");
+		vector<vector<Device_Info>> device_type_ids; // a vector of all different devices, containing vectors of their device IDs
+		for(uint i=0u; i<(uint)devices.size(); i++) {
+			const string name_i = devices[i].name;
+			bool already_exists = false;
+			for(uint j=0u; j<(uint)device_type_ids.size(); j++) {
+				const string name_j = device_type_ids[j][0].name;
+				if(name_i==name_j) {
+					device_type_ids[j].push_back(devices[i]);
+					already_exists = true;
+				}
+			}
+			if(!already_exists) device_type_ids.push_back(vector<Device_Info>(1, devices[i]));
+		}
+		float best_value = -1.0f;
+		int best_j = -1;
+		for(uint j=0u; j<(uint)device_type_ids.size(); j++) {
+			const float value = device_type_ids[j][0].tflops;
+			if((uint)device_type_ids[j].size()>=D && value>best_value) {
+				best_value = value;
+				best_j = j;
+			}
+		}
+		if(best_j>=0) { // select all devices of fastest device type with at least D devices of the same type
+			for(uint d=0; d<D; d++) device_infos[d] = device_type_ids[best_j][d];
+		} else {
+			print_warning("Not enough devices of the same type available. Using single fastest device for all domains.");
+			for(uint d=0; d<D; d++) device_infos[d] = select_device_with_most_flops(devices);
+		}
+		//for(uint j=0u; j<(uint)device_type_ids.size(); j++) print_info("Device Type "+to_string(j)+" ("+device_type_ids[j][0].name+"): "+to_string((uint)device_type_ids[j].size())+"x");
+	}
+	return device_infos;
+}
+
+inline string program_cache_key(const Device_Info& info, const string& build_options, const string& opencl_c_code) { // hash of everything that changes the compiled program
+	return to_string_hex(hash_string(info.name+"\n"+info.vendor+"\n"+info.driver_version+"\n"+info.opencl_c_version+"\n"+build_options+"\n"+opencl_c_code));
+}
+
+class Kernel_Profiler { // opt-in timing of every kernel run and buffer copy with OpenCL profiling events (--profile), off: one branch per enqueue
+public:
+	struct Stats { // times in s, bandwidth in GB/s (0 if the bytes per run are unknown)
+		string name;
+		ulong count=0ull, bytes=0ull;
+		double total=0.0, mean=0.0, p95=0.0, min=0.0, max=0.0, bandwidth=0.0;
+	};
+private:
+	struct Pending { Event event; uint name, device, queue; ulong bytes; }; // enqueued, not yet read back
+	struct Record { uint name, device, queue; ulong bytes, start, end; }; // start/end in ns on the device clock
+	struct Timing { // per name, running totals plus a uniform sample of the durations for p95, so memory stays bounded however long the run
+		ulong count=0ull, bytes=0ull; // runs, total bytes moved
+		double total=0.0, min=0.0, max=0.0; // in s
+		vector<float> samples; // reservoir of at most max_samples durations in s, every run while count<=max_samples
+		ulong random=0x9E3779B97F4A7C15ull; // xorshift64 state, fixed seed for reproducible p95
+	};
+	std::atomic_bool enabled{false};
+	std::mutex mutex; // guards everything below
+	vector<string> names; // kernel and copy names, indexed by Pending::name and Record::name
+	vector<Timing> timings; // per name, every run even past max_records
+	vector<cl_command_queue> queues; // trace thread IDs are indices into this
+	vector<std::pair<uint, string>> devices; // device ID and name, trace process IDs are device IDs
+	vector<Pending> pending;
+	vector<Record> records; // trace timeline, the first max_records runs
+	const ulong max_records = 1000000ull;
+	const uint max_samples = 4096u; // per name, p95 is exact up to this many runs
+	inline uint index(const vector<string>& list, const string& name) const {
+		for(uint i=0u; i<(uint)list.size(); i++) if(list[i]==name) return i;
+		return (uint)list.size();
+	}
+	inline bool resolve(const Pending& p, const bool wait) { // returns false if the command has not finished yet
+		if(wait) p.event.wait();
+		const cl_int status = p.event.getInfo<CL_EVENT_COMMAND_EXECUTION_STATUS>();
+		if(status>CL_COMPLETE) return false;
+		if(status<CL_COMPLETE) return true; // command failed, drop it
+		const ulong start=p.event.getProfilingInfo<CL_PROFILING_COMMAND_START>(), end=p.event.getProfilingInfo<CL_PROFILING_COMMAND_END>();
+		const float duration = (float)(1E-9*(double)(end>start ? end-start : 0ull));
+		Timing& t = timings[p.name];
+		t.min = t.count==0ull ? (double)duration : fmin(t.min, (double)duration);
+		t.max = t.count==0ull ? (double)duration : fmax(t.max, (double)duration);
+		t.count++;
+		t.total += (double)duration;
+		t.bytes += p.bytes;
+		if((ulong)t.samples.size()<(ulong)max_samples) {
+			t.samples.push_back(duration);
+		} else { // reservoir sampling: the n-th run replaces a random sample with probability max_samples/n
+			t.random ^= t.random<<13; t.random ^= t.random>>7; t.random ^= t.random<<17;
+			const ulong i = t.random%t.count;
+			if(i<(ulong)max_samples) t.samples[i] = duration;
+		}
+		if((ulong)records.size()<max_records) records.push_back({ p.name, p.device, p.queue, p.bytes, start, max(end, start) });
+		return true;
+	}
+	inline void collect(const bool wait) { // read back finished events, with wait=true all of them
+		uint kept = 0u;
+		for(uint i=0u; i<(uint)pending.size(); i++) if(!resolve(pending[i], wait)) pending[kept++] = pending[i];
+		pending.resize(kept);
+	}
+public:
+	inline void enable(const bool enabled) { this->enabled = enabled; } // only queues of devices created while enabled can be profiled
+	inline bool is_enabled() const { return enabled; }
+	inline void add_device(const uint id, const string& name) {
+		std::lock_guard<std::mutex> lock(mutex);
+		for(const std::pair<uint, string>& device : devices) if(device.first==id) return;
+		devices.push_back({ id, name });
+	}
+	inline void add(const Event& event, const string& name, const uint device, const cl_command_queue queue, const ulong bytes) { // bytes moved by this run, 0 if unknown
+		std::lock_guard<std::mutex> lock(mutex);
+		uint n = index(names, name);
+		if(n==(uint)names.size()) { names.push_back(name); timings.push_back(Timing()); }
+		uint q = 0u;
+		while(q<(uint)queues.size()&&queues[q]!=queue) q++;
+		if(q==(uint)queues.size()) queues.push_back(queue);
+		pending.push_back({ event, n, device, q, bytes });
+		if(pending.size()>=4096u) collect(false); // keep the number of live events bounded without waiting for the device
+	}
+	inline void reset() {
+		std::lock_guard<std::mutex> lock(mutex);
+		collect(true);
+		for(Timing& t : timings) t = Timing();
+		records.clear();
+	}
+	inline vector<Stats> stats() { // per kernel/copy name, sorted by total time
+		std::lock_guard<std::mutex> lock(mutex);
+		collect(true);
+		vector<Stats> table;
+		for(uint n=0u; n<(uint)names.size(); n++) {
+			const Timing& t = timings[n];
+			if(t.count==0ull) continue;
+			Stats s;
+			s.name = names[n];
+			s.count = t.count;
+			s.bytes = t.bytes;
+			s.total = t.total;
+			s.mean = s.total/(double)s.count;
+			s.min = t.min;
+			s.max = t.max;
+			vector<float> d = t.samples;
+			std::sort(d.begin(), d.end());
+			s.p95 = (double)d[(ulong)ceil(0.95*(double)d.size())-1ull];
+			s.bandwidth = s.total>0.0 ? 1E-9*(double)s.bytes/s.total : 0.0;
+			table.push_back(s);
+		}
+		std::sort(table.begin(), table.end(), [](const Stats& a, const Stats& b) { return a.total>b.total; });
+		return table;
+	}
+	inline ulong export_trace(const string& filename) { // Chrome trace JSON (chrome://tracing, ui.perfetto.dev), one process per device and one thread per queue, returns the number of events
+		std::lock_guard<std::mutex> lock(mutex);
+		collect(true);
+		ulong t0 = max_ulong;
+		for(const Record& r : records) t0 = min(t0, r.start);
+		string s = "{\"displayTimeUnit\":\"ns\",\"traceEvents\":[";
+		bool first = true;
+		for(const std::pair<uint, string>& device : devices) {
+			string name = "";
+			for(const char c : device.second) if(c!='"'&&c!='\\') name += c;
+			s += string(first ? "" : ",")+"\n{\"name\":\"process_name\",\"ph\":\"M\",\"pid\":"+to_string(device.first)+",\"args\":{\"name\":\"Device "+to_string(device.first)+": "+name+"\"}}";
+			first = false;
+		}
+		for(const Record& r : records) {
+			s += string(first ? "" : ",")+"\n{\"name\":\""+names[r.name]+"\",\"cat\":\""+(begins_with(names[r.name], "read_")||begins_with(names[r.name], "write_") ? "copy" : "kernel")+"\",\"ph\":\"X\",\"pid\":"+to_string(r.device)+",\"tid\":"+to_string(r.queue)+
+				",\"ts\":"+to_string(1E-3*(double)(r.start-t0), 3u)+",\"dur\":"+to_string(1E-3*(double)(r.end-r.start), 3u)+(r.bytes>0ull ? ",\"args\":{\"bytes\":"+to_string(r.bytes)+"}" : "")+"}";
+			first = false;
+		}
+		s += "\n]}\n";
+		write_file(filename, s);
+		return (ulong)records.size();
+	}
+	inline void print() { // table of the kernels and copies with the most device time
+		const vector<Stats> table = stats();
+		if(table.empty()) return;
+		double total = 0.0;
+		for(const Stats& s : table) total += s.total;
+		println("|---------------------------.----------.-----------.-----------.------.-------|");
+		println("| Kernel / Copy             |     Runs | Mean [us] |  p95 [us] | Time |  GB/s |");
+		println("|---------------------------+----------+-----------+-----------+------+-------|");
+		for(const Stats& s : table) {
+			println("| "+alignl(25u, s.name.substr(0, 25))+" | "+alignr(8u, s.count)+" | "+alignr(9u, to_string(1E6*s.mean, 1u))+" | "+alignr(9u, to_string(1E6*s.p95, 1u))+" | "+
+				alignr(3u, to_uint(100.0*s.total/total))+"% | "+alignr(5u, s.bandwidth>0.0 ? to_string(to_uint(s.bandwidth)) : string("-"))+" |");
+		}
+		println("'---------------------------'----------'-----------'-----------'------'-------'");
+	}
+};
+inline Kernel_Profiler& kernel_profiler() { // never destroyed, events may still be read back from other threads at exit
+	static Kernel_Profiler* profiler = new Kernel_Profiler();
+	return *profiler;
+}
+
 class Device {
 private:
 	cl::Program cl_program;
 	cl::CommandQueue cl_queue;
+	cl::CommandQueue cl_queue_transfer; // second queue for multi-device halo exchange, so PCIe copies can overlap with kernels in cl_queue
 	bool exists = false;
+	bool profiling = false; // queues were created with CL_QUEUE_PROFILING_ENABLE
 	inline string enable_device_capabilities() const { return // enable FP64/FP16 capabilities if available
 		"\n	#define def_workgroup_size "+to_string(WORKGROUP_SIZE)+"u"
 		"\n	#ifdef cl_khr_fp64"
@@ -183,23 +397,52 @@ public:
 	inline Device(const Device_Info& info, const string& opencl_c_code=get_opencl_c_code()) {
 		print_device_info(info);
 		this->info = info;
-		this->cl_queue = cl::CommandQueue(info.cl_context, info.cl_device); // queue to push commands for the device
-		cl::Program::Sources cl_source;
+		this->profiling = kernel_profiler().is_enabled();
+		if(profiling) kernel_profiler().add_device(info.id, info.name);
+		this->cl_queue = cl::CommandQueue(info.cl_context, info.cl_device, profiling ? CL_QUEUE_PROFILING_ENABLE : 0); // queue to push commands for the device
+		this->cl_queue_transfer = cl::CommandQueue(info.cl_context, info.cl_device, profiling ? CL_QUEUE_PROFILING_ENABLE : 0);
 		const string kernel_code = enable_device_capabilities()+"\n"+opencl_c_code;
-		cl_source.push_back({ kernel_code.c_str(), kernel_code.length() });
-		this->cl_program = cl::Program(info.cl_context, cl_source);
 		const string build_options = string("-cl-finite-math-only -cl-no-signed-zeros -cl-mad-enable")+(info.intel_gpu_above_4gb_patch ? " -cl-intel-greater-than-4GB-buffer-required" : "");
+		bool cached = false;
+#ifndef UTILITIES_NO_CPP17
+		const string cache_file = KERNEL_CACHE_PATH!="" ? KERNEL_CACHE_PATH+(ends_with(KERNEL_CACHE_PATH, "/") ? "" : "/")+program_cache_key(info, build_options, kernel_code)+".clbin" : "";
+		string binary;
+		if(cache_file!=""&&read_cache_file(cache_file, binary)) { // skip the compiler if the same program was built before for this device and driver
+			int error = 0;
+			this->cl_program = cl::Program(info.cl_context, { info.cl_device }, { { binary.data(), binary.length() } }, nullptr, &error);
+			cached = error==CL_SUCCESS&&cl_program.build({ info.cl_device }, (build_options+" -w").c_str())==CL_SUCCESS;
+			if(!cached) { // stale or corrupt binary, fall back to building from source
+				std::error_code remove_error;
+				std::filesystem::remove(cache_file, remove_error);
+			}
+		}
+#endif // UTILITIES_NO_CPP17
+		if(cached) {
+			print_info("OpenCL C code loaded from kernel cache.");
+		} else {
+			cl::Program::Sources cl_source;
+			cl_source.push_back({ kernel_code.c_str(), kernel_code.length() });
+			this->cl_program = cl::Program(info.cl_context, cl_source);
 #ifndef LOG
-		int error = cl_program.build({ info.cl_device }, (build_options+" -w").c_str()); // compile OpenCL C code, disable warnings
-		if(error) print_warning(cl_program.getBuildInfo<CL_PROGRAM_BUILD_LOG>(info.cl_device)); // print build log
+			int error = cl_program.build({ info.cl_device }, (build_options+" -w").c_str()); // compile OpenCL C code, disable warnings
+			if(error) print_warning(cl_program.getBuildInfo<CL_PROGRAM_BUILD_LOG>(info.cl_device)); // print build log
 #else // LOG, generate logfile for OpenCL code compilation
-		int error = cl_program.build({ info.cl_device }, build_options.c_str()); // compile OpenCL C code
-		const string log = cl_program.getBuildInfo<CL_PROGRAM_BUILD_LOG>(info.cl_device);
-		write_file("bin/kernel.log", log); // save build log
-		if((uint)log.length()>2u) print_warning(log); // print build log
+			int error = cl_program.build({ info.cl_device }, build_options.c_str()); // compile OpenCL C code
+			const string log = cl_program.getBuildInfo<CL_PROGRAM_BUILD_LOG>(info.cl_device);
+			write_file("bin/kernel.log", log); // save build log
+			if((uint)log.length()>2u) print_warning(log); // print build log
 #endif // LOG
-		if(error) print_error("OpenCL C code compilation failed with error code "+to_string(error)+". Make sure there are no errors in kernel.cpp.");
-		else print_info("OpenCL C code successfully compiled.");
+			if(error) print_error("OpenCL C code compilation failed with error code "+to_string(error)+". Make sure there are no errors in kernel.cpp.");
+			else print_info("OpenCL C code successfully compiled.");
+#ifndef UTILITIES_NO_CPP17
+			if(cache_file!="") {
+				const vector<size_t> sizes = cl_program.getInfo<CL_PROGRAM_BINARY_SIZES>();
+				vector<char*> binaries = cl_program.getInfo<CL_PROGRAM_BINARIES>();
+				if(sizes.size()==1u&&binaries.size()==1u&&binaries[0]!=nullptr&&sizes[0]>0u) write_cache_file(cache_file, string(binaries[0], sizes[0]), { ".clbin" }, (ulong)KERNEL_CACHE_MB*1048576ull);
+				for(uint i=0u; i<(uint)binaries.size(); i++) delete[] binaries[i];
+			}
+#endif // UTILITIES_NO_CPP17
+		}
 #ifdef PTX // generate assembly (ptx) file for OpenCL code
 		write_file("bin/kernel.ptx", cl_program.getInfo<CL_PROGRAM_BINARIES>()[0]); // save binary (ptx file)
 #endif // PTX
@@ -207,11 +450,15 @@ public:
 	}
 	inline Device() {} // default constructor
 	inline void barrier(const vector<Event>* event_waitlist=nullptr, Event* event_returned=nullptr) { cl_queue.enqueueBarrierWithWaitList(event_waitlist, event_returned); }
+	inline void barrier_transfer(const vector<Event>* event_waitlist=nullptr, Event* event_returned=nullptr) { cl_queue_transfer.enqueueBarrierWithWaitList(event_waitlist, event_returned); }
 	inline void finish_queue() { cl_queue.finish(); }
+	inline void finish_transfer_queue() { cl_queue_transfer.finish(); }
 	inline cl::Context get_cl_context() const { return info.cl_context; }
 	inline cl::Program get_cl_program() const { return cl_program; }
 	inline cl::CommandQueue get_cl_queue() const { return cl_queue; }
+	inline cl::CommandQueue get_cl_queue_transfer() const { return cl_queue_transfer; }
 	inline bool is_initialized() const { return exists; }
+	inline bool is_profiling() const { return profiling; }
 };
 
 template<typename T> class Memory {
@@ -231,6 +478,26 @@ private:
 		if(d>0x2u) z = s2 = host_buffer+N*0x2ull; if(d>0x6u) s6 = host_buffer+N*0x6ull; if(d>0xAu) sA = host_buffer+N*0xAull; if(d>0xEu) sE = host_buffer+N*0xEull;
 		if(d>0x3u) w = s3 = host_buffer+N*0x3ull; if(d>0x7u) s7 = host_buffer+N*0x7ull; if(d>0xBu) sB = host_buffer+N*0xBull; if(d>0xFu) sF = host_buffer+N*0xFull;
 	}
+	inline void enqueue_read(const bool blocking, const ulong offset, const ulong bytes, void* const destination, const vector<Event>* event_waitlist=nullptr, Event* event_returned=nullptr) { // offset and bytes in Byte
+		if(device->is_profiling()&&kernel_profiler().is_enabled()) {
+			Event event;
+			cl_queue.enqueueReadBuffer(device_buffer, blocking, offset, bytes, destination, event_waitlist, &event);
+			kernel_profiler().add(event, "read_from_device", device->info.id, cl_queue(), bytes);
+			if(event_returned) *event_returned = event;
+		} else {
+			cl_queue.enqueueReadBuffer(device_buffer, blocking, offset, bytes, destination, event_waitlist, event_returned);
+		}
+	}
+	inline void enqueue_write(const bool blocking, const ulong offset, const ulong bytes, const void* const source, const vector<Event>* event_waitlist=nullptr, Event* event_returned=nullptr) { // offset and bytes in Byte
+		if(device->is_profiling()&&kernel_profiler().is_enabled()) {
+			Event event;
+			cl_queue.enqueueWriteBuffer(device_buffer, blocking, offset, bytes, source, event_waitlist, &event);
+			kernel_profiler().add(event, "write_to_device", device->info.id, cl_queue(), bytes);
+			if(event_returned) *event_returned = event;
+		} else {
+			cl_queue.enqueueWriteBuffer(device_buffer, blocking, offset, bytes, source, event_waitlist, event_returned);
+		}
+	}
 	inline void allocate_device_buffer(Device& device, const bool allocate_device) {
 		this->device = &device;
 		this->cl_queue = device.get_cl_queue();
@@ -357,21 +624,21 @@ public:
 	inline const T operator()(const ulong i) const { return host_buffer[i]; }
 	inline const T operator()(const ulong i, const uint dimension) const { return host_buffer[i+(ulong)dimension*N]; } // array of structures
 	inline void read_from_device(const bool blocking=true, const vector<Event>* event_waitlist=nullptr, Event* event_returned=nullptr) {
-		if(host_buffer_exists&&device_buffer_exists) cl_queue.enqueueReadBuffer(device_buffer, blocking, 0ull, capacity(), (void*)host_buffer, event_waitlist, event_returned);
+		if(host_buffer_exists&&device_buffer_exists) enqueue_read(blocking, 0ull, capacity(), (void*)host_buffer, event_waitlist, event_returned);
 	}
 	inline void write_to_device(const bool blocking=true, const vector<Event>* event_waitlist=nullptr, Event* event_returned=nullptr) {
-		if(host_buffer_exists&&device_buffer_exists) cl_queue.enqueueWriteBuffer(device_buffer, blocking, 0ull, capacity(), (void*)host_buffer, event_waitlist, event_returned);
+		if(host_buffer_exists&&device_buffer_exists) enqueue_write(blocking, 0ull, capacity(), (void*)host_buffer, event_waitlist, event_returned);
 	}
 	inline void read_from_device(const ulong offset, const ulong length, const bool blocking=true, const vector<Event>* event_waitlist=nullptr, Event* event_returned=nullptr) {
 		if(host_buffer_exists&&device_buffer_exists) {
 			const ulong safe_offset=min(offset, range()), safe_length=min(length, range()-safe_offset);
-			if(safe_length>0ull) cl_queue.enqueueReadBuffer(device_buffer, blocking, safe_offset*sizeof(T), safe_length*sizeof(T), (void*)(host_buffer+safe_offset), event_waitlist, event_returned);
+			if(safe_length>0ull) enqueue_read(blocking, safe_offset*sizeof(T), safe_length*sizeof(T), (void*)(host_buffer+safe_offset), event_waitlist, event_returned);
 		}
 	}
 	inline void write_to_device(const ulong offset, const ulong length, const bool blocking=true, const vector<Event>* event_waitlist=nullptr, Event* event_returned=nullptr) {
 		if(host_buffer_exists&&device_buffer_exists) {
 			const ulong safe_offset=min(offset, range()), safe_length=min(length, range()-safe_offset);
-			if(safe_length>0ull) cl_queue.enqueueWriteBuffer(device_buffer, blocking, safe_offset*sizeof(T), safe_length*sizeof(T), (void*)(host_buffer+safe_offset), event_waitlist, event_returned);
+			if(safe_length>0ull) enqueue_write(blocking, safe_offset*sizeof(T), safe_length*sizeof(T), (void*)(host_buffer+safe_offset), event_waitlist, event_returned);
 		}
 	}
 	inline void read_from_device_1d(const ulong x0, const ulong x1, const int dimension=-1, const bool blocking=true, const vector<Event>* event_waitlist=nullptr, Event* event_returned=nullptr) { // read 1D domain from device, either for all vector dimensions (-1) or for a specified dimension
@@ -379,7 +646,7 @@ public:
 			const uint i0=(uint)max(0, dimension), i1=dimension<0 ? d : i0+1u;
 			for(uint i=i0; i<i1; i++) {
 				const ulong safe_offset=min((ulong)i*N+x0, range()), safe_length=min(x1-x0, range()-safe_offset);
-				if(safe_length>0ull) cl_queue.enqueueReadBuffer(device_buffer, false, safe_offset*sizeof(T), safe_length*sizeof(T), (void*)(host_buffer+safe_offset), event_waitlist, event_returned);
+				if(safe_length>0ull) enqueue_read(false, safe_offset*sizeof(T), safe_length*sizeof(T), (void*)(host_buffer+safe_offset), event_waitlist, event_returned);
 			}
 			if(blocking) cl_queue.finish();
 		}
@@ -389,7 +656,7 @@ public:
 			const uint i0=(uint)max(0, dimension), i1=dimension<0 ? d : i0+1u;
 			for(uint i=i0; i<i1; i++) {
 				const ulong safe_offset=min((ulong)i*N+x0, range()), safe_length=min(x1-x0, range()-safe_offset);
-				if(safe_length>0ull) cl_queue.enqueueWriteBuffer(device_buffer, false, safe_offset*sizeof(T), safe_length*sizeof(T), (void*)(host_buffer+safe_offset), event_waitlist, event_returned);
+				if(safe_length>0ull) enqueue_write(false, safe_offset*sizeof(T), safe_length*sizeof(T), (void*)(host_buffer+safe_offset), event_waitlist, event_returned);
 			}
 			if(blocking) cl_queue.finish();
 		}
@@ -401,7 +668,7 @@ public:
 				const uint i0=(uint)max(0, dimension), i1=dimension<0 ? d : i0+1u;
 				for(uint i=i0; i<i1; i++) {
 					const ulong safe_offset=min((ulong)i*N+n, range()), safe_length=min(x1-x0, range()-safe_offset);
-					if(safe_length>0ull) cl_queue.enqueueReadBuffer(device_buffer, false, safe_offset*sizeof(T), safe_length*sizeof(T), (void*)(host_buffer+safe_offset), event_waitlist, event_returned);
+					if(safe_length>0ull) enqueue_read(false, safe_offset*sizeof(T), safe_length*sizeof(T), (void*)(host_buffer+safe_offset), event_waitlist, event_returned);
 				}
 			}
 			if(blocking) cl_queue.finish();
@@ -414,7 +681,7 @@ public:
 				const uint i0=(uint)max(0, dimension), i1=dimension<0 ? d : i0+1u;
 				for(uint i=i0; i<i1; i++) {
 					const ulong safe_offset=min((ulong)i*N+n, range()), safe_length=min(x1-x0, range()-safe_offset);
-					if(safe_length>0ull) cl_queue.enqueueWriteBuffer(device_buffer, false, safe_offset*sizeof(T), safe_length*sizeof(T), (void*)(host_buffer+safe_offset), event_waitlist, event_returned);
+					if(safe_length>0ull) enqueue_write(false, safe_offset*sizeof(T), safe_length*sizeof(T), (void*)(host_buffer+safe_offset), event_waitlist, event_returned);
 				}
 			}
 			if(blocking) cl_queue.finish();
@@ -428,7 +695,7 @@ public:
 					const uint i0=(uint)max(0, dimension), i1=dimension<0 ? d : i0+1u;
 					for(uint i=i0; i<i1; i++) {
 						const ulong safe_offset=min((ulong)i*N+n, range()), safe_length=min(x1-x0, range()-safe_offset);
-						if(safe_length>0ull) cl_queue.enqueueReadBuffer(device_buffer, false, safe_offset*sizeof(T), safe_length*sizeof(T), (void*)(host_buffer+safe_offset), event_waitlist, event_returned);
+						if(safe_length>0ull) enqueue_read(false, safe_offset*sizeof(T), safe_length*sizeof(T), (void*)(host_buffer+safe_offset), event_waitlist, event_returned);
 					}
 				}
 			}
@@ -443,7 +710,7 @@ public:
 					const uint i0=(uint)max(0, dimension), i1=dimension<0 ? d : i0+1u;
 					for(uint i=i0; i<i1; i++) {
 						const ulong safe_offset=min((ulong)i*N+n, range()), safe_length=min(x1-x0, range()-safe_offset);
-						if(safe_length>0ull) cl_queue.enqueueWriteBuffer(device_buffer, false, safe_offset*sizeof(T), safe_length*sizeof(T), (void*)(host_buffer+safe_offset), event_waitlist, event_returned);
+						if(safe_length>0ull) enqueue_write(false, safe_offset*sizeof(T), safe_length*sizeof(T), (void*)(host_buffer+safe_offset), event_waitlist, event_returned);
 					}
 				}
 			}
@@ -454,7 +721,14 @@ public:
 	inline void enqueue_write_to_device(const vector<Event>* event_waitlist=nullptr, Event* event_returned=nullptr) { write_to_device(false, event_waitlist, event_returned); }
 	inline void enqueue_read_from_device(const ulong offset, const ulong length, const vector<Event>* event_waitlist=nullptr, Event* event_returned=nullptr) { read_from_device(offset, length, false, event_waitlist, event_returned); }
 	inline void enqueue_write_to_device(const ulong offset, const ulong length, const vector<Event>* event_waitlist=nullptr, Event* event_returned=nullptr) { write_to_device(offset, length, false, event_waitlist, event_returned); }
+	inline void enqueue_read_from_device_to(T* const destination) { // copy whole device buffer into external host memory, also works for device-only buffers
+		if(device_buffer_exists) enqueue_read(false, 0ull, capacity(), (void*)destination);
+	}
+	inline void write_to_device_from(const T* const source) { // copy external host memory into the whole device buffer, blocking
+		if(device_buffer_exists) enqueue_write(true, 0ull, capacity(), (const void*)source);
+	}
 	inline void finish_queue() { cl_queue.finish(); }
+	inline void set_queue(const cl::CommandQueue& cl_queue) { this->cl_queue = cl_queue; } // enqueue all following copies in another queue of the same device
 	inline const cl::Buffer& get_cl_buffer() const { return device_buffer; }
 };
 
@@ -466,6 +740,9 @@ private:
 	cl::Kernel cl_kernel;
 	cl::NDRange cl_range_global, cl_range_local;
 	cl::CommandQueue cl_queue;
+	bool profiling = false; // device queues support profiling events, see Kernel_Profiler
+	uint device_id = 0u;
+	ulong bytes = 0ull; // device memory traffic per run, for the achieved bandwidth in the profiler (0: unknown)
 	inline void check_for_errors(const int error) {
 		if(error==-48) print_error("There is no OpenCL kernel with name \""+name+"(...)\" in the OpenCL C code! Check spelling!");
 		if(error<-48&&error>-53) print_error("Parameters for OpenCL kernel \""+name+"(...)\" don't match between C++ and OpenCL C!");
@@ -493,13 +770,18 @@ public:
 		link_parameters(number_of_parameters, parameters...); // expand variadic template to link kernel parameters
 		set_ranges(N);
 		cl_queue = device.get_cl_queue();
+		profiling = device.is_profiling();
+		device_id = device.info.id;
 	}
 	template<class... T> inline Kernel(const Device& device, const ulong N, const uint workgroup_size, const string& name, const T&... parameters) { // accepts Memory<T> objects and fundamental data type constants
 		if(!device.is_initialized()) print_error("No OpenCL Device selected. Call Device constructor.");
+		this->name = name;
 		cl_kernel = cl::Kernel(device.get_cl_program(), name.c_str());
 		link_parameters(number_of_parameters, parameters...); // expand variadic template to link kernel parameters
 		set_ranges(N, (ulong)workgroup_size);
 		cl_queue = device.get_cl_queue();
+		profiling = device.is_profiling();
+		device_id = device.info.id;
 	}
 	inline Kernel() {} // default constructor
 	inline Kernel& set_ranges(const ulong N, const ulong workgroup_size=(ulong)WORKGROUP_SIZE) {
@@ -508,6 +790,14 @@ public:
 		cl_range_local = cl::NDRange(workgroup_size);
 		return *this;
 	}
+	inline Kernel& set_queue(const cl::CommandQueue& cl_queue) { // enqueue all following runs in another queue of the same device
+		this->cl_queue = cl_queue;
+		return *this;
+	}
+	inline Kernel& set_bytes(const ulong bytes) { // device memory traffic per run, only used for the bandwidth column of the profiler
+		this->bytes = bytes;
+		return *this;
+	}
 	inline const ulong range() const { return N; }
 	inline uint get_number_of_parameters() const { return number_of_parameters; }
 	template<class... T> inline Kernel& add_parameters(const T&... parameters) { // add parameters to the list of existing parameters
@@ -519,11 +809,21 @@ public:
 		return *this;
 	}
 	inline Kernel& enqueue_run(const uint t=1u, const vector<Event>* event_waitlist=nullptr, Event* event_returned=nullptr) {
+		if(profiling&&kernel_profiler().is_enabled()) return enqueue_run_profiled(t, event_waitlist, event_returned);
 		for(uint i=0u; i<t; i++) {
 			check_for_errors(cl_queue.enqueueNDRangeKernel(cl_kernel, cl::NullRange, cl_range_global, cl_range_local, event_waitlist, event_returned));
 		}
 		return *this;
 	}
+	inline Kernel& enqueue_run_profiled(const uint t=1u, const vector<Event>* event_waitlist=nullptr, Event* event_returned=nullptr) { // same as enqueue_run(), but every run gets an event for Kernel_Profiler
+		for(uint i=0u; i<t; i++) {
+			Event event;
+			check_for_errors(cl_queue.enqueueNDRangeKernel(cl_kernel, cl::NullRange, cl_range_global, cl_range_local, event_waitlist, &event));
+			kernel_profiler().add(event, name, device_id, cl_queue(), bytes);
+			if(event_returned) *event_returned = event;
+		}
+		return *this;
+	}
 	inline Kernel& run(const uint t=1u, const vector<Event>* event_waitlist=nullptr, Event* event_returned=nullptr) {
 		enqueue_run(t, event_waitlist, event_returned);
 		finish_queue();
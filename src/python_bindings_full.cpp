@@ -8,7 +8,9 @@
 #include <map>
 #include <stdexcept>
 #include <thread>
+#include <sstream>
 #include "utilities.hpp"
+#include "setup.hpp"  // main_setup(), setup_cnd_wing(), LBM; pulls in graphics.hpp for camera and the shared running flag
 
 #if defined(_WIN32)
 #include <windows.h>
@@ -25,12 +27,13 @@ extern vector<string> main_arguments;  // Defined in graphics.cpp
 extern cxxopts::ParseResult g_args;  // Defined in main.cpp
 extern int fpxxsize;  // Defined in main.cpp
 extern string EXPORT_PATH;  // Defined in main.cpp
-
-// Define the global variables that we need to provide (only those NOT in main.cpp)
-bool running = true;
-
-// Forward declare main_setup - this is defined in setup.cpp
-void main_setup();
+extern string KERNEL_CACHE_PATH;  // Defined in main.cpp, empty disables the OpenCL program cache
+extern uint KERNEL_CACHE_MB;  // Defined in main.cpp
+extern string PROFILE_TRACE_PATH;  // Defined in main.cpp
+extern string MESH_CACHE_PATH;  // Defined in main.cpp, empty disables the mesh/flags cache
+extern uint MESH_CACHE_MB;  // Defined in main.cpp
+extern int GRAPHICS_BACKGROUND_COLOR;  // Defined in main.cpp
+// NOTE: running (std::atomic_bool) comes from graphics.hpp - a second "bool running" here clashes with graphics.cpp when linking with g++
 
 // NOTE: main_label, main_graphics, main_physics are now defined in main.cpp
 
@@ -94,8 +97,28 @@ public:
             ("pause", "Do not auto-start the simulation", cxxopts::value<bool>()->default_value("false"))
             ("fps", "Frames per Second for video output", cxxopts::value<float>()->default_value("25.0"))
             ("realtime", "Save every frame to video output", cxxopts::value<bool>()->default_value("false"))
+            ("record", "Start with frame export turned on (same as pressing O)", cxxopts::value<bool>()->default_value("false"))
+            ("framequeue", "Max frames waiting for background encoding, the simulation waits when full", cxxopts::value<int>()->default_value("8"))
+            ("dropframes", "Drop frames instead of waiting when the frame queue is full", cxxopts::value<bool>()->default_value("false"))
             ("slomo", "What speed the video plays at 1=realtime 10=10x slower", cxxopts::value<float>()->default_value("1.0"))
             ("export", "Folder name to save images and data into", cxxopts::value<std::string>()->default_value("export/"))
+            ("kernelcache", "Folder to cache compiled OpenCL programs in (empty: always compile)", cxxopts::value<std::string>()->default_value(""))
+            ("kernelcachesize", "Size limit of the kernel cache in MB, least recently used programs are deleted first", cxxopts::value<int>()->default_value("256"))
+            ("profile", "Time every kernel run and buffer copy on the device and print count, mean, p95 and bandwidth per kernel at the end", cxxopts::value<bool>()->default_value("false"))
+            ("profiletrace", "Also write the --profile timeline to this Chrome trace JSON file (chrome://tracing, ui.perfetto.dev)", cxxopts::value<std::string>()->default_value(""))
+            ("meshcache", "Folder to cache transformed meshes and voxelized flags in (empty: off)", cxxopts::value<std::string>()->default_value(""))
+            ("meshcachesize", "Size limit of the mesh cache in MB", cxxopts::value<int>()->default_value("1024"))
+            ("devicepolicy", "How to pick OpenCL devices when -d is not given: auto (fastest group of identical devices), flops or memory", cxxopts::value<std::string>()->default_value("auto"))
+            ("domains", "Split the grid across this many devices, -r is then the memory per device in MB; the domain split with the least halo traffic is picked automatically", cxxopts::value<int>()->default_value("1"))
+            ("synchalo", "Exchange halos after stream_collide on the whole domain instead of overlapping the exchange with the interior cells (several domains only)", cxxopts::value<bool>()->default_value("false"))
+            ("monitor", "Sample drag and lift every N time steps into a CSV log, needs --FORCE_FIELD (0: off)", cxxopts::value<int>()->default_value("0"))
+            ("monitorlog", "CSV file for --monitor (empty: forces.csv in the export folder)", cxxopts::value<std::string>()->default_value(""))
+            ("converge", "Stop once the mean force coefficients of the last --convergewindow samples change by less than this fraction (0: run to the end)", cxxopts::value<float>()->default_value("0.0"))
+            ("convergewindow", "Number of --monitor samples averaged per convergence check", cxxopts::value<int>()->default_value("10"))
+            ("area", "Reference area in m^2 for the force coefficients (0: chord^2)", cxxopts::value<float>()->default_value("0.0"))
+            ("checkpoint-every", "Write a checkpoint of the full simulation state every N time steps, in the background (0: off)", cxxopts::value<int>()->default_value("0"))
+            ("checkpoint", "Checkpoint file for --checkpoint-every (empty: checkpoint.fxc in the export folder)", cxxopts::value<std::string>()->default_value(""))
+            ("resume", "Continue from this checkpoint instead of initializing; grid, domains, velocity set, FP16 mode and extensions must match", cxxopts::value<std::string>()->default_value(""))
             ("SUBGRID", "Use SUBGRID", cxxopts::value<bool>()->default_value("false"))
             ("VOLUME_FORCE", "Use VOLUME_FORCE", cxxopts::value<bool>()->default_value("false"))
             ("FORCE_FIELD", "Use FORCE_FIELD", cxxopts::value<bool>()->default_value("false"))
@@ -210,23 +233,29 @@ public:
         return "2.16.0-python-phase3";
     }
     
-    // Run the simulation by calling WinMain() directly - just like the .exe does!
-    void run_simulation() {
+    // Copy the parsed arguments into the globals the simulation reads from (same as get_main_arguments() does for the .exe)
+    void apply_globals() {
         if (!parsed) {
             throw std::runtime_error("Arguments not parsed yet. Call parse_args() first.");
         }
         
         // Set the global g_args that the simulation will read from
         g_args = args;
+        set_runtime_features(args);
         
-        // Set main_arguments (some code paths check this)
-        main_arguments = std::vector<std::string>();  // Empty for Python
+        // Set main_arguments: OpenCL device IDs from -d, same as get_main_arguments() (empty: auto-select)
+        main_arguments = std::vector<std::string>();
+        if (args.count("d")) {
+            std::istringstream tokenStream(args["d"].as<std::string>());
+            std::string token;
+            while (std::getline(tokenStream, token, ',')) main_arguments.push_back(token);
+        }
         
         // Set global variables based on parsed arguments
         if (args["FP16S"].as<bool>() || args["FP16C"].as<bool>()) {
-            fpxxsize = 16;
+            fpxxsize = 2;  // Bytes per stored DDF
         } else {
-            fpxxsize = 32;
+            fpxxsize = 4;
         }
         
         if (args["D2Q9"].as<bool>()) {
@@ -248,23 +277,1091 @@ public:
         }
         
         EXPORT_PATH = args["export"].as<std::string>();
+        KERNEL_CACHE_PATH = args["kernelcache"].as<std::string>();
+        KERNEL_CACHE_MB = (uint)std::max(args["kernelcachesize"].as<int>(), 0);
+        PROFILE_TRACE_PATH = args["profiletrace"].as<std::string>();
+        MESH_CACHE_PATH = args["meshcache"].as<std::string>();
+        MESH_CACHE_MB = (uint)std::max(args["meshcachesize"].as<int>(), 0);
+        GRAPHICS_BACKGROUND_COLOR = args["BACKGROUND_COLOR"].as<int>();
         key_P = !args["pause"].as<bool>();  // key_P=true means not paused
+        key_O = args["record"].as<bool>();  // key_O=true means frames are written to EXPORT_PATH
+        running = true;
+    }
+    
+    // Run the simulation.
+    // Windows (default): call WinMain() directly - just like the .exe does!
+    // headless=true (always on Linux/macOS): call main_setup() on this thread with no window, message pump or main_graphics() loop
+    // Returns the last --monitor sample as a dict, or None when the force monitor was off
+    py::object run_simulation(bool headless = false) {
+        apply_globals();
         
-        // Call WinMain() directly - this creates the window and runs everything!
-        // This is EXACTLY what the .exe does when you run it!
 #if defined(_WIN32)
-        HINSTANCE hInstance = GetModuleHandle(NULL);  // Get our module handle
+        if (!headless) {
+            HINSTANCE hInstance = GetModuleHandle(NULL);  // Get our module handle
+            {
+                // Release Python GIL so the Windows message pump can run
+                py::gil_scoped_release release;
+                WinMain(hInstance, NULL, NULL, SW_SHOW);  // Call WinMain directly!
+            }
+            return monitor_result();
+        }
+#endif
+        run_headless();
+        return monitor_result();
+    }
+    
+    // Summary of the drag/lift monitor of the last run
+    py::object monitor_result() const {
+        if (force_monitor.samples == 0ull) return py::none();
+        py::dict result;
+        result["converged"] = force_monitor.converged;
+        result["samples"] = force_monitor.samples;
+        result["t"] = force_monitor.t;
+        result["time_s"] = units.si_t(force_monitor.t);
+        result["Cd"] = force_monitor.coefficients.y;
+        result["Cl"] = force_monitor.coefficients.z;
+        result["Cs"] = force_monitor.coefficients.x;
+        result["force_N"] = py::make_tuple(force_monitor.si_force.x, force_monitor.si_force.y, force_monitor.si_force.z);
+        result["change"] = force_monitor.change;
+        result["log_file"] = force_monitor.log_file;
+        return result;
+    }
+    
+    // apply_globals() plus what a run without a window needs
+    void apply_headless_globals() {
+        apply_globals();
+        camera = Camera(args["FRAME_WIDTH"].as<int>(), args["FRAME_HEIGHT"].as<int>(), 60u);  // offscreen frame buffer for Graphics::write_frame(); width and height must be divisible by 8
+        key_P = true;  // nobody can press P without a window, so never start paused
+    }
+    
+    // Headless run: frames are only rendered offscreen when write_frame() is called (--record), so this works on servers without a display
+    void run_headless() {
+        apply_headless_globals();
         
-        // Release Python GIL so the Windows message pump can run
+        // Release Python GIL for the whole run so other Python threads keep going
         py::gil_scoped_release release;
-        WinMain(hInstance, NULL, NULL, SW_SHOW);  // Call WinMain directly!
-        py::gil_scoped_acquire acquire;
-#else
-        throw std::runtime_error("Interactive graphics only supported on Windows!");
-#endif
+        main_setup();  // not main_physics(), that calls exit(0) when done
+        running = false;
+    }
+    
+    // Parametric sweep: one LBM for all points, per point only the viscosity, units and (for a new angle of attack) the voxelized mesh change
+    // points: list of dicts with any of "re", "u" (m/s) and "aoa" (degrees), missing keys default to the parsed --re/-u/--aoa
+    // Returns one dict per point with the force coefficients of the last --monitor sample
+    py::list run_sweep(py::list points) {
+#ifdef DEMO_CND_WING
+        if (!parsed) throw std::runtime_error("Arguments not parsed yet. Call parse_args() first.");
+        if (!args["FORCE_FIELD"].as<bool>()) throw std::runtime_error("run_sweep() needs --FORCE_FIELD for the force coefficients.");
+        if (args["secs"].as<float>() <= 0.0f && (args["monitor"].as<int>() <= 0 || args["converge"].as<float>() <= 0.0f)) throw std::runtime_error("run_sweep() needs --secs, or --monitor with --converge, to end each point.");
+        std::vector<Sweep_Point> sweep;
+        for (py::handle item : points) {
+            py::dict point = py::cast<py::dict>(item);
+            Sweep_Point p;
+            p.re = args["re"].as<float>();
+            p.u = args["u"].as<float>();
+            p.aoa = args["aoa"].as<float>();
+            for (auto entry : point) {
+                const std::string key = py::cast<std::string>(entry.first);
+                const float value = py::cast<float>(entry.second);
+                if (key == "re") p.re = value;
+                else if (key == "u") p.u = value;
+                else if (key == "aoa") p.aoa = value;
+                else throw std::runtime_error("Unknown sweep parameter \""+key+"\", use re, u and aoa.");
+            }
+            if (!(p.re > 0.0f && p.u > 0.0f)) throw std::runtime_error("Sweep points need re > 0 and u > 0.");
+            sweep.push_back(p);
+        }
+        apply_headless_globals();
+        std::vector<Sweep_Result> results;
+        {
+            py::gil_scoped_release release;
+            results = run_cnd_wing_sweep(sweep);
+            running = false;
+        }
+        py::list table;
+        for (const Sweep_Result& r : results) {
+            py::dict row;
+            row["re"] = r.point.re;
+            row["u"] = r.point.u;
+            row["aoa"] = r.point.aoa;
+            row["nu"] = r.nu;
+            row["t"] = r.t;
+            row["time_s"] = r.si_time;
+            row["samples"] = r.samples;
+            row["converged"] = r.converged;
+            row["change"] = r.change;
+            row["Cd"] = r.coefficients.y;
+            row["Cl"] = r.coefficients.z;
+            row["Cs"] = r.coefficients.x;
+            row["force_N"] = py::make_tuple(r.si_force.x, r.si_force.y, r.si_force.z);
+            row["setup_s"] = r.setup_time;
+            row["run_s"] = r.run_time;
+            table.append(row);
+        }
+        return table;
+#else // DEMO_CND_WING
+        throw std::runtime_error("run_sweep() needs DEMO_CND_WING in defines.hpp.");
+#endif // DEMO_CND_WING
+    }
+};
+
+// Host field -> NumPy: shape (Nz, Ny, Nx) for scalars and (d, Nz, Ny, Nx) for vectors, matching the n = x+(y+z*Ny)*Nx layout with dimensions stacked
+template<typename T> py::array field_to_numpy(LBM::Memory_Container<T>& field, LBM* lbm, py::handle base, const bool read_only) {
+    std::vector<py::ssize_t> shape = { (py::ssize_t)lbm->get_Nz(), (py::ssize_t)lbm->get_Ny(), (py::ssize_t)lbm->get_Nx() };
+    if (field.dimensions() > 1u) shape.insert(shape.begin(), (py::ssize_t)field.dimensions());
+    if (lbm->get_D() == 1u && read_only) {
+        py::array_t<T> view(shape, ((const LBM::Memory_Container<T>&)field).data(), base);  // const data() doesn't mark the field dirty
+        view.attr("flags").attr("writeable") = false;
+        return view;
+    }
+    if (lbm->get_D() == 1u) {
+        return py::array_t<T>(shape, field.data(), base);  // zero-copy view, base keeps the Simulation (and so the buffer) alive; counts as a host write
+    }
+    py::array_t<T> result(shape);  // multiple domains: gather into one array (copy)
+    T* out = result.mutable_data();
+    {
+        py::gil_scoped_release release;
+        field.gather(out);
+    }
+    return result;
+}
+
+// NumPy -> host field (needed when the array is a gathered copy, i.e. D>1)
+template<typename T> void numpy_to_field(LBM::Memory_Container<T>& field, py::array_t<T, py::array::c_style|py::array::forcecast> data) {
+    if ((ulong)data.size() != field.range()) throw std::runtime_error("Array has "+std::to_string(data.size())+" elements, field has "+std::to_string(field.range())+".");
+    const T* in = data.data();
+    if (field.data() == in) return;  // the zero-copy view itself, nothing to copy
+    py::gil_scoped_release release;
+    field.scatter(in);
+}
+
+// Stepwise simulation: the LBM (device memory, compiled kernels) is built once and Python drives it between run() calls
+// FluidX3D keeps its state in globals (g_args, camera, info, units), so only one Simulation can be alive at a time
+class FluidX3DSimulation {
+private:
+    LBM* lbm = nullptr;
+    static inline bool alive = false;
+    ulong checkpoint_every = 0ull;  // --checkpoint-every
+    std::string checkpoint_file;  // --checkpoint
+    
+    void claim(FluidX3DConfig& config) {
+        if (alive) throw std::runtime_error("Only one Simulation can exist at a time. Delete the old one first.");
+        config.apply_headless_globals();
+        checkpoint_every = (ulong)std::max(g_args["checkpoint-every"].as<int>(), 0);
+        checkpoint_file = g_args["checkpoint"].as<std::string>();
+        alive = true;
+    }
+    
+    // Construct the LBM with the GIL released; if that throws, the destructor never runs, so give up the claim here
+    template<typename F> void build(F construct) {
+        try {
+            py::gil_scoped_release release;
+            lbm = construct();
+        } catch (...) {
+            lbm = nullptr;
+            alive = false;
+            throw;
+        }
+        resume();
+    }
+    
+    // --resume: restore the state right after construction, so initialize()/run() continue from there
+    void resume() {
+        const std::string resume_file = g_args["resume"].as<std::string>();
+        if (resume_file == "") return;
+        const std::string error = lbm->read_checkpoint(resume_file);
+        if (error != "") {
+            delete lbm;
+            lbm = nullptr;
+            alive = false;
+            throw std::runtime_error("Can't resume. "+error);
+        }
+    }
+    
+public:
+    // Build the DEMO_CND_WING setup (box, mesh, initial conditions) from the parsed arguments, without running it
+    FluidX3DSimulation(FluidX3DConfig& config) {
+#ifdef DEMO_CND_WING
+        claim(config);
+        build([]() { return setup_cnd_wing(); });
+#else // DEMO_CND_WING
+        throw std::runtime_error("Simulation(config) needs DEMO_CND_WING in defines.hpp. Use Simulation(config, Nx, Ny, Nz, nu) instead.");
+#endif // DEMO_CND_WING
+    }
+    
+    // Empty Nx*Ny*Nz box with kinematic viscosity nu (LBM units), split into Dx*Dy*Dz domains; velocity set and extensions come from the parsed arguments
+    FluidX3DSimulation(FluidX3DConfig& config, uint Nx, uint Ny, uint Nz, float nu, uint Dx, uint Dy, uint Dz) {
+        claim(config);
+        build([&]() { return new LBM(Nx, Ny, Nz, Dx, Dy, Dz, nu); });
+    }
+    
+    ~FluidX3DSimulation() {
+        delete lbm;
+        alive = false;
+    }
+    
+    // With apply_region() setups, host edits of rho/u/flags after the first region are not uploaded by run(), raise instead of exiting in LBM::initialize()
+    void check_host_fields() const {
+        if (lbm->host_fields_changed()) throw std::runtime_error("rho, u or flags were changed on the host after apply_region() but not uploaded. Set host fields before the first apply_region(), or call write_to_device() on them.");
+    }
+
+    // Copy data to the device and run the initialize kernel (same as run(0))
+    void initialize() {
+        check_host_fields();
+        py::gil_scoped_release release;
+        lbm->run(0u);
+    }
+    
+    // Run the given number of time steps (initializes first if needed), with --checkpoint-every a checkpoint is queued at every multiple of the interval
+    void run(ulong steps) {
+        check_host_fields();
+        py::gil_scoped_release release;
+        if (checkpoint_every == 0ull || steps == 0ull) {
+            lbm->run(steps);
+            return;
+        }
+        const ulong end = lbm->get_t()+steps;
+        while (lbm->get_t() < end && running) {
+            lbm->run(std::min(checkpoint_every-lbm->get_t()%checkpoint_every, end-lbm->get_t()));
+            if (lbm->get_t()%checkpoint_every == 0ull) lbm->write_checkpoint(checkpoint_file);
+        }
+    }
+    
+    // Queue a checkpoint of the full simulation state (DDFs, fields, time step) on the background writer
+    void write_checkpoint(const std::string& path) {
+        check_host_fields();
+        py::gil_scoped_release release;
+        lbm->run(0u);  // a checkpoint needs initialized DDFs
+        lbm->write_checkpoint(path);
+    }
+    
+    // Restore a checkpoint; the next run() continues from its time step without initializing
+    void read_checkpoint(const std::string& path) {
+        std::string error;
+        {
+            py::gil_scoped_release release;
+            error = lbm->read_checkpoint(path);
+        }
+        if (error != "") throw std::runtime_error(error);
+    }
+    
+    ulong get_t() const { return lbm->get_t(); }
+    uint get_Nx() const { return lbm->get_Nx(); }
+    uint get_Ny() const { return lbm->get_Ny(); }
+    uint get_Nz() const { return lbm->get_Nz(); }
+    uint get_D() const { return lbm->get_D(); }
+    
+    // Re-initialize from the host fields on the next run() call (time step goes back to 0)
+    void reset() { lbm->reset(); }
+    
+    void finish_queue() {
+        py::gil_scoped_release release;
+        lbm->finish_queue();
+    }
+    
+    // Render the current frame and queue it for background encoding (.png, .qoi or .bmp); waits only if the encoder queue is full
+    void write_frame(const std::string& path, const std::string& extension) {
+#ifdef GRAPHICS
+        if (extension != ".png" && extension != ".qoi" && extension != ".bmp") throw std::runtime_error("Unknown image format \""+extension+"\". Use .png, .qoi or .bmp.");
+        py::gil_scoped_release release;
+        lbm->graphics.write_frame(path, "image", extension);
+#else // GRAPHICS
+        throw std::runtime_error("write_frame() needs GRAPHICS in defines.hpp.");
+#endif // GRAPHICS
+    }
+    
+    // Wait until all queued frames are written to disk
+    void flush_frames() {
+#ifdef GRAPHICS
+        py::gil_scoped_release release;
+        lbm->graphics.flush_frames();
+#endif // GRAPHICS
+    }
+    
+    // Frame export queue metrics
+    py::dict frame_stats() {
+        py::dict stats;
+        stats["queued"] = 0ull; stats["written"] = 0ull; stats["dropped"] = 0ull; stats["in_queue"] = 0u; stats["max_in_queue"] = 0u; stats["stall_seconds"] = 0.0;
+#ifdef GRAPHICS
+        Frame_Encoder* encoder = lbm->graphics.get_encoder();
+        if (encoder != nullptr) {
+            stats["queued"] = encoder->frames_queued;
+            stats["written"] = encoder->frames_written.load();
+            stats["dropped"] = encoder->frames_dropped;
+            stats["in_queue"] = encoder->queued();
+            stats["max_in_queue"] = encoder->max_in_flight;
+            stats["stall_seconds"] = encoder->stall_time;
+        }
+#endif // GRAPHICS
+        return stats;
+    }
+    
+    // Queue a compressed .fxs snapshot of a field; only the device->host copy blocks, slabs are converted, compressed and written by a background thread
+    void write_snapshot(const std::string& name, const std::string& path, const std::string& format, bool compress, bool si_units, bool from_device) {
+        if (format != "raw" && format != "float16" && format != "uint16") throw std::runtime_error("Unknown snapshot format \""+format+"\". Use raw, float16 or uint16.");
+        if (format != "raw" && name == "flags") throw std::runtime_error("flags can only be stored raw.");
+        visit_field(name, [&](auto& field) {
+            py::gil_scoped_release release;
+            if (from_device) field.write_device_to_snapshot(path, format, compress, si_units);
+            else field.write_host_to_snapshot(path, format, compress, si_units);
+        });
+    }
+    
+    // Wait until all queued snapshots are written to disk
+    void flush_snapshots() {
+        py::gil_scoped_release release;
+        lbm->flush_snapshots();
+    }
+    
+    // Snapshot writer metrics
+    py::dict snapshot_stats() {
+        Snapshot_Writer* writer = lbm->get_snapshot_writer();
+        py::dict stats;
+        stats["queued"] = writer->snapshots_queued;
+        stats["written"] = writer->snapshots_written.load();
+        stats["failed"] = writer->snapshots_failed.load();
+        stats["in_queue"] = writer->queued();
+        stats["bytes_raw"] = writer->bytes_raw.load();
+        stats["bytes_written"] = writer->bytes_written.load();
+        stats["write_seconds"] = 1E-6*(double)writer->write_time_us.load();
+        return stats;
+    }
+    
+    // Force, torque and center of mass of the cells flagged exactly flag, summed on the device so only a few KB cross PCIe
+    // Torque is around center (lattice coordinates) if given, otherwise around the center of mass
+    py::dict object_forces(uchar flag, py::object center, bool update) {
+        if (!g_features.force_field) throw std::runtime_error("object_forces() needs --FORCE_FIELD.");
+        Object_Forces result;
+        const bool around_center = !center.is_none();
+        const std::vector<float> c = around_center ? center.cast<std::vector<float>>() : std::vector<float>(3, 0.0f);
+        if (c.size() != 3u) throw std::runtime_error("center must have 3 components (x, y, z)");
+        {
+            py::gil_scoped_release release;
+            if (update) lbm->calculate_force_on_boundaries();
+            result = around_center ? lbm->calculate_object_forces(float3(c[0], c[1], c[2]), flag) : lbm->calculate_object_forces(flag);
+        }
+        py::dict forces;
+        forces["force"] = py::make_tuple(result.force.x, result.force.y, result.force.z);
+        forces["torque"] = py::make_tuple(result.torque.x, result.torque.y, result.torque.z);
+        forces["center_of_mass"] = py::make_tuple(result.center_of_mass.x, result.center_of_mass.y, result.center_of_mass.z);
+        forces["cells"] = result.cells;
+        return forces;
+    }
+    
+    // Set flag, density and/or velocity of the cells in a region directly in device memory, before the first run(); None leaves that field as it is
+    // shape: box (whole box), faces (outermost cell layers, faces from -x +x -y +y -z +z or all), sphere (center, radius), cuboid (center, size), cylinder (center, axis with the cylinder length as its length, radius)
+    void apply_region(const std::string& shape, py::object flag, py::object rho, py::object u, uchar keep, py::object center, py::object size, float radius, py::object axis, py::object faces) {
+        if (lbm->is_initialized()) throw std::runtime_error("apply_region() needs an uninitialized simulation. Call it before run() or after reset().");
+        const auto vector3 = [](py::object value, const char* name) {
+            if (value.is_none()) throw std::runtime_error(std::string(name)+" is needed for this shape");
+            const std::vector<float> v = value.cast<std::vector<float>>();
+            if (v.size() != 3u) throw std::runtime_error(std::string(name)+" must have 3 components (x, y, z)");
+            return float3(v[0], v[1], v[2]);
+        };
+        Region region;
+        if (shape == "box") {
+            region = Region::box();
+        } else if (shape == "faces") {
+            uint mask = 0u;
+            std::vector<std::string> names;
+            if (py::isinstance<py::str>(faces)) {  // "-x +x -y"
+                std::istringstream words(faces.cast<std::string>());
+                for (std::string word; words >> word; ) names.push_back(word);
+            } else if (!faces.is_none()) {
+                names = faces.cast<std::vector<std::string>>();
+            }
+            for (const std::string& name : names) {
+                if (name == "-x") mask |= Region::X0; else if (name == "+x") mask |= Region::X1;
+                else if (name == "-y") mask |= Region::Y0; else if (name == "+y") mask |= Region::Y1;
+                else if (name == "-z") mask |= Region::Z0; else if (name == "+z") mask |= Region::Z1;
+                else if (name == "all") mask |= Region::ALL_FACES;
+                else throw std::runtime_error("Unknown face \""+name+"\". Use -x, +x, -y, +y, -z, +z or all.");
+            }
+            if (mask == 0u) throw std::runtime_error("faces is needed for this shape");
+            region = Region::box_faces(mask);
+        } else if (shape == "sphere") {
+            region = Region::sphere(vector3(center, "center"), radius);
+        } else if (shape == "cuboid") {
+            region = Region::cuboid(vector3(center, "center"), vector3(size, "size"));
+        } else if (shape == "cylinder") {
+            region = Region::cylinder(vector3(center, "center"), vector3(axis, "axis"), radius);
+        } else {
+            throw std::runtime_error("Unknown shape \""+shape+"\". Use box, faces, sphere, cuboid or cylinder.");
+        }
+        if (!flag.is_none()) region.set(flag.cast<uchar>());
+        if (!rho.is_none()) region.set_density(rho.cast<float>());
+        if (!u.is_none()) region.set_velocity(vector3(u, "u"));
+        region.except(keep);
+        py::gil_scoped_release release;
+        lbm->apply_region(region);
+    }
+    
+    // Host time per cell of a setup-style initialization loop, filling a field and gathering it, each through the per-element global index and through the domain-aware bulk path
+    // Overwrites the flags and u host buffers (not the device)
+    py::dict benchmark_host_access() {
+        LBM& lbm = *this->lbm;
+        const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz();
+        const ulong N = lbm.get_N();
+        const auto setup = [&](const auto& n, const uint x, const uint y, const uint z) {  // same body for ulong (stitched) and LBM::Cell (bulk) indices
+            if (z == 0u) lbm.flags[n] = TYPE_S;
+            if (lbm.flags[n] != TYPE_S) lbm.u.y[n] = 0.05f;
+            if (x == 0u || x == Nx-1u || y == 0u || y == Ny-1u || z == Nz-1u) lbm.flags[n] = TYPE_E;
+        };
+        std::vector<uchar> flags_element(N), flags_bulk(N);
+        std::vector<float> u_element(3ull*N), u_bulk(3ull*N);
+        double t[6];
+        bool identical = false;
+        {
+            py::gil_scoped_release release;
+            lbm.flags.fill(0u); lbm.u.fill(0.0f);
+            Clock clock;
+            parallel_for(N, [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z); setup(n, x, y, z); });
+            t[0] = clock.stop();
+            lbm.flags.gather(flags_element.data()); lbm.u.gather(u_element.data());
+            lbm.flags.fill(0u); lbm.u.fill(0.0f);
+            clock.start();
+            lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) { setup(n, x, y, z); });
+            t[1] = clock.stop();
+            lbm.flags.gather(flags_bulk.data()); lbm.u.gather(u_bulk.data());
+            identical = flags_element == flags_bulk && u_element == u_bulk;
+            clock.start();
+            parallel_for(N, [&](ulong n) { lbm.u.x[n] = 0.01f; });
+            t[2] = clock.stop();
+            clock.start();
+            lbm.u.x.fill(0.01f);
+            t[3] = clock.stop();
+            clock.start();
+            parallel_for(lbm.u.range(), [&](ulong i) { u_element[i] = lbm.u[i]; });
+            t[4] = clock.stop();
+            clock.start();
+            lbm.u.gather(u_element.data());
+            t[5] = clock.stop();
+        }
+        py::dict result;
+        result["cells"] = N;
+        result["domains"] = lbm.get_D();
+        result["setup_element_ns"] = 1E9*t[0]/(double)N;  // parallel_for over the global index, Memory_Container decomposes n per access
+        result["setup_cells_ns"] = 1E9*t[1]/(double)N;  // parallel_for_cells(), rows per domain
+        result["fill_element_ns"] = 1E9*t[2]/(double)N;
+        result["fill_ns"] = 1E9*t[3]/(double)N;
+        result["gather_element_ns"] = 1E9*t[4]/(double)N;
+        result["gather_ns"] = 1E9*t[5]/(double)N;
+        result["identical"] = identical;
+        return result;
+    }
+    
+    // Call fn(field) for the named Memory_Container (rho, u, flags, F, phi, T)
+    template<typename Fn> void visit_field(const std::string& name, Fn&& fn) {
+        ulong length = 0ull;
+        if (name == "rho") { length = lbm->rho.length(); if (length) fn(lbm->rho); }
+        else if (name == "u") { length = lbm->u.length(); if (length) fn(lbm->u); }
+        else if (name == "flags") { length = lbm->flags.length(); if (length) fn(lbm->flags); }
+        else if (name == "F") { length = lbm->F.length(); if (length) fn(lbm->F); }
+        else if (name == "phi") { length = lbm->phi.length(); if (length) fn(lbm->phi); }
+        else if (name == "T") { length = lbm->T.length(); if (length) fn(lbm->T); }
+        else throw std::runtime_error("Unknown field \""+name+"\". Use one of rho, u, flags, F, phi, T.");
+        if (length == 0ull) throw std::runtime_error("Field \""+name+"\" is not allocated. Enable its extension (F: --FORCE_FIELD, phi: --SURFACE, T: --TEMPERATURE).");
+    }
+    
+    // Host buffer of a field as a NumPy array (zero-copy view for a single domain, gathered copy for multiple domains)
+    // With apply_region() setups before run(), rho, u and flags are read-only views: run() would not upload edits, and handing out a writable view would mark the field dirty
+    py::array get_field(const std::string& name, py::handle base) {
+        const bool read_only = lbm->setup_on_device() && !lbm->is_initialized() && (name == "rho" || name == "u" || name == "flags");
+        py::array result;
+        visit_field(name, [&](auto& field) { result = field_to_numpy(field, lbm, base, read_only); });
+        return result;
+    }
+    
+    // Copy the field from device to host memory (the NumPy views see the new values)
+    void read_from_device(const std::string& name) {
+        visit_field(name, [&](auto& field) {
+            py::gil_scoped_release release;
+            field.read_from_device();
+        });
+    }
+    
+    // Copy the field from host to device memory, optionally copying data into the host buffer first (needed for D>1)
+    void write_to_device(const std::string& name, py::object data) {
+        visit_field(name, [&](auto& field) {
+            using T = typename std::remove_reference<decltype(field[0])>::type;
+            if (!data.is_none()) numpy_to_field<T>(field, data.cast<py::array_t<T, py::array::c_style|py::array::forcecast>>());
+            py::gil_scoped_release release;
+            field.write_to_device();
+        });
     }
 };
 
+// Triangles of a mesh as (N, 3, 3) array, deletes the mesh
+py::array_t<float> mesh_to_triangles(Mesh* mesh) {
+    py::array_t<float> triangles({ (py::ssize_t)mesh->triangle_number, (py::ssize_t)3, (py::ssize_t)3 });
+    float* data = triangles.mutable_data();
+    parallel_for(mesh->triangle_number, [&](uint i) {
+        const float3 p[3] = { mesh->p0[i], mesh->p1[i], mesh->p2[i] };
+        for (uint v = 0u; v < 3u; v++) {
+            data[9ull*(ulong)i+3u*v   ] = p[v].x;
+            data[9ull*(ulong)i+3u*v+1u] = p[v].y;
+            data[9ull*(ulong)i+3u*v+2u] = p[v].z;
+        }
+    });
+    delete mesh;
+    return triangles;
+}
+
+// Read a binary or ASCII .stl file, triangles as (N, 3, 3) float32 array [triangle, vertex, xyz], vertices scaled by scale and not repositioned
+py::array_t<float> read_stl_triangles(const std::string& path, float scale) {
+    Mesh* mesh = nullptr;
+    std::string error;
+    {
+        py::gil_scoped_release release;
+        mesh = read_stl_raw(path, false, float3(1.0f), float3(0.0f), float3x3(1.0f), -fabs(scale), &error); // same as read_stl(path, scale), but returns an error instead of exiting
+    }
+    if (mesh == nullptr) throw std::runtime_error(error);
+    return mesh_to_triangles(mesh);
+}
+
+// read_stl(path, scale) as it was before the memory-mapped loader: std::ifstream into one buffer with a 32-bit size, binary
+// files only, rotation, bounds and rescaling on one thread; kept as the reference for benchmark_stl_loader.py
+static Mesh* read_stl_legacy(const string& path, const float scale, string& error) {
+    const string filename = create_file_extension(path, ".stl");
+    std::ifstream file(filename, std::ios::in|std::ios::binary);
+    if (file.fail()) { error = "File \""+filename+"\" does not exist!"; return nullptr; }
+    file.seekg(0, std::ios::end);
+    const uint filesize = (uint)file.tellg();
+    file.seekg(0, std::ios::beg);
+    uchar* data = new uchar[filesize];
+    file.read((char*)data, filesize);
+    file.close();
+    const uint triangle_number = filesize>=84u ? ((uint*)data)[20] : 0u;
+    if (triangle_number==0u || filesize!=84u+50u*triangle_number) {
+        delete[] data;
+        error = "File \""+filename+"\" is corrupt or unsupported! Only binary .stl files are supported.";
+        return nullptr;
+    }
+    const float3x3 rotation = float3x3(1.0f);
+    const float3 center = float3(0.0f);
+    Mesh* mesh = new Mesh(triangle_number, center);
+    uint counter = 84u;
+    for (uint i=0u; i<triangle_number; i++) {
+        const float* triangle_data = (float*)(data+counter);
+        counter += 50u;
+        mesh->p0[i] = rotation*float3(triangle_data[ 3], triangle_data[ 4], triangle_data[ 5]);
+        mesh->p1[i] = rotation*float3(triangle_data[ 6], triangle_data[ 7], triangle_data[ 8]);
+        mesh->p2[i] = rotation*float3(triangle_data[ 9], triangle_data[10], triangle_data[11]);
+    }
+    delete[] data;
+    mesh->find_bounds(0u, triangle_number, mesh->pmin, mesh->pmax);
+    for (uint i=0u; i<triangle_number; i++) {
+        mesh->p0[i] = center+fabs(scale)*mesh->p0[i];
+        mesh->p1[i] = center+fabs(scale)*mesh->p1[i];
+        mesh->p2[i] = center+fabs(scale)*mesh->p2[i];
+    }
+    mesh->find_bounds(0u, triangle_number, mesh->pmin, mesh->pmax);
+    return mesh;
+}
+
+py::array_t<float> read_stl_legacy_triangles(const std::string& path, float scale) {
+    Mesh* mesh = nullptr;
+    std::string error;
+    {
+        py::gil_scoped_release release;
+        mesh = read_stl_legacy(path, scale, error);
+    }
+    if (mesh == nullptr) throw std::runtime_error(error);
+    return mesh_to_triangles(mesh);
+}
+
+// Read an .fxs snapshot written by Simulation.write_snapshot(), see Memory_Container::write_snapshot() for the layout
+// z=(start, stop) reads only the slabs of these z layers; float16 and uint16 snapshots are returned as float32
+py::dict read_snapshot(const std::string& filename, py::object z) {
+    std::ifstream file(filename, std::ios::in|std::ios::binary);
+    if (file.fail()) throw std::runtime_error("File \""+filename+"\" does not exist.");
+    char magic[8] = { 0 }, type_code[5] = { 0 }, name_code[17] = { 0 };
+    uint version=0u, Nx=0u, Ny=0u, Nz=0u, d=0u, slab_z=0u, quantized=0u, compressed=0u;
+    ulong t = 0ull;
+    float spacing=0.0f, origin[3] = { 0.0f, 0.0f, 0.0f };
+    file.read(magic, 8);
+    if (std::string(magic, 8) != "FX3DSNAP") throw std::runtime_error("\""+filename+"\" is not a FluidX3D snapshot.");
+    file.read((char*)&version, 4);
+    if (version != 1u) throw std::runtime_error("Snapshot version "+std::to_string(version)+" is not supported.");
+    file.read((char*)&Nx, 4); file.read((char*)&Ny, 4); file.read((char*)&Nz, 4); file.read((char*)&d, 4); file.read((char*)&slab_z, 4); file.read(type_code, 4);
+    file.read((char*)&quantized, 4); file.read((char*)&compressed, 4); file.read((char*)&t, 8); file.read((char*)&spacing, 4); file.read((char*)origin, 12); file.read(name_code, 16);
+    if (file.fail() || slab_z == 0u) throw std::runtime_error("Snapshot \""+filename+"\" is truncated.");
+    const std::string type = type_code;
+    uint z0 = 0u, z1 = Nz;
+    if (!z.is_none()) {
+        const std::vector<uint> range = z.cast<std::vector<uint>>();
+        if (range.size() != 2u || range[0] >= range[1] || range[1] > Nz) throw std::runtime_error("z must be (start, stop) with 0 <= start < stop <= "+std::to_string(Nz));
+        z0 = range[0]; z1 = range[1];
+    }
+    const bool to_float = type == "f2" || quantized;
+    const py::dtype dtype = to_float ? py::dtype("<f4") : py::dtype("<"+type);
+    const size_t stored_size = type == "f2" || type == "u2" || type == "i2" ? 2u : type == "u1" || type == "i1" ? 1u : type == "f8" || type == "u8" || type == "i8" ? 8u : 4u;
+    const size_t out_size = dtype.itemsize();
+    std::vector<py::ssize_t> shape = { (py::ssize_t)(z1-z0), (py::ssize_t)Ny, (py::ssize_t)Nx };
+    if (d > 1u) shape.insert(shape.begin(), (py::ssize_t)d);
+    py::array data(dtype, shape);
+    char* out = (char*)data.mutable_data();
+    {
+        py::gil_scoped_release release;
+        const ulong NxNy = (ulong)Nx*(ulong)Ny, out_cells = NxNy*(ulong)(z1-z0);
+        std::vector<float> parameters(2u*d);
+        std::vector<uchar> payload, raw;
+        for (uint slab_start = 0u; slab_start < z1; slab_start += slab_z) {
+            const uint nz = std::min(slab_z, Nz-slab_start);
+            ulong bytes = 0ull;
+            file.read((char*)&bytes, 8);
+            if (quantized) file.read((char*)parameters.data(), 8u*d);
+            if (file.fail()) throw std::runtime_error("Snapshot \""+filename+"\" is truncated.");
+            if (slab_start+nz <= z0) { // slab before the requested range
+                file.seekg((std::streamoff)bytes, std::ios::cur);
+                continue;
+            }
+            payload.resize(bytes);
+            file.read((char*)payload.data(), (std::streamsize)bytes);
+            if (file.fail()) throw std::runtime_error("Snapshot \""+filename+"\" is truncated.");
+            const ulong cells = NxNy*(ulong)nz, values = cells*(ulong)d;
+            if (compressed) { // inflate, then undo the byte shuffle
+                std::vector<uchar> shuffled;
+                if (lodepng::decompress(shuffled, payload.data(), payload.size()) != 0u || shuffled.size() != values*stored_size) throw std::runtime_error("Snapshot \""+filename+"\" is corrupt.");
+                raw.resize(shuffled.size());
+                for (ulong v = 0ull; v < values; v++) for (size_t b = 0u; b < stored_size; b++) raw[v*stored_size+b] = shuffled[b*values+v];
+            } else {
+                if (payload.size() != values*stored_size) throw std::runtime_error("Snapshot \""+filename+"\" is corrupt.");
+                raw.swap(payload);
+            }
+            const uint a = std::max(slab_start, z0), b = std::min(slab_start+nz, z1); // overlap of slab and requested range
+            for (uint c = 0u; c < d; c++) {
+                for (ulong i = NxNy*(ulong)(a-slab_start); i < NxNy*(ulong)(b-slab_start); i++) {
+                    const ulong source = (ulong)c*cells+i, target = (ulong)c*out_cells+NxNy*(ulong)slab_start+i-NxNy*(ulong)z0; // i starts at layer a>=z0, so no underflow
+                    if (type == "f2") ((float*)out)[target] = half_to_float(((ushort*)raw.data())[source]);
+                    else if (quantized) ((float*)out)[target] = parameters[2u*c]+(float)((ushort*)raw.data())[source]*(parameters[2u*c+1u]-parameters[2u*c])/65535.0f;
+                    else std::memcpy(out+target*out_size, raw.data()+source*stored_size, out_size);
+                }
+            }
+        }
+    }
+    py::dict result;
+    result["name"] = std::string(name_code);
+    result["t"] = t;
+    result["spacing"] = spacing;
+    result["origin"] = py::make_tuple(origin[0], origin[1], origin[2]);
+    result["z"] = py::make_tuple(z0, z1);
+    result["format"] = type == "f2" ? "float16" : quantized ? "uint16" : "raw";
+    result["compressed"] = (bool)compressed;
+    result["data"] = data;
+    return result;
+}
+
+// One OpenCL device as dict, fields as in the device table printed at startup
+py::dict device_to_dict(const Device_Info& d) {
+    py::dict result;
+    result["id"] = d.id;
+    result["name"] = d.name;
+    result["vendor"] = d.vendor;
+    result["driver_version"] = d.driver_version;
+    result["opencl_c_version"] = d.opencl_c_version;
+    result["type"] = d.is_gpu ? "gpu" : d.is_cpu ? "cpu" : "other";
+    result["memory_mb"] = d.memory;
+    result["max_buffer_mb"] = d.max_global_buffer;
+    result["global_cache_kb"] = d.global_cache;
+    result["local_cache_kb"] = d.local_cache;
+    result["compute_units"] = d.compute_units;
+    result["clock_mhz"] = d.clock_frequency;
+    result["cores"] = d.cores;
+    result["tflops"] = d.tflops;
+    result["fp16"] = d.is_fp16_capable > 0u;
+    result["fp64"] = d.is_fp64_capable > 0u;
+    return result;
+}
+
+// All OpenCL devices, an empty list without OpenCL runtime; the platforms are queried once per process unless refresh=True
+py::list list_devices(bool refresh) {
+    std::vector<Device_Info> devices;
+    {
+        py::gil_scoped_release release;
+        devices = get_devices(false, refresh, false);
+    }
+    py::list result;
+    for (const Device_Info& d : devices) result.append(device_to_dict(d));
+    return result;
+}
+
+// All OpenCL devices, for functions that need at least one; get_devices() would exit the interpreter if there is none
+std::vector<Device_Info> require_devices() {
+    const std::vector<Device_Info> devices = get_devices(false, false, false);
+    if (devices.empty()) {
+        throw std::runtime_error("There are no OpenCL devices available. Make sure that the OpenCL 1.2 Runtime for your device is installed.");
+    }
+    return devices;
+}
+
+// Device IDs a simulation with the given number of domains would run on, same rules as -d and --devicepolicy
+std::vector<uint> select_device_ids(uint count, const std::string& policy, const std::vector<uint>& ids) {
+    if (count == 0u) {
+        throw std::runtime_error("count must be at least 1");
+    }
+    if (policy != "auto" && policy != "flops" && policy != "memory") {
+        throw std::runtime_error("Unknown device policy '" + policy + "', use auto, flops or memory");
+    }
+    py::gil_scoped_release release;
+    const std::vector<Device_Info> devices = require_devices();
+    std::vector<std::string> id_strings;
+    for (uint id : ids) {
+        if (id >= (uint)devices.size()) {
+            throw std::runtime_error("Device ID " + std::to_string(id) + " does not exist, there are " + std::to_string(devices.size()) + " device(s)");
+        }
+        id_strings.push_back(std::to_string(id));
+    }
+    std::vector<uint> selected;
+    for (const Device_Info& d : select_devices(count, policy, id_strings, devices)) selected.push_back(d.id);
+    return selected;
+}
+
+// Devices D domains would run on, by -d and --devicepolicy like the LBM constructor; raises for a -d ID that does not exist instead of exiting
+std::vector<Device_Info> select_configured_devices(const uint D, const std::vector<Device_Info>& devices) {
+    for (const std::string& id : main_arguments) {
+        if (to_uint(id) >= (uint)devices.size()) {
+            throw std::runtime_error("Device ID " + id + " does not exist, there are " + std::to_string(devices.size()) + " device(s)");
+        }
+    }
+    return select_devices(D, g_args["devicepolicy"].as<std::string>(), main_arguments, devices);
+}
+
+// Memory plan as a dict, with the fit on each device the simulation would run on; without OpenCL device only the bytes, devices=[] and fits=None
+py::dict plan_to_dict(const Memory_Plan& plan) {
+    const std::vector<Device_Info> available = get_devices(false, false, false);
+    const std::vector<Device_Info> devices = available.empty() ? available : select_configured_devices(plan.get_D(), available);
+    py::dict result;
+    result["N"] = py::make_tuple(plan.Nx, plan.Ny, plan.Nz);
+    result["domains"] = py::make_tuple(plan.Dx, plan.Dy, plan.Dz);
+    result["domain_N"] = py::make_tuple(plan.domain_Nx, plan.domain_Ny, plan.domain_Nz);
+    result["bytes_per_cell_device"] = bytes_per_cell_device();
+    result["bytes_per_cell_host"] = bytes_per_cell_host();
+    result["device_bytes"] = plan.device_bytes;
+    result["host_bytes"] = plan.host_bytes;
+    result["device_mb"] = plan.device_memory();
+    result["host_mb"] = plan.host_memory();
+    result["max_buffer_bytes"] = plan.max_buffer_bytes;
+    result["halo_bytes_per_step"] = plan.halo_bytes;
+    std::map<uint, uint> domains_per_device;  // several domains on one device share its memory
+    for (const Device_Info& d : devices) domains_per_device[d.id]++;
+    py::list fit;
+    bool fits = plan.get_N() > 0ull;
+    for (const Device_Info& d : devices) {
+        if (domains_per_device.count(d.id) == 0u) continue;  // listed once
+        const uint domains = domains_per_device[d.id];
+        domains_per_device.erase(d.id);
+        py::dict device;
+        device["id"] = d.id;
+        device["name"] = d.name;
+        device["domains"] = domains;
+        device["memory_mb"] = d.memory;
+        device["max_buffer_mb"] = d.max_global_buffer;
+        device["required_mb"] = domains * plan.device_memory();
+        device["fits"] = plan.fits(d, domains);
+        device["buffer_fits"] = d.intel_gpu_above_4gb_patch || plan.max_buffer_bytes/1048576ull <= (ulong)d.max_global_buffer;  // drivers may still allow larger buffers
+        fit.append(device);
+        fits = fits && plan.fits(d, domains);
+    }
+    result["devices"] = fit;
+    if (devices.empty()) {
+        result["fits"] = py::none();  // unknown, nothing to check against
+    } else {
+        result["fits"] = fits;
+    }
+    return result;
+}
+
+// Exact device and host memory of a grid split into Dx*Dy*Dz domains, for the velocity set, FP16 mode and extensions in config
+py::dict plan_memory_for(FluidX3DConfig& config, uint Nx, uint Ny, uint Nz, uint Dx, uint Dy, uint Dz, uint particles) {
+    config.apply_globals();
+    if (Dx * Dy * Dz == 0u) {
+        throw std::runtime_error("There has to be at least 1 domain in every direction");
+    }
+    return plan_to_dict(plan_memory(Nx, Ny, Nz, Dx, Dy, Dz, particles));
+}
+
+// Domain split and grid for count devices: the split with the least halo traffic for the given grid, or without a grid the one
+// the wing setup uses for -x/-y/-z and -r MB per device (resolution() on one device, plan_resolution() with --domains)
+py::dict plan_domains_for(FluidX3DConfig& config, uint count, py::object grid, uint memory, uint particles) {
+    config.apply_globals();
+    if (count == 0u) {
+        const std::vector<Device_Info> devices = get_devices(false, false, false);
+        const std::string policy = g_args["devicepolicy"].as<std::string>();
+        if (!main_arguments.empty()) {
+            count = (uint)main_arguments.size();
+        } else if (devices.empty()) {
+            count = 1u;  // no OpenCL device to count, plan for one
+        } else if (policy == "flops" || policy == "memory") {
+            count = (uint)devices.size();
+        } else {
+            const std::string fastest = select_devices(1u, policy, main_arguments, devices)[0].name;  // same group --devicepolicy auto picks from
+            for (const Device_Info& d : devices) count += d.name == fastest;
+        }
+    }
+    Memory_Plan plan;
+    if (!grid.is_none()) {
+        const std::vector<uint> N = grid.cast<std::vector<uint>>();
+        if (N.size() != 3u) {
+            throw std::runtime_error("grid must be (Nx, Ny, Nz)");
+        }
+        plan = plan_domains(N[0], N[1], N[2], count, particles);
+    } else {
+        const float3 box_aspect_ratio = float3(g_args["x"].as<float>(), g_args["y"].as<float>(), g_args["z"].as<float>());
+        if (memory == 0u) memory = g_args["r"].as<unsigned int>();
+        if (count == 1u) {
+            const uint3 N = resolution(box_aspect_ratio, memory);
+            plan = plan_memory(N.x, N.y, N.z, 1u, 1u, 1u, particles);
+        } else {
+            plan = plan_resolution(box_aspect_ratio, memory, count, particles);
+        }
+    }
+    if (plan.get_N() == 0ull) {
+        throw std::runtime_error("No grid fits " + std::to_string(count) + " domain(s) with these settings");
+    }
+    return plan_to_dict(plan);
+}
+
+// Host cost of the extension checks LBM::do_time_step() does once per step (D3Q19, one domain), as cxxopts string lookups vs the resolved RuntimeFeatures
+py::dict benchmark_feature_lookup(FluidX3DConfig& config, ulong steps) {
+    config.apply_globals();
+    volatile uint sink = 0u;
+    Clock clock;
+    for (ulong i = 0ull; i < steps; i++) {
+        sink += g_args["SURFACE"].as<bool>(); sink += g_args["SURFACE"].as<bool>() || g_args["GRAPHICS"].as<bool>(); sink += g_args["SURFACE"].as<bool>();
+        sink += g_args["TEMPERATURE"].as<bool>(); sink += g_args["PARTICLES"].as<bool>(); sink += g_args["UPDATE_FIELDS"].as<bool>();
+    }
+    const double t_args = clock.stop();
+    clock.start();
+    for (ulong i = 0ull; i < steps; i++) {
+        sink += g_features.surface; sink += g_features.surface || g_features.graphics; sink += g_features.surface;
+        sink += g_features.temperature; sink += g_features.particles; sink += g_features.update_fields;
+    }
+    const double t_features = clock.stop();
+    py::dict result;
+    result["g_args_ns_per_step"] = 1E9*t_args/(double)max(steps, 1ull);
+    result["g_features_ns_per_step"] = 1E9*t_features/(double)max(steps, 1ull);
+    return result;
+}
+
+// Turn the kernel profiler on or off; only devices created while it is on (the next Simulation or run) can be profiled
+void set_profiling(bool enabled) {
+    kernel_profiler().enable(enabled);
+}
+
+bool get_profiling() {
+    return kernel_profiler().is_enabled();
+}
+
+// Per kernel/copy statistics of everything profiled since the last reset_profile(), sorted by total device time
+py::list profile_stats() {
+    py::list table;
+    const std::vector<Kernel_Profiler::Stats> stats = kernel_profiler().stats();
+    double total = 0.0;
+    for (const Kernel_Profiler::Stats& s : stats) total += s.total;
+    for (const Kernel_Profiler::Stats& s : stats) {
+        py::dict row;
+        row["name"] = s.name;
+        row["count"] = s.count;
+        row["total_ms"] = 1E3*s.total;
+        row["mean_us"] = 1E6*s.mean;
+        row["p95_us"] = 1E6*s.p95;
+        row["min_us"] = 1E6*s.min;
+        row["max_us"] = 1E6*s.max;
+        row["share"] = total > 0.0 ? s.total/total : 0.0;
+        row["bytes"] = s.bytes;
+        row["bandwidth_gbs"] = s.bandwidth;
+        table.append(row);
+    }
+    return table;
+}
+
+// parallel_for() as it was before the thread pool: fresh threads per call and a std::function call per element
+static void parallel_for_legacy(const ulong N, const uint threads, std::function<void(ulong, uint)> lambda) {
+    vector<thread> thread_array(threads);
+    for (uint t = 0u; t < threads; t++) thread_array[t] = thread([=]() {
+        for (ulong n = N*(ulong)t/(ulong)threads; n < N*(ulong)(t+1u)/(ulong)threads; n++) lambda(n, t);
+    });
+    for (uint t = 0u; t < threads; t++) thread_array[t].join();
+}
+
+// Time a fill and a per-thread reduction over N elements with the legacy parallel_for() vs the thread pool, for each size
+py::list benchmark_parallel_for(std::vector<ulong> sizes, uint repeats) {
+    const uint threads = get_parallel_threads();
+    repeats = max(repeats, 1u);
+    py::list table;
+    for (const ulong N : sizes) {
+        vector<float> data(N);
+        vector<double> sums_legacy(threads, 0.0), sums_pool(threads, 0.0);
+        double t_fill_legacy = 0.0, t_fill_pool = 0.0, t_sum_legacy = 0.0, t_sum_pool = 0.0, t_fill_dynamic = 0.0;
+        for (uint r = 0u; r < repeats; r++) {
+            Clock clock;
+            parallel_for_legacy(N, threads, [&](ulong n, uint t) { data[n] = 0.5f*(float)n+1.0f; });
+            t_fill_legacy += clock.stop();
+            clock.start();
+            parallel_for(N, threads, [&](ulong n, uint t) { data[n] = 0.5f*(float)n+1.0f; });
+            t_fill_pool += clock.stop();
+            clock.start();
+            parallel_for(N, [&](ulong n) { data[n] = 0.5f*(float)n+1.0f; });
+            t_fill_dynamic += clock.stop();
+            std::fill(sums_legacy.begin(), sums_legacy.end(), 0.0);
+            std::fill(sums_pool.begin(), sums_pool.end(), 0.0);
+            clock.start();
+            parallel_for_legacy(N, threads, [&](ulong n, uint t) { sums_legacy[t] += (double)data[n]; });
+            t_sum_legacy += clock.stop();
+            clock.start();
+            parallel_for(N, threads, [&](ulong n, uint t) { sums_pool[t] += (double)data[n]; });
+            t_sum_pool += clock.stop();
+        }
+        py::dict row;
+        row["N"] = N;
+        row["fill_legacy_us"] = 1E6*t_fill_legacy/(double)repeats;
+        row["fill_static_us"] = 1E6*t_fill_pool/(double)repeats;
+        row["fill_dynamic_us"] = 1E6*t_fill_dynamic/(double)repeats;
+        row["sum_legacy_us"] = 1E6*t_sum_legacy/(double)repeats;
+        row["sum_static_us"] = 1E6*t_sum_pool/(double)repeats;
+        row["identical"] = sums_legacy == sums_pool; // same n go to the same t, so the per-thread sums match bit for bit
+        table.append(row);
+    }
+    return table;
+}
+
+// MLUPs and effective bandwidth of stream_collide on an empty box for every velocity set x precision x collision operator x grid size,
+// the same case as the BENCHMARK setup. Sizes are cube edges; D2Q9 runs the square with the same number of cells.
+// Each case is warmed up, then timed repeats times; the median is reported so one slow repeat does not move the result
+py::dict run_benchmark(std::vector<uint> sizes, std::vector<std::string> velocity_sets, std::vector<std::string> precisions, std::vector<std::string> collisions,
+                       int device, ulong steps, ulong warmup, uint repeats, std::vector<std::string> args, const std::string& output, const std::string& baseline, float tolerance) {
+    for (const std::string& v : velocity_sets) {
+        if (v != "D2Q9" && v != "D3Q15" && v != "D3Q19" && v != "D3Q27") throw std::runtime_error("Unknown velocity set \"" + v + "\", use D2Q9, D3Q15, D3Q19 or D3Q27.");
+    }
+    for (const std::string& p : precisions) {
+        if (p != "FP32" && p != "FP16S" && p != "FP16C") throw std::runtime_error("Unknown precision \"" + p + "\", use FP32, FP16S or FP16C.");
+    }
+    for (const std::string& c : collisions) {
+        if (c != "SRT" && c != "TRT") throw std::runtime_error("Unknown collision operator \"" + c + "\", use SRT or TRT.");
+    }
+    for (const uint N : sizes) {
+        if (N < 2u) throw std::runtime_error("Benchmark grid sizes have to be at least 2.");
+    }
+    if (steps == 0ull) throw std::runtime_error("benchmark() needs steps > 0.");
+    repeats = std::max(repeats, 1u);
+    const std::vector<Device_Info> devices = require_devices();  // new drivers and CPU runtimes may have none, raise before the sweep instead of exiting in it
+    if (device >= (int)devices.size()) {
+        throw std::runtime_error("Device ID " + std::to_string(device) + " does not exist, there are " + std::to_string(devices.size()) + " device(s)");
+    }
+
+    py::dict result;
+    py::list rows;
+    py::object device_info = py::none();
+    for (const uint N : sizes) {
+        for (const std::string& v : velocity_sets) {
+            for (const std::string& p : precisions) {
+                for (const std::string& c : collisions) {
+                    std::vector<std::string> case_args = args;
+                    case_args.push_back("--" + v);
+                    case_args.push_back("--" + c);
+                    if (p != "FP32") case_args.push_back("--" + p);
+                    if (device >= 0) { case_args.push_back("-d"); case_args.push_back(std::to_string(device)); }
+                    FluidX3DConfig config;
+                    config.parse_args(case_args);
+                    config.apply_globals();
+                    const uint side = v == "D2Q9" ? (uint)std::lround(std::sqrt((double)N*(double)N*(double)N)) : N;
+                    const uint Nx = side, Ny = side, Nz = v == "D2Q9" ? 1u : N;
+                    const Device_Info selected = select_configured_devices(1u, devices)[0];  // raises for a -d in args that does not exist
+                    if (device_info.is_none()) device_info = device_to_dict(selected);
+                    py::dict row;
+                    row["velocity_set"] = v;
+                    row["precision"] = p;
+                    row["collision"] = c;
+                    row["N"] = py::make_tuple(Nx, Ny, Nz);
+                    row["cells"] = (ulong)Nx*(ulong)Ny*(ulong)Nz;
+                    row["bytes_per_cell"] = bandwidth_bytes_per_cell_device();
+                    const Memory_Plan plan = plan_memory(Nx, Ny, Nz, 1u, 1u, 1u);
+                    if (!plan.fits(selected)) {
+                        row["status"] = "skipped";
+                        row["reason"] = "needs " + std::to_string(plan.device_memory()) + " MB, " + selected.name + " has " + std::to_string(selected.memory) + " MB";
+                        rows.append(row);
+                        continue;
+                    }
+                    std::vector<double> mlups;
+                    {
+                        FluidX3DSimulation sim(config, Nx, Ny, Nz, 1.0f, 1u, 1u, 1u);
+                        sim.initialize();
+                        if (warmup > 0ull) sim.run(warmup);
+                        for (uint r = 0u; r < repeats; r++) {
+                            Clock clock;
+                            sim.run(steps);
+                            mlups.push_back(1E-6*(double)plan.get_N()*(double)steps/clock.stop());
+                        }
+                    }
+                    std::sort(mlups.begin(), mlups.end());
+                    const double median = repeats%2u ? mlups[repeats/2u] : 0.5*(mlups[repeats/2u-1u]+mlups[repeats/2u]);
+                    row["status"] = "ok";
+                    row["mlups"] = median;
+                    row["mlups_min"] = mlups.front();
+                    row["mlups_max"] = mlups.back();
+                    row["bandwidth_gbs"] = 1E-3*median*(double)bandwidth_bytes_per_cell_device();
+                    rows.append(row);
+                }
+            }
+        }
+    }
+
+    py::module_ json = py::module_::import("json");
+    py::module_ builtins = py::module_::import("builtins");
+    py::dict settings;
+    settings["steps"] = steps;
+    settings["warmup"] = warmup;
+    settings["repeats"] = repeats;
+    settings["args"] = args;
+    result["version"] = "2.16.0-python-phase3";
+    result["date"] = py::module_::import("datetime").attr("datetime").attr("now")().attr("isoformat")();
+    result["host"] = py::module_::import("platform").attr("platform")();
+    result["device"] = device_info;
+    result["settings"] = settings;
+    result["results"] = rows;
+
+    if (baseline != "") {  // compare against an earlier output file, matched by velocity set, precision, collision operator and cells
+        py::object file = builtins.attr("open")(baseline, "r");
+        py::dict reference = json.attr("load")(file);
+        file.attr("close")();
+        std::map<std::string, double> baseline_mlups;
+        for (py::handle entry : reference["results"]) {
+            py::dict e = py::reinterpret_borrow<py::dict>(entry);
+            if (e["status"].cast<std::string>() != "ok") continue;
+            baseline_mlups[e["velocity_set"].cast<std::string>() + " " + e["precision"].cast<std::string>() + " " + e["collision"].cast<std::string>() + " " + std::to_string(e["cells"].cast<ulong>())] = e["mlups"].cast<double>();
+        }
+        uint regressions = 0u;
+        for (py::handle entry : rows) {
+            py::dict row = py::reinterpret_borrow<py::dict>(entry);
+            if (row["status"].cast<std::string>() != "ok") continue;
+            const std::string key = row["velocity_set"].cast<std::string>() + " " + row["precision"].cast<std::string>() + " " + row["collision"].cast<std::string>() + " " + std::to_string(row["cells"].cast<ulong>());
+            if (baseline_mlups.count(key) == 0u) {
+                row["baseline_mlups"] = py::none();
+                continue;
+            }
+            const double change = row["mlups"].cast<double>()/baseline_mlups[key]-1.0;
+            row["baseline_mlups"] = baseline_mlups[key];
+            row["change"] = change;
+            row["regression"] = change < -(double)tolerance;
+            regressions += change < -(double)tolerance;
+        }
+        py::dict compared;
+        compared["file"] = baseline;
+        compared["tolerance"] = tolerance;
+        compared["device"] = reference.contains("device") && !reference["device"].is_none() ? reference["device"]["name"] : py::object(py::none());
+        compared["same_device"] = !device_info.is_none() && compared["device"].equal(device_info["name"]);
+        result["baseline"] = compared;
+        result["regressions"] = regressions;
+    }
+
+    if (output != "") {
+        py::object file = builtins.attr("open")(output, "w");
+        json.attr("dump")(result, file, py::arg("indent") = 2);
+        file.attr("close")();
+    }
+    return result;
+}
+
 // Python module definition
 PYBIND11_MODULE(fluidx3d, m) {
     m.doc() = "FluidX3D - Lattice Boltzmann CFD Python module (Phase 2: Full argument parsing)";
@@ -296,7 +1393,152 @@ PYBIND11_MODULE(fluidx3d, m) {
         .def("get_version", &FluidX3DConfig::get_version,
              "Get module version")
         .def("run_simulation", &FluidX3DConfig::run_simulation,
-             "Run the FluidX3D simulation (calls main_setup())");
+             "Run the FluidX3D simulation (calls main_setup()). headless=True skips the window and is always used outside Windows. Returns the last --monitor drag/lift sample as a dict, or None without --monitor",
+             py::arg("headless") = false)
+        .def("run_sweep", &FluidX3DConfig::run_sweep,
+             "Run the wing setup headless for a list of points ({'re', 'u', 'aoa'} dicts, missing keys use the parsed values) on one LBM: kernels are compiled and memory is allocated once, per point only viscosity, units and geometry change. Needs --FORCE_FIELD. Returns one dict per point with Cd/Cl/Cs, time steps and wall times",
+             py::arg("points"));
+    
+    py::class_<FluidX3DSimulation>(m, "Simulation")
+        .def(py::init<FluidX3DConfig&>(),
+             "Build the simulation from parsed arguments without running it",
+             py::arg("config"))
+        .def(py::init<FluidX3DConfig&, uint, uint, uint, float, uint, uint, uint>(),
+             "Empty Nx*Ny*Nz box with kinematic viscosity nu (LBM units), split into Dx*Dy*Dz domains",
+             py::arg("config"), py::arg("Nx"), py::arg("Ny"), py::arg("Nz"), py::arg("nu"), py::arg("Dx") = 1u, py::arg("Dy") = 1u, py::arg("Dz") = 1u)
+        .def("initialize", &FluidX3DSimulation::initialize,
+             "Copy data to the device and run the initialize kernel")
+        .def("run", &FluidX3DSimulation::run,
+             "Run time steps (GIL released)",
+             py::arg("steps") = 1ull)
+        .def("get_t", &FluidX3DSimulation::get_t,
+             "Get current time step")
+        .def("get_Nx", &FluidX3DSimulation::get_Nx, "Get lattice size in x")
+        .def("get_Ny", &FluidX3DSimulation::get_Ny, "Get lattice size in y")
+        .def("get_Nz", &FluidX3DSimulation::get_Nz, "Get lattice size in z")
+        .def("get_D", &FluidX3DSimulation::get_D, "Get number of domains")
+        .def("reset", &FluidX3DSimulation::reset,
+             "Re-initialize from the host fields on the next run() call")
+        .def("finish_queue", &FluidX3DSimulation::finish_queue,
+             "Wait until all queued device work has finished")
+        .def("get_field", [](py::object self, const std::string& name) { return self.cast<FluidX3DSimulation&>().get_field(name, self); },
+             "Host buffer of a field (rho, u, flags, F, phi, T) as NumPy array: zero-copy view for one domain, gathered copy for several. "
+             "After apply_region() and before run(), the rho, u and flags views are read-only; change them with write_to_device(name, data)",
+             py::arg("name"))
+        .def_property_readonly("rho", [](py::object self) { return self.cast<FluidX3DSimulation&>().get_field("rho", self); },
+             "Density, shape (Nz, Ny, Nx)")
+        .def_property_readonly("u", [](py::object self) { return self.cast<FluidX3DSimulation&>().get_field("u", self); },
+             "Velocity, shape (3, Nz, Ny, Nx)")
+        .def_property_readonly("flags", [](py::object self) { return self.cast<FluidX3DSimulation&>().get_field("flags", self); },
+             "Cell flags (TYPE_*), shape (Nz, Ny, Nx)")
+        .def_property_readonly("F", [](py::object self) { return self.cast<FluidX3DSimulation&>().get_field("F", self); },
+             "Force on boundary cells (--FORCE_FIELD), shape (3, Nz, Ny, Nx)")
+        .def("read_from_device", &FluidX3DSimulation::read_from_device,
+             "Copy a field from device to host memory",
+             py::arg("name"))
+        .def("write_to_device", &FluidX3DSimulation::write_to_device,
+             "Copy a field from host to device memory; pass data to copy an array into the host buffer first (needed for several domains)",
+             py::arg("name"), py::arg("data") = py::none())
+        .def("write_frame", &FluidX3DSimulation::write_frame,
+             "Render the current frame and write it in the background (empty path: --export folder)",
+             py::arg("path") = "", py::arg("extension") = ".png")
+        .def("flush_frames", &FluidX3DSimulation::flush_frames,
+             "Wait until all queued frames are written to disk")
+        .def("frame_stats", &FluidX3DSimulation::frame_stats,
+             "Frame export metrics: queued, written, dropped, in_queue, max_in_queue, stall_seconds")
+        .def("write_snapshot", &FluidX3DSimulation::write_snapshot,
+             "Write a field as .fxs snapshot in the background (empty path: --export folder). format: raw, float16 or uint16 (quantized per slab); "
+             "compress=True deflates every slab. Only the device->host copy blocks; the host buffer must not be changed until flush_snapshots()",
+             py::arg("name"), py::arg("path") = "", py::arg("format") = "raw", py::arg("compress") = true, py::arg("si_units") = true, py::arg("from_device") = true)
+        .def("flush_snapshots", &FluidX3DSimulation::flush_snapshots,
+             "Wait until all queued snapshots and checkpoints are written to disk")
+        .def("write_checkpoint", &FluidX3DSimulation::write_checkpoint,
+             "Write the full simulation state (.fxc) in the background (empty path: checkpoint.fxc in the --export folder); only the device->host copy blocks",
+             py::arg("path") = "")
+        .def("read_checkpoint", &FluidX3DSimulation::read_checkpoint,
+             "Restore a checkpoint; grid, domains, velocity set, FP16 mode and extensions must match. The next run() continues without initializing",
+             py::arg("path"))
+        .def("snapshot_stats", &FluidX3DSimulation::snapshot_stats,
+             "Snapshot writer metrics: queued, written, failed, in_queue, bytes_raw, bytes_written, write_seconds")
+        .def("object_forces", &FluidX3DSimulation::object_forces,
+             "Force, torque and center of mass (LBM units, lattice coordinates) of the cells flagged exactly flag, reduced on the device (--FORCE_FIELD). "
+             "Torque is around center if given, else around the center of mass. update=True recomputes the boundary forces first",
+             py::arg("flag") = (uchar)TYPE_S, py::arg("center") = py::none(), py::arg("update") = true)
+        .def("apply_region", &FluidX3DSimulation::apply_region,
+             "Set flag, density and/or velocity (LBM units) of the cells in a region directly in device memory, with no host loop and no upload in initialize(). "
+             "Call before the first run(). shape: box, faces (faces='-x +x ...' or 'all'), sphere (center, radius), cuboid (center, size), cylinder (center, axis, radius); "
+             "coordinates are lattice cells. Cells with any of the keep flags are left untouched. The host fields see the result after read_from_device()",
+             py::arg("shape"), py::arg("flag") = py::none(), py::arg("rho") = py::none(), py::arg("u") = py::none(), py::arg("keep") = (uchar)0u,
+             py::arg("center") = py::none(), py::arg("size") = py::none(), py::arg("radius") = 0.0f, py::arg("axis") = py::none(), py::arg("faces") = py::none())
+        .def("benchmark_host_access", &FluidX3DSimulation::benchmark_host_access,
+             "Host ns per cell of a setup-style initialization loop, a fill and a gather, per element through the global index vs domain-aware bulk iteration. Overwrites the flags and u host buffers");
+    
+    m.def("read_stl", &read_stl_triangles,
+          "Read a binary or ASCII .stl file as (N, 3, 3) float32 array of triangle vertices",
+          py::arg("path"), py::arg("scale") = 1.0f);
+    m.def("read_stl_legacy", &read_stl_legacy_triangles,
+          "read_stl() as it was before the memory-mapped parallel loader (std::ifstream, binary only, one thread), the reference for benchmark_stl_loader.py",
+          py::arg("path"), py::arg("scale") = 1.0f);
+    m.def("read_snapshot", &read_snapshot,
+          "Read an .fxs snapshot as dict (name, t, spacing, origin, z, format, compressed, data); data has shape (Nz, Ny, Nx) or (d, Nz, Ny, Nx), z=(start, stop) reads only these layers",
+          py::arg("filename"), py::arg("z") = py::none());
+    m.def("get_devices", &list_devices,
+          "List OpenCL devices as dicts (id, name, vendor, type, memory_mb, compute_units, cores, tflops, fp16, fp64, ...), empty without OpenCL runtime or device",
+          py::arg("refresh") = false);
+    m.def("select_devices", &select_device_ids,
+          "Device IDs a simulation with count domains would use: the given ids, or picked by policy auto, flops or memory. Raises RuntimeError without OpenCL device",
+          py::arg("count") = 1u, py::arg("policy") = "auto", py::arg("ids") = std::vector<uint>());
+    m.def("plan_memory", &plan_memory_for,
+          "Exact device and host memory of an Nx*Ny*Nz grid split into Dx*Dy*Dz domains for the flags in config, and whether it fits the devices it would run on (without OpenCL device: devices=[], fits=None)",
+          py::arg("config"), py::arg("Nx"), py::arg("Ny"), py::arg("Nz"), py::arg("Dx") = 1u, py::arg("Dy") = 1u, py::arg("Dz") = 1u, py::arg("particles") = 0u);
+    m.def("plan_domains", &plan_domains_for,
+          "Domain split with the least halo traffic for count devices (0: -d or all devices --devicepolicy could use), for grid=(Nx, Ny, Nz) or the largest grid of -x/-y/-z with memory MB per device (0: -r)",
+          py::arg("config"), py::arg("count") = 0u, py::arg("grid") = py::none(), py::arg("memory") = 0u, py::arg("particles") = 0u);
+    m.def("benchmark_feature_lookup", &benchmark_feature_lookup,
+          "Time the per-step extension checks as g_args string lookups vs cached RuntimeFeatures (ns per step)",
+          py::arg("config"), py::arg("steps") = 1000000ull);
+    m.def("set_threads", &set_parallel_threads,
+          "Set the number of CPU threads for host loops (setup, mesh transforms, exports, reductions), 0: all CPU cores",
+          py::arg("threads") = 0u);
+    m.def("get_threads", &get_parallel_threads,
+          "Number of CPU threads used for host loops");
+    m.def("benchmark", &run_benchmark,
+          "MLUPs and effective GB/s of an empty box for every size x velocity set x precision x collision operator on one device (-1: same choice as -d/--devicepolicy). "
+          "Sizes are cube edges, D2Q9 runs the square with as many cells. Each case runs warmup steps, then steps timed repeats times; the median is reported. "
+          "Returns a dict with device, host and settings metadata and one result per case; output writes it as JSON. baseline compares with an earlier output "
+          "and flags cases that are more than tolerance slower (regression, change); regressions counts them. args are extra command line arguments for every case",
+          py::arg("sizes") = std::vector<uint>{ 128u }, py::arg("velocity_sets") = std::vector<std::string>{ "D2Q9", "D3Q15", "D3Q19", "D3Q27" },
+          py::arg("precisions") = std::vector<std::string>{ "FP32", "FP16S", "FP16C" }, py::arg("collisions") = std::vector<std::string>{ "SRT", "TRT" },
+          py::arg("device") = -1, py::arg("steps") = 200ull, py::arg("warmup") = 50ull, py::arg("repeats") = 5u, py::arg("args") = std::vector<std::string>(),
+          py::arg("output") = "", py::arg("baseline") = "", py::arg("tolerance") = 0.05f);
+    m.def("set_profiling", &set_profiling,
+          "Time every kernel run and buffer copy with OpenCL profiling events (same as --profile). Takes effect for devices created afterwards, so call it before Simulation() or run_simulation()",
+          py::arg("enabled") = true);
+    m.def("get_profiling", &get_profiling,
+          "Whether the kernel profiler is on");
+    m.def("profile_stats", &profile_stats,
+          "Per kernel/copy dicts (name, count, total_ms, mean_us, p95_us, min_us, max_us, share, bytes, bandwidth_gbs), sorted by device time. "
+          "bandwidth_gbs is 0 where the traffic per run is unknown; for stream_collide it is based on the same bytes per cell as the MLUPs line. "
+          "p95_us is exact up to 4096 runs per kernel, past that it comes from a uniform sample of 4096 runs");
+    m.def("export_trace", [](const std::string& filename) { return kernel_profiler().export_trace(filename); },
+          "Write the profiled runs as Chrome trace JSON (chrome://tracing, ui.perfetto.dev), one process per device and one thread per queue; returns the number of events. "
+          "The timeline keeps the first 1000000 runs, the statistics cover all of them",
+          py::arg("filename"));
+    m.def("reset_profile", []() { kernel_profiler().reset(); },
+          "Clear the profiler statistics and timeline");
+    m.def("benchmark_parallel_for", &benchmark_parallel_for,
+          "Time a fill and a per-thread reduction for each size N with the old parallel_for (fresh threads, std::function per element) vs the thread pool (static and dynamic schedule), in us per loop",
+          py::arg("sizes") = std::vector<ulong>{ 1000ull, 100000ull, 10000000ull }, py::arg("repeats") = 20u);
+    
+    // Cell flags, for Simulation.flags and object_forces()
+    m.attr("TYPE_S") = (uchar)TYPE_S;
+    m.attr("TYPE_E") = (uchar)TYPE_E;
+    m.attr("TYPE_T") = (uchar)TYPE_T;
+    m.attr("TYPE_F") = (uchar)TYPE_F;
+    m.attr("TYPE_I") = (uchar)TYPE_I;
+    m.attr("TYPE_G") = (uchar)TYPE_G;
+    m.attr("TYPE_X") = (uchar)TYPE_X;
+    m.attr("TYPE_Y") = (uchar)TYPE_Y;
     
     // Module-level version info
     m.attr("__version__") = "2.16.0-python-phase3";
@@ -44,7 +44,7 @@ void main_setup() { // 3D Taylor-Green vortices; 					required extensions in def
 	// ################################################################## define simulation box size, viscosity and volume force ###################################################################
 	LBM lbm(128u, 128u, 128u, 1u, 1u, 1u, 0.01f);
 	// ###################################################################################### define geometry ######################################################################################
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		const float A = 0.25f;
 		const uint periodicity = 1u;
 		const float a=(float)Nx/(float)periodicity, b=(float)Ny/(float)periodicity, c=(float)Nz/(float)periodicity;
@@ -68,7 +68,7 @@ void main_setup() { // 2D Taylor-Green vortices (use D2Q9); 				required extensi
 	// ################################################################## define simulation box size, viscosity and volume force ###################################################################
 	LBM lbm(1024u, 1024u, 1u, 0.02f);
 	// ###################################################################################### define geometry ######################################################################################
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		const float A = 0.2f;
 		const uint periodicity = 5u;
 		const float a=(float)Nx/(float)periodicity, b=(float)Ny/(float)periodicity;
@@ -99,7 +99,7 @@ void main_setup() { // Poiseuille flow validation; 					required extensions in d
 	LBM lbm(lcm(H, WORKGROUP_SIZE)/H, H, 1u, nu, units.f_from_u_Poiseuille_2D(umax, 1.0f, nu, R), 0.0f, 0.0f); // 2D
 #endif // D2Q9
 	// ###################################################################################### define geometry ######################################################################################
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 #ifndef D2Q9
 		if(!cylinder(x, y, z, lbm.center(), float3(0u, Ny, 0u), 0.5f*(float)min(Nx, Nz)-1.0f)) lbm.flags[n] = TYPE_S; // 3D
 #else // D2Q9
@@ -162,7 +162,7 @@ void main_setup() { // Stokes drag validation; 						required extensions in defi
 	const float u = units.u_from_Re(Re, 2.0f*R, nu); // velocity
 	LBM lbm(L, L, L, nu); // flow driven by equilibrium boundaries
 	// ###################################################################################### define geometry ######################################################################################
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		if(x==0u||x==Nx-1u||y==0u||y==Ny-1u||z==0u||z==Nz-1u) lbm.flags[n] = TYPE_E;
 		if(sphere(x, y, z, lbm.center(), R)) {
 			lbm.flags[n] = TYPE_S|TYPE_X; // flag boundary cells for force summation additionally with TYPE_X
@@ -207,7 +207,7 @@ void main_setup() { // cylinder in rectangular duct; 					required extensions in
 	const float f = units.f_from_u_rectangular_duct(w, D, 1.0f, nu, u);
 	LBM lbm(to_uint(w), to_uint(l), to_uint(h), nu, 0.0f, f, 0.0f);
 	// ###################################################################################### define geometry ######################################################################################
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		lbm.u.y[n] = 0.1f*u;
 		if(cylinder(x, y, z, float3(lbm.center().x, 2.0f*D, lbm.center().z), float3(Nx, 0u, 0u), 0.5f*D)) lbm.flags[n] = TYPE_S;
 		if(x==0u||x==Nx-1u||z==0u||z==Nz-1u) lbm.flags[n] = TYPE_S; // x and z non periodic
@@ -226,7 +226,7 @@ void main_setup() { // Taylor-Couette flow; 						required extensions in defines
 	const uint threads = (uint)thread::hardware_concurrency();
 	vector<uint> seed(threads);
 	for(uint t=0u; t<threads; t++) seed[t] = 42u+t;
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), threads, [&](ulong n, uint t) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells(threads, [&](const LBM::Cell& n, const uint x, const uint y, const uint z, const uint t) {
 		if(!cylinder(x, y, z, lbm.center(), float3(0u, 0u, Nz), (float)(Nx/2u-1u))) lbm.flags[n] = TYPE_S;
 		if( cylinder(x, y, z, lbm.center(), float3(0u, 0u, Nz), (float)(Nx/4u   ))) {
 			const float3 relative_position = lbm.relative_position(n);
@@ -251,7 +251,7 @@ void main_setup() { // lid-driven cavity; 						required extensions in defines.h
 	const float u = 0.1f;
 	LBM lbm(L, L, L, units.nu_from_Re(Re, (float)(L-2u), u));
 	// ###################################################################################### define geometry ######################################################################################
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		if(z==Nz-1) lbm.u.y[n] = u;
 		if(x==0u||x==Nx-1u||y==0u||y==Ny-1u||z==0u||z==Nz-1u) lbm.flags[n] = TYPE_S; // all non periodic
 	}); // ####################################################################### run simulation, export images and data ##########################################################################
@@ -269,7 +269,7 @@ void main_setup() { // 2D Karman vortex street; 					required extensions in defi
 	const float u = 0.10f;
 	LBM lbm(16u*R, 32u*R, 1u, units.nu_from_Re(Re, 2.0f*(float)R, u));
 	// ###################################################################################### define geometry ######################################################################################
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		if(cylinder(x, y, z, float3(Nx/2u, Ny/4u, Nz/2u), float3(0u, 0u, Nz), (float)R)) lbm.flags[n] = TYPE_S;
 		else lbm.u.y[n] = u;
 		if(x==0u||x==Nx-1u||y==0u||y==Ny-1u) lbm.flags[n] = TYPE_E; // all non periodic
@@ -295,7 +295,7 @@ void main_setup() { // particle test; 							required extensions in defines.hpp:
 		lbm.particles->y[n] = random_symmetric(seed, 0.5f*lbm.size().y/4.0f);
 		lbm.particles->z[n] = random_symmetric(seed, 0.5f*lbm.size().z/4.0f);
 	}
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		if(z==Nz-1) lbm.u.y[n] = u;
 		if(x==0u||x==Nx-1u||y==0u||y==Ny-1u||z==0u||z==Nz-1u) lbm.flags[n] = TYPE_S; // all non periodic
 	}); // ####################################################################### run simulation, export images and data ##########################################################################
@@ -317,7 +317,7 @@ void main_setup() { // delta wing; 							required extensions in defines.hpp: FP
 	const float3 p0 = offset+float3(  0*(int)L/64,  5*(int)L/64,  20*(int)L/64);
 	const float3 p1 = offset+float3(-20*(int)L/64, 90*(int)L/64, -10*(int)L/64);
 	const float3 p2 = offset+float3(+20*(int)L/64, 90*(int)L/64, -10*(int)L/64);
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		if(triangle(x, y, z, p0, p1, p2)) lbm.flags[n] = TYPE_S;
 		else lbm.u.y[n] = u;
 		if(x==0u||x==Nx-1u||y==0u||y==Ny-1u||z==0u||z==Nz-1u) lbm.flags[n] = TYPE_E; // all non periodic
@@ -358,7 +358,7 @@ void main_setup() { // NASA Common Research Model; 					required extensions in d
 	mesh->translate(float3(0.0f, -0.5f*lbm.size().y+mesh->pmax.y+0.5f*(lbm.size().x-(mesh->pmax.x-mesh->pmin.x)), 0.0f));
 	mesh->translate(lbm.center());
 	lbm.voxelize_mesh_on_device(mesh);
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		if(lbm.flags[n]!=TYPE_S) lbm.u.y[n] = u;
 		if(x==0u||x==Nx-1u||y==0u||y==Ny-1u||z==0u||z==Nz-1u) lbm.flags[n] = TYPE_E; // all non periodic
 	}); // ####################################################################### run simulation, export images and data ##########################################################################
@@ -395,7 +395,7 @@ void main_setup() { // Concorde; 							required extensions in defines.hpp: FP16
 #else
 	lbm.voxelize_stl(get_exe_path()+"../stl/concord_cut_large.stl", center, rotation, lbm_length); // https://www.thingiverse.com/thing:1176931/files
 #endif
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		if(lbm.flags[n]!=TYPE_S) lbm.u.y[n] = lbm_u;
 		if(x==0u||x==Nx-1u||y==0u||y==Ny-1u||z==0u||z==Nz-1u) lbm.flags[n] = TYPE_E; // all non periodic
 	}); // ####################################################################### run simulation, export images and data ##########################################################################
@@ -461,7 +461,7 @@ void main_setup() { // from Boeing 747; 						required extensions in defines.hpp
 	//lbm.voxelize_stl(get_exe_path()+"../stl/Glider_Nosedown.stl", center, rotation, size); // https://www.thingiverse.com/thing:2772812/files
 	lbm.voxelize_stl(g_args["f"].as<std::string>(), center, rotation, size);
 #endif
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		if(lbm.flags[n]!=TYPE_S) lbm.u.y[n] = lbm_u;
 		if(x==0u||x==Nx-1u||y==0u||y==Ny-1u||z==0u||z==Nz-1u) lbm.flags[n] = TYPE_E; // all non periodic
 	}); // ####################################################################### run simulation, export images and data ##########################################################################
@@ -469,9 +469,10 @@ void main_setup() { // from Boeing 747; 						required extensions in defines.hpp
 #if defined(GRAPHICS) && !defined(INTERACTIVE_GRAPHICS)
 	lbm.graphics.set_camera_free(float3(1.0f*(float)Nx, -0.4f*(float)Ny, 2.0f*(float)Nz), -33.0f, 42.0f, 68.0f);	//
 	lbm.run(0u); // initialize simulation
+	const float video_length = g_args["s"].as<float>(); // seconds of --fps video
 	while(lbm.get_t()<lbm_T) { // main simulation loop
-		if(lbm.graphics.next_frame(lbm_T, g_args["s"].as<float>())) lbm.graphics.write_frame(); // render enough frames 10 seconds of 60fps video
-		lbm.run(1u);
+		if(lbm.graphics.next_frame(lbm_T, video_length)) lbm.graphics.write_frame(); // render enough frames for video_length seconds of --fps video
+		lbm.run(min(lbm.graphics.steps_to_next_frame(lbm_T, video_length), lbm_T-lbm.get_t())); // all time steps up to the next frame in one batch
 	}
 #else // GRAPHICS && !INTERACTIVE_GRAPHICS
 	lbm.run();
@@ -501,7 +502,7 @@ void main_setup() { // Boeing 747; 							required extensions in defines.hpp: FP
 #else
 	lbm.voxelize_stl(get_exe_path()+"../stl/techtris_airplane.stl", center, rotation, size); // https://www.thingiverse.com/thing:2772812/files
 #endif
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		if(lbm.flags[n]!=TYPE_S) lbm.u.y[n] = lbm_u;
 		if(x==0u||x==Nx-1u||y==0u||y==Ny-1u||z==0u||z==Nz-1u) lbm.flags[n] = TYPE_E; // all non periodic
 	}); // ####################################################################### run simulation, export images and data ##########################################################################
@@ -533,7 +534,7 @@ void main_setup() { // Star Wars X-wing; 						required extensions in defines.hp
 	const float3 center = float3(lbm.center().x, 0.55f*size, lbm.center().z);
 	const float3x3 rotation = float3x3(float3(0, 0, 1), radians(180.0f));
 	lbm.voxelize_stl(get_exe_path()+"../stl/X-Wing.stl", center, rotation, size); // https://www.thingiverse.com/thing:353276/files
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		if(lbm.flags[n]!=TYPE_S) lbm.u.y[n] = lbm_u;
 		if(x==0u||x==Nx-1u||y==0u||y==Ny-1u||z==0u||z==Nz-1u) lbm.flags[n] = TYPE_E; // all non periodic
 	}); // ####################################################################### run simulation, export images and data ##########################################################################
@@ -575,7 +576,7 @@ void main_setup() { // Star Wars TIE fighter; 						required extensions in defin
 	Mesh* mesh = read_stl(get_exe_path()+"../stl/DWG_Tie_Fighter_Assembled_02.stl", lbm.size(), center, rotation, size); // https://www.thingiverse.com/thing:2919109/files
 	lbm.voxelize_mesh_on_device(mesh);
 	lbm.flags.read_from_device();
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		if(lbm.flags[n]!=TYPE_S) lbm.u.y[n] = lbm_u;
 		if(x==0u||x==Nx-1u||y==0u||y==Ny-1u||z==0u||z==Nz-1u) lbm.flags[n] = TYPE_E; // all non periodic
 	}); // ####################################################################### run simulation, export images and data ##########################################################################
@@ -618,7 +619,7 @@ void main_setup() { // radial fan; 							required extensions in defines.hpp: FP
 	const float3 center = float3(lbm.center().x, lbm.center().y, 0.36f*radius);
 	const float lbm_omega=lbm_u/radius, lbm_domega=lbm_omega*lbm_dt;
 	Mesh* mesh = read_stl(get_exe_path()+"../stl/FAN_Solid_Bottom.stl", lbm.size(), center, 2.0f*radius); // https://www.thingiverse.com/thing:6113/files
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		if(x==0u||x==Nx-1u||y==0u||y==Ny-1u||z==0u) lbm.flags[n] = TYPE_S; // all non periodic
 	}); // ####################################################################### run simulation, export images and data ##########################################################################
 	lbm.graphics.visualization_modes = VIS_FLAG_LATTICE|VIS_FLAG_SURFACE|VIS_Q_CRITERION;
@@ -661,7 +662,7 @@ void main_setup() { // electric ducted fan (EDF); 					required extensions in de
 	rotor->set_center(rotor->get_bounding_box_center());
 	const float lbm_radius=0.5f*rotor->get_max_size(), omega=lbm_u/lbm_radius, domega=omega*(float)lbm_dt;
 	lbm.voxelize_mesh_on_device(stator, TYPE_S, center);
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		if(lbm.flags[n]==0u) lbm.u.y[n] = 0.3f*lbm_u;
 		if(x==0u||x==Nx-1u||y==0u||y==Ny-1u||z==0u||z==Nz-1u) lbm.flags[n] = TYPE_E; // all non periodic
 	}); // ####################################################################### run simulation, export images and data ##########################################################################
@@ -731,7 +732,7 @@ void main_setup() { // aerodynamics of a cow; 						required extensions in defin
 	Mesh* mesh = read_stl(get_exe_path()+"../stl/Cow_t.stl", lbm.size(), lbm.center(), rotation, lbm_length); // https://www.thingiverse.com/thing:182114/files
 	mesh->translate(float3(0.0f, 1.0f-mesh->pmin.y+0.1f*lbm_length, 1.0f-mesh->pmin.z)); // move mesh forward a bit and to simulation box bottom, keep in mind 1 cell thick box boundaries
 	lbm.voxelize_mesh_on_device(mesh);
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		if(z==0u) lbm.flags[n] = TYPE_S; // solid floor
 		if(lbm.flags[n]!=TYPE_S) lbm.u.y[n] = lbm_u; // initialize y-velocity everywhere except in solid cells
 		if(x==0u||x==Nx-1u||y==0u||y==Ny-1u||z==Nz-1u) lbm.flags[n] = TYPE_E; // all other simulation box boundaries are inflow/outflow
@@ -769,7 +770,7 @@ void main_setup() { // aerodynamics of a cow; 						required extensions in defin
 	Mesh* mesh = read_stl(get_exe_path()+"../stl/Cow_t.stl", lbm.size(), lbm.center(), rotation, lbm_length); // https://www.thingiverse.com/thing:182114/files
 	mesh->translate(float3(0.0f, 1.0f-mesh->pmin.y+0.1f*lbm_length, 1.0f-mesh->pmin.z)); // move mesh forward a bit and to simulation box bottom, keep in mind 1 cell thick box boundaries
 	lbm.voxelize_mesh_on_device(mesh);
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		if(z==0u) lbm.flags[n] = TYPE_S; // solid floor
 		if(lbm.flags[n]!=TYPE_S) lbm.u.y[n] = lbm_u; // initialize y-velocity everywhere except in solid cells
 		if(x==0u||x==Nx-1u||y==0u||y==Ny-1u||z==Nz-1u) lbm.flags[n] = TYPE_E; // all other simulation box boundaries are inflow/outflow
@@ -805,7 +806,7 @@ void main_setup() { // Space Shuttle; 							required extensions in defines.hpp:
 	Clock clock;
 	lbm.voxelize_stl(get_exe_path()+"../stl/Full_Shuttle.stl", center, rotation, size); // https://www.thingiverse.com/thing:4975964/files
 	println(print_time(clock.stop()));
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		if(lbm.flags[n]!=TYPE_S) lbm.u.y[n] = lbm_u;
 		if(x==0u||x==Nx-1u||y==0u||y==Ny-1u||z==0u||z==Nz-1u) lbm.flags[n] = TYPE_E; // all non periodic
 	}); // ####################################################################### run simulation, export images and data ##########################################################################
@@ -842,7 +843,7 @@ void main_setup() { // Starship; 							required extensions in defines.hpp: FP16
 	const float size = 1.6f*lbm.size().x;
 	const float3 center = float3(lbm.center().x, lbm.center().y+0.05f*size, 0.18f*size);
 	lbm.voxelize_stl(get_exe_path()+"../stl/StarShipV2.stl", center, size); // https://www.thingiverse.com/thing:4912729/files
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		if(lbm.flags[n]!=TYPE_S) lbm.u.z[n] = lbm_u;
 		if(x==0u||x==Nx-1u||y==0u||y==Ny-1u||z==0u||z==Nz-1u) lbm.flags[n] = TYPE_E; // all non periodic
 	}); // ####################################################################### run simulation, export images and data ##########################################################################
@@ -893,7 +894,7 @@ void main_setup() { // Ahmed body; 							required extensions in defines.hpp: FP
 	Mesh* mesh = read_stl(get_exe_path()+"../stl/ahmed_25deg_m.stl", lbm.size(), lbm.center(), float3x3(float3(0, 0, 1), radians(90.0f)), lbm_length);
 	mesh->translate(float3(0.0f, units.x(0.5f*(0.5f*box_scale*si_length-si_width))-mesh->pmin.y, 1.0f-mesh->pmin.z));
 	lbm.voxelize_mesh_on_device(mesh, TYPE_S|TYPE_X); // https://github.com/nathanrooy/ahmed-bluff-body-cfd/blob/master/geometry/ahmed_25deg_m.stl converted to binary
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		if(z==0u) lbm.flags[n] = TYPE_S;
 		if(lbm.flags[n]!=TYPE_S) lbm.u.y[n] = lbm_u;
 		if(x==0u||x==Nx-1u||y==0u||y==Ny-1u||z==Nz-1u) lbm.flags[n] = TYPE_E;
@@ -958,7 +959,7 @@ void main_setup() { // Cessna 172 propeller aircraft; 					required extensions i
 	rotor->set_center(rotor->get_bounding_box_center());
 	const float lbm_radius=0.5f*rotor->get_max_size(), omega=-lbm_u/lbm_radius, domega=omega*(float)lbm_dt;
 	lbm.voxelize_mesh_on_device(plane);
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		if(lbm.flags[n]!=TYPE_S) lbm.u.y[n] = lbm_u;
 		if(x==0u||x==Nx-1u||y==0u||y==Ny-1u||z==0u||z==Nz-1u) lbm.flags[n] = TYPE_E; // all non periodic
 	}); // ####################################################################### run simulation, export images and data ##########################################################################
@@ -1014,7 +1015,7 @@ void main_setup() { // Bell 222 helicopter; 						required extensions in defines
 	const float main_radius=0.5f*main->get_max_size(), main_omega=lbm_u/main_radius, main_domega=main_omega*(float)lbm_dt;
 	const float back_radius=0.5f*back->get_max_size(), back_omega=-lbm_u/back_radius, back_domega=back_omega*(float)lbm_dt;
 	lbm.voxelize_mesh_on_device(body);
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		if(lbm.flags[n]!=TYPE_S) lbm.u.y[n] =  0.2f*lbm_u;
 		if(lbm.flags[n]!=TYPE_S) lbm.u.z[n] = -0.1f*lbm_u;
 		if(x==0u||x==Nx-1u||y==0u||y==Ny-1u||z==0u||z==Nz-1u) lbm.flags[n] = TYPE_E; // all non periodic
@@ -1080,7 +1081,7 @@ void main_setup() { // Mercedes F1 W14 car; 						required extensions in defines
 	lbm.voxelize_mesh_on_device(body);
 	lbm.voxelize_mesh_on_device(front_wheels, TYPE_S, front_wheels->get_center(), float3(0.0f), float3(omega, 0.0f, 0.0f)); // make wheels rotating
 	lbm.voxelize_mesh_on_device(back_wheels, TYPE_S, back_wheels->get_center(), float3(0.0f), float3(omega, 0.0f, 0.0f)); // make wheels rotating
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		if(lbm.flags[n]!=TYPE_S) lbm.u.y[n] = lbm_u;
 		if(x==0u||x==Nx-1u||y==0u||y==Ny-1u||z==Nz-1u) lbm.flags[n] = TYPE_E;
 		if(z==0u) lbm.flags[n] = TYPE_S;
@@ -1115,7 +1116,7 @@ void main_setup() { // hydraulic jump; 							required extensions in defines.hpp
 	// ################################################################## define simulation box size, viscosity and volume force ###################################################################
 	LBM lbm(96u, 352u, 96u, 1u, 1u, 1u, 0.007f, 0.0f, 0.0f, -0.0005f);
 	// ###################################################################################### define geometry ######################################################################################
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		const uint H1=Nz*2u/5u, H2=Nz*3u/5u, P1=Ny*1u/20u, P3=Ny*3u/20u;
 		if(z<H2) lbm.flags[n] = TYPE_F;
 		if(y<P3&&z< H1) lbm.flags[n] = TYPE_S;
@@ -1143,7 +1144,7 @@ void main_setup() { // dam break; 							required extensions in defines.hpp: FP1
 	// ################################################################## define simulation box size, viscosity and volume force ###################################################################
 	LBM lbm(128u, 256u, 256u, 0.005f, 0.0f, 0.0f, -0.0002f, 0.0001f);
 	// ###################################################################################### define geometry ######################################################################################
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		if(z<Nz*6u/8u && y<Ny/8u) lbm.flags[n] = TYPE_F;
 		if(x==0u||x==Nx-1u||y==0u||y==Ny-1u||z==0u||z==Nz-1u) lbm.flags[n] = TYPE_S; // all non periodic
 	}); // ####################################################################### run simulation, export images and data ##########################################################################
@@ -1165,7 +1166,7 @@ void main_setup() { // liquid metal on a speaker; 					required extensions in de
 	const uint threads = (uint)thread::hardware_concurrency();
 	vector<uint> seed(threads);
 	for(uint t=0u; t<threads; t++) seed[t] = 42u+t;
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), threads, [&](ulong n, uint t) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells(threads, [&](const LBM::Cell& n, const uint x, const uint y, const uint z, const uint t) {
 		if(z<Nz/3u && x>0u&&x<Nx-1u&&y>0u&&y<Ny-1u&&z>0u&&z<Nz-1u) {
 			lbm.rho[n] = units.rho_hydrostatic(f, (float)z, (float)(Nz/3u));
 			lbm.u.x[n] = random_symmetric(seed[t], 1E-9f);
@@ -1204,7 +1205,7 @@ void main_setup() { // breaking waves on beach; 					required extensions in defi
 	const float frequency = 0.0007f; // amplitude = u/(2.0f*pif*frequency);
 	LBM lbm(128u, 640u, 96u, 0.01f, 0.0f, 0.0f, -f);
 	// ###################################################################################### define geometry ######################################################################################
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		const uint H = Nz/2u;
 		if(z<H) {
 			lbm.flags[n] = TYPE_F;
@@ -1241,7 +1242,7 @@ void main_setup() { // river; 								required extensions in defines.hpp: FP16S,
 	// ################################################################## define simulation box size, viscosity and volume force ###################################################################
 	LBM lbm(128u, 384u, 96u, 0.02f, 0.0f, -0.00007f, -0.0005f, 0.01f);
 	// ###################################################################################### define geometry ######################################################################################
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		const int R = 20, H = 32;
 		if(z==0) lbm.flags[n] = TYPE_S;
 		else if(z<H) {
@@ -1288,7 +1289,7 @@ void main_setup() { // raindrop impact; 						required extensions in defines.hpp
 	const float lbm_R = 0.5f*lbm_D; // drop radius
 	LBM lbm(lbm_N, 1u, 1u, 1u, units.nu(si_nu), 0.0f, 0.0f, -units.f(si_rho, si_g), units.sigma(si_sigma)); // calculate values for remaining parameters in simulation units
 	// ###################################################################################### define geometry ######################################################################################
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		if(sphere(x, y, z, float3(0.5f*(float)Nx, 0.5f*(float)Ny-2.0f*lbm_R*tan(inclination*pif/180.0f), lbm_H+lbm_R+2.5f)+0.5f, lbm_R+2.0f)) {
 			const float b = sphere_plic(x, y, z, float3(0.5f*(float)Nx, 0.5f*(float)Ny-2.0f*lbm_R*tan(inclination*pif/180.0f)+0.5f, lbm_H+lbm_R+2.5f), lbm_R);
 			if(b!=-1.0f) {
@@ -1360,7 +1361,7 @@ void main_setup() { // bursting bubble; 						required extensions in defines.hpp
 	const uint lbm_H = to_uint(2.0f*lbm_d);
 	LBM lbm(lbm_N, units.nu(si_nu), 0.0f, 0.0f, -units.f(si_f), lbm_sigma);
 	// ###################################################################################### define geometry ######################################################################################
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		if(z<lbm_H) lbm.flags[n] = TYPE_F;
 		const float r = 0.5f*lbm_d;
 		if(sphere(x, y, z, float3(lbm.center().x, lbm.center().y, (float)lbm_H-0.5f*lbm_d), r+1.0f)) { // bubble
@@ -1386,7 +1387,7 @@ void main_setup() { // cube with changing gravity; 					required extensions in d
 	// ################################################################## define simulation box size, viscosity and volume force ###################################################################
 	LBM lbm(96u, 96u, 96u, 0.02f, 0.0f, 0.0f, -0.001f, 0.001f);
 	// ###################################################################################### define geometry ######################################################################################
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		if(x<Nx*2u/3u&&y<Ny*2u/3u) lbm.flags[n] = TYPE_F;
 		if(x==0u||x==Nx-1u||y==0u||y==Ny-1u||z==0u||z==Nz-1u) lbm.flags[n] = TYPE_S;
 	}); // ####################################################################### run simulation, export images and data ##########################################################################
@@ -1413,7 +1414,7 @@ void main_setup() { // periodic faucet mass conservation test; 				required exte
 	// ################################################################## define simulation box size, viscosity and volume force ###################################################################
 	LBM lbm(96u, 192u, 128u, 0.02f, 0.0f, 0.0f, -0.001f);
 	// ###################################################################################### define geometry ######################################################################################
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		if(y>Ny*5u/6u) lbm.flags[n] = TYPE_F;
 		const uint D=max(Nx, Nz), R=D/6;
 		if(x==0u||x==Nx-1u||y==0u||y==Ny-1u) lbm.flags[n] = TYPE_S; // x and y non periodic
@@ -1431,7 +1432,7 @@ void main_setup() { // two colliding droplets in force field; 				required exten
 	// ################################################################## define simulation box size, viscosity and volume force ###################################################################
 	LBM lbm(256u, 256u, 128u, 0.014f, 0.0f, 0.0f, 0.0f, 0.0001f);
 	// ###################################################################################### define geometry ######################################################################################
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		if(sphere(x, y, z, lbm.center()-float3(0u, 10u, 0u), 32.0f)) {
 			lbm.flags[n] = TYPE_F;
 			lbm.u.y[n] = 0.025f;
@@ -1459,7 +1460,7 @@ void main_setup() { // Rayleigh-Benard convection; 					required extensions in d
 	const uint threads = (uint)thread::hardware_concurrency();
 	vector<uint> seed(threads);
 	for(uint t=0u; t<threads; t++) seed[t] = 42u+t;
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), threads, [&](ulong n, uint t) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells(threads, [&](const LBM::Cell& n, const uint x, const uint y, const uint z, const uint t) {
 		lbm.u.x[n] = random_symmetric(seed[t], 0.015f); // initialize velocity with random noise
 		lbm.u.y[n] = random_symmetric(seed[t], 0.015f);
 		lbm.u.z[n] = random_symmetric(seed[t], 0.015f);
@@ -1484,7 +1485,7 @@ void main_setup() { // thermal convection; 						required extensions in defines.
 	// ################################################################## define simulation box size, viscosity and volume force ###################################################################
 	LBM lbm(32u, 196u, 60u, 1u, 1u, 1u, 0.02f, 0.0f, 0.0f, -0.0005f, 0.0f, 1.0f, 1.0f);
 	// ###################################################################################### define geometry ######################################################################################
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
+	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); lbm.parallel_for_cells([&](const LBM::Cell& n, const uint x, const uint y, const uint z) {
 		if(y==1) {
 			lbm.T[n] = 1.8f;
 			lbm.flags[n] = TYPE_T;
@@ -1566,14 +1567,35 @@ void benchmark_setup() { // benchmark; 							required extensions in defines.hpp
 
 
 #ifdef DEMO_CND_WING //cnd from AERODYNAMIC_COW
-void main_setup() { // input parameter drivern sim; 					required extensions in defines.hpp: FP16S, EQUILIBRIUM_BOUNDARIES, SUBGRID, INTERACTIVE_GRAPHICS or GRAPHICS
-
-    if(g_args["BENCHMARK"].as<bool>()) {
-      benchmark_setup();
-      exit(0);
-    }
+static const uchar cnd_wing_flag = TYPE_S|TYPE_X; // wing cells, additionally flagged with TYPE_X so the force monitor does not add up the --floor
+static float3x3 cnd_wing_rotation(const float aoa) { // --rotx/--roty/--rotz, then the angle of attack in degrees
+	//const float3x3 rotation = float3x3(float3(1, 0, 0), radians(180.0f))*float3x3(float3(0, 0, 1), radians(180.0f)); // undersurface first
+	float3x3 rotation = float3x3(float3(1, 0, 0), radians(g_args["rotx"].as<float>()));
+	rotation = rotation * float3x3(float3(0, 1, 0), radians(g_args["roty"].as<float>()));
+	rotation = rotation * float3x3(float3(0, 0, 1), radians(g_args["rotz"].as<float>()));
 
-    float next_frame_time = -1.0f; 	// When we reach (or pass) this, output a new .png frame when recording is on.
+	// rotation = rotation * float3x3(float3(1, 0, 0), radians( aoa )); // about "X" has the effect of "dropping a wing" (rotates around the prop axis)
+	// rotation = rotation * float3x3(float3(0, 1, 0), radians( aoa )); // about "Y" causes it to Yaw
+	rotation = rotation * float3x3(float3(0, 0, 1), radians( aoa )); // angle it how they asked (- to climb)
+	return rotation;
+}
+static void cnd_wing_translate(Mesh* mesh) { // --trx/--try/--trz are relative to the mesh's lower bounds
+	const float3 translation = float3(g_args["trx"].as<float>(), g_args["try"].as<float>(), g_args["trz"].as<float>());
+	//mesh->translate(float3(0.0f, 1.0f-mesh->pmin.y+0.1f*lbm_length, 1.0f-mesh->pmin.z)); // move mesh forward a bit and to simulation box bottom, keep in mind 1 cell thick box boundaries
+	mesh->translate(float3(translation.x*mesh->pmin.x, translation.y*mesh->pmin.y, translation.z*mesh->pmin.z));
+}
+static float cnd_wing_length(const uint Ny) { // the length of the stl in LBM units
+	return g_args["scale"].as<float>()*0.56f*(float)Ny;
+}
+static float cnd_wing_units(const float lbm_length, const float lbm_u, const float velocity_si, const float reynolds_number_si) { // set the unit conversion for free stream velocity and Reynolds number, returns the kinematic viscosity in LBM units
+	const float chord_length_si = g_args["c"].as<float>();
+	const float air_density_si = g_args["rho"].as<float>();
+	const float dynamic_viscosity_si = (air_density_si * velocity_si * chord_length_si) / reynolds_number_si;
+	const float kinematic_viscosity_si = dynamic_viscosity_si / air_density_si;
+	units.set_m_kg_s(lbm_length, lbm_u, 1.0f, chord_length_si, velocity_si, air_density_si);
+	return units.nu(kinematic_viscosity_si);
+}
+LBM* setup_cnd_wing() { // builds the input parameter driven sim (units, box, mesh, initial conditions) without running it; used by main_setup() and the Python Simulation class
 
     // SI Units
     float velocity_si = g_args["u"].as<float>();		//	5.0f; 		// m/s
@@ -1596,7 +1618,14 @@ void main_setup() { // input parameter drivern sim; 					required extensions in
 
 
     // ################################################################## define simulation box size, viscosity and volume force ###################################################################
-    const uint3 lbm_N = resolution(float3(nx/boxmin, ny/boxmin, nz/boxmin),  g_args["r"].as<unsigned int>() ); // input: simulation box aspect ratio and VRAM occupation in MB, output: grid resolution
+    const uint domains = (uint)max(g_args["domains"].as<int>(), 1); // devices to split the grid across
+    Memory_Plan plan; // 1x1x1 domains unless --domains is given
+    if(domains>1u) {
+        plan = plan_resolution(float3(nx/boxmin, ny/boxmin, nz/boxmin), g_args["r"].as<unsigned int>(), domains); // largest grid where every device uses at most -r MB, split with the least halo traffic
+        if(plan.get_N()==0ull) print_error("-r "+to_string(g_args["r"].as<unsigned int>())+" MB per device is too small for "+to_string(domains)+" domains.");
+        print_info("Domains = "+to_string(plan.Dx)+"x"+to_string(plan.Dy)+"x"+to_string(plan.Dz)+", "+to_string(plan.device_memory())+" MB per device, "+to_string((float)plan.halo_bytes/1048576.0f, 2u)+" MB halo transfer per time step");
+    }
+    const uint3 lbm_N = domains>1u ? uint3(plan.Nx, plan.Ny, plan.Nz) : resolution(float3(nx/boxmin, ny/boxmin, nz/boxmin),  g_args["r"].as<unsigned int>() ); // input: simulation box aspect ratio and VRAM occupation in MB, output: grid resolution
     print_info("lbm_N.x = "+to_string(lbm_N.x));
     print_info("lbm_N.y = "+to_string(lbm_N.y));
     print_info("lbm_N.z = "+to_string(lbm_N.z));
@@ -1619,77 +1648,133 @@ void main_setup() { // input parameter drivern sim; 					required extensions in
 
 	//const float si_u = g_args["u"].as<float>();	// velocity in m/s			was 1.0f
 	//const float si_length = g_args["c"].as<float>();// cord or stl length in meters		was 2.4f
-	const float si_T = g_args["secs"].as<float>();	// time in seconds (from --secs argument)
 	//const float si_nu=1.48E-5f;			// kinematic viscosity in m^2/s		nu = x*u/Re
 	//const float si_rho=1.225f;			// density in kg/m^3
 	//const float lbm_length = 0.65f*(float)lbm_N.y; 
-	const float lbm_length =  g_args["scale"].as<float>()*0.56f*(float)lbm_N.y; // the length of the stl in LBM units. The value itself is in simulation grid units.
+	const float lbm_length = cnd_wing_length(lbm_N.y); // the length of the stl in LBM units. The value itself is in simulation grid units.
 	print_info("lbm_length = "+to_string(lbm_length, 6u));
 	const float lbm_u = 0.1f;			// the velocity in lattice units (lattice nodes per time step).
-	units.set_m_kg_s(lbm_length, lbm_u, 1.0f, chord_length_si, velocity_si, air_density_si);
+	const float lbm_nu = cnd_wing_units(lbm_length, lbm_u, velocity_si, reynolds_number_si);
 	print_info("Re = "+to_string(to_uint(units.si_Re(chord_length_si, velocity_si, kinematic_viscosity_si))));	// 
 	// D2Q9?
 	//? LBM lbm(lbm_N, units.nu(kinematic_viscosity_si)); // from cow
-	LBM lbm(lbm_N, 1u, 1u, 1u, units.nu(kinematic_viscosity_si)); // from concorde
+	LBM* lbm_ptr = new LBM(lbm_N, plan.Dx, plan.Dy, plan.Dz, lbm_nu); // from concorde; on the heap so it outlives this function
+	LBM& lbm = *lbm_ptr;
 
 	// ###################################################################################### define geometry ######################################################################################
-	//const float3x3 rotation = float3x3(float3(1, 0, 0), radians(180.0f))*float3x3(float3(0, 0, 1), radians(180.0f)); // undersurface first
-	float3x3 rotation = float3x3(float3(1, 0, 0), radians(g_args["rotx"].as<float>()));
-	rotation = rotation * float3x3(float3(0, 1, 0), radians(g_args["roty"].as<float>()));
-	rotation = rotation * float3x3(float3(0, 0, 1), radians(g_args["rotz"].as<float>()));
+	const float3x3 rotation = cnd_wing_rotation(g_args["aoa"].as<float>());
+	const string stl_file = g_args["f"].as<std::string>();
+	const float3 translation = float3(g_args["trx"].as<float>(), g_args["try"].as<float>(), g_args["trz"].as<float>()); // for the mesh cache key, see cnd_wing_translate()
+	string cache_key = ""; // --meshcache entries are keyed by STL content, transform and resolution
+	if(MESH_CACHE_PATH!="") {
+		const float3x3& r = rotation;
+		const string parameters = "cnd_wing "+to_string((uint)cnd_wing_flag)+" "+to_string(r.xx)+" "+to_string(r.xy)+" "+to_string(r.xz)+" "+to_string(r.yx)+" "+to_string(r.yy)+" "+to_string(r.yz)+" "+to_string(r.zx)+" "+to_string(r.zy)+" "+to_string(r.zz)
+			+" "+to_string(lbm_length)+" "+to_string(translation.x)+" "+to_string(translation.y)+" "+to_string(translation.z)+" "+to_string(lbm_N.x)+" "+to_string(lbm_N.y)+" "+to_string(lbm_N.z);
+		cache_key = MESH_CACHE_PATH+(ends_with(MESH_CACHE_PATH, "/") ? "" : "/")+to_string_hex(hash_string(parameters, hash_file(create_file_extension(stl_file, ".stl"))));
+	}
+	if(cache_key!=""&&lbm.read_flags_cache(cache_key+".flags")) {
+		print_info("Voxelized mesh loaded from mesh cache."); // the first apply_region() below uploads the flags
+	} else {
+		Mesh* mesh = nullptr;
+		string cached_mesh;
+		if(cache_key!=""&&read_cache_file(cache_key+".mesh", cached_mesh)) mesh = mesh_from_binary(cached_mesh);
+		if(mesh!=nullptr) {
+			print_info("Transformed mesh loaded from mesh cache.");
+		} else {
+			//Mesh* mesh = read_stl(get_exe_path()+"../stl/Cow_t.stl", lbm.size(), lbm.center(), rotation, lbm_length); // https://www.thingiverse.com/thing:182114/files
+			mesh = read_stl(stl_file, lbm.size(), lbm.center(), rotation, lbm_length);
 
-	// rotation = rotation * float3x3(float3(1, 0, 0), radians( g_args["aoa"].as<float>() )); // about "X" has the effect of "dropping a wing" (rotates around the prop axis)
-	// rotation = rotation * float3x3(float3(0, 1, 0), radians( g_args["aoa"].as<float>() )); // about "Y" causes it to Yaw
-	rotation = rotation * float3x3(float3(0, 0, 1), radians( g_args["aoa"].as<float>() )); // angle it how they asked (- to climb)
+			//mesh->translate(float3(0.0f, 1.0f-mesh->pmin.y+0.1f*lbm_length, 1.0f-mesh->pmin.z)); // move mesh forward a bit and to simulation box bottom, keep in mind 1 cell thick box boundaries
+			cnd_wing_translate(mesh);
+			if(cache_key!="") write_cache_file(cache_key+".mesh", mesh_to_binary(mesh), { ".mesh", ".flags" }, (ulong)MESH_CACHE_MB*1048576ull);
+		}
+		lbm.voxelize_mesh_on_device(mesh, cnd_wing_flag);
+		if(cache_key!="") lbm.write_flags_cache(cache_key+".flags");
+		delete mesh;
+	}
+	if(g_args["floor"].as<bool>()) lbm.apply_region(Region::box_faces(Region::Z0).set(TYPE_S)); // solid floor
+	lbm.apply_region(Region::box().set_velocity(float3(0.0f, lbm_u, 0.0f)).except(TYPE_S)); // initialize y-velocity everywhere except in solid cells
+	lbm.apply_region(Region::box_faces(Region::X0|Region::X1|Region::Y0|Region::Y1|Region::Z1).set(TYPE_E)); // all other simulation box boundaries are inflow/outflow
 
-	//Mesh* mesh = read_stl(get_exe_path()+"../stl/Cow_t.stl", lbm.size(), lbm.center(), rotation, lbm_length); // https://www.thingiverse.com/thing:182114/files
-	Mesh* mesh = read_stl(g_args["f"].as<std::string>(), lbm.size(), lbm.center(), rotation, lbm_length); 
+	lbm.graphics.visualization_modes = VIS_FLAG_SURFACE|VIS_Q_CRITERION;
+	lbm.graphics.set_camera_centered(-40.0f, 20.0f, 78.0f, 1.25f);
+	return lbm_ptr;
+}
+void main_setup() { // input parameter drivern sim; 					required extensions in defines.hpp: FP16S, EQUILIBRIUM_BOUNDARIES, SUBGRID, INTERACTIVE_GRAPHICS or GRAPHICS
 
-	//mesh->translate(float3(0.0f, 1.0f-mesh->pmin.y+0.1f*lbm_length, 1.0f-mesh->pmin.z)); // move mesh forward a bit and to simulation box bottom, keep in mind 1 cell thick box boundaries
-	mesh->translate(float3( g_args["trx"].as<float>() * mesh->pmin.x, g_args["try"].as<float>() * mesh->pmin.y, g_args["trz"].as<float>() * mesh->pmin.z));
+    if(g_args["BENCHMARK"].as<bool>()) {
+      benchmark_setup();
+      return; // main_physics() exits for the .exe; the Python headless run needs to get control back
+    }
 
-	lbm.voxelize_mesh_on_device(mesh);
-	const uint Nx=lbm.get_Nx(), Ny=lbm.get_Ny(), Nz=lbm.get_Nz(); parallel_for(lbm.get_N(), [&](ulong n) { uint x=0u, y=0u, z=0u; lbm.coordinates(n, x, y, z);
-		if(g_args["floor"].as<bool>() && z==0u) lbm.flags[n] = TYPE_S; // solid floor
-		if(lbm.flags[n]!=TYPE_S) lbm.u.y[n] = lbm_u; // initialize y-velocity everywhere except in solid cells
-		if(x==0u||x==Nx-1u||y==0u||y==Ny-1u||z==Nz-1u) lbm.flags[n] = TYPE_E; // all other simulation box boundaries are inflow/outflow
-	}); // ####################################################################### run simulation, export images and data ##########################################################################
+	const float si_T = g_args["secs"].as<float>();	// time in seconds (from --secs argument)
+
+	LBM* lbm_ptr = setup_cnd_wing();
+	LBM& lbm = *lbm_ptr;
+
+	force_monitor = Force_Monitor(); // drag/lift monitor, --monitor sets the interval in time steps
+	force_monitor.interval = (ulong)max(g_args["monitor"].as<int>(), 0);
+	force_monitor.flag_marker = cnd_wing_flag;
+	if(force_monitor.interval>0ull&&!g_features.force_field) {
+		print_warning("--monitor needs --FORCE_FIELD, force monitor is off.");
+		force_monitor.interval = 0ull;
+	}
+	if(force_monitor.interval>0ull) {
+		const float chord_si = g_args["c"].as<float>();
+		force_monitor.tolerance = g_args["converge"].as<float>();
+		force_monitor.window = (uint)max(g_args["convergewindow"].as<int>(), 1);
+		force_monitor.si_rho = g_args["rho"].as<float>();
+		force_monitor.si_u = g_args["u"].as<float>();
+		force_monitor.si_A = g_args["area"].as<float>()>0.0f ? g_args["area"].as<float>() : sq(chord_si); // default reference area: chord^2
+		force_monitor.log_file = g_args["monitorlog"].as<std::string>()!="" ? g_args["monitorlog"].as<std::string>() : EXPORT_PATH+"forces.csv";
+		force_monitor.start();
+		print_info("Force monitor: every "+to_string(force_monitor.interval)+" time steps"+(force_monitor.tolerance>0.0f ? ", stops at "+to_string(force_monitor.tolerance, 4u)+" relative change over "+to_string(force_monitor.window)+" samples" : "")+", log "+force_monitor.log_file);
+	}
+	const string resume_file = g_args["resume"].as<std::string>();
+	if(resume_file!="") {
+		const string error = lbm.read_checkpoint(resume_file); // replaces the initialization in lbm.run(0u)
+		if(error!="") print_error("Can't resume. "+error);
+	}
+	const ulong checkpoint_every = (ulong)max(g_args["checkpoint-every"].as<int>(), 0);
+	const string checkpoint_file = g_args["checkpoint"].as<std::string>();
+	const auto write_checkpoint = [&]() { // written in the background, the file is replaced only once the new checkpoint is complete
+		if(checkpoint_every>0ull&&lbm.get_t()%checkpoint_every==0ull) lbm.write_checkpoint(checkpoint_file);
+	};
+	const auto monitor_converged = [&]() { // sample at the monitor interval, true once the coefficients converged
+		if(force_monitor.interval==0ull||lbm.get_t()==0ull||lbm.get_t()%force_monitor.interval!=0ull||!force_monitor.sample(lbm)) return false;
+		print_info("Force coefficients converged at t = "+to_string(lbm.get_t())+": Cd = "+to_string(force_monitor.coefficients.y, 4u)+", Cl = "+to_string(force_monitor.coefficients.z, 4u));
+		return true;
+	};
+	// ####################################################################### run simulation, export images and data ##########################################################################
 
 #if defined(_WIN32)
         if(!g_args["allowsleep"].as<bool>())SetThreadExecutionState(ES_CONTINUOUS | ES_SYSTEM_REQUIRED | ES_DISPLAY_REQUIRED); // // Function to prevent sleep and display timeout
 #endif
 
-	lbm.graphics.visualization_modes = VIS_FLAG_SURFACE|VIS_Q_CRITERION;
 #if defined(GRAPHICS) && !defined(INTERACTIVE_GRAPHICS)
-	lbm.graphics.set_camera_centered(-40.0f, 20.0f, 78.0f, 1.25f);
 	lbm.run(0u); // initialize simulation
 	while(lbm.get_t()<=units.t(si_T)) { // main simulation loop
 		if(lbm.graphics.next_frame(units.t(si_T), 10.0f)) lbm.graphics.write_frame();
-		lbm.run(1u);
+		lbm.run(min(lbm.graphics.steps_to_next_frame(units.t(si_T), 10.0f), units.t(si_T)+1ull-lbm.get_t())); // all time steps up to the next frame in one batch
 	}
 #else // GRAPHICS && !INTERACTIVE_GRAPHICS
 
-	lbm.graphics.set_camera_centered(-40.0f, 20.0f, 78.0f, 1.25f);
 	lbm.run(0u); // initialize simulation
-	while((si_T<=0.0f) || (lbm.get_t()<=units.t(si_T))) { // main simulation loop
-		//if(lbm.graphics.next_frame(units.t(si_T), 10.0f)) lbm.graphics.write_frame();
-		// info.allow_rendering
-		// Simulation Time: draw_label(ox, oy+i, "Simulation Time "+alignr(21u, /**************************************/ (units.si_t(1ull)==1.0f?to_string(info.lbm->get_t()):to_string(units.si_t(info.lbm->get_t()), 6u))+"s"), c); i+=FONT_HEIGHT;
-		if(key_O) {
-		  info.allow_labeling = true; // render what they want to show
-		  float sim_time= units.si_t(1ull)==1.0f ? info.lbm->get_t() : units.si_t(info.lbm->get_t());
-		  if((sim_time >= next_frame_time) || g_args["realtime"].as<bool>() ) {
-		    if(next_frame_time < 0.0f) next_frame_time =sim_time + (1.0f/g_args["fps"].as<float>())/g_args["slomo"].as<float>(); // First frame
-		    else next_frame_time+=(1.0f/g_args["fps"].as<float>())/g_args["slomo"].as<float>();
-
-		    info.allow_labeling = true; // render what they want to show
-		    lbm.graphics.write_frame();
-		    // key_O=false;
-		    //std::cout <<std::endl << " step=" << lbm.get_t() << " time(s)=" << sim_time << " allow_labeling=" << info.allow_labeling << " allow_rendering=" << info.allow_rendering << " next_frame_time=" << next_frame_time;
-		    std::cout << " step=" << lbm.get_t() << " time(s)=" << sim_time << " allow_labeling=" << info.allow_labeling << " allow_rendering=" << info.allow_rendering << " next_frame_time=" << next_frame_time <<std::endl;
-                  }
+	Frame_Scheduler frames(g_features.fps, g_features.slomo, g_features.realtime, units.si_t(1ull)); // --fps frames per second of video, played --slomo times slower than the simulation
+	const ulong T = si_T>0.0f ? units.t(si_T)+1ull : max_ulong; // time steps up to and including units.t(si_T)
+	while(running&&lbm.get_t()<T) { // main simulation loop; running=false (Esc, or Python) stops it
+		const ulong t = lbm.get_t();
+		if(key_O&&frames.due(t)) { // O key or --record
+			info.allow_labeling = true; // render what they want to show
+			lbm.graphics.write_frame();
 		}
-		lbm.run(1u);
+		ulong steps = min(T-t, max((ulong)(0.1/info.runtime_lbm_timestep_smooth), 1ull)); // run up to the next frame, sample or checkpoint in one batch, but no longer than about 0.1 s so Esc, stop and O react quickly
+		if(key_O) steps = min(steps, frames.steps_until_next(t));
+		if(checkpoint_every>0ull) steps = min(steps, checkpoint_every-t%checkpoint_every);
+		if(force_monitor.interval>0ull) steps = min(steps, force_monitor.interval-t%force_monitor.interval);
+		lbm.run(steps);
+		write_checkpoint();
+		if(monitor_converged()) break;
 	}
 
 	//lbm.run();
@@ -1697,9 +1782,74 @@ void main_setup() { // input parameter drivern sim; 					required extensions in
 
 
 #endif // GRAPHICS && !INTERACTIVE_GRAPHICS
+	delete lbm_ptr;
 #if defined(_WIN32)
         if(!g_args["allowsleep"].as<bool>())SetThreadExecutionState(ES_CONTINUOUS); // Allow the system to enter sleep mode or turn off the display if it wants to
 #endif
 } /**/
+vector<Sweep_Result> run_cnd_wing_sweep(const vector<Sweep_Point>& points) { // the device memory, OpenCL kernels and initial conditions of setup_cnd_wing() are built once; per point the viscosity (a kernel argument) and units are updated, the mesh is voxelized again only when the angle of attack changes
+	vector<Sweep_Result> results;
+	if(points.empty()) return results;
+	if(!g_features.force_field) print_error("A sweep needs --FORCE_FIELD for the force coefficients.");
+	const float si_T = g_args["secs"].as<float>();
+	const ulong interval = (ulong)max(g_args["monitor"].as<int>(), 0);
+	if(si_T<=0.0f&&(interval==0ull||g_args["converge"].as<float>()<=0.0f)) print_error("A sweep needs --secs, or --monitor with --converge, to end each point.");
+	for(const Sweep_Point& point : points) if(!(point.re>0.0f&&point.u>0.0f)) print_error("Sweep points need a Reynolds number and velocity > 0.");
+
+	LBM* lbm_ptr = setup_cnd_wing(); // geometry at --aoa
+	LBM& lbm = *lbm_ptr;
+	const float lbm_length = cnd_wing_length(lbm.get_Ny());
+	Mesh* raw = nullptr; // STL as read, placed with transform_mesh() for each angle of attack, read only when the first point needs it
+	float aoa = g_args["aoa"].as<float>(); // angle of attack that is currently voxelized
+	for(ulong i=0ull; i<(ulong)points.size()&&running; i++) {
+		Clock clock;
+		Sweep_Result result;
+		result.point = points[i];
+		print_info("Sweep point "+to_string(i+1u)+"/"+to_string((ulong)points.size())+": Re = "+to_string(result.point.re, 1u)+", u = "+to_string(result.point.u, 3u)+" m/s, aoa = "+to_string(result.point.aoa, 2u)+" deg");
+		result.nu = cnd_wing_units(lbm_length, 0.1f, result.point.u, result.point.re);
+		lbm.set_nu(result.nu);
+		if(result.point.aoa!=aoa) {
+			if(raw==nullptr) raw = read_stl(g_args["f"].as<std::string>());
+			Mesh* mesh = transform_mesh(raw, lbm.size(), lbm.center(), cnd_wing_rotation(result.point.aoa), lbm_length); // same vertices as read_stl() in setup_cnd_wing()
+			cnd_wing_translate(mesh);
+			lbm.clear_geometry(); // rather than unvoxelize_mesh_on_device(), which would leave cells that turn solid with the velocity of the last point
+			lbm.voxelize_mesh_on_device(mesh, cnd_wing_flag);
+			delete mesh;
+			aoa = result.point.aoa;
+		}
+		lbm.reset(); // writes the floor, free stream and inflow/outflow regions again
+		Force_Monitor monitor;
+		monitor.interval = interval;
+		monitor.flag_marker = cnd_wing_flag;
+		monitor.tolerance = g_args["converge"].as<float>();
+		monitor.window = (uint)max(g_args["convergewindow"].as<int>(), 1);
+		monitor.si_rho = g_args["rho"].as<float>();
+		monitor.si_u = result.point.u;
+		monitor.si_A = g_args["area"].as<float>()>0.0f ? g_args["area"].as<float>() : sq(g_args["c"].as<float>()); // default reference area: chord^2
+		monitor.start();
+		lbm.run(0u); // initialize simulation
+		result.setup_time = clock.stop();
+		const ulong T = si_T>0.0f ? units.t(si_T)+1ull : max_ulong; // main_setup() runs while t<=units.t(si_T)
+		while(running&&lbm.get_t()<T) { // run up to the next sample in one go
+			const ulong next = interval>0ull ? min((lbm.get_t()/interval+1ull)*interval, T) : T;
+			lbm.run(next-lbm.get_t());
+			if(interval>0ull&&lbm.get_t()%interval==0ull&&monitor.sample(lbm)) break;
+		}
+		if(monitor.samples==0ull) monitor.sample(lbm); // --monitor 0: coefficients at the end only
+		result.run_time = clock.stop()-result.setup_time;
+		result.t = monitor.t;
+		result.si_time = units.si_t(result.t);
+		result.samples = monitor.samples;
+		result.converged = monitor.converged;
+		result.change = monitor.change;
+		result.si_force = monitor.si_force;
+		result.coefficients = monitor.coefficients;
+		results.push_back(result);
+		print_info("Sweep point "+to_string(i+1u)+"/"+to_string((ulong)points.size())+": Cd = "+to_string(result.coefficients.y, 4u)+", Cl = "+to_string(result.coefficients.z, 4u)+" after "+to_string(result.t)+" steps, "+to_string(result.setup_time+result.run_time, 2u)+" s");
+	}
+	if(raw!=nullptr) delete raw;
+	delete lbm_ptr;
+	return results;
+}
 #endif //cnd
 
@@ -4,4 +4,25 @@
 #include "lbm.hpp"
 #include "shapes.hpp"
 
-void main_setup(); // main setup script
\ No newline at end of file
+void main_setup(); // main setup script
+#ifdef DEMO_CND_WING
+LBM* setup_cnd_wing(); // build the DEMO_CND_WING simulation from g_args without running it (caller deletes it)
+struct Sweep_Point { // one operating point of a sweep, see run_cnd_wing_sweep()
+	float re = 1.0f; // Reynolds number
+	float u = 1.0f; // free stream velocity in m/s
+	float aoa = 0.0f; // angle of attack in degrees
+};
+struct Sweep_Result { // force coefficients of one sweep point
+	Sweep_Point point;
+	float nu = 0.0f; // kinematic shear viscosity in LBM units
+	ulong t = 0ull; // time step of the last sample
+	float si_time = 0.0f; // simulated time in s
+	ulong samples = 0ull; // force monitor samples
+	bool converged = false; // stopped early by --converge
+	float change = 0.0f; // relative change of the last convergence check
+	float3 si_force; // force of the last sample in N
+	float3 coefficients; // (side, drag, lift) coefficients of the last sample
+	double setup_time=0.0, run_time=0.0; // wall time in s for geometry and initialization, and for the time steps
+};
+vector<Sweep_Result> run_cnd_wing_sweep(const vector<Sweep_Point>& points); // run all points on one LBM, only viscosity, units and geometry change between them
+#endif // DEMO_CND_WING
\ No newline at end of file
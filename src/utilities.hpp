@@ -20,7 +20,11 @@
 #endif // UTILITIES_REGEX
 #include <iostream>
 #include <thread> // contains <chrono>
-#include <functional> // for parallel_for(...)
+#include <functional>
+#include <atomic> // for parallel_for(...)
+#include <mutex>
+#include <condition_variable>
+#include <type_traits>
 #undef min
 #undef max
 using std::string;
@@ -58,47 +62,199 @@ typedef uint64_t ulong;
 
 #include "cxxopts.hpp"
 extern cxxopts::ParseResult g_args;
+struct RuntimeFeatures { // typed copy of the extension switches in g_args, resolved once after parsing so per-step and per-frame code does not do hashed string lookups in cxxopts
+	bool d2q9=false, d3q15=false, d3q19=false, d3q27=false; // velocity set
+	bool srt=false, trt=false; // collision operator
+	bool fp16s=false, fp16c=false; // DDF storage precision
+	bool volume_force=false, force_field=false, equilibrium_boundaries=false, moving_boundaries=false, surface=false, temperature=false, subgrid=false, particles=false, update_fields=false; // extensions
+	bool benchmark=false, graphics=false, graphics_ascii=false;
+	bool sync_halo=false; // multi-device halo exchange after stream_collide instead of in parallel with it
+	uint streamline_sparse=8u, streamline_length=128u;
+	float fps=25.0f, slomo=1.0f; // video frames per second and how many times slower than the simulation the video plays
+	bool realtime=false; // export a frame every time step
+	bool profile=false; // time every kernel run and buffer copy, see Kernel_Profiler in opencl.hpp
+	RuntimeFeatures() {} // all extensions off
+	RuntimeFeatures(const cxxopts::ParseResult& args) {
+		d2q9 = args["D2Q9"].as<bool>(); d3q15 = args["D3Q15"].as<bool>(); d3q19 = args["D3Q19"].as<bool>(); d3q27 = args["D3Q27"].as<bool>();
+		srt = args["SRT"].as<bool>(); trt = args["TRT"].as<bool>();
+		fp16s = args["FP16S"].as<bool>(); fp16c = args["FP16C"].as<bool>();
+		volume_force = args["VOLUME_FORCE"].as<bool>();
+		force_field = args["FORCE_FIELD"].as<bool>();
+		equilibrium_boundaries = args["EQUILIBRIUM_BOUNDARIES"].as<bool>();
+		moving_boundaries = args["MOVING_BOUNDARIES"].as<bool>();
+		surface = args["SURFACE"].as<bool>();
+		temperature = args["TEMPERATURE"].as<bool>();
+		subgrid = args["SUBGRID"].as<bool>();
+		particles = args["PARTICLES"].as<bool>();
+		update_fields = args["UPDATE_FIELDS"].as<bool>();
+		benchmark = args["BENCHMARK"].as<bool>(); graphics = args["GRAPHICS"].as<bool>(); graphics_ascii = args["GRAPHICS_ASCII"].as<bool>();
+		streamline_sparse = (uint)args["STREAMLINE_SPARSE"].as<int>(); streamline_length = (uint)args["STREAMLINE_LENGTH"].as<int>();
+		sync_halo = args["synchalo"].as<bool>();
+		fps = args["fps"].as<float>(); slomo = args["slomo"].as<float>(); realtime = args["realtime"].as<bool>();
+		profile = args["profile"].as<bool>();
+	}
+};
+extern const RuntimeFeatures& g_features; // read-only, set with set_runtime_features(g_args) right after g_args is parsed (main.cpp)
+void set_runtime_features(const cxxopts::ParseResult& args);
 extern int fpxxsize;
 //extern Info info; // declared in info.cpp
-extern bool key_P;
+extern bool key_P, key_O;
 extern uint velocity_set,dimensions,transfers; // See lbm.cpp
 extern int GRAPHICS_BACKGROUND_COLOR; // for speed - used every frame
 extern std::string EXPORT_PATH;
+extern std::string KERNEL_CACHE_PATH; // folder for cached OpenCL program binaries (see opencl.hpp), empty disables the cache
+extern uint KERNEL_CACHE_MB; // size limit of the kernel cache folder in MB, least recently used binaries are deleted first
+extern std::string PROFILE_TRACE_PATH; // Chrome trace JSON file written at the end of a --profile run, empty: no trace
+extern std::string MESH_CACHE_PATH; // folder for cached transformed meshes and voxelized flags, empty disables the cache
+extern uint MESH_CACHE_MB; // size limit of the mesh cache in MB
 
 
-inline void parallel_for(const uint N, const uint threads, std::function<void(uint, uint)> lambda) { // usage: parallel_for(N, threads, [&](uint n, uint t) { ... });
-	vector<thread> thread_array(threads);
-	for(uint t=0u; t<threads; t++) thread_array[t] = thread([=]() {
-		for(ulong n=(ulong)N*(ulong)t/(ulong)threads; n<(ulong)N*(ulong)(t+1u)/(ulong)threads; n++) lambda((uint)n, t);
-	});
-	for(uint t=0u; t<threads; t++) thread_array[t].join();
+class Thread_Pool { // persistent worker threads behind parallel_for(...), started on first use; the calling thread works along, so a pool of T threads has T-1 workers
+private:
+	vector<thread> workers;
+	std::mutex mutex; // guards the job fields below
+	std::condition_variable wake, finished;
+	void (*run)(const void* job, const ulong chunk) = nullptr; // runs one chunk, one indirect call per chunk instead of a std::function call per element
+	const void* job = nullptr;
+	ulong chunks = 0ull;
+	std::atomic<ulong> next{0ull}; // next unclaimed chunk
+	uint participants = 0u, active = 0u; // workers that take part in the current job, and those of them still working on it
+	ulong generation = 0ull; // incremented for every job, so workers see each job once
+	bool stop = false;
+	uint size = 0u; // number of threads including the caller, 0: not decided yet
+	void claim() { // run chunks until none are left
+		for(ulong c=next.fetch_add(1ull); c<chunks; c=next.fetch_add(1ull)) run(job, c);
+	}
+	void loop(const uint worker) {
+		inside() = true;
+		ulong seen = 0ull;
+		std::unique_lock<std::mutex> lock(mutex);
+		while(true) {
+			wake.wait(lock, [&]() { return stop||generation!=seen; });
+			if(stop) return;
+			seen = generation;
+			if(worker>=participants) continue; // fewer chunks than threads
+			lock.unlock();
+			claim();
+			lock.lock();
+			if(--active==0u) finished.notify_one();
+		}
+	}
+	void start() { // call with busy held
+		if(!workers.empty()||size<=1u) return;
+		stop = false;
+		for(uint i=0u; i+1u<size; i++) workers.push_back(thread(&Thread_Pool::loop, this, i));
+	}
+	void shutdown() { // call with busy held
+		{
+			std::lock_guard<std::mutex> lock(mutex);
+			stop = true;
+		}
+		wake.notify_all();
+		for(thread& worker : workers) worker.join();
+		workers.clear();
+	}
+
+public:
+	std::atomic<bool> busy{false}; // true while a parallel_for(...) uses the pool, a concurrent caller on another thread starts its own threads instead
+	static bool& inside() { // true on pool workers and on a caller while it runs a job, where nested parallel_for(...) calls must not wait for the pool
+		static thread_local bool flag = false;
+		return flag;
+	}
+	uint threads() {
+		if(size==0u) size = thread::hardware_concurrency()>0u ? (uint)thread::hardware_concurrency() : 1u;
+		return size;
+	}
+	void resize(const uint threads) { // 0: thread::hardware_concurrency(), waits for a running parallel_for(...) to finish
+		for(bool expected=false; !busy.compare_exchange_weak(expected, true); expected=false) std::this_thread::yield();
+		shutdown();
+		size = threads;
+		this->threads();
+		busy = false;
+	}
+	template<typename Chunk> void execute(const ulong chunks, const Chunk& chunk) { // calls chunk(c) for all c in [0, chunks) and returns when they are done, call with busy held
+		threads();
+		start();
+		{
+			std::lock_guard<std::mutex> lock(mutex);
+			this->run = [](const void* job, const ulong c) { (*(const Chunk*)job)(c); };
+			this->job = (const void*)&chunk;
+			this->chunks = chunks;
+			next = 0ull;
+			participants = active = (uint)(chunks-1ull<(ulong)workers.size() ? chunks-1ull : (ulong)workers.size());
+			generation++;
+		}
+		wake.notify_all();
+		inside() = true;
+		claim();
+		inside() = false;
+		std::unique_lock<std::mutex> lock(mutex);
+		finished.wait(lock, [&]() { return active==0u; });
+	}
+};
+inline Thread_Pool& thread_pool() { // never destroyed, so exit() from inside a parallel_for(...) does not wait for its own workers
+	static Thread_Pool* pool = new Thread_Pool();
+	return *pool;
+}
+inline uint get_parallel_threads() { // threads parallel_for(...) uses, including the calling thread
+	return thread_pool().threads();
 }
-inline void parallel_for(const uint N, const uint threads, std::function<void(uint)> lambda) { // usage: parallel_for(N, threads, [&](uint n) { ... });
+inline void set_parallel_threads(const uint threads) { // 0: all CPU cores (default); the pool restarts with the new size on the next parallel_for(...)
+	thread_pool().resize(threads);
+}
+template<typename Chunk> inline void parallel_for_spawn(const ulong chunks, const uint threads, const Chunk& chunk) { // calls chunk(c) for all c in [0, chunks) on threads freshly started threads, like parallel_for(...) did before the pool
+	std::atomic<ulong> next{0ull};
 	vector<thread> thread_array(threads);
-	for(uint t=0u; t<threads; t++) thread_array[t] = thread([=]() {
-		for(ulong n=(ulong)N*(ulong)t/(ulong)threads; n<(ulong)N*(ulong)(t+1u)/(ulong)threads; n++) lambda((uint)n);
+	for(uint t=0u; t<threads; t++) thread_array[t] = thread([&]() {
+		for(ulong c=next.fetch_add(1ull); c<chunks; c=next.fetch_add(1ull)) chunk(c);
 	});
 	for(uint t=0u; t<threads; t++) thread_array[t].join();
 }
-inline void parallel_for(const uint N, std::function<void(uint)> lambda) { // usage: parallel_for(N, [&](uint n) { ... });
-	parallel_for(N, (uint)thread::hardware_concurrency(), lambda);
+template<typename Chunk> inline void parallel_for_chunks(const ulong chunks, const Chunk& chunk) { // calls chunk(c) for all c in [0, chunks) on the thread pool
+	Thread_Pool& pool = thread_pool();
+	const uint threads = pool.threads();
+	if(chunks<=1ull||threads<=1u) {
+		for(ulong c=0ull; c<chunks; c++) chunk(c);
+		return;
+	}
+	bool expected = false;
+	if(Thread_Pool::inside()||!pool.busy.compare_exchange_strong(expected, true)) { // nested, or another thread uses the pool
+		parallel_for_spawn(chunks, (uint)(chunks<(ulong)threads ? chunks : (ulong)threads), chunk);
+		return;
+	}
+	pool.execute(chunks, chunk);
+	pool.busy = false;
 }
-inline void parallel_for(const ulong N, const uint threads, std::function<void(ulong, uint)> lambda) { // usage: parallel_for(N, threads, [&](ulong n, uint t) { ... });
-	vector<thread> thread_array(threads);
-	for(uint t=0u; t<threads; t++) thread_array[t] = thread([=]() {
-		for(ulong n=N*(ulong)t/(ulong)threads; n<N*(ulong)(t+1u)/(ulong)threads; n++) lambda(n, t);
+inline ulong parallel_for_dynamic_chunks(const ulong N) { // chunks of the dynamic schedule: 8 per thread, so threads that finish early take over the rest
+	const ulong chunks = 8ull*(ulong)get_parallel_threads();
+	return N<chunks ? N : chunks;
+}
+
+template<typename Function> inline void parallel_for(const uint N, const uint threads, Function&& lambda) { // usage: parallel_for(N, threads, [&](uint n, uint t) { ... }); or [&](uint n) { ... }; static schedule: N is split into threads contiguous ranges, range t always holds the same n, so results kept per t need no locks
+	parallel_for_chunks((ulong)threads, [&](const ulong t) {
+		for(ulong n=(ulong)N*t/(ulong)threads; n<(ulong)N*(t+1ull)/(ulong)threads; n++) {
+			if constexpr(std::is_invocable<Function, uint, uint>::value) lambda((uint)n, (uint)t); else lambda((uint)n);
+		}
 	});
-	for(uint t=0u; t<threads; t++) thread_array[t].join();
 }
-inline void parallel_for(const ulong N, const uint threads, std::function<void(ulong)> lambda) { // usage: parallel_for(N, threads, [&](ulong n) { ... });
-	vector<thread> thread_array(threads);
-	for(uint t=0u; t<threads; t++) thread_array[t] = thread([=]() {
-		for(ulong n=N*(ulong)t/(ulong)threads; n<N*(ulong)(t+1u)/(ulong)threads; n++) lambda(n);
+template<typename Function> inline void parallel_for(const uint N, Function&& lambda) { // usage: parallel_for(N, [&](uint n) { ... }); dynamic schedule on all pool threads
+	const ulong chunks = parallel_for_dynamic_chunks((ulong)N);
+	parallel_for_chunks(chunks, [&](const ulong c) {
+		for(ulong n=(ulong)N*c/chunks; n<(ulong)N*(c+1ull)/chunks; n++) lambda((uint)n);
 	});
-	for(uint t=0u; t<threads; t++) thread_array[t].join();
 }
-inline void parallel_for(const ulong N, std::function<void(ulong)> lambda) { // usage: parallel_for(N, [&](ulong n) { ... });
-	parallel_for(N, (uint)thread::hardware_concurrency(), lambda);
+template<typename Function> inline void parallel_for(const ulong N, const uint threads, Function&& lambda) { // usage: parallel_for(N, threads, [&](ulong n, uint t) { ... }); or [&](ulong n) { ... }; static schedule like above
+	parallel_for_chunks((ulong)threads, [&](const ulong t) {
+		for(ulong n=N*t/(ulong)threads; n<N*(t+1ull)/(ulong)threads; n++) {
+			if constexpr(std::is_invocable<Function, ulong, uint>::value) lambda(n, (uint)t); else lambda(n);
+		}
+	});
+}
+template<typename Function> inline void parallel_for(const ulong N, Function&& lambda) { // usage: parallel_for(N, [&](ulong n) { ... }); dynamic schedule on all pool threads
+	const ulong chunks = parallel_for_dynamic_chunks(N);
+	parallel_for_chunks(chunks, [&](const ulong c) {
+		for(ulong n=N*c/chunks; n<N*(c+1ull)/chunks; n++) lambda(n);
+	});
 }
 
 class Clock {
@@ -3237,8 +3393,28 @@ inline vector<string> get_main_arguments(int argc, char* argv[]) {
         ("pause", "Do not auto-start the simulation", cxxopts::value<bool>()->default_value("false"))
         ("fps", "Frames per Second for video output (see also --realtime)", cxxopts::value<float>()->default_value("25.0"))
         ("realtime", "Save every frame to video output", cxxopts::value<bool>()->default_value("false"))
+        ("record", "Start with frame export turned on (same as pressing O)", cxxopts::value<bool>()->default_value("false"))
+        ("framequeue", "Max frames waiting for background encoding, the simulation waits when full", cxxopts::value<int>()->default_value("8"))
+        ("dropframes", "Drop frames instead of waiting when the frame queue is full", cxxopts::value<bool>()->default_value("false"))
         ("slomo", "What speed the video plays at 1=realtime 10=10x slower", cxxopts::value<float>()->default_value("1.0"))
         ("export", "Folder name to save images and data into", cxxopts::value<std::string>()->default_value(get_exe_path()+"export/"))
+        ("kernelcache", "Folder to cache compiled OpenCL programs in (empty: always compile)", cxxopts::value<std::string>()->default_value(""))
+        ("kernelcachesize", "Size limit of the kernel cache in MB, least recently used programs are deleted first", cxxopts::value<int>()->default_value("256"))
+        ("profile", "Time every kernel run and buffer copy on the device and print count, mean, p95 and bandwidth per kernel at the end", cxxopts::value<bool>()->default_value("false"))
+        ("profiletrace", "Also write the --profile timeline to this Chrome trace JSON file (chrome://tracing, ui.perfetto.dev)", cxxopts::value<std::string>()->default_value(""))
+        ("meshcache", "Folder to cache transformed meshes and voxelized flags in, so runs with the same STL, transform and resolution skip loading and voxelization (empty: off)", cxxopts::value<std::string>()->default_value(""))
+        ("meshcachesize", "Size limit of the mesh cache in MB, least recently used entries are deleted first", cxxopts::value<int>()->default_value("1024"))
+        ("devicepolicy", "How to pick OpenCL devices when -d is not given: auto (fastest group of identical devices), flops or memory", cxxopts::value<std::string>()->default_value("auto"))
+        ("domains", "Split the grid across this many devices, -r is then the memory per device in MB; the domain split with the least halo traffic is picked automatically", cxxopts::value<int>()->default_value("1"))
+        ("synchalo", "Exchange halos after stream_collide on the whole domain instead of overlapping the exchange with the interior cells (several domains only)", cxxopts::value<bool>()->default_value("false"))
+        ("monitor", "Sample drag and lift every N time steps into a CSV log, needs --FORCE_FIELD (0: off)", cxxopts::value<int>()->default_value("0"))
+        ("monitorlog", "CSV file for --monitor (empty: forces.csv in the export folder)", cxxopts::value<std::string>()->default_value(""))
+        ("converge", "Stop once the mean force coefficients of the last --convergewindow samples change by less than this fraction (0: run to the end)", cxxopts::value<float>()->default_value("0.0"))
+        ("convergewindow", "Number of --monitor samples averaged per convergence check", cxxopts::value<int>()->default_value("10"))
+        ("area", "Reference area in m^2 for the force coefficients (0: chord^2)", cxxopts::value<float>()->default_value("0.0"))
+        ("checkpoint-every", "Write a checkpoint of the full simulation state every N time steps, in the background (0: off)", cxxopts::value<int>()->default_value("0"))
+        ("checkpoint", "Checkpoint file for --checkpoint-every (empty: checkpoint.fxc in the export folder)", cxxopts::value<std::string>()->default_value(""))
+        ("resume", "Continue from this checkpoint instead of initializing; grid, domains, velocity set, FP16 mode and extensions must match", cxxopts::value<std::string>()->default_value(""))
 
         ("SUBGRID", "Use SUBGRID #define", cxxopts::value<bool>()->default_value("false"))
         ("VOLUME_FORCE", "Use VOLUME_FORCE #define", cxxopts::value<bool>()->default_value("false"))
@@ -3283,6 +3459,7 @@ inline vector<string> get_main_arguments(int argc, char* argv[]) {
 #else
     g_args = options.parse(argc, argv);
 #endif
+    set_runtime_features(g_args);
 
     //std::cerr << "parsed ok1" << std::endl;
 
@@ -3293,11 +3470,17 @@ inline vector<string> get_main_arguments(int argc, char* argv[]) {
     }
 
     if (!g_args["pause"].as<bool>()) key_P= true;
+    if (g_args["record"].as<bool>()) key_O= true;
 
     EXPORT_PATH=g_args["export"].as<std::string>();
+    KERNEL_CACHE_PATH=g_args["kernelcache"].as<std::string>();
+    KERNEL_CACHE_MB=(uint)max(g_args["kernelcachesize"].as<int>(), 0);
+    PROFILE_TRACE_PATH=g_args["profiletrace"].as<std::string>();
+    MESH_CACHE_PATH=g_args["meshcache"].as<std::string>();
+    MESH_CACHE_MB=(uint)max(g_args["meshcachesize"].as<int>(), 0);
 
-    if(g_args["FP16S"].as<bool>() || g_args["FP16C"].as<bool>()) fpxxsize=16; //  g_args.set_option_value("fpxxsize", "16"); // g_args["fpxxsize"] = cxxopts::value<unsigned int>()->default_value("16");
-    else fpxxsize=32; // g_args.set_option_value("fpxxsize", "32"); //g_args["fpxxsize"] = cxxopts::value<unsigned int>()->default_value("32");
+    if(g_args["FP16S"].as<bool>() || g_args["FP16C"].as<bool>()) fpxxsize=2; // Bytes per stored DDF
+    else fpxxsize=4;
 
     if (g_args["D2Q9"].as<bool>()) {
 	velocity_set = 9u;
@@ -4287,8 +4470,23 @@ inline void print_info(const string& s) { // print info message
 
 #ifdef UTILITIES_FILE
 #include <fstream> // read/write files
+#if defined(_WIN32)
+#ifndef WIN32_LEAN_AND_MEAN
+#define WIN32_LEAN_AND_MEAN
+#define VC_EXTRALEAN
+#endif // WIN32_LEAN_AND_MEAN
+#include <Windows.h> // for memory-mapped files
+#undef min
+#undef max
+#else // Linux or macOS
+#include <fcntl.h> // for memory-mapped files
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#endif // Windows/Linux
 #ifndef UTILITIES_NO_CPP17
 #include <filesystem> // automatically create directory before writing file, requires C++17
+#include <random> // for unique temporary file names
 inline vector<string> find_files(const string& path, const string& extension=".*") {
 	vector<string> files;
 	if(std::filesystem::is_directory(path)&&std::filesystem::exists(path)) {
@@ -4329,6 +4527,73 @@ inline void write_line(const string& filename, const string& content="") {
 	file.write(s.c_str(), s.length());
 	file.close();
 }
+inline ulong hash_bytes(const void* data, const ulong length, ulong hash=0xCBF29CE484222325ull) { // 64-bit FNV-1a hash, pass the previous hash to continue hashing
+	const uchar* bytes = (const uchar*)data;
+	for(ulong i=0ull; i<length; i++) {
+		hash ^= (ulong)bytes[i];
+		hash *= 0x100000001B3ull;
+	}
+	return hash;
+}
+inline ulong hash_string(const string& s, const ulong hash=0xCBF29CE484222325ull) {
+	return hash_bytes(s.data(), (ulong)s.length(), hash);
+}
+inline string to_string_hex(const ulong x) { // 16 hex digits
+	const string digits = "0123456789abcdef";
+	string r = "";
+	for(int i=60; i>=0; i-=4) r += digits[(x>>i)&0xFull];
+	return r;
+}
+#ifndef UTILITIES_NO_CPP17
+inline bool read_cache_file(const string& filename, string& content) { // read binary cache entry, returns true on a cache hit and marks the entry as recently used
+	std::ifstream file(filename, std::ios::in|std::ios::binary);
+	if(file.fail()) return false;
+	content.assign((std::istreambuf_iterator<char>(file)), std::istreambuf_iterator<char>());
+	file.close();
+	std::error_code error; // other processes may evict the file at any time, so never throw
+	std::filesystem::last_write_time(filename, std::filesystem::file_time_type::clock::now(), error);
+	return content.length()>0ull;
+}
+inline void evict_cache_folder(const string& path, const vector<string>& extensions, const ulong max_bytes) { // delete least recently used cache entries with these extensions until they fit into max_bytes
+	std::error_code error;
+	vector<std::pair<std::filesystem::file_time_type, std::filesystem::path>> entries;
+	ulong total = 0ull;
+	for(const auto& entry : std::filesystem::directory_iterator(path, error)) {
+		if(std::find(extensions.begin(), extensions.end(), entry.path().extension().string())==extensions.end()) continue;
+		const ulong size = (ulong)entry.file_size(error);
+		if(error) continue;
+		total += size;
+		entries.push_back({ entry.last_write_time(error), entry.path() });
+	}
+	std::sort(entries.begin(), entries.end()); // oldest first
+	for(uint i=0u; i<(uint)entries.size()&&total>max_bytes; i++) {
+		const ulong size = (ulong)std::filesystem::file_size(entries[i].second, error);
+		if(std::filesystem::remove(entries[i].second, error)) total -= size;
+	}
+}
+inline string unique_temporary_suffix() { // unique across threads and processes, also across hosts on a shared folder: process ID, counter and random bits
+	static const ulong random = hash_string(to_string((ulong)std::chrono::high_resolution_clock::now().time_since_epoch().count())+" "+to_string((ulong)std::hash<std::thread::id>()(std::this_thread::get_id())));
+	static std::atomic<ulong> counter(0ull);
+#if defined(_WIN32)
+	const ulong process = (ulong)GetCurrentProcessId();
+#else // Linux or macOS
+	const ulong process = (ulong)getpid();
+#endif // Windows/Linux
+	return "."+to_string(process)+"."+to_string(counter++)+"."+to_string_hex(random^(ulong)std::random_device()())+".tmp";
+}
+inline void write_cache_file(const string& filename, const string& content, const vector<string>& extensions, const ulong max_bytes) { // write binary cache entry, then evict least recently used entries of the same kind
+	create_folder(filename);
+	const string temporary = filename+unique_temporary_suffix(); // write to a temporary file first, so parallel runs never see half-written entries
+	std::ofstream file(temporary, std::ios::out|std::ios::binary);
+	if(file.fail()) return;
+	file.write(content.data(), content.length());
+	file.close();
+	std::error_code error;
+	std::filesystem::rename(temporary, filename, error);
+	if(error) std::filesystem::remove(temporary, error);
+	evict_cache_folder(std::filesystem::path(filename).parent_path().string(), extensions, max_bytes);
+}
+#endif // UTILITIES_NO_CPP17
 template<typename T> inline void write_file(const string& filename, const string& header, const uint n, const T* y) {
 	string s = header;
 	if(length(s)>0u && !ends_with(s, "\n")) s += "\n";
@@ -4341,6 +4606,38 @@ template<typename T, typename U> inline void write_file(const string& filename,
 	for(uint i=0u; i<n; i++) s += to_string(x[i])+"\t"+to_string(y[i])+"\n";
 	write_file(filename, s);
 }
+template<typename T> inline string vtk_type() { // .vtk name of T
+	/**/ if constexpr(std::is_same<T, char >::value) return "char" ; else if constexpr(std::is_same<T, uchar >::value) return "unsigned_char" ;
+	else if constexpr(std::is_same<T, short>::value) return "short"; else if constexpr(std::is_same<T, ushort>::value) return "unsigned_short";
+	else if constexpr(std::is_same<T, int  >::value) return "int"  ; else if constexpr(std::is_same<T, uint  >::value) return "unsigned_int"  ;
+	else if constexpr(std::is_same<T, slong>::value) return "long" ; else if constexpr(std::is_same<T, ulong >::value) return "unsigned_long" ;
+	else if constexpr(std::is_same<T, float>::value) return "float"; else if constexpr(std::is_same<T, double>::value) return "double"        ;
+	else print_error("Error in vtk_type(): Type not supported.");
+	return "";
+}
+template<typename T, typename F> inline void write_vtk(const string& filename, const uint Nx, const uint Ny, const uint Nz, const uint dimensions, const float spacing, const F& value) { // binary .vtk file of structured points, value(n, d) returns component d of cell n=x+(y+z*Ny)*Nx
+	const ulong N = (ulong)Nx*(ulong)Ny*(ulong)Nz;
+	const float3 origin = spacing*float3(0.5f-0.5f*(float)Nx, 0.5f-0.5f*(float)Ny, 0.5f-0.5f*(float)Nz);
+	const string header =
+		"# vtk DataFile Version 3.0\nData\nBINARY\nDATASET STRUCTURED_POINTS\n"
+		"DIMENSIONS "+to_string(Nx)+" "+to_string(Ny)+" "+to_string(Nz)+"\n"
+		"ORIGIN "+to_string(origin.x)+" "+to_string(origin.y)+" "+to_string(origin.z)+"\n"
+		"SPACING "+to_string(spacing)+" "+to_string(spacing)+" "+to_string(spacing)+"\n"
+		"POINT_DATA "+to_string(N)+"\nSCALARS data "+vtk_type<T>()+" "+to_string(dimensions)+"\nLOOKUP_TABLE default\n"
+	;
+	T* data = new T[N*(ulong)dimensions];
+	parallel_for(N, [&](ulong n) {
+		for(uint d=0u; d<dimensions; d++) {
+			data[n*(ulong)dimensions+(ulong)d] = reverse_bytes((T)value(n, d)); // .vtk is big endian, SoA <- AoS
+		}
+	});
+	create_folder(filename);
+	std::ofstream file(filename, std::ios::out|std::ios::binary);
+	file.write(header.c_str(), header.length()); // write non-binary file header
+	file.write((char*)data, N*(ulong)dimensions*sizeof(T)); // write binary data
+	file.close();
+	delete[] data;
+}
 #pragma warning(disable:6385)
 inline Image* read_bmp(const string& filename, Image* image=nullptr) {
 	std::ifstream file(create_file_extension(filename, ".bmp"), std::ios::in|std::ios::binary);
@@ -4560,9 +4857,9 @@ struct Mesh { // triangle mesh
 		delete[] p1;
 		delete[] p2;
 	}
-	inline void find_bounds() {
-		pmin = pmax = p0[0];
-		for(uint i=1u; i<triangle_number; i++) {
+	inline void find_bounds(const uint first, const uint last, float3& pmin, float3& pmax) const { // bounds of triangles [first, last)
+		pmin = pmax = p0[first];
+		for(uint i=first; i<last; i++) {
 			const float3 p0i=p0[i], p1i=p1[i], p2i=p2[i];
 			pmin.x = fmin(fmin(fmin(p0i.x, p1i.x), p2i.x), pmin.x);
 			pmin.y = fmin(fmin(fmin(p0i.y, p1i.y), p2i.y), pmin.y);
@@ -4572,6 +4869,23 @@ struct Mesh { // triangle mesh
 			pmax.z = fmax(fmax(fmax(p0i.z, p1i.z), p2i.z), pmax.z);
 		}
 	}
+	inline void find_bounds() {
+		const uint threads = triangle_number<65536u ? 1u : (uint)thread::hardware_concurrency(); // parallel min/max reduction only pays off for large meshes
+		if(threads<=1u) {
+			find_bounds(0u, triangle_number, pmin, pmax);
+			return;
+		}
+		vector<float3> thread_pmin(threads), thread_pmax(threads);
+		parallel_for(threads, threads, [&](uint t) {
+			find_bounds((uint)((ulong)triangle_number*(ulong)t/(ulong)threads), (uint)((ulong)triangle_number*(ulong)(t+1u)/(ulong)threads), thread_pmin[t], thread_pmax[t]);
+		});
+		pmin = thread_pmin[0];
+		pmax = thread_pmax[0];
+		for(uint t=1u; t<threads; t++) {
+			pmin = float3(fmin(pmin.x, thread_pmin[t].x), fmin(pmin.y, thread_pmin[t].y), fmin(pmin.z, thread_pmin[t].z));
+			pmax = float3(fmax(pmax.x, thread_pmax[t].x), fmax(pmax.y, thread_pmax[t].y), fmax(pmax.z, thread_pmax[t].z));
+		}
+	}
 	inline void scale(const float scale) {
 		for(uint i=0u; i<triangle_number; i++) {
 			p0[i] = scale*(p0[i]-center)+center;
@@ -4621,31 +4935,128 @@ struct Mesh { // triangle mesh
 		return fmin(fmin(box_size.x/(pmax.x-pmin.x), box_size.y/(pmax.y-pmin.y)), box_size.z/(pmax.z-pmin.z));
 	}
 };
-inline Mesh* read_stl_raw(const string& path, const bool reposition, const float3& box_size, const float3& center, const float3x3& rotation, const float size) { // read binary .stl file
-	const string filename = create_file_extension(path, ".stl");
-	std::ifstream file(filename, std::ios::in|std::ios::binary);
-	if(file.fail()) print_error("File \""+filename+"\" does not exist!");
-	file.seekg(0, std::ios::end);
-	const uint filesize = (uint)file.tellg();
-	file.seekg(0, std::ios::beg);
-	uchar* data = new uchar[filesize];
-	file.read((char*)data, filesize);
-	file.close();
-	if(filesize==0u) print_error("File \""+filename+"\" is corrupt!");
-	const uint triangle_number = ((uint*)data)[20];
-	uint counter = 84u;
-	if(triangle_number>0u&&filesize==84u+50u*triangle_number) print_info("Loading \""+filename+"\" with "+to_string(triangle_number)+" triangles.");
-	else print_error("File \""+filename+"\" is corrupt or unsupported! Only binary .stl files are supported.");
-	Mesh* mesh = new Mesh(triangle_number, center);
-	mesh->p0[0] = float3(0.0f); // to fix warning C6001
-	for(uint i=0u; i<triangle_number; i++) {
-		const float* triangle_data = (float*)(data+counter);
-		counter += 50u;
-		mesh->p0[i] = rotation*float3(triangle_data[ 3], triangle_data[ 4], triangle_data[ 5]); // read positions of triangle vertices and rotate them
-		mesh->p1[i] = rotation*float3(triangle_data[ 6], triangle_data[ 7], triangle_data[ 8]);
-		mesh->p2[i] = rotation*float3(triangle_data[ 9], triangle_data[10], triangle_data[11]);
+class Mapped_File { // read-only memory-mapped file (64-bit sizes), falls back to reading the whole file if mapping is not possible
+private:
+	const uchar* mapped = nullptr;
+	vector<uchar> buffer;
+	ulong file_size = 0ull;
+	bool found = false;
+#if defined(_WIN32)
+	HANDLE file_handle=INVALID_HANDLE_VALUE, mapping_handle=NULL;
+#else // Linux or macOS
+	int file_descriptor = -1;
+#endif // Windows/Linux
+public:
+	inline Mapped_File(const string& filename) {
+#if defined(_WIN32)
+		file_handle = CreateFileA(filename.c_str(), GENERIC_READ, FILE_SHARE_READ, NULL, OPEN_EXISTING, FILE_ATTRIBUTE_NORMAL, NULL);
+		LARGE_INTEGER size;
+		if(file_handle!=INVALID_HANDLE_VALUE&&GetFileSizeEx(file_handle, &size)) {
+			found = true;
+			file_size = (ulong)size.QuadPart;
+			if(file_size>0ull) mapping_handle = CreateFileMappingA(file_handle, NULL, PAGE_READONLY, 0, 0, NULL);
+			if(mapping_handle!=NULL) mapped = (const uchar*)MapViewOfFile(mapping_handle, FILE_MAP_READ, 0, 0, 0);
+		}
+#else // Linux or macOS
+		file_descriptor = open(filename.c_str(), O_RDONLY);
+		struct stat status;
+		if(file_descriptor>=0&&fstat(file_descriptor, &status)==0) {
+			found = true;
+			file_size = (ulong)status.st_size;
+			if(file_size>0ull) {
+				void* pointer = mmap(nullptr, (size_t)file_size, PROT_READ, MAP_PRIVATE, file_descriptor, 0);
+				if(pointer!=MAP_FAILED) {
+					madvise(pointer, (size_t)file_size, MADV_WILLNEED); // threads read different parts of the file at once, so prefetch everything
+					mapped = (const uchar*)pointer;
+				}
+			}
+		}
+#endif // Windows/Linux
+		if(found&&mapped==nullptr&&file_size>0ull) { // mapping failed, read file into memory instead
+			std::ifstream file(filename, std::ios::in|std::ios::binary);
+			buffer.resize((size_t)file_size);
+			file.read((char*)buffer.data(), (std::streamsize)file_size);
+			if(file.fail()) file_size = 0ull;
+			file.close();
+		}
 	}
-	delete[] data;
+	inline ~Mapped_File() {
+#if defined(_WIN32)
+		if(mapped!=nullptr) UnmapViewOfFile(mapped);
+		if(mapping_handle!=NULL) CloseHandle(mapping_handle);
+		if(file_handle!=INVALID_HANDLE_VALUE) CloseHandle(file_handle);
+#else // Linux or macOS
+		if(mapped!=nullptr) munmap((void*)mapped, (size_t)file_size);
+		if(file_descriptor>=0) close(file_descriptor);
+#endif // Windows/Linux
+	}
+	Mapped_File(const Mapped_File&) = delete;
+	Mapped_File& operator=(const Mapped_File&) = delete;
+	inline bool exists() const { return found; }
+	inline const uchar* data() const { return mapped!=nullptr ? mapped : buffer.data(); }
+	inline ulong size() const { return file_size; }
+};
+inline float parse_stl_float(const char*& p, const char* end) { // parse a decimal number like -1.2345e-03, stops at end (mapped files are not null-terminated)
+	while(p<end&&(*p==' '||*p=='\t'||*p=='\r'||*p=='\n')) p++;
+	const bool negative = p<end&&*p=='-';
+	if(p<end&&(*p=='-'||*p=='+')) p++;
+	double mantissa = 0.0;
+	int exponent = 0;
+	for(; p<end&&*p>='0'&&*p<='9'; p++) mantissa = 10.0*mantissa+(double)(*p-'0');
+	if(p<end&&*p=='.') for(p++; p<end&&*p>='0'&&*p<='9'; p++) {
+		mantissa = 10.0*mantissa+(double)(*p-'0');
+		exponent--;
+	}
+	if(p<end&&(*p=='e'||*p=='E')) {
+		p++;
+		const bool negative_exponent = p<end&&*p=='-';
+		if(p<end&&(*p=='-'||*p=='+')) p++;
+		int e = 0;
+		for(; p<end&&*p>='0'&&*p<='9'; p++) e = 10*e+(*p-'0');
+		exponent += negative_exponent ? -e : e;
+	}
+	const float x = (float)(exponent==0 ? mantissa : mantissa*pow(10.0, (double)exponent));
+	return negative ? -x : x;
+}
+inline const char* find_stl_keyword(const char* p, const char* end, const char* keyword, const uint length) { // find next occurrence of lower case keyword (case insensitive), returns end if there is none
+	for(; p+length<=end; p++) {
+		uint i = 0u;
+		while(i<length&&(p[i]|0x20)==keyword[i]) i++;
+		if(i==length) return p;
+	}
+	return end;
+}
+inline vector<float3> parse_stl_ascii(const char* begin, const char* end, uint threads=(uint)thread::hardware_concurrency()) { // returns vertices of all facets in file order, parsed in parallel
+	if((ulong)(end-begin)<(1ull<<20)||threads==0u) threads = 1u; // small files are parsed on one thread
+	vector<const char*> chunk(threads+1u);
+	chunk[0] = begin;
+	chunk[threads] = end;
+	for(uint t=1u; t<threads; t++) { // each chunk starts right after an "endfacet", so it contains whole facets only
+		const char* split = begin+(ulong)(end-begin)*(ulong)t/(ulong)threads;
+		const char* p = find_stl_keyword(split>chunk[t-1u] ? split : chunk[t-1u], end, "endfacet", 8u);
+		chunk[t] = p<end ? p+8 : end;
+	}
+	vector<vector<float3>> thread_vertices(threads);
+	parallel_for(threads, threads, [&](uint t) {
+		vector<float3>& vertices = thread_vertices[t];
+		const char* p = chunk[t];
+		const char* chunk_end = chunk[t+1u];
+		while((p=find_stl_keyword(p, chunk_end, "vertex", 6u))<chunk_end) {
+			p += 6;
+			const float x = parse_stl_float(p, end);
+			const float y = parse_stl_float(p, end);
+			const float z = parse_stl_float(p, end);
+			vertices.push_back(float3(x, y, z));
+		}
+	});
+	ulong total = 0ull;
+	for(uint t=0u; t<threads; t++) total += (ulong)thread_vertices[t].size();
+	vector<float3> vertices;
+	vertices.reserve((size_t)total);
+	for(uint t=0u; t<threads; t++) vertices.insert(vertices.end(), thread_vertices[t].begin(), thread_vertices[t].end());
+	return vertices;
+}
+inline void place_mesh(Mesh* mesh, const bool reposition, const float3& box_size, const float3& center, const float size) { // rescale and reposition a mesh with unscaled vertices the way read_stl(...) does
 	mesh->find_bounds();
 	float scale = 1.0f;
 	if(size==0.0f) { // auto-rescale to largest possible size
@@ -4656,21 +5067,120 @@ inline Mesh* read_stl_raw(const string& path, const bool reposition, const float
 		scale = -size;
 	}
 	const float3 offset = reposition ? -0.5f*(mesh->pmin+mesh->pmax) : float3(0.0f); // auto-reposition mesh
-	for(uint i=0u; i<triangle_number; i++) { // rescale mesh
+	parallel_for(mesh->triangle_number, [&](uint i) { // rescale mesh
 		mesh->p0[i] = center+scale*(offset+mesh->p0[i]);
 		mesh->p1[i] = center+scale*(offset+mesh->p1[i]);
 		mesh->p2[i] = center+scale*(offset+mesh->p2[i]);
-	}
+	});
 	mesh->find_bounds();
+}
+inline Mesh* transform_mesh(const Mesh* raw, const float3& box_size, const float3& center, const float3x3& rotation, const float size) { // rotated, rescaled and repositioned copy of a mesh read with read_stl(path), same vertices as read_stl(path, box_size, center, rotation, size) without reading the file again
+	Mesh* mesh = new Mesh(raw->triangle_number, center);
+	parallel_for(raw->triangle_number, [&](uint i) {
+		mesh->p0[i] = rotation*raw->p0[i];
+		mesh->p1[i] = rotation*raw->p1[i];
+		mesh->p2[i] = rotation*raw->p2[i];
+	});
+	place_mesh(mesh, true, box_size, center, size);
+	return mesh;
+}
+inline Mesh* stl_error(const string& message, string* error) { // exits with message, or returns nullptr and message in *error if the caller handles it
+	if(error==nullptr) print_error(message);
+	*error = message;
+	return nullptr;
+}
+inline Mesh* read_stl_raw(const string& path, const bool reposition, const float3& box_size, const float3& center, const float3x3& rotation, const float size, string* error=nullptr) { // read binary or ASCII .stl file; with error, a missing or corrupt file returns nullptr instead of exiting
+	Clock clock;
+	const string filename = create_file_extension(path, ".stl");
+	const Mapped_File file(filename);
+	if(!file.exists()) return stl_error("File \""+filename+"\" does not exist!", error);
+	const ulong filesize = file.size();
+	if(filesize==0ull) return stl_error("File \""+filename+"\" is corrupt!", error);
+	const uchar* data = file.data();
+	const double time_read = clock.stop();
+	uint triangle_number = 0u;
+	if(filesize>=84ull) memcpy(&triangle_number, data+80, 4u);
+	Mesh* mesh = nullptr;
+	const bool binary = triangle_number>0u&&filesize==84ull+50ull*(ulong)triangle_number;
+	if(binary) {
+		mesh = new Mesh(triangle_number, center);
+		parallel_for(triangle_number, [&](uint i) {
+			float triangle_data[9]; // skip normal vector, copy because triangles are not 4-byte aligned
+			memcpy(triangle_data, data+96ull+50ull*(ulong)i, 36u);
+			mesh->p0[i] = rotation*float3(triangle_data[0], triangle_data[1], triangle_data[2]); // read positions of triangle vertices and rotate them
+			mesh->p1[i] = rotation*float3(triangle_data[3], triangle_data[4], triangle_data[5]);
+			mesh->p2[i] = rotation*float3(triangle_data[6], triangle_data[7], triangle_data[8]);
+		});
+	} else {
+		const char* begin = (const char*)data;
+		const char* end = begin+filesize;
+		const char* first = begin;
+		while(first<end&&(*first==' '||*first=='\t'||*first=='\r'||*first=='\n')) first++;
+		if(find_stl_keyword(first, end-first>=5 ? first+5 : end, "solid", 5u)!=first) return stl_error("File \""+filename+"\" is corrupt or unsupported! It is neither a binary nor an ASCII .stl file.", error);
+		const vector<float3> vertices = parse_stl_ascii(first, end);
+		if(vertices.size()==0ull||vertices.size()%3ull!=0ull||vertices.size()/3ull>(ulong)max_uint) return stl_error("File \""+filename+"\" is corrupt! ASCII .stl file contains "+to_string((ulong)vertices.size())+" vertices.", error);
+		triangle_number = (uint)(vertices.size()/3ull);
+		mesh = new Mesh(triangle_number, center);
+		parallel_for(triangle_number, [&](uint i) {
+			mesh->p0[i] = rotation*vertices[3ull*(ulong)i   ];
+			mesh->p1[i] = rotation*vertices[3ull*(ulong)i+1ull];
+			mesh->p2[i] = rotation*vertices[3ull*(ulong)i+2ull];
+		});
+	}
+	const double time_parse = clock.stop();
+	place_mesh(mesh, reposition, box_size, center, size);
+	const double time_total = clock.stop();
+	print_info("Loaded \""+filename+"\" ("+string(binary ? "binary" : "ASCII")+") with "+to_string(triangle_number)+" triangles in "+to_string(1E3*time_total, 1u)+" ms (open "+to_string(1E3*time_read, 1u)+" ms, parse "+to_string(1E3*(time_parse-time_read), 1u)+" ms, transform "+to_string(1E3*(time_total-time_parse), 1u)+" ms).");
+	return mesh;
+}
+inline ulong hash_file(const string& filename) { // content hash of a file, 16MB chunks are hashed in parallel; 0 if the file does not exist
+	const Mapped_File file(filename);
+	if(!file.exists()) return 0ull;
+	const ulong chunk=1ull<<24, size=file.size(), chunks=(size+chunk-1ull)/chunk;
+	vector<ulong> chunk_hashes((size_t)chunks);
+	parallel_for(chunks, [&](ulong i) {
+		chunk_hashes[i] = hash_bytes(file.data()+i*chunk, min(chunk, size-i*chunk));
+	});
+	return hash_bytes(chunk_hashes.data(), 8ull*chunks, hash_bytes(&size, 8ull));
+}
+inline string mesh_to_binary(const Mesh* mesh) { // serialize mesh (triangles, center and bounds) for caching
+	const ulong N = (ulong)mesh->triangle_number;
+	string data(8u+4u+3u*sizeof(float3)+3ull*N*sizeof(float3), '\0');
+	char* p = &data[0];
+	memcpy(p, "FX3DMESH", 8u); p += 8;
+	memcpy(p, &mesh->triangle_number, 4u); p += 4;
+	memcpy(p, &mesh->center, sizeof(float3)); p += sizeof(float3);
+	memcpy(p, &mesh->pmin, sizeof(float3)); p += sizeof(float3);
+	memcpy(p, &mesh->pmax, sizeof(float3)); p += sizeof(float3);
+	memcpy(p, mesh->p0, N*sizeof(float3)); p += N*sizeof(float3);
+	memcpy(p, mesh->p1, N*sizeof(float3)); p += N*sizeof(float3);
+	memcpy(p, mesh->p2, N*sizeof(float3));
+	return data;
+}
+inline Mesh* mesh_from_binary(const string& data) { // returns nullptr if data is not a serialized mesh
+	uint triangle_number = 0u;
+	if(data.length()<8ull+4ull||data.compare(0, 8, "FX3DMESH")!=0) return nullptr;
+	memcpy(&triangle_number, data.data()+8, 4u);
+	const ulong N = (ulong)triangle_number;
+	if(N==0ull||(ulong)data.length()!=8ull+4ull+3ull*sizeof(float3)+3ull*N*sizeof(float3)) return nullptr;
+	const char* p = data.data()+12;
+	float3 center;
+	memcpy(&center, p, sizeof(float3)); p += sizeof(float3);
+	Mesh* mesh = new Mesh(triangle_number, center);
+	memcpy(&mesh->pmin, p, sizeof(float3)); p += sizeof(float3);
+	memcpy(&mesh->pmax, p, sizeof(float3)); p += sizeof(float3);
+	memcpy(mesh->p0, p, N*sizeof(float3)); p += N*sizeof(float3);
+	memcpy(mesh->p1, p, N*sizeof(float3)); p += N*sizeof(float3);
+	memcpy(mesh->p2, p, N*sizeof(float3));
 	return mesh;
 }
-inline Mesh* read_stl(const string& path, const float3& box_size, const float3& center, const float3x3& rotation, const float size) { // read binary .stl file (rescale and reposition)
+inline Mesh* read_stl(const string& path, const float3& box_size, const float3& center, const float3x3& rotation, const float size) { // read binary or ASCII .stl file (rescale and reposition)
 	return read_stl_raw(path, true, box_size, center, rotation, size);
 }
-inline Mesh* read_stl(const string& path, const float3& box_size, const float3& center, const float size) { // read binary .stl file (rescale and reposition, no rotation)
+inline Mesh* read_stl(const string& path, const float3& box_size, const float3& center, const float size) { // read binary or ASCII .stl file (rescale and reposition, no rotation)
 	return read_stl_raw(path, true, box_size, center, float3x3(1.0f), size);
 }
-inline Mesh* read_stl(const string& path, const float scale=1.0f, const float3x3& rotation=float3x3(1.0f), const float3& offset=float3(0.0f)) { // read binary .stl file (do not auto-rescale and auto-reposition)
+inline Mesh* read_stl(const string& path, const float scale=1.0f, const float3x3& rotation=float3x3(1.0f), const float3& offset=float3(0.0f)) { // read binary or ASCII .stl file (do not auto-rescale and auto-reposition)
 	return read_stl_raw(path, false, float3(1.0f), offset, rotation, -fabs(scale));
 }
 
@@ -0,0 +1,151 @@
+"""
+Test script for FluidX3D MCP tool - run_batch scheduler
+Runs BatchScheduler with fake worker processes to check work stealing, timeouts and failed workers, then one real
+worker on the CPU OpenCL device to check that cores_per_worker pins it to its cores, and that multi-device configs are
+rejected. Needs the MCP server package (easy_mcp) that fluidx3d.py imports
+Usage: python test_batch.py [path/to/fluidx3d.py]
+"""
+import sys
+import io
+import os
+import re
+import shutil
+import subprocess
+import importlib.util
+import fluidx3d
+
+# Fix console encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+print("=" * 70)
+print("FluidX3D MCP Tool - Batch Scheduler Test")
+print("=" * 70)
+print(f"Version: {fluidx3d.__version__}")
+print()
+
+tool_file = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fluidx3d.py')
+spec = importlib.util.spec_from_file_location("fluidx3d_tool", tool_file)
+tool = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(tool)
+
+stl_file = os.path.abspath("batch_cube.stl")
+with open(stl_file, 'w') as f:  # unit cube, the fake workers never read it, the real one does
+    f.write("solid cube\n")
+    for a, b, c in [((0,0,0),(1,1,0),(1,0,0)), ((0,0,0),(0,1,0),(1,1,0)), ((0,0,1),(1,0,1),(1,1,1)), ((0,0,1),(1,1,1),(0,1,1)),
+                    ((0,0,0),(1,0,0),(1,0,1)), ((0,0,0),(1,0,1),(0,0,1)), ((0,1,0),(1,1,1),(1,1,0)), ((0,1,0),(0,1,1),(1,1,1)),
+                    ((0,0,0),(0,0,1),(0,1,1)), ((0,0,0),(0,1,1),(0,1,0)), ((1,0,0),(1,1,0),(1,1,1)), ((1,0,0),(1,1,1),(1,0,1))]:
+        f.write("facet normal 0 0 0\nouter loop\n" + "".join(f"vertex {x} {y} {z}\n" for x, y, z in (a, b, c)) + "endloop\nendfacet\n")
+    f.write("endsolid cube\n")
+config = {"stl_file": stl_file, "velocity_set": "D3Q19", "collision_operator": "SRT", "resolution": 32, "velocity": 0.075,
+          "reynolds": 100.0, "simulation_time": 0.1}
+
+# Fake workers: job index (from the log file name) -> (seconds, exit code), an OSError for exit code None
+behavior = {}
+started = []
+real_start_worker = tool.start_worker
+def fake_start_worker(args, headless, log_file, cores=None):
+    index = int(os.path.basename(log_file).split('.')[0])
+    started.append((index, args[args.index('-d') + 1] if '-d' in args else None))
+    seconds, code = behavior[index]
+    if code is None:
+        raise OSError(f"cannot start worker {index}")
+    with open(log_file, "w") as log:
+        return subprocess.Popen([sys.executable, "-c", f"import sys, time; print('fake worker {index}', flush=True); time.sleep({seconds}); sys.exit({code})"],
+                                stdout=log, stderr=subprocess.STDOUT)
+tool.start_worker = fake_start_worker
+
+def run(devices, jobs, timeout=None, cores_per_worker=0):
+    scheduler = tool.BatchScheduler(devices, cores_per_worker)
+    result = scheduler.run([config] * jobs, timeout)
+    shutil.rmtree(scheduler.folder, ignore_errors=True)
+    return scheduler, result
+
+# Test 1: an idle worker steals the queued jobs of a busy one
+print("Test 1: work stealing...")
+behavior = {0: (3.0, 0), **{i: (0.2, 0) for i in range(1, 6)}}
+scheduler, result = run(['a', 'b'], 6)
+workers = result['stats']['workers']
+on_b = [r['index'] for r in result['results'] if r['device'] == 'b']
+print(f"    jobs on b: {on_b}, stolen: a {workers[0]['stolen']}, b {workers[1]['stolen']}, wall time {result['stats']['wall_time']:.1f}s")
+if result['stats']['completed'] == 6 and workers[1]['stolen'] == 2 and sorted(on_b) == [1, 2, 3, 4, 5] and sorted(d for _, d in started) == ['a', 'b', 'b', 'b', 'b', 'b']:
+    print("  ✅ SUCCESS: b ran its own 3 jobs and stole 2 from a, each with -d b")
+else:
+    print("  ❌ FAILED: jobs were not stolen")
+print()
+
+# Test 2: a job over the timeout is terminated, the other jobs still run
+print("Test 2: timeout...")
+behavior = {0: (30.0, 0), 1: (0.2, 0)}
+scheduler, result = run(['a'], 2, timeout=1.0)
+statuses = [r['status'] for r in result['results']]
+print(f"    statuses: {statuses}, wall time {result['stats']['wall_time']:.1f}s")
+if statuses == ['timeout', 'completed'] and result['stats']['timeout'] == 1 and result['stats']['wall_time'] < 15.0:
+    print("  ✅ SUCCESS: the long job timed out and was terminated")
+else:
+    print("  ❌ FAILED: timeout not handled")
+print()
+
+# Test 3: a worker exiting with an error, and one that cannot start
+print("Test 3: failed workers...")
+behavior = {0: (0.1, 3), 1: (0.1, None), 2: (0.1, 0)}
+started = []
+scheduler, result = run(['a'], 3)
+failed, broken, completed = result['results']
+print(f"    job 0: {failed['status']}, exit code {failed['returncode']}, log {failed.get('log_tail')}")
+print(f"    job 1: {broken['status']}, error {broken.get('error')}")
+if (failed['status'] == 'failed' and failed['returncode'] == 3 and failed['log_tail'] == ['fake worker 0'] and broken['status'] == 'failed'
+        and 'cannot start worker 1' in broken['error'] and completed['status'] == 'completed' and result['stats']['failed'] == 2):
+    print("  ✅ SUCCESS: failures reported with exit code, log tail and error, the next job still ran")
+else:
+    print("  ❌ FAILED: failures not reported")
+print()
+
+# Test 4: a real worker on a CPU device is pinned to its cores
+print("Test 4: cores_per_worker pinning...")
+tool.start_worker = real_start_worker
+cpus = [d for d in fluidx3d.get_devices() if d['type'] == 'cpu']
+if not cpus:
+    print("  ⚠️  SKIPPED: no CPU OpenCL device")
+else:
+    device = str(cpus[0]['id'])
+    scheduler = tool.BatchScheduler([device], 1)
+    cores = [slot['cores'] for slot in scheduler.slots]
+    config = dict(config, stl_file=os.path.abspath("batch_corrupt.stl"))
+    with open(config['stl_file'], 'wb') as f:
+        f.write(b"\0" * 80 + b"\xff\xff\x00\x00")  # claims 65535 triangles, has none, the worker fails right after starting
+    result = scheduler.run([config], 120.0)
+    with open(result['results'][0]['log_file']) as f:
+        log = f.read()
+    pinned = re.search(r"Worker pinned to cores ([0-9,]+)", log)
+    print(f"    {len(cores)} worker(s) on device {device}, cores {cores}, log: {pinned.group(0) if pinned else log.strip()[-200:]}")
+    if (all(c is not None and len(c) == 1 for c in cores) and len(set(c[0] for c in cores)) == len(cores) and pinned
+            and pinned.group(1) == str(cores[0][0]) and result['results'][0]['status'] == 'failed'):
+        print("  ✅ SUCCESS: one worker per core, pinned to its own core")
+    else:
+        print("  ❌ FAILED: worker not pinned")
+    shutil.rmtree(scheduler.folder, ignore_errors=True)
+    os.remove(config['stl_file'])
+print()
+
+# Test 5: multi-device configs are rejected, their other devices would be oversubscribed
+print("Test 5: multi-device configs...")
+rejected = []
+for extra in (dict(display="0,1"), dict(domains=2)):
+    try:
+        tool.BatchScheduler(['a'], 0).run([dict(config, stl_file=stl_file, **extra)])
+    except ValueError as e:
+        rejected.append(str(e))
+response = tool.handle_run_batch({"configs": [dict(config, stl_file=stl_file), dict(config, stl_file=stl_file, display="0,1")]})
+print(f"    {rejected}")
+print(f"    run_batch: {response['content'][0]['text'][:120]}")
+if len(rejected) == 2 and response.get('isError') and 'Config 1 runs on devices 0, 1' in response['content'][0]['text']:
+    print("  ✅ SUCCESS: rejected before any job started")
+else:
+    print("  ❌ FAILED: multi-device config accepted")
+os.remove(stl_file)
+
+print()
+print("=" * 70)
+print("Batch scheduler tests completed!")
+print("=" * 70)
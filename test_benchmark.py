@@ -0,0 +1,115 @@
+"""
+Test script for FluidX3D Python Module - MLUPs benchmark suite
+Runs fluidx3d.benchmark() on small grids and checks the result layout, the JSON output, the baseline comparison and
+the argument checks
+Usage: python test_benchmark.py
+"""
+import sys
+import io
+import os
+import json
+import subprocess
+import tempfile
+import fluidx3d
+
+# Fix console encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+print("=" * 70)
+print("FluidX3D Python Module - Benchmark Suite Test")
+print("=" * 70)
+print(f"Version: {fluidx3d.__version__}")
+print()
+
+output = os.path.abspath("benchmark_test.json")
+small = dict(sizes=[16], steps=10, warmup=2, repeats=3)
+
+# Test 1: every combination is run, with plausible numbers
+print("Test 1: combinations...")
+result = fluidx3d.benchmark(velocity_sets=['D2Q9', 'D3Q19'], precisions=['FP32', 'FP16S'], collisions=['SRT', 'TRT'], output=output, **small)
+rows = result['results']
+for row in rows:
+    print(f"    {row['velocity_set']} {row['precision']:5s} {row['collision']} {row['N']}: {row['mlups']:.1f} MLUPs, {row['bandwidth_gbs']:.2f} GB/s")
+combinations = {(r['velocity_set'], r['precision'], r['collision']) for r in rows}
+ok = len(rows) == 8 and len(combinations) == 8 and all(r['status'] == 'ok' for r in rows)
+ok = ok and all(r['mlups_min'] <= r['mlups'] <= r['mlups_max'] and r['mlups'] > 0 for r in rows)
+ok = ok and all(r['cells'] == 16**3 for r in rows if r['velocity_set'] == 'D3Q19')
+ok = ok and all(r['N'][2] == 1 and r['cells'] == 64*64 for r in rows if r['velocity_set'] == 'D2Q9')
+d3q19 = [r for r in rows if r['velocity_set'] == 'D3Q19' and r['precision'] == 'FP32'][0]
+ok = ok and d3q19['bytes_per_cell'] == 19*2*4 + 1 and abs(d3q19['bandwidth_gbs'] - 1e-3*d3q19['mlups']*d3q19['bytes_per_cell']) < 1e-9
+if ok:
+    print("  ✅ SUCCESS: 8 cases, 2D cases have the same cells as 3D, bandwidth matches bytes per cell")
+else:
+    print("  ❌ FAILED: unexpected results")
+print()
+
+# Test 2: JSON output with device metadata
+print("Test 2: JSON output...")
+with open(output) as f:
+    written = json.load(f)
+if written['results'] == json.loads(json.dumps(rows)) and written['device']['name'] and written['settings']['repeats'] == 3:
+    print(f"  ✅ SUCCESS: {len(written['results'])} results on {written['device']['name']}")
+else:
+    print("  ❌ FAILED: JSON differs from the returned results")
+print()
+
+# Test 3: baseline comparison
+print("Test 3: baseline...")
+faster = dict(written)
+faster['results'] = [dict(r, mlups=10*r['mlups']) for r in written['results']]  # a baseline that was 10x faster
+baseline = os.path.abspath("benchmark_baseline.json")
+with open(baseline, 'w') as f:
+    json.dump(faster, f)
+slow = fluidx3d.benchmark(velocity_sets=['D3Q19'], precisions=['FP32', 'FP16C'], collisions=['SRT'], baseline=baseline, tolerance=0.5, **small)
+flagged = [r for r in slow['results'] if r.get('regression')]
+missing = [r for r in slow['results'] if r['baseline_mlups'] is None]
+if slow['regressions'] == 1 and len(flagged) == 1 and len(missing) == 1 and slow['baseline']['same_device']:
+    print(f"  ✅ SUCCESS: {flagged[0]['precision']} flagged ({100*flagged[0]['change']:+.0f}%), FP16C not in the baseline")
+else:
+    print(f"  ❌ FAILED: {slow['regressions']} regressions")
+same = fluidx3d.benchmark(velocity_sets=['D3Q19'], precisions=['FP32'], collisions=['SRT'], baseline=output, tolerance=10.0, **small)
+if same['regressions'] == 0:
+    print("  ✅ SUCCESS: no regression against itself with a wide tolerance")
+else:
+    print("  ❌ FAILED: regression against itself")
+os.remove(baseline)
+os.remove(output)
+print()
+
+# Test 4: argument checks
+print("Test 4: invalid arguments...")
+caught = 0
+for kwargs in [dict(velocity_sets=['D3Q7']), dict(precisions=['FP64']), dict(collisions=['MRT']), dict(sizes=[1]), dict(steps=0),
+               dict(device=99), dict(args=['-d', '99'])]:
+    try:
+        fluidx3d.benchmark(**dict(small, **kwargs))
+    except RuntimeError as e:
+        print(f"    RuntimeError: {e}")
+        caught += 1
+if caught == 7:
+    print("  ✅ SUCCESS: all rejected before running")
+else:
+    print(f"  ❌ FAILED: {7 - caught} not rejected")
+empty = tempfile.mkdtemp()  # ICD loader vendor folder without any runtime
+probe = f"""
+import sys
+sys.path = {sys.path!r}
+import fluidx3d
+try:
+    fluidx3d.benchmark(**{small!r})
+except RuntimeError as e:
+    print('raised', e)
+"""
+process = subprocess.run([sys.executable, '-c', probe], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                         env=dict(os.environ, OCL_ICD_VENDORS=empty, OPENCL_VENDOR_PATH=empty))
+os.rmdir(empty)
+if process.returncode == 0 and 'raised' in process.stdout:
+    print("  ✅ SUCCESS: without OpenCL runtime benchmark() raises RuntimeError")
+else:
+    print(f"  ❌ FAILED: exit code {process.returncode}, {process.stdout.strip()[-200:]}")
+print()
+
+print("=" * 70)
+print("Benchmark suite tests completed!")
+print("=" * 70)
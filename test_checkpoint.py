@@ -0,0 +1,125 @@
+"""
+Test script for FluidX3D Python Module - checkpoint and restart
+Writes a checkpoint mid-run, restores it in a fresh Simulation and checks the continued run is bit-identical
+Usage: python test_checkpoint.py
+"""
+import sys
+import io
+import os
+import shutil
+import struct
+import numpy as np
+import fluidx3d
+
+# Fix console encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+print("=" * 70)
+print("FluidX3D Python Module - Checkpoint Test")
+print("=" * 70)
+print(f"Version: {fluidx3d.__version__}")
+print()
+
+N = 48
+folder = os.path.join(os.getcwd(), 'checkpoint_test')
+shutil.rmtree(folder, ignore_errors=True)
+os.makedirs(folder)
+
+def make_simulation(args, D=1, n=N):
+    config = fluidx3d.Config()
+    config.parse_args(['--D3Q19', '--SRT'] + args)
+    sim = fluidx3d.Simulation(config, n, n, n, 0.05, 1, 1, D)
+    return sim
+
+def set_initial_conditions(sim):
+    z, y, x = np.mgrid[0:N, 0:N, 0:N]
+    flags = sim.flags.copy()
+    flags[(x - 20.0)**2 + (y - 24.0)**2 + (z - 24.0)**2 < 6.0**2] = fluidx3d.TYPE_S
+    sim.write_to_device('flags', flags)
+    u = sim.u.copy()
+    u[0] = 0.05
+    u[1] = 0.02*np.sin(2*np.pi*z/N)
+    u[:, flags == fluidx3d.TYPE_S] = 0.0
+    sim.write_to_device('u', u)
+
+def checkpoint_t(path):
+    with open(path, 'rb') as f:
+        header = f.read(60)
+    assert header[:8] == b'FX3DCKPT'
+    return struct.unpack_from('<Q', header, 52)[0]
+
+def run_case(args, D):
+    path = os.path.join(folder, f'case_{D}.fxc')
+    sim = make_simulation(args, D)
+    set_initial_conditions(sim)
+    sim.run(100)
+    sim.write_checkpoint(path)
+    sim.run(100)  # keeps stepping while the checkpoint is written
+    sim.read_from_device('u')
+    reference = sim.u.copy()
+    sim.flush_snapshots()
+    del sim
+
+    sim = make_simulation(args, D)  # fresh setup, never initialized
+    sim.read_checkpoint(path)
+    t = sim.get_t()
+    sim.run(100)
+    sim.read_from_device('u')
+    identical = t == 100 and sim.get_t() == 200 and np.array_equal(sim.u, reference)
+    print(f"    restored t={t}, continued to t={sim.get_t()}, max difference {float(np.abs(sim.u - reference).max()):.1e}")
+    del sim
+    return identical
+
+# Test 1: FP32 DDFs, one domain
+print("Test 1: FP32, one domain...")
+if run_case([], 1):
+    print("  ✅ SUCCESS: continued run is bit-identical")
+else:
+    print("  ❌ FAILED: continued run differs")
+print()
+
+# Test 2: FP16S DDFs, two domains (halos are part of the state)
+print("Test 2: FP16S, two domains...")
+if run_case(['--FP16S'], 2):
+    print("  ✅ SUCCESS: continued run is bit-identical")
+else:
+    print("  ❌ FAILED: continued run differs")
+print()
+
+# Test 3: incompatible simulations are refused
+print("Test 3: mismatching grid, domains and encoding...")
+path = os.path.join(folder, 'case_1.fxc')
+for args, D, n, what in [([], 1, 32, 'grid'), ([], 2, N, 'domains'), (['--FP16C'], 1, N, 'encoding')]:
+    sim = make_simulation(args, D, n)
+    try:
+        sim.read_checkpoint(path)
+        print(f"  ❌ UNEXPECTED: different {what} was accepted")
+    except RuntimeError as e:
+        print(f"  ✅ SUCCESS: {what}: {e}")
+    del sim
+print()
+
+# Test 4: --checkpoint-every and --resume from the config
+print("Test 4: --checkpoint-every and --resume...")
+path = os.path.join(folder, 'periodic.fxc')
+sim = make_simulation(['--checkpoint-every', '40', '--checkpoint', path])
+set_initial_conditions(sim)
+sim.run(130)
+sim.flush_snapshots()
+written = checkpoint_t(path)
+del sim
+sim = make_simulation(['--resume', path])
+resumed = sim.get_t()
+del sim
+print(f"  last checkpoint at t={written}, resumed at t={resumed}")
+if written == 120 and resumed == 120 and not os.path.exists(path + '.tmp'):
+    print("  ✅ SUCCESS: periodic checkpoint written and resumed")
+else:
+    print("  ❌ FAILED: expected the t=120 checkpoint")
+shutil.rmtree(folder, ignore_errors=True)
+
+print()
+print("=" * 70)
+print("Checkpoint Test Complete!")
+print("=" * 70)
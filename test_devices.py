@@ -0,0 +1,108 @@
+"""
+Test script for FluidX3D Python Module - OpenCL device enumeration and selection
+Lists the devices, checks the enumeration is cached, and builds a simulation on a device picked by ID and by policy
+Usage: python test_devices.py
+"""
+import sys
+import io
+import os
+import subprocess
+import tempfile
+import time
+import fluidx3d
+
+# Fix console encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+print("=" * 70)
+print("FluidX3D Python Module - Device Test")
+print("=" * 70)
+print(f"Version: {fluidx3d.__version__}")
+print()
+
+# Test 1: enumeration
+print("Test 1: get_devices()...")
+start = time.time()
+devices = fluidx3d.get_devices()
+first = time.time() - start
+for d in devices:
+    print(f"  {d['id']}: {d['name']} ({d['type']}, {d['memory_mb']} MB, {d['compute_units']} CUs, {d['tflops']:.3f} TFLOPs/s, fp16={d['fp16']})")
+if devices and [d['id'] for d in devices] == list(range(len(devices))):
+    print("  ✅ SUCCESS: devices listed with consecutive IDs")
+else:
+    print("  ❌ FAILED: no devices or wrong IDs")
+print()
+
+# Test 2: repeated calls use the cached result
+print("Test 2: cached enumeration...")
+start = time.time()
+for i in range(100):
+    again = fluidx3d.get_devices()
+cached = (time.time() - start) / 100
+print(f"  first call {first*1000:.2f} ms, cached call {cached*1000:.3f} ms")
+if again == devices:
+    print("  ✅ SUCCESS: cached result matches")
+else:
+    print("  ❌ FAILED: cached result differs")
+print()
+
+# Test 3: selection policies
+print("Test 3: select_devices()...")
+best_flops = max(devices, key=lambda d: d['tflops'])['id']
+best_memory = max(devices, key=lambda d: d['memory_mb'])['id']
+selected = {policy: fluidx3d.select_devices(1, policy)[0] for policy in ('auto', 'flops', 'memory')}
+print(f"  {selected}")
+if selected['flops'] == best_flops and selected['memory'] == best_memory and fluidx3d.select_devices(1, 'auto', [0]) == [0]:
+    print("  ✅ SUCCESS: policies pick the expected devices")
+else:
+    print("  ❌ FAILED: unexpected selection")
+try:
+    fluidx3d.select_devices(1, 'fastest')
+    print("  ❌ UNEXPECTED: Should have raised an exception!")
+except RuntimeError as e:
+    print(f"  ✅ SUCCESS: Caught expected error: {e}")
+print()
+
+# Test 4: run on a device by ID and by policy
+print("Test 4: Simulation with -d and --devicepolicy...")
+for extra in (['-d', str(devices[-1]['id'])], ['--devicepolicy', 'memory']):
+    config = fluidx3d.Config()
+    config.parse_args(['--D3Q19', '--SRT'] + extra)
+    sim = fluidx3d.Simulation(config, 16, 16, 16, 0.1)
+    sim.run(5)
+    print(f"  {' '.join(extra)}: t={sim.get_t()}")
+    if sim.get_t() == 5:
+        print("  ✅ SUCCESS")
+    else:
+        print("  ❌ FAILED")
+    del sim
+print()
+
+# Test 5: without OpenCL runtime, listing is empty and selection raises instead of exiting
+print("Test 5: no OpenCL runtime...")
+empty = tempfile.mkdtemp()  # ICD loader vendor folder without any runtime
+probe = f"""
+import sys
+sys.path = {sys.path!r}
+import fluidx3d
+print('devices', fluidx3d.get_devices())
+try:
+    fluidx3d.select_devices(1, 'auto')
+except RuntimeError as e:
+    print('raised', e)
+"""
+process = subprocess.run([sys.executable, '-c', probe], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                         env=dict(os.environ, OCL_ICD_VENDORS=empty, OPENCL_VENDOR_PATH=empty))
+os.rmdir(empty)
+lines = process.stdout.strip().splitlines()
+print(f"  {lines[-2:] if lines else process.stdout}")
+if process.returncode == 0 and 'devices []' in lines and any(line.startswith('raised') for line in lines):
+    print("  ✅ SUCCESS: get_devices() returned [], select_devices() raised RuntimeError")
+else:
+    print(f"  ❌ FAILED: exit code {process.returncode}")
+
+print()
+print("=" * 70)
+print("Device Test Complete!")
+print("=" * 70)
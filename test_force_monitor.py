@@ -0,0 +1,95 @@
+"""
+Test script for FluidX3D Python Module - drag/lift monitor
+Runs the wing setup headless with --monitor, checks the CSV log, the result dict, the early stop on convergence and
+that a --floor is not added to the object's forces
+Usage: python test_force_monitor.py [model.stl] (default: a generated cube)
+"""
+import sys
+import io
+import os
+import csv
+import fluidx3d
+
+# Fix console encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+stl_file = sys.argv[1] if len(sys.argv) > 1 else os.path.abspath('force_monitor_cube.stl')
+if len(sys.argv) <= 1:  # unit cube, 12 triangles
+    corners = [(x, y, z) for x in (0, 1) for y in (0, 1) for z in (0, 1)]
+    faces = [(0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1), (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)]
+    with open(stl_file, 'w') as f:
+        f.write("solid cube\n")
+        for a, b, c, d in faces:
+            for triangle in ((a, b, c), (a, c, d)):
+                f.write("facet normal 0 0 0\nouter loop\n")
+                for i in triangle:
+                    f.write("vertex {} {} {}\n".format(*corners[i]))
+                f.write("endloop\nendfacet\n")
+        f.write("endsolid cube\n")
+log_file = os.path.join(os.getcwd(), 'export_monitor', 'forces.csv')
+
+print("=" * 70)
+print("FluidX3D Python Module - Force Monitor Test")
+print("=" * 70)
+print(f"Version: {fluidx3d.__version__}")
+print()
+
+def run(extra_args):
+    config = fluidx3d.Config()
+    config.parse_args(['-f', stl_file, '--D3Q19', '--SRT', '--EQUILIBRIUM_BOUNDARIES', '-r', '50', '--secs', '1.0', '--re', '100',
+                       '--monitorlog', log_file] + extra_args)
+    return config.run_simulation(headless=True)
+
+def read_log():
+    with open(log_file) as f:
+        return [row for row in csv.reader(f) if row and not row[0].startswith('#')]
+
+# Test 1: sampling without a convergence target runs to the end
+print("Test 1: monitor every 20 steps...")
+result = run(['--FORCE_FIELD', '--monitor', '20'])
+rows = read_log()
+print(f"  {result}")
+if result and not result['converged'] and result['samples'] == len(rows) > 0 and int(rows[-1][0]) == result['t'] and result['t'] % 20 == 0:
+    print(f"  ✅ SUCCESS: {len(rows)} samples logged, last Cd = {result['Cd']:.4f}")
+else:
+    print("  ❌ FAILED: result and log disagree")
+full_steps = result['t'] if result else 0
+print()
+
+# Test 2: the low Reynolds number flow settles, so a 0.1% tolerance stops the run early
+print("Test 2: early stop with --converge...")
+result = run(['--FORCE_FIELD', '--monitor', '20', '--converge', '0.001', '--convergewindow', '5'])
+print(f"  {result}")
+if result and result['converged'] and result['change'] < 0.001 and result['t'] < full_steps:
+    print(f"  ✅ SUCCESS: converged after {result['t']} of {full_steps} steps")
+else:
+    print("  ❌ FAILED: expected an early stop")
+print()
+
+# Test 3: without --FORCE_FIELD the monitor is off
+print("Test 3: --monitor without --FORCE_FIELD...")
+result = run(['--monitor', '20'])
+if result is None:
+    print("  ✅ SUCCESS: monitor off, run_simulation() returned None")
+else:
+    print(f"  ❌ FAILED: expected None, got {result}")
+
+print()
+
+# Test 4: the floor is a solid too, but only the object's forces are added up
+print("Test 4: --floor...")
+free = run(['--FORCE_FIELD', '--monitor', '20'])
+floor = run(['--FORCE_FIELD', '--monitor', '20', '--floor'])
+print(f"    Cd without floor {free['Cd']:.4f}, with floor {floor['Cd']:.4f}")
+if abs(floor['Cd'] - free['Cd']) <= 0.1*abs(free['Cd']):
+    print("  ✅ SUCCESS: Cd with floor within 10% of Cd without")
+else:
+    print("  ❌ FAILED: the floor's wall shear is counted as drag")
+if len(sys.argv) <= 1:
+    os.remove(stl_file)
+
+print()
+print("=" * 70)
+print("Force Monitor Test Complete!")
+print("=" * 70)
@@ -0,0 +1,87 @@
+"""
+Test script for FluidX3D Python Module - overlapped halo exchange
+With several domains, stream_collide on the interior cells runs while the halos are exchanged; checks the result is
+bit-identical to one domain and to the sequential exchange (--synchalo) for several domain splits
+Usage: python test_halo_overlap.py
+"""
+import sys
+import io
+import numpy as np
+import fluidx3d
+
+# Fix console encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+print("=" * 70)
+print("FluidX3D Python Module - Halo Overlap Test")
+print("=" * 70)
+print(f"Version: {fluidx3d.__version__}")
+print()
+
+N = 48
+
+def run_case(args, domains, steps=100):
+    config = fluidx3d.Config()
+    config.parse_args(['--D3Q19', '--SRT'] + args)
+    sim = fluidx3d.Simulation(config, N, N, N, 0.05, *domains)
+    z, y, x = np.mgrid[0:N, 0:N, 0:N]
+    flags = sim.flags.copy()
+    flags[(x - 20.0)**2 + (y - 24.0)**2 + (z - 24.0)**2 < 6.0**2] = fluidx3d.TYPE_S  # sphere across the domain boundaries
+    sim.write_to_device('flags', flags)
+    u = sim.u.copy()
+    u[0] = 0.05
+    u[1] = 0.02*np.sin(2*np.pi*z/N)
+    u[2] = 0.02*np.cos(2*np.pi*x/N)
+    u[:, flags == fluidx3d.TYPE_S] = 0.0
+    sim.write_to_device('u', u)
+    sim.run(steps)
+    sim.read_from_device('u')
+    sim.read_from_device('rho')
+    result = sim.u.copy(), sim.rho.copy()
+    del sim
+    return result
+
+def identical(a, b):
+    return np.array_equal(a[0], b[0]) and np.array_equal(a[1], b[1])
+
+# Test 1: FP32 DDFs, splits in every direction
+print("Test 1: FP32, domain splits against one domain...")
+reference = run_case([], (1, 1, 1))
+ok = True
+for domains in [(2, 1, 1), (1, 2, 1), (1, 1, 2), (2, 2, 1), (2, 2, 2)]:
+    overlapped = run_case([], domains)
+    synchronous = run_case(['--synchalo'], domains)
+    same = identical(overlapped, reference) and identical(synchronous, reference)
+    print(f"    {domains}: overlapped max difference {float(np.abs(overlapped[0] - reference[0]).max()):.1e}, --synchalo {float(np.abs(synchronous[0] - reference[0]).max()):.1e}")
+    ok = ok and same
+if ok:
+    print("  ✅ SUCCESS: all splits are bit-identical to one domain")
+else:
+    print("  ❌ FAILED: a domain split differs")
+print()
+
+# Test 2: FP16S DDFs and thermal DDFs are exchanged in the same overlap window
+print("Test 2: FP16S with TEMPERATURE...")
+args = ['--FP16S', '--VOLUME_FORCE', '--TEMPERATURE']
+reference = run_case(args, (1, 1, 1), 60)
+overlapped = run_case(args, (2, 1, 2), 60)
+if identical(overlapped, reference):
+    print("  ✅ SUCCESS: bit-identical to one domain")
+else:
+    print(f"  ❌ FAILED: max difference {float(np.abs(overlapped[0] - reference[0]).max()):.1e}")
+print()
+
+# Test 3: domains too thin for separate transfer layers fall back to the sequential exchange
+print("Test 3: thin domains...")
+reference = run_case([], (1, 1, 1), 20)
+thin = run_case([], (1, 1, 16), 20)  # 3 layers per domain
+if identical(thin, reference):
+    print("  ✅ SUCCESS: bit-identical to one domain")
+else:
+    print(f"  ❌ FAILED: max difference {float(np.abs(thin[0] - reference[0]).max()):.1e}")
+
+print()
+print("=" * 70)
+print("Halo Overlap Test Complete!")
+print("=" * 70)
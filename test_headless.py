@@ -0,0 +1,76 @@
+"""
+Test script for FluidX3D Python Module - headless run
+No window: runs main_setup() directly, writes offscreen frames, and checks the GIL is released
+Usage: python test_headless.py [model.stl]
+"""
+import sys
+import io
+import os
+import threading
+import time
+import fluidx3d
+
+# Fix console encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+stl_file = sys.argv[1] if len(sys.argv) > 1 else 'LZ_129_Hindenburg.stl'
+export_path = os.path.join(os.getcwd(), 'export_headless') + os.sep
+
+print("=" * 70)
+print("FluidX3D Python Module - Headless Test")
+print("=" * 70)
+print(f"Version: {fluidx3d.__version__}")
+print()
+
+config = fluidx3d.Config()
+config.parse_args([
+    '-f', stl_file,
+    '--D3Q19', '--SRT',
+    '--EQUILIBRIUM_BOUNDARIES',
+    '-r', '50',            # Very low resolution for speed
+    '--secs', '0.05',
+    '--record',            # write frames offscreen
+    '--fps', '100',
+    '--export', export_path,
+    '--FRAME_WIDTH', '320',
+    '--FRAME_HEIGHT', '240',
+])
+print(f"  ✅ record: {config.get_bool('record')}")
+
+# Count in a Python thread while the simulation runs - only possible if run_simulation() releases the GIL
+ticks = 0
+done = threading.Event()
+def ticker():
+    global ticks
+    while not done.is_set():
+        ticks += 1
+        time.sleep(0.01)
+
+t = threading.Thread(target=ticker)
+t.start()
+start = time.time()
+try:
+    config.run_simulation(headless=True)
+finally:
+    done.set()
+    t.join()
+elapsed = time.time() - start
+
+print()
+print(f"Run took {elapsed:.2f}s, Python thread ticked {ticks} times meanwhile")
+if ticks > 1:
+    print("  ✅ SUCCESS: GIL was released during the run")
+else:
+    print("  ❌ FAILED: Python thread did not run during the simulation")
+
+frames = [f for f in os.listdir(export_path) if f.endswith('.png')] if os.path.isdir(export_path) else []
+if frames:
+    print(f"  ✅ SUCCESS: {len(frames)} offscreen frame(s) written to {export_path}")
+else:
+    print(f"  ❌ FAILED: no frames in {export_path}")
+
+print()
+print("=" * 70)
+print("Headless Test Complete!")
+print("=" * 70)
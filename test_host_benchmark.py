@@ -0,0 +1,97 @@
+"""
+Test script for FluidX3D - host-side I/O and utility benchmark
+Runs benchmark_host.py on tiny inputs and checks that every case ran with correct output, the JSON layout, the case
+selection and the baseline comparison. Needs no GPU, builds bin/benchmark_host with make if it is missing
+Usage: python test_host_benchmark.py
+"""
+import sys
+import io
+import os
+import json
+import shutil
+import subprocess
+
+# Fix console encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+print("=" * 70)
+print("FluidX3D - Host Benchmark Test")
+print("=" * 70)
+print()
+
+script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_host.py')
+output = os.path.abspath("host_benchmark_test.json")
+small = ['--triangles', '20000', '--ascii-triangles', '2000', '--width', '320', '--height', '200', '--cells', '24',
+         '--elements', '100000', '--repeats', '3']
+cases = ['read_stl_binary', 'read_stl_ascii', 'find_bounds', 'write_png', 'write_qoi', 'write_bmp', 'vtk_pack', 'write_vtk',
+         'parallel_for_static', 'parallel_for_dynamic']
+
+def run(*args):
+    return subprocess.run([sys.executable, script] + small + list(args), stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+
+# Test 1: every case runs and checks its output
+print("Test 1: all cases...")
+process = run('--output', output)
+with open(output) as f:
+    result = json.load(f)
+rows = result['results']
+for row in rows:
+    print(f"    {row['name']:20s} {row['size']:26s} {row['items_per_s']/1e6:9.2f} M{row['unit']}/s, {row['mb_per_s']:8.1f} MB/s")
+ok = process.returncode == 0 and [row['name'] for row in rows] == cases and all(row['ok'] for row in rows)
+ok = ok and all(row['repeats'] == 3 and 0 < row['seconds_min'] <= row['seconds'] for row in rows)
+ok = ok and all(abs(row['items_per_s'] - row['items']/row['seconds']) <= 1e-3*row['items_per_s'] for row in rows)
+if ok:
+    print(f"  ✅ SUCCESS: {len(rows)} cases with correct output on {result['host']['threads']} host thread(s)")
+else:
+    print(f"  ❌ FAILED: exit code {process.returncode}")
+    print(process.stdout)
+print()
+
+# Test 2: case selection
+print("Test 2: --only...")
+selected = run('--only', 'write_qoi', 'find_bounds', '--output', '')
+if selected.returncode == 0 and 'write_qoi' in selected.stdout and 'find_bounds' in selected.stdout and 'write_png' not in selected.stdout:
+    print("  ✅ SUCCESS: only the selected cases ran")
+else:
+    print("  ❌ FAILED: other cases ran")
+print()
+
+# Test 3: baseline comparison
+print("Test 3: baseline...")
+faster = dict(result)
+faster['results'] = [dict(row, items_per_s=10*row['items_per_s']) if row['name'] == 'write_bmp' else row for row in rows]
+baseline = os.path.abspath("host_benchmark_baseline.json")
+with open(baseline, 'w') as f:
+    json.dump(faster, f)
+slow = run('--only', 'write_bmp', 'vtk_pack', '--baseline', baseline, '--tolerance', '0.5', '--output', output)
+with open(output) as f:
+    compared = json.load(f)
+flagged = [row['name'] for row in compared['results'] if row.get('regression')]
+if slow.returncode == 1 and compared['regressions'] == 1 and flagged == ['write_bmp']:
+    print("  ✅ SUCCESS: write_bmp flagged, exit code 1")
+else:
+    print(f"  ❌ FAILED: exit code {slow.returncode}, flagged {flagged}")
+os.remove(baseline)
+os.remove(output)
+print()
+
+# Test 4: without --output, stdout holds only the JSON, the loader info goes to stderr
+print("Test 4: JSON on stdout...")
+binary = os.path.join(os.path.dirname(script), 'bin', 'benchmark_host')
+direct = subprocess.run([binary, '--triangles', '2000', '--asciitriangles', '200', '--repeats', '2', '--only', 'read_stl_binary,read_stl_ascii',
+                         '--dir', os.path.abspath('host_benchmark_files')], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+try:
+    printed = [row['name'] for row in json.loads(direct.stdout)['results']]
+except ValueError:
+    printed = None
+if direct.returncode == 0 and printed == ['read_stl_binary', 'read_stl_ascii'] and direct.stderr.count('Loaded') == 2:
+    print("  ✅ SUCCESS: stdout parses as JSON, one info line per case on stderr from the warmup run only")
+else:
+    print(f"  ❌ FAILED: exit code {direct.returncode}, stdout {direct.stdout[:200]!r}")
+shutil.rmtree(os.path.abspath('host_benchmark_files'), ignore_errors=True)
+print()
+
+print("=" * 70)
+print("Host benchmark tests completed!")
+print("=" * 70)
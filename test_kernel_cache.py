@@ -0,0 +1,116 @@
+"""
+Test script for FluidX3D Python Module - OpenCL program cache
+Builds the same simulation twice with --kernelcache and checks the second build skips the compiler
+Usage: python test_kernel_cache.py
+"""
+import sys
+import io
+import os
+import shutil
+import subprocess
+import time
+import fluidx3d
+
+# Fix console encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+cache_path = os.path.join(os.getcwd(), 'kernel_cache_test')
+shutil.rmtree(cache_path, ignore_errors=True)
+
+print("=" * 70)
+print("FluidX3D Python Module - Kernel Cache Test")
+print("=" * 70)
+print(f"Version: {fluidx3d.__version__}")
+print()
+
+def build(extra_args=['--SRT']):
+    config = fluidx3d.Config()
+    config.parse_args(['--D3Q19', '--kernelcache', cache_path] + extra_args)
+    start = time.time()
+    sim = fluidx3d.Simulation(config, 16, 16, 16, 0.1)
+    elapsed = time.time() - start
+    sim.run(10)
+    t = sim.get_t()
+    del sim
+    return elapsed, t
+
+def cache_files():
+    return sorted(f for f in os.listdir(cache_path) if f.endswith('.clbin')) if os.path.isdir(cache_path) else []
+
+# Test 1: first build compiles and fills the cache
+print("Test 1: cold build...")
+cold, t = build()
+files = cache_files()
+print(f"  {cold:.2f}s, cache: {files}")
+if len(files) == 1 and t == 10:
+    print("  ✅ SUCCESS: one program binary cached")
+else:
+    print("  ❌ FAILED: expected exactly one cached binary")
+print()
+
+# Test 2: second build loads the binary
+print("Test 2: warm build...")
+warm, t = build()
+print(f"  {warm:.2f}s (cold {cold:.2f}s)")
+if warm < cold and t == 10 and cache_files() == files:
+    print("  ✅ SUCCESS: warm build is faster and runs")
+else:
+    print("  ❌ FAILED: warm build was not faster")
+print()
+
+# Test 3: corrupt binary falls back to a source build
+print("Test 3: corrupt cache entry...")
+with open(os.path.join(cache_path, files[0]), 'wb') as f:
+    f.write(b'not a program binary')
+_, t = build()
+if t == 10 and os.path.getsize(os.path.join(cache_path, files[0])) > 100:
+    print("  ✅ SUCCESS: rebuilt from source and replaced the entry")
+else:
+    print("  ❌ FAILED: no fallback to the source build")
+print()
+
+# Test 4: a different program gets its own entry, size limit 0 evicts everything
+print("Test 4: different build options and LRU eviction...")
+build(['--TRT'])
+if len(cache_files()) == 2:
+    print("  ✅ SUCCESS: TRT program cached next to SRT")
+else:
+    print(f"  ❌ FAILED: expected two entries, got {cache_files()}")
+build(['--SRT', '--FP16S', '--kernelcachesize', '0'])
+if len(cache_files()) == 0:
+    print("  ✅ SUCCESS: size limit 0 evicts all entries")
+else:
+    print(f"  ❌ FAILED: entries left: {cache_files()}")
+shutil.rmtree(cache_path, ignore_errors=True)
+print()
+
+# Test 5: parallel processes fill the same cache entry, each through its own temporary file
+print("Test 5: parallel processes...")
+worker = f"""
+import sys
+sys.path = {sys.path!r}
+import fluidx3d
+config = fluidx3d.Config()
+config.parse_args(['--D3Q19', '--SRT', '--kernelcache', {cache_path!r}])
+sim = fluidx3d.Simulation(config, 16, 16, 16, 0.1)
+sim.run(10)
+print('t =', sim.get_t())
+"""
+processes = [subprocess.Popen([sys.executable, '-c', worker], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True) for i in range(4)]
+outputs = [process.communicate()[0] for process in processes]
+left = [f for f in os.listdir(cache_path) if f.endswith('.tmp')] if os.path.isdir(cache_path) else []
+if all(process.returncode == 0 and 't = 10' in output for process, output in zip(processes, outputs)) and len(cache_files()) == 1 and not left:
+    _, t = build()
+    if t == 10:
+        print("  ✅ SUCCESS: 4 processes ran, one valid entry cached, no temporary files left")
+    else:
+        print("  ❌ FAILED: cached entry does not load")
+else:
+    print(f"  ❌ FAILED: exit codes {[process.returncode for process in processes]}, entries {cache_files()}, temporary files {left}")
+shutil.rmtree(cache_path, ignore_errors=True)
+
+print()
+print("=" * 70)
+print("Kernel Cache Test Complete!")
+print("=" * 70)
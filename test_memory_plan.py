@@ -0,0 +1,135 @@
+"""
+Test script for FluidX3D Python Module - memory planner
+Checks fluidx3d.plan_memory() against the buffers a Simulation allocates and fluidx3d.plan_domains() against all domain splits
+Usage: python test_memory_plan.py
+"""
+import sys
+import io
+import os
+import json
+import subprocess
+import tempfile
+import fluidx3d
+
+# Fix console encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+print("=" * 70)
+print("FluidX3D Python Module - Memory Plan Test")
+print("=" * 70)
+print(f"Version: {fluidx3d.__version__}")
+print()
+
+def make_config(args):
+    config = fluidx3d.Config()
+    config.parse_args(['--D3Q19', '--SRT'] + args)
+    return config
+
+# Test 1: bytes per cell for the velocity set, DDF precision and extensions
+print("Test 1: bytes per cell...")
+ok = True
+for args, expected in [([], 19*4+17), (['--FP16S'], 19*2+17), (['--FORCE_FIELD'], 19*4+17+12), (['--D3Q27', '--FP16C'], 27*2+17)]:
+    config = fluidx3d.Config()
+    config.parse_args(args if '--D3Q27' in args else ['--D3Q19'] + args)
+    plan = fluidx3d.plan_memory(config, 64, 64, 64)
+    print(f"  {' '.join(args) or 'FP32':20s} {plan['bytes_per_cell_device']} bytes/cell device, {plan['device_mb']} MB")
+    ok = ok and plan['bytes_per_cell_device'] == expected and plan['device_bytes'] >= 64**3*expected
+if ok:
+    print("  ✅ SUCCESS: bytes per cell match the allocated buffers")
+else:
+    print("  ❌ FAILED: unexpected bytes per cell")
+print()
+
+# Test 2: host memory of the plan is what a Simulation allocates on the host
+print("Test 2: host memory against a Simulation...")
+ok = True
+pixels = None  # frame buffers are allocated with graphics support, 4 bytes per pixel on the host, 8 with several domains
+for D in (1, 2):
+    config = make_config(['--FORCE_FIELD'])
+    plan = fluidx3d.plan_memory(config, 48, 48, 48, 1, 1, D)
+    sim = fluidx3d.Simulation(config, 48, 48, 48, 0.1, 1, 1, D)
+    fields = sum(getattr(sim, name).nbytes for name in ('rho', 'u', 'flags', 'F'))  # 29 bytes per cell, the whole grid without halo layers
+    Nx, Ny, Nz = plan['domain_N']
+    halo = D*Nx*Ny*Nz*29 - fields  # halo layers are allocated on the host too
+    transfer = 2*Nx*Ny*max(5*4, 17) if D > 1 else 0  # transfer buffers in +z/-z
+    sums = 40*min((Nx*Ny*Nz + 63)//64, 1024)  # object force reduction
+    expected = fields + halo + D*(transfer + sums)
+    if pixels is None:
+        pixels = (plan['host_bytes'] - expected)//4
+    frames = D*(4 if D == 1 else 8)*pixels
+    print(f"  D={D}: planned {plan['host_bytes']} bytes, fields {fields}, halo layers {halo}, buffers {D*(transfer + sums)}, frames {frames}")
+    ok = ok and plan['host_bytes'] == expected + frames
+    del sim
+if ok:
+    print("  ✅ SUCCESS: host memory matches")
+else:
+    print("  ❌ FAILED: host memory differs")
+print()
+
+# Test 3: plan_domains() picks the split with the least halo traffic
+print("Test 3: domain split with the least halo traffic...")
+config = make_config([])
+grid = (96, 256, 64)
+best = fluidx3d.plan_domains(config, 8, grid=grid)
+splits = [(x, y, 8//(x*y)) for x in (1, 2, 4, 8) for y in (1, 2, 4, 8) if 8 % (x*y) == 0]
+traffic = {s: fluidx3d.plan_memory(config, *grid, *s)['halo_bytes_per_step'] for s in splits}
+print(f"  picked {best['domains']}, {best['halo_bytes_per_step']/1048576:.2f} MB per time step; all splits: " + ", ".join(f"{s}: {t/1048576:.2f}" for s, t in sorted(traffic.items(), key=lambda item: item[1])))
+if best['halo_bytes_per_step'] == min(traffic.values()) and tuple(best['N']) == grid:
+    print("  ✅ SUCCESS: least halo traffic")
+else:
+    print("  ❌ FAILED: a split with less halo traffic exists")
+print()
+
+# Test 4: the largest grid for a memory budget fits it, and a grid that is too large is flagged
+print("Test 4: grid for a memory budget...")
+config = make_config(['-x', '1', '-y', '2', '-z', '1'])
+plan = fluidx3d.plan_domains(config, 2, memory=64)
+sim = fluidx3d.Simulation(config, *plan['N'], 0.1, *plan['domains'])  # the planned grid allocates
+del sim
+huge = fluidx3d.plan_memory(config, 4096, 4096, 4096)
+print(f"  64 MB per device: grid {plan['N']}, domains {plan['domains']}, {plan['device_mb']} MB; 4096^3: {huge['device_mb']} MB, fits={huge['fits']}")
+if plan['device_mb'] <= 64 and plan['N'][1] >= 2*plan['N'][0] - 2 and plan['fits'] and not huge['fits']:
+    print("  ✅ SUCCESS: planned grid fits its budget")
+else:
+    print("  ❌ FAILED: unexpected plan")
+try:
+    fluidx3d.plan_domains(config, 2, grid=(64, 64))
+    print("  ❌ UNEXPECTED: Should have raised an exception!")
+except RuntimeError as e:
+    print(f"  ✅ SUCCESS: Caught expected error: {e}")
+print()
+
+# Test 5: a -d ID that does not exist raises, and without OpenCL runtime the byte plan comes without the device fit
+print("Test 5: bad device ID and no OpenCL runtime...")
+try:
+    fluidx3d.plan_memory(make_config(['-d', '99']), 64, 64, 64)
+    print("  ❌ UNEXPECTED: Should have raised an exception!")
+except RuntimeError as e:
+    print(f"  ✅ SUCCESS: Caught expected error: {e}")
+expected = fluidx3d.plan_memory(make_config([]), 64, 64, 64)
+empty = tempfile.mkdtemp()  # ICD loader vendor folder without any runtime
+probe = f"""
+import sys, json
+sys.path = {sys.path!r}
+import fluidx3d
+config = fluidx3d.Config()
+config.parse_args(['--D3Q19', '--SRT'])
+plan = fluidx3d.plan_memory(config, 64, 64, 64)
+domains = fluidx3d.plan_domains(config)
+print('plan', json.dumps([plan['device_bytes'], plan['host_bytes'], plan['devices'], plan['fits'], domains['domains']]))
+"""
+process = subprocess.run([sys.executable, '-c', probe], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                         env=dict(os.environ, OCL_ICD_VENDORS=empty, OPENCL_VENDOR_PATH=empty))
+os.rmdir(empty)
+lines = [line for line in process.stdout.splitlines() if line.startswith('plan ')]
+print(f"  {lines[-1] if lines else process.stdout.strip()[-200:]}")
+if process.returncode == 0 and lines and json.loads(lines[-1][5:]) == [expected['device_bytes'], expected['host_bytes'], [], None, [1, 1, 1]]:
+    print("  ✅ SUCCESS: same bytes as with a device, devices=[] and fits=None, one domain")
+else:
+    print(f"  ❌ FAILED: exit code {process.returncode}")
+
+print()
+print("=" * 70)
+print("Memory Plan Test Complete!")
+print("=" * 70)
@@ -0,0 +1,88 @@
+"""
+Test script for FluidX3D Python Module - mesh preprocessing cache
+Builds the same wing setup twice with --meshcache and checks the second build restores identical flags from the cache
+Usage: python test_mesh_cache.py [model.stl]
+"""
+import sys
+import io
+import os
+import shutil
+import time
+import fluidx3d
+
+# Fix console encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+stl_file = sys.argv[1] if len(sys.argv) > 1 else 'cube.stl'
+cache_path = os.path.join(os.getcwd(), 'mesh_cache_test')
+shutil.rmtree(cache_path, ignore_errors=True)
+
+print("=" * 70)
+print("FluidX3D Python Module - Mesh Cache Test")
+print("=" * 70)
+print(f"Version: {fluidx3d.__version__}")
+print()
+
+def build(extra_args=[]):
+    config = fluidx3d.Config()
+    config.parse_args(['-f', stl_file, '--D3Q19', '--SRT', '--EQUILIBRIUM_BOUNDARIES', '-r', '50', '--meshcache', cache_path] + extra_args)
+    start = time.time()
+    sim = fluidx3d.Simulation(config)
+    sim.initialize()
+    elapsed = time.time() - start
+    flags = sim.flags.copy()
+    del sim
+    return elapsed, flags
+
+def cache_files(extension):
+    return sorted(f for f in os.listdir(cache_path) if f.endswith(extension)) if os.path.isdir(cache_path) else []
+
+# Test 1: first build voxelizes and fills the cache
+print("Test 1: cold build...")
+cold, cold_flags = build()
+print(f"  {cold:.2f}s, meshes: {cache_files('.mesh')}, flags: {cache_files('.flags')}")
+if len(cache_files('.mesh')) == 1 and len(cache_files('.flags')) == 1 and cold_flags.any():
+    print("  ✅ SUCCESS: mesh and flags cached")
+else:
+    print("  ❌ FAILED: expected one .mesh and one .flags entry")
+print()
+
+# Test 2: second build restores the flags without voxelizing
+print("Test 2: warm build...")
+warm, warm_flags = build()
+print(f"  {warm:.2f}s (cold {cold:.2f}s)")
+if (warm_flags == cold_flags).all():
+    print("  ✅ SUCCESS: cached flags are identical to the voxelized ones")
+else:
+    print(f"  ❌ FAILED: {int((warm_flags != cold_flags).sum())} cells differ")
+print()
+
+# Test 3: without the flags entry the cached mesh is voxelized again
+print("Test 3: mesh entry only...")
+os.remove(os.path.join(cache_path, cache_files('.flags')[0]))
+_, mesh_flags = build()
+if (mesh_flags == cold_flags).all() and len(cache_files('.flags')) == 1:
+    print("  ✅ SUCCESS: cached mesh voxelizes to the same flags")
+else:
+    print("  ❌ FAILED: flags from the cached mesh differ")
+print()
+
+# Test 4: a different transform gets its own entry, size limit 0 evicts everything
+print("Test 4: different rotation and LRU eviction...")
+build(['--rotx', '10'])
+if len(cache_files('.flags')) == 2:
+    print("  ✅ SUCCESS: rotated geometry cached next to the original")
+else:
+    print(f"  ❌ FAILED: expected two entries, got {cache_files('.flags')}")
+build(['--rotx', '20', '--meshcachesize', '0'])
+if len(cache_files('.mesh')) + len(cache_files('.flags')) == 0:
+    print("  ✅ SUCCESS: size limit 0 evicts all entries")
+else:
+    print(f"  ❌ FAILED: entries left: {cache_files('.mesh') + cache_files('.flags')}")
+shutil.rmtree(cache_path, ignore_errors=True)
+
+print()
+print("=" * 70)
+print("Mesh Cache Test Complete!")
+print("=" * 70)
@@ -0,0 +1,153 @@
+"""
+Test script for FluidX3D Python Module - kernel profiler
+Times every kernel run and buffer copy with OpenCL profiling events, checks the statistics, the stream_collide
+bandwidth, the Chrome trace export and that nothing is recorded while the profiler is off
+Usage: python test_profiler.py
+"""
+import sys
+import io
+import os
+import json
+import time
+import fluidx3d
+
+# Fix console encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+print("=" * 70)
+print("FluidX3D Python Module - Kernel Profiler Test")
+print("=" * 70)
+print(f"Version: {fluidx3d.__version__}")
+print()
+
+N = 32
+STEPS = 50
+
+def make_sim(args=[], domains=(1, 1, 1)):
+    config = fluidx3d.Config()
+    config.parse_args(['--D3Q19', '--SRT'] + args)
+    return fluidx3d.Simulation(config, N, N, N, 0.05, *domains)
+
+def by_name(stats):
+    return {row['name']: row for row in stats}
+
+# Test 1: profiler off records nothing
+print("Test 1: profiler off...")
+fluidx3d.set_profiling(False)
+fluidx3d.reset_profile()
+sim = make_sim()
+sim.run(STEPS)
+del sim
+if fluidx3d.profile_stats() == []:
+    print("  ✅ SUCCESS: no runs recorded")
+else:
+    print(f"  ❌ FAILED: {len(fluidx3d.profile_stats())} kernels recorded")
+print()
+
+# Test 2: every stream_collide is timed, with plausible statistics
+print("Test 2: statistics per kernel...")
+fluidx3d.set_profiling(True)
+fluidx3d.reset_profile()
+sim = make_sim()
+sim.run(STEPS)
+sim.read_from_device('rho')
+stats = by_name(fluidx3d.profile_stats())
+for row in fluidx3d.profile_stats():
+    print(f"    {row['name']:30s} {row['count']:6d} runs, mean {row['mean_us']:9.1f} us, p95 {row['p95_us']:9.1f} us, {100*row['share']:5.1f}%, {row['bandwidth_gbs']:7.2f} GB/s")
+sc = stats.get('stream_collide')
+ok = sc is not None and sc['count'] == STEPS
+ok = ok and sc['min_us'] <= sc['mean_us'] <= sc['max_us'] and sc['min_us'] <= sc['p95_us'] <= sc['max_us']
+ok = ok and 'initialize' in stats and 'read_from_device' in stats
+ok = ok and abs(sum(row['share'] for row in stats.values()) - 1.0) < 1e-6
+if ok:
+    print(f"  ✅ SUCCESS: {sc['count']} stream_collide runs, initialize and read_from_device timed")
+else:
+    print("  ❌ FAILED: missing kernels or inconsistent statistics")
+print()
+
+# Test 3: stream_collide bandwidth uses the bytes per cell of the MLUPs line
+print("Test 3: bandwidth...")
+bytes_per_cell = 19*2*4 + 1  # D3Q19 FP32 DDFs read and written, flags
+expected = N*N*N*bytes_per_cell*sc['count']
+if sc['bytes'] == expected and abs(sc['bandwidth_gbs'] - 1e-9*expected/(1e-3*sc['total_ms'])) < 1e-6*max(sc['bandwidth_gbs'], 1.0):
+    print(f"  ✅ SUCCESS: {sc['bandwidth_gbs']:.2f} GB/s from {bytes_per_cell} bytes per cell")
+else:
+    print(f"  ❌ FAILED: {sc['bytes']} bytes, expected {expected}")
+print()
+
+# Test 4: Chrome trace
+print("Test 4: Chrome trace export...")
+path = os.path.abspath("profile_trace.json")
+events = fluidx3d.export_trace(path)
+with open(path) as f:
+    trace = json.load(f)
+os.remove(path)
+runs = [e for e in trace['traceEvents'] if e['ph'] == 'X']
+names = [e for e in trace['traceEvents'] if e['ph'] == 'M']
+ordered = all(e['dur'] >= 0 and e['ts'] >= 0 for e in runs)
+if events == len(runs) and events == sum(row['count'] for row in stats.values()) and names and ordered:
+    print(f"  ✅ SUCCESS: {events} events on {len(names)} device(s)")
+else:
+    print(f"  ❌ FAILED: {events} events, {len(runs)} in the file")
+del sim
+print()
+
+# Test 5: several domains, the halo transfer kernels run in their own queue
+print("Test 5: two domains...")
+fluidx3d.reset_profile()
+sim = make_sim(domains=(1, 1, 2))
+sim.run(STEPS)
+stats = by_name(fluidx3d.profile_stats())
+path = os.path.abspath("profile_trace.json")
+fluidx3d.export_trace(path)
+with open(path) as f:
+    queues = {(e['pid'], e['tid']) for e in json.load(f)['traceEvents'] if e['ph'] == 'X'}
+os.remove(path)
+transfer = [name for name in stats if name.startswith('transfer_')]
+if stats['stream_collide']['count'] >= 2*STEPS and transfer and len(queues) >= 2:
+    print(f"  ✅ SUCCESS: {', '.join(sorted(transfer))} timed on {len(queues)} queues")
+else:
+    print(f"  ❌ FAILED: {sorted(stats)}")
+del sim
+print()
+
+# Test 6: more runs than the p95 sample holds, count/total/min/max stay exact
+print("Test 6: long run...")
+LONG = 5000  # > 4096 samples per kernel
+fluidx3d.set_profiling(True)
+fluidx3d.reset_profile()
+config = fluidx3d.Config()
+config.parse_args(['--D3Q19', '--SRT'])
+sim = fluidx3d.Simulation(config, 8, 8, 8, 0.05)
+sim.run(LONG)
+sc = by_name(fluidx3d.profile_stats())['stream_collide']
+print(f"    {sc['count']} runs, mean {sc['mean_us']:.1f} us, p95 {sc['p95_us']:.1f} us, min {sc['min_us']:.1f} us, max {sc['max_us']:.1f} us")
+ok = sc['count'] == LONG and abs(sc['mean_us'] - 1e3*sc['total_ms']/LONG) <= 1e-6*sc['mean_us']
+ok = ok and sc['min_us'] <= sc['mean_us'] <= sc['max_us'] and sc['min_us'] <= sc['p95_us'] <= sc['max_us']
+if ok:
+    print(f"  ✅ SUCCESS: {LONG} runs counted, p95 from the sample within min/max")
+else:
+    print("  ❌ FAILED: inconsistent statistics past the sample size")
+del sim
+fluidx3d.set_profiling(False)
+print()
+
+# Overhead, for reference only: the step time depends on the device and its load, so it is not checked
+print("Overhead:")
+timings = {}
+for enabled in (False, True):
+    fluidx3d.set_profiling(enabled)
+    sim = make_sim()
+    sim.run(10)
+    start = time.perf_counter()
+    sim.run(200)
+    timings[enabled] = time.perf_counter() - start
+    del sim
+fluidx3d.set_profiling(False)
+print(f"    off {1e6*timings[False]/200:.1f} us/step, on {1e6*timings[True]/200:.1f} us/step")
+print()
+
+print("=" * 70)
+print("Kernel profiler tests completed!")
+print("=" * 70)
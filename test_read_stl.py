@@ -0,0 +1,79 @@
+"""
+Test script for FluidX3D Python Module - STL loader
+Reads the same triangles from a binary and an ASCII .stl file, and checks that missing and corrupt files raise a
+RuntimeError instead of ending the Python process
+Usage: python test_read_stl.py
+"""
+import sys
+import io
+import os
+import tempfile
+import numpy as np
+import fluidx3d
+
+# Fix console encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+print("=" * 70)
+print("FluidX3D Python Module - STL Loader Test")
+print("=" * 70)
+print(f"Version: {fluidx3d.__version__}")
+print()
+
+folder = tempfile.mkdtemp()
+def path(name):
+    return os.path.join(folder, name)
+
+# Test 1: binary and ASCII files give the same triangles
+print("Test 1: binary and ASCII...")
+triangles = np.random.default_rng(2).random((1000, 3, 3), dtype=np.float32)
+with open(path("binary.stl"), "wb") as f:
+    f.write(b"\0"*80 + np.uint32(len(triangles)).tobytes())
+    for t in triangles:
+        f.write(np.zeros(3, dtype=np.float32).tobytes() + t.tobytes() + b"\0\0")
+with open(path("ascii.stl"), "w") as f:
+    f.write("solid test\n")
+    for t in triangles:
+        f.write("facet normal 0 0 1\nouter loop\n")
+        for v in t:
+            f.write(f"vertex {v[0]:.9e} {v[1]:.9e} {v[2]:.9e}\n")
+        f.write("endloop\nendfacet\n")
+    f.write("endsolid test\n")
+binary = fluidx3d.read_stl(path("binary.stl"))
+ascii = fluidx3d.read_stl(path("ascii.stl"))
+if np.array_equal(binary, triangles) and np.array_equal(ascii, triangles):
+    print(f"  ✅ SUCCESS: {len(binary)} identical triangles")
+else:
+    print("  ❌ FAILED: triangles differ")
+print()
+
+# Test 2: missing and corrupt files raise instead of exiting
+print("Test 2: missing and corrupt files...")
+with open(path("empty.stl"), "wb") as f:
+    pass
+with open(path("garbage.stl"), "wb") as f:
+    f.write(b"\x89PNG not a mesh" * 10)
+with open(path("truncated.stl"), "wb") as f:
+    f.write(open(path("binary.stl"), "rb").read()[:5000])
+with open(path("novertices.stl"), "w") as f:
+    f.write("solid test\nendsolid test\n")
+caught = 0
+for name in ["missing.stl", "empty.stl", "garbage.stl", "truncated.stl", "novertices.stl"]:
+    try:
+        fluidx3d.read_stl(path(name))
+    except RuntimeError as e:
+        print(f"    {name}: RuntimeError: {e}")
+        caught += 1
+if caught == 5 and len(fluidx3d.read_stl(path("binary.stl"))) == 1000:
+    print("  ✅ SUCCESS: 5 errors raised, the module still works afterwards")
+else:
+    print(f"  ❌ FAILED: {5 - caught} not raised")
+for name in os.listdir(folder):
+    os.remove(path(name))
+os.rmdir(folder)
+
+print()
+print("=" * 70)
+print("STL Loader Test Complete!")
+print("=" * 70)
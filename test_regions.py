@@ -0,0 +1,205 @@
+"""
+Test script for FluidX3D Python Module - initial and boundary conditions set on the device
+Simulation.apply_region() writes flags, density and velocity in device memory; checks it against the same setup
+written from NumPy arrays, for one and several domains, that initialize() doesn't overwrite it with the host fields, and
+that host fields set before the first region are kept while later host edits must be uploaded with write_to_device()
+Usage: python test_regions.py
+"""
+import sys
+import io
+import time
+import numpy as np
+import fluidx3d
+
+# Fix console encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+print("=" * 70)
+print("FluidX3D Python Module - Regions Test")
+print("=" * 70)
+print(f"Version: {fluidx3d.__version__}")
+print()
+
+Nx, Ny, Nz = 32, 48, 32
+u_in = 0.05
+
+def make_sim(domains, N=(Nx, Ny, Nz)):
+    config = fluidx3d.Config()
+    config.parse_args(['--D3Q19', '--SRT', '--EQUILIBRIUM_BOUNDARIES'])
+    return fluidx3d.Simulation(config, *N, 0.05, *domains)
+
+def setup_on_device(sim):
+    sim.apply_region('sphere', flag=fluidx3d.TYPE_S, center=(15.0, 20.0, 16.0), radius=6.0)
+    sim.apply_region('cuboid', flag=fluidx3d.TYPE_S, center=(16.0, 34.0, 8.0), size=(8.0, 4.0, 10.0))
+    sim.apply_region('box', u=(0.0, u_in, 0.0), keep=fluidx3d.TYPE_S)
+    sim.apply_region('faces', flag=fluidx3d.TYPE_E, faces='-x +x -y +y +z')
+    sim.apply_region('faces', flag=fluidx3d.TYPE_S, u=(0.0, 0.0, 0.0), faces=['-z'])
+
+def setup_on_host(sim):
+    z, y, x = np.mgrid[0:Nz, 0:Ny, 0:Nx].astype(np.float32)
+    flags = sim.flags.copy()
+    u = sim.u.copy()
+    flags[(x - 15.0)**2 + (y - 20.0)**2 + (z - 16.0)**2 <= 6.0**2] = fluidx3d.TYPE_S
+    flags[(np.abs(x - 16.0) <= 4.0) & (np.abs(y - 34.0) <= 2.0) & (np.abs(z - 8.0) <= 5.0)] = fluidx3d.TYPE_S
+    u[1][flags != fluidx3d.TYPE_S] = u_in
+    faces = (x == 0) | (x == Nx - 1) | (y == 0) | (y == Ny - 1) | (z == Nz - 1)
+    flags[faces] = fluidx3d.TYPE_E
+    flags[z == 0] = fluidx3d.TYPE_S
+    u[:, z == 0] = 0.0
+    sim.write_to_device('flags', flags)
+    sim.write_to_device('u', u)
+
+def state(sim):
+    for name in ('flags', 'u', 'rho'):
+        sim.read_from_device(name)
+    return sim.flags.copy(), sim.u.copy(), sim.rho.copy()
+
+def identical(a, b):
+    return all(np.array_equal(x, y) for x, y in zip(a, b))
+
+# Test 1: regions give the same fields and the same flow as the NumPy setup
+print("Test 1: regions against the same setup from NumPy...")
+ok = True
+for domains in [(1, 1, 1), (2, 1, 1), (1, 2, 2)]:
+    sim = make_sim(domains)
+    setup_on_host(sim)
+    sim.run(0)
+    host_initial = state(sim)
+    sim.run(50)
+    host_final = state(sim)
+    del sim
+    sim = make_sim(domains)
+    setup_on_device(sim)
+    sim.run(0)
+    device_initial = state(sim)
+    sim.run(50)
+    device_final = state(sim)
+    del sim
+    same = identical(host_initial, device_initial) and identical(host_final, device_final)
+    print(f"    {domains}: initial fields {'identical' if identical(host_initial, device_initial) else 'differ'}, after 50 steps max |u| difference {float(np.abs(host_final[1] - device_final[1]).max()):.1e}")
+    ok = ok and same
+if ok:
+    print("  ✅ SUCCESS: bit-identical for all splits")
+else:
+    print("  ❌ FAILED: regions differ from the NumPy setup")
+print()
+
+# Test 2: the host fields are left untouched and initialize() keeps the device fields
+print("Test 2: no host loop and no upload...")
+sim = make_sim((1, 1, 1))
+setup_on_device(sim)
+host_flags = sim.flags.copy()
+sim.run(0)
+sim.read_from_device('flags')
+if not host_flags.any() and (sim.flags == fluidx3d.TYPE_E).sum() > 0:
+    print("  ✅ SUCCESS: host flags stayed empty, device flags survived initialize()")
+else:
+    print("  ❌ FAILED: host fields were written or the device fields were overwritten")
+print()
+
+# Test 3: reset() writes the regions again, so the next run starts from the same state
+print("Test 3: reset...")
+sim.run(0)
+initial = state(sim)
+sim.run(30)
+sim.reset()
+sim.run(0)
+if identical(state(sim), initial):
+    print("  ✅ SUCCESS: state after reset() matches the initial state")
+else:
+    print("  ❌ FAILED: reset() didn't restore the initial state")
+print()
+
+# Test 4: cylinder against the shapes.cpp formula
+print("Test 4: cylinder...")
+del sim
+sim = make_sim((1, 1, 1))
+sim.apply_region('cylinder', flag=fluidx3d.TYPE_S, center=(16.0, 24.0, 16.0), axis=(0.0, 20.0, 10.0), radius=5.0)
+sim.read_from_device('flags')
+z, y, x = np.mgrid[0:Nz, 0:Ny, 0:Nx].astype(np.float32)
+a = np.array([0.0, 20.0, 10.0], dtype=np.float32)
+t = np.stack([x - 16.0, y - 24.0, z - 16.0])
+nt = np.tensordot(a/np.linalg.norm(a), t, axes=1)
+expected = (np.sum(t**2, axis=0) - nt**2 <= 25.0) & (nt**2 <= (0.5*np.linalg.norm(a))**2)
+mismatch = int(np.sum((sim.flags == fluidx3d.TYPE_S) != expected))
+print(f"    {int(expected.sum())} cells expected, {mismatch} differ (rounding at the surface)")
+if mismatch <= max(1, expected.sum()//100):
+    print("  ✅ SUCCESS: cylinder matches")
+else:
+    print("  ❌ FAILED: cylinder differs")
+print()
+
+# Test 5: regions can't change an initialized simulation, unknown shapes are rejected
+print("Test 5: errors...")
+sim.run(0)
+try:
+    sim.apply_region('box', rho=1.0)
+    print("  ❌ UNEXPECTED: Should have raised an exception!")
+except RuntimeError as e:
+    print(f"  ✅ SUCCESS: Caught expected error: {e}")
+sim.reset()
+try:
+    sim.apply_region('torus', flag=fluidx3d.TYPE_S)
+    print("  ❌ UNEXPECTED: Should have raised an exception!")
+except RuntimeError as e:
+    print(f"  ✅ SUCCESS: Caught expected error: {e}")
+del sim
+print()
+
+# Test 6: host fields set before the first region are uploaded with it, later the views are read-only and edits need write_to_device()
+print("Test 6: host fields and regions...")
+sim = make_sim((1, 1, 1))
+sim.flags[10:20, 20:30, 10:20] = fluidx3d.TYPE_S  # in place on the host buffer, before any region
+sim.apply_region('faces', flag=fluidx3d.TYPE_E, faces='-y +y')
+sim.run(0)
+flags = state(sim)[0]
+if np.all(flags[10:20, 20:30, 10:20] == fluidx3d.TYPE_S) and np.all(flags[:, 0, :] == fluidx3d.TYPE_E):
+    print("  ✅ SUCCESS: host flags from before the first region are on the device")
+else:
+    print("  ❌ FAILED: host flags were dropped")
+sim.reset()
+try:
+    sim.flags[2:4, 2:4, 2:4] = fluidx3d.TYPE_S  # after the regions, run() would not upload it
+    print("  ❌ UNEXPECTED: Should have raised an exception!")
+except ValueError as e:
+    print(f"  ✅ SUCCESS: Caught expected error: {e}")
+flags = sim.flags.copy()
+flags[2:4, 2:4, 2:4] = fluidx3d.TYPE_S
+sim.write_to_device('flags', flags)
+sim.run(0)
+if np.all(state(sim)[0][2:4, 2:4, 2:4] == fluidx3d.TYPE_S):
+    print("  ✅ SUCCESS: runs once the edit is uploaded with write_to_device()")
+else:
+    print("  ❌ FAILED: uploaded edit missing")
+del sim
+print()
+
+# Test 7: setup time of a larger box, host arrays vs regions
+print("Test 7: setup time...")
+N = (128, 256, 128)
+timings = {}
+for name in ('host', 'device'):
+    sim = make_sim((1, 1, 1), N)
+    start = time.perf_counter()
+    if name == 'host':
+        flags = sim.flags.copy()
+        u = sim.u.copy()
+        u[1] = u_in
+        flags[:, :, 0] = flags[:, :, -1] = flags[:, 0, :] = flags[:, -1, :] = flags[-1] = fluidx3d.TYPE_E
+        sim.write_to_device('flags', flags)
+        sim.write_to_device('u', u)
+    else:
+        sim.apply_region('box', u=(0.0, u_in, 0.0))
+        sim.apply_region('faces', flag=fluidx3d.TYPE_E, faces='-x +x -y +y +z')
+    sim.run(0)
+    sim.finish_queue()
+    timings[name] = time.perf_counter() - start
+    del sim
+print(f"    {N[0]}x{N[1]}x{N[2]}: NumPy arrays + upload {timings['host']:.3f} s, regions {timings['device']:.3f} s")
+print("  ✅ SUCCESS: timed")
+
+print()
+print("=" * 70)
+print("Regions Test Complete!")
+print("=" * 70)
@@ -0,0 +1,115 @@
+"""
+Test script for FluidX3D Python Module - stepwise Simulation object
+Builds the simulation once, then steps it from Python
+Usage: python test_simulation.py [model.stl]
+"""
+import sys
+import io
+import time
+import fluidx3d
+
+# Fix console encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+stl_file = sys.argv[1] if len(sys.argv) > 1 else 'LZ_129_Hindenburg.stl'
+
+print("=" * 70)
+print("FluidX3D Python Module - Simulation Test")
+print("=" * 70)
+print(f"Version: {fluidx3d.__version__}")
+print()
+
+config = fluidx3d.Config()
+config.parse_args([
+    '-f', stl_file,
+    '--D3Q19', '--SRT',
+    '--EQUILIBRIUM_BOUNDARIES',
+    '-r', '50',  # Very low resolution for speed
+])
+
+# Test 1: build once, step several times
+print("Test 1: initialize() and run(steps)...")
+sim = fluidx3d.Simulation(config)
+print(f"  Lattice: {sim.get_Nx()}x{sim.get_Ny()}x{sim.get_Nz()}, {sim.get_D()} domain(s)")
+sim.initialize()
+t0 = sim.get_t()
+for i in range(3):
+    start = time.time()
+    sim.run(10)
+    sim.finish_queue()
+    print(f"  phase {i}: t={sim.get_t()} ({time.time()-start:.3f}s)")
+if sim.get_t() == t0 + 30:
+    print("  ✅ SUCCESS: time step advanced by 30")
+else:
+    print(f"  ❌ FAILED: expected t={t0+30}, got t={sim.get_t()}")
+print()
+
+# Test 2: only one Simulation at a time
+print("Test 2: second Simulation while the first is alive...")
+try:
+    fluidx3d.Simulation(config, 32, 32, 32, 0.1)
+    print("  ❌ UNEXPECTED: Should have raised an exception!")
+except RuntimeError as e:
+    print(f"  ✅ SUCCESS: Caught expected error: {e}")
+print()
+
+# Test 3: reset goes back to t=0 on the next run
+print("Test 3: reset()...")
+sim.reset()
+sim.run(5)
+if sim.get_t() == 5:
+    print("  ✅ SUCCESS: t=5 after reset and run(5)")
+else:
+    print(f"  ❌ FAILED: expected t=5, got t={sim.get_t()}")
+del sim
+print()
+
+# Test 4: plain box
+print("Test 4: Simulation(config, Nx, Ny, Nz, nu)...")
+box = fluidx3d.Simulation(config, 32, 32, 32, 0.1)
+box.run(10)
+print(f"  ✅ SUCCESS: t={box.get_t()}")
+print()
+
+# Test 5: NumPy views of the host fields
+print("Test 5: rho/u/flags as NumPy arrays...")
+rho, u, flags = box.rho, box.u, box.flags
+print(f"  rho {rho.shape} {rho.dtype}, u {u.shape} {u.dtype}, flags {flags.shape} {flags.dtype}")
+if rho.shape == (32, 32, 32) and u.shape == (3, 32, 32, 32) and not rho.flags.owndata:
+    print("  ✅ SUCCESS: shapes match and rho is a view of the host buffer (no copy)")
+else:
+    print("  ❌ FAILED: unexpected shape or copied data")
+u[0] = 0.05                  # set x-velocity everywhere on the host...
+box.write_to_device('u')     # ...and upload it
+box.reset()
+box.run(1)
+box.read_from_device('u')
+print(f"  mean ux after 1 step: {float(u[0].mean()):.4f}")
+if abs(float(u[0].mean()) - 0.05) < 1e-3:
+    print("  ✅ SUCCESS: view sees the device data after read_from_device()")
+else:
+    print("  ❌ FAILED: unexpected velocity")
+del rho, u, flags
+print()
+
+# Test 6: background frame export
+print("Test 6: write_frame() and frame_stats()...")
+import os
+export_path = os.path.join(os.getcwd(), 'export_simulation') + os.sep
+for i in range(5):
+    box.run(1)
+    box.write_frame(export_path)
+box.flush_frames()
+stats = box.frame_stats()
+print(f"  {stats}")
+if stats['queued'] == 5 and stats['written'] == 5 and stats['in_queue'] == 0:
+    print("  ✅ SUCCESS: all queued frames were written")
+else:
+    print("  ❌ FAILED: frame counters do not match")
+del box
+
+print()
+print("=" * 70)
+print("Simulation Test Complete!")
+print("=" * 70)
@@ -0,0 +1,115 @@
+"""
+Test script for FluidX3D Python Module - compressed field snapshots
+Writes .fxs snapshots in every format in the background and reads them back with fluidx3d.read_snapshot()
+Usage: python test_snapshots.py
+"""
+import sys
+import io
+import os
+import shutil
+import time
+import numpy as np
+import fluidx3d
+
+# Fix console encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+print("=" * 70)
+print("FluidX3D Python Module - Snapshot Test")
+print("=" * 70)
+print(f"Version: {fluidx3d.__version__}")
+print()
+
+N = 64
+folder = os.path.join(os.getcwd(), 'snapshot_test')
+shutil.rmtree(folder, ignore_errors=True)
+
+def make_simulation(D):
+    config = fluidx3d.Config()
+    config.parse_args(['--D3Q19', '--SRT'])
+    sim = fluidx3d.Simulation(config, N, N, N, 0.05, 1, 1, D)
+    z, y, x = np.mgrid[0:N, 0:N, 0:N]
+    u = sim.u.copy()
+    u[0] = 0.05*np.sin(2*np.pi*x/N)*np.cos(2*np.pi*z/N)  # Taylor-Green like vortices, smooth so compression has something to find
+    u[2] = -0.05*np.cos(2*np.pi*x/N)*np.sin(2*np.pi*z/N)
+    sim.write_to_device('u', u)
+    sim.run(20)
+    return sim
+
+def run_case(D):
+    sim = make_simulation(D)
+    sim.read_from_device('u')
+    sim.read_from_device('flags')
+    u, flags = sim.u.copy(), sim.flags.copy()
+    ok = True
+    for fmt, compress, tolerance in [('raw', False, 0.0), ('raw', True, 0.0), ('float16', True, 1e-3), ('uint16', True, 1e-5)]:
+        path = os.path.join(folder, f'u_{D}_{fmt}_{int(compress)}.fxs')
+        sim.write_snapshot('u', path, format=fmt, compress=compress, si_units=False)
+        sim.flush_snapshots()
+        snapshot = fluidx3d.read_snapshot(path)
+        error = float(np.abs(snapshot['data'] - u).max())
+        ratio = u.nbytes / os.path.getsize(path)
+        print(f"    u {fmt:8s} compress={compress!s:5s}: {os.path.getsize(path)/1024:8.1f} KB ({ratio:4.1f}x), max error {error:.2e}")
+        ok = ok and snapshot['data'].shape == u.shape and snapshot['name'] == 'u' and snapshot['t'] == 20 and error <= tolerance
+    path = os.path.join(folder, f'flags_{D}.fxs')
+    sim.write_snapshot('flags', path)
+    sim.flush_snapshots()
+    snapshot = fluidx3d.read_snapshot(path)
+    ok = ok and snapshot['data'].dtype == np.uint8 and (snapshot['data'] == flags).all()
+    part = fluidx3d.read_snapshot(os.path.join(folder, f'u_{D}_raw_1.fxs'), z=(17, 40))
+    ok = ok and part['data'].shape == (3, 23, N, N) and (part['data'] == u[:, 17:40]).all()
+    del sim
+    return ok
+
+# Test 1: every format round-trips, single domain
+print("Test 1: one domain...")
+if run_case(1):
+    print("  ✅ SUCCESS: snapshots read back within the format's precision")
+else:
+    print("  ❌ FAILED: snapshot data differs")
+print()
+
+# Test 2: several domains, halos must not end up in the file
+print("Test 2: two domains...")
+if run_case(2):
+    print("  ✅ SUCCESS: domains stitched together")
+else:
+    print("  ❌ FAILED: multi-domain snapshot differs")
+print()
+
+# Test 3: write_snapshot() returns before the file is written, stepping continues meanwhile
+print("Test 3: background writing...")
+sim = make_simulation(1)
+start = time.time()
+sim.write_snapshot('u', os.path.join(folder, 'background.fxs'))
+queued = time.time() - start
+sim.run(10)
+sim.flush_snapshots()
+stats = sim.snapshot_stats()
+print(f"  write_snapshot() returned after {queued*1000:.1f} ms, writer busy {stats['write_seconds']*1000:.1f} ms, {stats}")
+if stats['written'] == stats['queued'] == 1 and stats['bytes_written'] < stats['bytes_raw'] and os.path.exists(os.path.join(folder, 'background.fxs')):
+    print("  ✅ SUCCESS: snapshot written in the background")
+else:
+    print("  ❌ FAILED: unexpected writer state")
+with open(os.path.join(folder, 'not_a_folder'), 'w') as f:
+    f.write('a file where the snapshot folder would be')
+sim.write_snapshot('u', os.path.join(folder, 'not_a_folder', 'failed.fxs'))
+sim.flush_snapshots()
+failed = sim.snapshot_stats()
+if failed['failed'] == 1 and failed['written'] == 1 and failed['queued'] == 2 and failed['in_queue'] == 0:
+    print("  ✅ SUCCESS: unwritable snapshot counted as failed, not as written")
+else:
+    print(f"  ❌ FAILED: {failed}")
+try:
+    sim.write_snapshot('flags', os.path.join(folder, 'bad.fxs'), format='float16')
+    print("  ❌ UNEXPECTED: Should have raised an exception!")
+except RuntimeError as e:
+    print(f"  ✅ SUCCESS: Caught expected error: {e}")
+del sim
+shutil.rmtree(folder, ignore_errors=True)
+
+print()
+print("=" * 70)
+print("Snapshot Test Complete!")
+print("=" * 70)
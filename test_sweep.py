@@ -0,0 +1,93 @@
+"""
+Test script for FluidX3D Python Module - parametric sweep
+Runs a Re/u/aoa sweep of the wing setup on one LBM with Config.run_sweep() and checks every point against a separate
+run_simulation() with the same arguments, which compiles, allocates and voxelizes from scratch
+Usage: python test_sweep.py [model.stl]
+"""
+import sys
+import io
+import time
+import fluidx3d
+
+# Fix console encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+stl_file = sys.argv[1] if len(sys.argv) > 1 else 'cube.stl'
+base_args = ['-f', stl_file, '--D3Q19', '--SRT', '--EQUILIBRIUM_BOUNDARIES', '--FORCE_FIELD', '-r', '50', '--secs', '0.25', '--monitor', '20']
+
+print("=" * 70)
+print("FluidX3D Python Module - Sweep Test")
+print("=" * 70)
+print(f"Version: {fluidx3d.__version__}")
+print()
+
+def config(extra_args=[]):
+    c = fluidx3d.Config()
+    c.parse_args(base_args + extra_args)
+    return c
+
+u0 = config().get_float('u')
+points = [{'re': 100}, {'re': 200}, {'re': 100, 'aoa': 10}, {'re': 200, 'u': 2*u0, 'aoa': 0}]  # back to aoa 0 after a rotated mesh
+
+# Test 1: one LBM for the whole sweep
+print("Test 1: sweep of 4 points...")
+start = time.perf_counter()
+table = config().run_sweep(points)
+sweep_seconds = time.perf_counter() - start
+for row in table:
+    print(f"    re {row['re']:>5.0f} | u {row['u']:>6.3f} | aoa {row['aoa']:>4.1f} | Cd {row['Cd']:>8.4f} | Cl {row['Cl']:>8.4f} | t {row['t']:>5} | setup {row['setup_s']:.2f} s | run {row['run_s']:.2f} s")
+if len(table) == len(points) and all(row['samples'] > 0 and row['t'] > 0 for row in table) and table[2]['aoa'] == 10.0 and table[3]['u'] == 2*u0:
+    print("  ✅ SUCCESS: one row per point")
+else:
+    print("  ❌ FAILED: incomplete table")
+print()
+
+# Test 2: every point matches a fresh run
+print("Test 2: sweep points against separate runs...")
+ok = True
+runs_seconds = 0.0
+for point, row in zip(points, table):
+    extra = []
+    for key, flag in (('re', '--re'), ('u', '-u'), ('aoa', '--aoa')):
+        if key in point:
+            extra += [flag, str(point[key])]
+    start = time.perf_counter()
+    result = config(extra + ['--monitorlog', 'export_sweep/forces.csv']).run_simulation(headless=True)
+    runs_seconds += time.perf_counter() - start
+    same = result is not None and result['t'] == row['t'] and result['Cd'] == row['Cd'] and result['Cl'] == row['Cl'] and result['Cs'] == row['Cs']
+    print(f"    {point}: separate Cd {result['Cd']:.6f} Cl {result['Cl']:.6f} t {result['t']}, sweep Cd {row['Cd']:.6f} Cl {row['Cl']:.6f} t {row['t']}")
+    ok = ok and same
+if ok:
+    print("  ✅ SUCCESS: all points are bit-identical to separate runs")
+else:
+    print("  ❌ FAILED: a sweep point differs from its separate run")
+print()
+
+# Test 3: timing
+print("Test 3: timing...")
+print(f"    sweep {sweep_seconds:.2f} s, separate runs {runs_seconds:.2f} s")
+print("  ✅ SUCCESS: timed")
+print()
+
+# Test 4: bad input raises instead of running
+print("Test 4: errors...")
+errors = 0
+no_force_field = [arg for arg in base_args if arg != '--FORCE_FIELD']
+for args, bad_points in ((base_args, [{'mach': 0.3}]), (base_args, [{'re': 0}]), (no_force_field, [{'re': 100}])):
+    c = fluidx3d.Config()
+    c.parse_args(args)
+    try:
+        c.run_sweep(bad_points)
+    except RuntimeError as e:
+        print(f"    RuntimeError: {e}")
+        errors += 1
+if errors == 3:
+    print("  ✅ SUCCESS: unknown key, Re 0 and missing --FORCE_FIELD rejected")
+else:
+    print("  ❌ FAILED: expected 3 errors")
+
+print()
+print("=" * 70)
+print("Sweep Test Complete!")
+print("=" * 70)
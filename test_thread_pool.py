@@ -0,0 +1,74 @@
+"""
+Test script for FluidX3D Python Module - parallel_for thread pool
+Checks the thread count setting, that per-thread reductions on the pool match the old parallel_for bit for bit, and that
+a host loop (STL loading and transform) gives the same result for any thread count
+Usage: python test_thread_pool.py
+"""
+import sys
+import io
+import os
+import tempfile
+import numpy as np
+import fluidx3d
+
+# Fix console encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+print("=" * 70)
+print("FluidX3D Python Module - Thread Pool Test")
+print("=" * 70)
+print(f"Version: {fluidx3d.__version__}")
+print()
+
+# Test 1: thread count
+print("Test 1: set_threads()/get_threads()...")
+default = fluidx3d.get_threads()
+counts = []
+for threads in (1, 3, 16, 0):
+    fluidx3d.set_threads(threads)
+    counts.append(fluidx3d.get_threads())
+print(f"  default {default}, set 1/3/16/0 -> {counts}")
+if counts == [1, 3, 16, default] and default >= 1:
+    print("  ✅ SUCCESS: thread count follows the setting")
+else:
+    print("  ❌ FAILED: unexpected thread counts")
+print()
+
+# Test 2: static schedule keeps the old n -> t mapping
+print("Test 2: reductions against the old parallel_for...")
+ok = True
+for threads in (1, 3, 0):
+    fluidx3d.set_threads(threads)
+    for r in fluidx3d.benchmark_parallel_for([0, 1, 7, 1000, 1234567], 2):
+        ok = ok and r['identical']
+print("  ✅ SUCCESS: per-thread sums identical for 1, 3 and all threads" if ok else "  ❌ FAILED: per-thread sums differ")
+print()
+
+# Test 3: a real host loop gives the same result for any thread count
+print("Test 3: STL loading with 1, 2, 5 and all threads...")
+rng = np.random.default_rng(1)
+triangles = rng.random((5000, 3, 3), dtype=np.float32)
+path = os.path.join(tempfile.gettempdir(), "fluidx3d_thread_pool_test.stl")
+with open(path, "w") as f:
+    f.write("solid test\n")
+    for t in triangles:
+        f.write("facet normal 0 0 1\nouter loop\n")
+        for v in t:
+            f.write(f"vertex {v[0]:.7e} {v[1]:.7e} {v[2]:.7e}\n")
+        f.write("endloop\nendfacet\n")
+    f.write("endsolid test\n")
+results = []
+for threads in (1, 2, 5, 0):
+    fluidx3d.set_threads(threads)
+    results.append(fluidx3d.read_stl(path, 2.0))
+os.remove(path)
+if all(np.array_equal(results[0], r) for r in results[1:]) and results[0].shape == (5000, 3, 3):
+    print("  ✅ SUCCESS: identical triangles")
+else:
+    print("  ❌ FAILED: results depend on the thread count")
+
+print()
+print("=" * 70)
+print("Thread Pool Test Complete!")
+print("=" * 70)